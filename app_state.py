@@ -0,0 +1,72 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from cache_dir import cache_path
+
+logger = logging.getLogger('FileExplorer.state')
+
+
+class AppState:
+    """Небольшой файл состояния приложения между запусками (последний каталог и т. п.)."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        """
+        Инициализация состояния. Файл читается при первом обращении.
+
+        Args:
+            path: Путь к JSON-файлу состояния; по умолчанию state.json в каталоге кэша
+        """
+        self.path = path or cache_path('state.json')
+        self._values: Dict[str, Any] = {}
+        self._loaded = False
+
+    def _load(self) -> None:
+        """Читает файл состояния; повреждённый или отсутствующий файл игнорируется."""
+        self._loaded = True
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                values = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.debug(f'State not loaded: {e}')
+            return
+        if isinstance(values, dict):
+            self._values = values
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Возвращает сохранённое значение.
+
+        Args:
+            key: Имя значения
+            default: Значение по умолчанию
+        """
+        if not self._loaded:
+            self._load()
+        return self._values.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Запоминает значение; на диск оно попадает при вызове save().
+
+        Args:
+            key: Имя значения
+            value: Значение, сериализуемое в JSON
+        """
+        if not self._loaded:
+            self._load()
+        self._values[key] = value
+
+    def save(self) -> None:
+        """Атомарно записывает состояние на диск."""
+        directory = os.path.dirname(self.path)
+        tmp_path = f'{self.path}.tmp'
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._values, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f'Cannot save state: {e}')
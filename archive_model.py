@@ -0,0 +1,266 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QAbstractItemModel, QDir, QModelIndex, Qt, pyqtSignal
+
+from archives import ArchiveCache, ArchiveError, ArchiveIndex, Member, member_path, split_archive_path
+from disk_usage import format_size
+from lazy_model import COLUMN_MTIME, COLUMN_NAME, COLUMN_SIZE, HEADERS
+
+
+class _Node:
+    """Каталог архива, содержимое которого уже показано."""
+
+    __slots__ = ('inner', 'parent', 'row', 'members', 'children')
+
+    def __init__(self, inner: str, parent: Optional['_Node'], row: int) -> None:
+        self.inner = inner
+        self.parent = parent
+        self.row = row
+        # None — содержимое ещё не запрашивалось
+        self.members: Optional[List[Member]] = None
+        self.children: dict = {}
+
+
+class ArchiveModel(QAbstractItemModel):
+    """
+    Модель для просмотра архива как каталога.
+
+    Оглавление архива строится в фоновом потоке (или берётся из кэша),
+    содержимое каталогов архива отображается по мере раскрытия.
+    Интерфейс повторяет используемую часть QFileSystemModel, как и
+    LazyDirectoryModel; пути элементов — вида /каталог/архив.zip/файл.
+    """
+
+    # Как и в QFileSystemModel: каталог прочитан полностью
+    directoryLoaded = pyqtSignal(str)
+    # Архив не удалось прочитать: (путь, сообщение)
+    loadFailed = pyqtSignal(str, str)
+
+    _index_ready = pyqtSignal(int, object)
+
+    def __init__(self, cache: ArchiveCache, parent=None, executor=None) -> None:
+        """
+        Инициализация пустой модели.
+
+        Args:
+            cache: Кэш оглавлений архивов
+            parent: Родительский объект Qt
+            executor: Исполнитель фоновых задач (submit/shutdown);
+                по умолчанию — собственный поток
+        """
+        super().__init__(parent)
+        self._cache = cache
+        self._archive = ''
+        self._index: Optional[ArchiveIndex] = None
+        self._root = _Node('', None, 0)
+        self._generation = 0
+        self._filter = QDir.AllEntries | QDir.AllDirs | QDir.NoDotAndDotDot
+        self._executor = executor or ThreadPoolExecutor(max_workers=1,
+                                                        thread_name_prefix='archive-index')
+        self._index_ready.connect(self._on_index_ready)
+
+        provider = QtWidgets.QFileIconProvider()
+        self._dir_icon = provider.icon(QtWidgets.QFileIconProvider.Folder)
+        self._file_icon = provider.icon(QtWidgets.QFileIconProvider.File)
+
+    @property
+    def archive(self) -> str:
+        """Путь к открытому архиву."""
+        return self._archive
+
+    # --- Интерфейс, совместимый с QFileSystemModel ---
+
+    def setRootPath(self, path: str) -> QModelIndex:
+        """
+        Открывает каталог архива; оглавление строится в фоне, если его нет в кэше.
+
+        Args:
+            path: Путь к архиву или к каталогу внутри него
+        """
+        location = split_archive_path(path)
+        self.beginResetModel()
+        self._generation += 1
+        self._archive, inner = location if location is not None else ('', '')
+        self._root = _Node(inner, None, 0)
+        self._index = None
+        self.endResetModel()
+        if location is None:
+            self.loadFailed.emit(path, 'Путь не ведёт в архив')
+            return QModelIndex()
+        index = self._cache.cached(self._archive)
+        if index is not None:
+            self._on_index_ready(self._generation, index)
+        else:
+            generation, archive = self._generation, self._archive
+
+            def job():
+                try:
+                    result = self._cache.get(archive)
+                except ArchiveError as e:
+                    result = e
+                self._index_ready.emit(generation, result)
+            self._executor.submit(job)
+        return QModelIndex()
+
+    def rootPath(self) -> str:
+        """Возвращает текущий каталог архива."""
+        return member_path(self._archive, self._root.inner) if self._archive else ''
+
+    def setFilter(self, filters) -> None:
+        """
+        Устанавливает фильтр; учитывается флаг QDir.Hidden.
+
+        Args:
+            filters: Флаги QDir
+        """
+        hidden_changed = bool(filters & QDir.Hidden) != bool(self._filter & QDir.Hidden)
+        self._filter = filters
+        if hidden_changed and self._archive:
+            self.setRootPath(self.rootPath())
+
+    def filter(self):
+        """Возвращает текущий фильтр."""
+        return self._filter
+
+    def filePath(self, index: QModelIndex) -> str:
+        """
+        Возвращает путь элемента.
+
+        Args:
+            index: Индекс элемента; недействительный индекс означает корень
+        """
+        if not index.isValid():
+            return self.rootPath()
+        node = index.internalPointer()
+        name = node.members[index.row()][0]
+        return member_path(self._archive, f'{node.inner}/{name}' if node.inner else name)
+
+    def isDir(self, index: QModelIndex) -> bool:
+        """Проверяет, является ли элемент каталогом."""
+        if not index.isValid():
+            return True
+        return index.internalPointer().members[index.row()][1]
+
+    def close(self) -> None:
+        """Отменяет построение оглавления."""
+        self._generation += 1
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Реализация QAbstractItemModel ---
+
+    def index(self, row, column: int = 0, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        """
+        Возвращает индекс по строке и родителю или по пути (как QFileSystemModel).
+
+        По пути находятся только элементы текущего каталога архива.
+        """
+        if isinstance(row, str):
+            return self._index_for_path(row, column)
+        node = self._container(parent)
+        if node is None or not 0 <= row < len(node.members) or not 0 <= column < len(HEADERS):
+            return QModelIndex()
+        return self.createIndex(row, column, node)
+
+    def parent(self, index: QModelIndex = QModelIndex()) -> QModelIndex:
+        """Возвращает индекс родительского каталога."""
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalPointer()
+        if node is self._root or node.parent is None:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node.parent)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Количество элементов в каталоге архива."""
+        if parent.column() > 0:
+            return 0
+        node = self._container(parent)
+        return len(node.members) if node is not None else 0
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Количество столбцов."""
+        return len(HEADERS)
+
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        """Каталоги архива могут иметь содержимое."""
+        if not parent.isValid():
+            return self._index is not None
+        return self.isDir(parent)
+
+    def headerData(self, section: int, orientation, role: int = Qt.DisplayRole) -> Any:
+        """Заголовки столбцов."""
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return HEADERS[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        """Возвращает данные строки из оглавления архива."""
+        if not index.isValid():
+            return None
+        name, is_dir, size, mtime = index.internalPointer().members[index.row()]
+        column = index.column()
+        if role == Qt.DecorationRole and column == COLUMN_NAME:
+            return self._dir_icon if is_dir else self._file_icon
+        if role != Qt.DisplayRole:
+            return None
+        if column == COLUMN_NAME:
+            return name
+        if column == COLUMN_SIZE:
+            return '' if is_dir else format_size(size)
+        if column == COLUMN_MTIME and mtime:
+            return time.strftime('%d.%m.%Y %H:%M', time.localtime(mtime))
+        return None
+
+    # --- Внутренние методы ---
+
+    def _container(self, parent: QModelIndex) -> Optional[_Node]:
+        """Возвращает каталог, строки которого находятся под parent, загружая его."""
+        if self._index is None:
+            return None
+        if not parent.isValid():
+            node = self._root
+        else:
+            holder = parent.internalPointer()
+            row = parent.row()
+            node = holder.children.get(row)
+            if node is None:
+                name = holder.members[row][0]
+                inner = f'{holder.inner}/{name}' if holder.inner else name
+                node = holder.children[row] = _Node(inner, holder, row)
+        if node.members is None:
+            members = self._index.list(node.inner) or []
+            if not self._filter & QDir.Hidden:
+                members = [member for member in members if not member[0].startswith('.')]
+            node.members = members
+        return node
+
+    def _index_for_path(self, path: str, column: int) -> QModelIndex:
+        """Находит строку элемента текущего каталога архива по пути."""
+        node = self._container(QModelIndex())
+        if node is None or os.path.dirname(os.path.normpath(path)) != self.rootPath():
+            return QModelIndex()
+        name = os.path.basename(path)
+        for row, member in enumerate(node.members):
+            if member[0] == name:
+                return self.createIndex(row, column, node)
+        return QModelIndex()
+
+    def _on_index_ready(self, generation: int, result: object) -> None:
+        """Показывает содержимое архива после построения оглавления."""
+        if generation != self._generation:
+            return
+        path = self.rootPath()
+        if isinstance(result, ArchiveError):
+            self.loadFailed.emit(path, str(result))
+            return
+        if not result.is_dir(self._root.inner):
+            self.loadFailed.emit(path, 'Каталог не найден в архиве')
+            return
+        self.beginResetModel()
+        self._index = result
+        self.endResetModel()
+        self.directoryLoaded.emit(path)
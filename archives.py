@@ -0,0 +1,349 @@
+"""
+Просмотр архивов zip и tar как каталогов.
+
+Оглавление архива строится по центральному каталогу zip или по
+заголовкам tar без распаковки содержимого элементов и кэшируется по
+(путь, время изменения, размер). Отдельный файл извлекается по запросу:
+из zip читается только этот элемент, из несжатого tar — только его
+данные по известному смещению. Сжатый tar (tar.gz и т. п.) не имеет
+оглавления, поэтому при построении оглавления поток распаковывается
+целиком, а при извлечении — до нужного элемента.
+
+Пути внутри архива записываются как продолжение пути к архиву:
+/home/user/backup.zip/docs/report.txt.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import stat
+import tarfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+from cache_dir import cache_path
+from dir_cache import sort_entries
+
+logger = logging.getLogger('FileExplorer.archives')
+
+# Расширения архивов, которые можно открыть как каталог
+ARCHIVE_EXTENSIONS = ('.zip', '.jar', '.whl', '.tar', '.tar.gz', '.tgz',
+                      '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+# Сколько оглавлений архивов хранится в памяти
+CACHE_SIZE = 32
+
+# Элемент архива: (имя, является ли каталогом, размер, время изменения)
+Member = Tuple[str, bool, int, float]
+
+
+class ArchiveError(OSError):
+    """Архив повреждён, не поддерживается или элемент не найден."""
+
+
+def is_archive(path: str) -> bool:
+    """Проверяет по расширению, можно ли открыть файл как архив."""
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def split_archive_path(path: str) -> Optional[Tuple[str, str]]:
+    """
+    Разделяет путь внутри архива на путь к архиву и путь элемента.
+
+    Args:
+        path: Путь вида /каталог/архив.zip/каталог/файл
+
+    Returns:
+        (путь к архиву, путь элемента через '/'; '' — корень архива)
+        или None, если путь не ведёт в архив
+    """
+    current = os.path.normpath(path)
+    parts: List[str] = []
+    while True:
+        if os.path.isfile(current):
+            return (current, '/'.join(reversed(parts))) if is_archive(current) else None
+        if os.path.isdir(current):
+            return None
+        parent, name = os.path.split(current)
+        if parent == current or not name:
+            return None
+        parts.append(name)
+        current = parent
+
+
+def member_path(archive: str, inner: str) -> str:
+    """Возвращает полный путь элемента архива."""
+    return os.path.join(archive, *inner.split('/')) if inner else archive
+
+
+def member_stat(member: Member) -> os.stat_result:
+    """Возвращает os.stat_result элемента архива для проверок запросов (размер, время)."""
+    _, is_dir, size, mtime = member
+    mode = stat.S_IFDIR | 0o755 if is_dir else stat.S_IFREG | 0o644
+    return os.stat_result((mode, 0, 0, 1, 0, 0, size, mtime, mtime, mtime))
+
+
+def _clean_name(name: str) -> Optional[str]:
+    """
+    Нормализует имя элемента архива: разделитель '/', без './' и ведущих '/'.
+
+    Returns:
+        Имя или None для небезопасных имён (с '..')
+    """
+    parts = [part for part in name.replace('\\', '/').split('/') if part and part != '.']
+    if not parts or '..' in parts:
+        return None
+    return '/'.join(parts)
+
+
+class ArchiveIndex:
+    """Оглавление архива: содержимое каталогов и сведения для извлечения элементов."""
+
+    def __init__(self, path: str, kind: str) -> None:
+        """
+        Инициализация пустого оглавления.
+
+        Args:
+            path: Путь к архиву
+            kind: 'zip' или 'tar'
+        """
+        self.path = path
+        self.kind = kind
+        # Каталог внутри архива ('' — корень) -> {имя: элемент}
+        self._dirs: Dict[str, Dict[str, Member]] = {'': {}}
+        # Путь файла -> имя в zip или TarInfo
+        self._locators: Dict[str, object] = {}
+        self._sorted: Dict[str, List[Member]] = {}
+
+    def __len__(self) -> int:
+        """Количество файлов в архиве."""
+        return len(self._locators)
+
+    def _add(self, inner: str, is_dir: bool, size: int, mtime: float, locator=None) -> None:
+        """Добавляет элемент и недостающие родительские каталоги."""
+        parent, _, name = inner.rpartition('/')
+        if parent not in self._dirs:
+            self._add(parent, True, 0, mtime)
+        self._dirs[parent][name] = (name, is_dir, size, mtime)
+        if is_dir:
+            self._dirs.setdefault(inner, {})
+        else:
+            self._locators[inner] = locator
+
+    def is_dir(self, inner: str) -> bool:
+        """Проверяет, является ли путь каталогом архива."""
+        return inner in self._dirs
+
+    def member(self, inner: str) -> Optional[Member]:
+        """Возвращает элемент по пути или None."""
+        parent, _, name = inner.rpartition('/')
+        return self._dirs.get(parent, {}).get(name)
+
+    def locator(self, inner: str) -> Optional[object]:
+        """Возвращает имя файла в zip или TarInfo для извлечения, None — если файла нет."""
+        return self._locators.get(inner)
+
+    def list(self, inner: str = '') -> Optional[List[Member]]:
+        """
+        Возвращает содержимое каталога архива: каталоги первыми, затем по имени.
+
+        Args:
+            inner: Путь каталога внутри архива
+
+        Returns:
+            Элементы (не изменять) или None, если каталога нет
+        """
+        members = self._sorted.get(inner)
+        if members is None:
+            children = self._dirs.get(inner)
+            if children is None:
+                return None
+            members = self._sorted[inner] = sort_entries(children.values())
+        return members
+
+    def walk(self) -> Iterator[Tuple[str, List[Member], List[Member]]]:
+        """Обходит каталоги архива: (путь каталога, подкаталоги, файлы)."""
+        for inner, children in self._dirs.items():
+            dirs = [member for member in children.values() if member[1]]
+            files = [member for member in children.values() if not member[1]]
+            yield inner, dirs, files
+
+
+def build_index(path: str) -> ArchiveIndex:
+    """
+    Строит оглавление архива без распаковки содержимого элементов.
+
+    Args:
+        path: Путь к архиву
+
+    Raises:
+        ArchiveError: Если архив повреждён или не поддерживается
+    """
+    try:
+        if zipfile.is_zipfile(path):
+            index = ArchiveIndex(path, 'zip')
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    inner = _clean_name(info.filename)
+                    if inner is not None:
+                        mtime = _zip_mtime(info)
+                        index._add(inner, info.is_dir(), info.file_size, mtime, info.filename)
+            return index
+        index = ArchiveIndex(path, 'tar')
+        with tarfile.open(path, 'r:*') as archive:
+            for info in archive:
+                inner = _clean_name(info.name)
+                if inner is None or not (info.isdir() or info.isfile()):
+                    continue
+                index._add(inner, info.isdir(), info.size, float(info.mtime), info)
+        return index
+    except (OSError, zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+        raise ArchiveError(f'Cannot read archive {path}: {e}') from e
+
+
+def _zip_mtime(info: zipfile.ZipInfo) -> float:
+    """Время изменения элемента zip (хранится как локальное время)."""
+    try:
+        return time.mktime(info.date_time + (0, 0, -1))
+    except (OverflowError, ValueError):
+        return 0.0
+
+
+class ArchiveCache:
+    """LRU-кэш оглавлений архивов, действительных, пока архив не изменился."""
+
+    def __init__(self, max_archives: int = CACHE_SIZE, extract_dir: Optional[str] = None) -> None:
+        """
+        Инициализация пустого кэша.
+
+        Args:
+            max_archives: Сколько оглавлений хранить в памяти
+            extract_dir: Каталог для извлечённых файлов; по умолчанию archives в каталоге кэша
+        """
+        self.max_archives = max_archives
+        self.extract_dir = extract_dir or cache_path('archives')
+        self._entries: 'OrderedDict[Tuple[str, int, int], ArchiveIndex]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Количество оглавлений в кэше."""
+        return len(self._entries)
+
+    @staticmethod
+    def _key(path: str) -> Tuple[str, int, int]:
+        """Ключ кэша: (путь, время изменения, размер)."""
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            raise ArchiveError(f'Cannot read archive {path}: {e}') from e
+        return os.path.normpath(path), st.st_mtime_ns, st.st_size
+
+    def cached(self, path: str) -> Optional[ArchiveIndex]:
+        """Возвращает оглавление, только если оно уже построено и актуально."""
+        try:
+            key = self._key(path)
+        except ArchiveError:
+            return None
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+        return index
+
+    def get(self, path: str) -> ArchiveIndex:
+        """
+        Возвращает оглавление архива, при необходимости строя его.
+
+        Args:
+            path: Путь к архиву
+
+        Raises:
+            ArchiveError: Если архив недоступен или повреждён
+        """
+        key = self._key(path)
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+                return index
+        index = build_index(path)
+        logger.info(f'Archive indexed: {path}, files={len(index)}')
+        with self._lock:
+            # Оглавления прежних версий архива больше не нужны
+            for stale in [k for k in self._entries if k[0] == key[0]]:
+                del self._entries[stale]
+            self._entries[key] = index
+            while len(self._entries) > self.max_archives:
+                self._entries.popitem(last=False)
+        return index
+
+    def open_member(self, archive: str, inner: str) -> IO[bytes]:
+        """
+        Открывает файл архива для чтения без распаковки остальных элементов.
+
+        Args:
+            archive: Путь к архиву
+            inner: Путь файла внутри архива
+
+        Raises:
+            ArchiveError: Если файла нет или архив не читается
+        """
+        index = self.get(archive)
+        locator = index.locator(inner)
+        if locator is None:
+            raise ArchiveError(f'No such file in archive: {member_path(archive, inner)}')
+        try:
+            if index.kind == 'zip':
+                container = zipfile.ZipFile(archive)
+                stream = container.open(locator)
+            else:
+                container = tarfile.open(archive, 'r:*')
+                stream = container.extractfile(locator)
+        except (OSError, zipfile.BadZipFile, tarfile.TarError, KeyError) as e:
+            raise ArchiveError(f'Cannot read {inner} from {archive}: {e}') from e
+        # Архив закрывается вместе с потоком элемента
+        close = stream.close
+
+        def close_both() -> None:
+            close()
+            container.close()
+        stream.close = close_both
+        return stream
+
+    def extract(self, archive: str, inner: str) -> str:
+        """
+        Извлекает один файл архива в каталог извлечённых файлов.
+
+        Повторное извлечение не выполняется, пока архив не изменился.
+
+        Args:
+            archive: Путь к архиву
+            inner: Путь файла внутри архива
+
+        Returns:
+            Путь извлечённого файла
+
+        Raises:
+            ArchiveError: Если файла нет или архив не читается
+        """
+        path, mtime_ns, size = self._key(archive)
+        digest = hashlib.sha1(f'{path}\0{mtime_ns}\0{size}'.encode('utf-8', 'surrogateescape'))
+        target = os.path.join(self.extract_dir, digest.hexdigest()[:16], *inner.split('/'))
+        if os.path.isfile(target):
+            return target
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        partial = target + '.partial'
+        try:
+            with self.open_member(archive, inner) as src, open(partial, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(partial, target)
+        except BaseException:
+            try:
+                os.unlink(partial)
+            except OSError:
+                pass
+            raise
+        logger.info(f'Extracted {inner} from {archive}')
+        return target
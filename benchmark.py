@@ -0,0 +1,395 @@
+"""
+Набор измерений производительности, работающий без дисплея.
+
+Генерирует воспроизводимые синтетические деревья и измеряет поиск
+FileSearchJob целиком и до первого результата, задержку отображения
+каталога в file_tree и пиковую память. Результаты записываются в JSON
+и могут сравниваться с базовым прогоном:
+
+    python benchmark.py --output bench.json
+    python benchmark.py --baseline bench.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5 import QtWidgets  # noqa: E402
+from PyQt5.QtCore import QEventLoop  # noqa: E402
+
+# Версия формата результатов
+RESULTS_VERSION = 1
+# Формы деревьев и их размеры при scale = 1
+SHAPES = {
+    # Один каталог с большим числом файлов и подкаталогов
+    'wide': {'files': 20000, 'dirs': 500},
+    # Цепочка вложенных каталогов с несколькими файлами на уровне
+    'deep': {'depth': 64, 'files': 20},
+    # Много мелких файлов в сотнях каталогов
+    'tiny': {'dirs': 200, 'files': 100},
+    # Длинные имена в разных алфавитах
+    'unicode': {'dirs': 20, 'files': 100},
+}
+# Запрос, под который попадает примерно каждый десятый файл
+SEARCH_QUERY = '7'
+# Запрос быстрого поиска, набираемый по одному символу, и число путей-кандидатов
+# при scale = 1 (пути дерева повторяются с разными префиксами)
+FUZZY_QUERY = 'cpy7'
+FUZZY_CANDIDATES = 1000000
+# Наибольшее время ожидания одного измерения в секундах
+TIMEOUT = 300
+# Разница меньше этой величины не считается регрессией (шум измерений)
+MIN_DELTA = 0.005
+# Метрики, сравниваемые с базовым прогоном (меньше — лучше)
+COMPARED_METRICS = ('search_total', 'search_first_result', 'listing_fs_model',
+                    'listing_lazy_first_rows', 'search_peak_python_mb',
+                    'fuzzy_first_result', 'fuzzy_refine_total', 'results_memory_mb')
+
+_ALPHABETS = ('abcdefghijklmnopqrstuvwxyz', 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя',
+              'αβγδεζηθικλμνξοπρστυφχψω', '日本語のファイル名漢字', 'ğüşıöç')
+
+
+def _unicode_name(rng: random.Random, number: int) -> str:
+    """Возвращает длинное имя из символов случайных алфавитов."""
+    parts = []
+    while sum(len(part) for part in parts) < 80:
+        alphabet = rng.choice(_ALPHABETS)
+        parts.append(''.join(rng.choice(alphabet) for _ in range(rng.randint(4, 12))))
+    return '_'.join(parts) + f'_{number}'
+
+
+def generate_tree(root: str, shape: str, scale: float = 1.0, seed: int = 0) -> Dict[str, int]:
+    """
+    Создаёт синтетическое дерево заданной формы.
+
+    Одинаковые shape, scale и seed дают одинаковое дерево.
+
+    Args:
+        root: Каталог, в котором создаётся дерево
+        shape: Форма дерева (ключ SHAPES)
+        scale: Множитель количества файлов и каталогов
+        seed: Начальное значение генератора случайных чисел
+
+    Returns:
+        Словарь с количеством созданных файлов и каталогов
+    """
+    params = {key: max(1, int(value * scale)) for key, value in SHAPES[shape].items()}
+    rng = random.Random(f'{shape}:{seed}')
+    os.makedirs(root, exist_ok=True)
+    files = dirs = 0
+
+    def touch(path: str) -> None:
+        nonlocal files
+        with open(path, 'wb') as f:
+            f.write(b'x' * rng.randint(0, 64))
+        files += 1
+
+    if shape == 'wide':
+        for i in range(params['dirs']):
+            os.mkdir(os.path.join(root, f'dir_{i:05d}'))
+            dirs += 1
+        for i in range(params['files']):
+            touch(os.path.join(root, f'file_{i:06d}.{rng.choice(("txt", "py", "log"))}'))
+    elif shape == 'deep':
+        path = root
+        for level in range(params['depth']):
+            path = os.path.join(path, f'level_{level:03d}')
+            os.mkdir(path)
+            dirs += 1
+            for i in range(params['files']):
+                touch(os.path.join(path, f'item_{level}_{i}.dat'))
+    elif shape == 'tiny':
+        for d in range(params['dirs']):
+            path = os.path.join(root, f'pkg_{d // 20:02d}', f'mod_{d:04d}')
+            os.makedirs(path, exist_ok=True)
+            dirs += 1
+            for i in range(params['files']):
+                touch(os.path.join(path, f'{i}.py'))
+    elif shape == 'unicode':
+        for d in range(params['dirs']):
+            path = os.path.join(root, _unicode_name(rng, d)[:100])
+            os.makedirs(path, exist_ok=True)
+            dirs += 1
+            for i in range(params['files']):
+                touch(os.path.join(path, _unicode_name(rng, i)[:120] + '.txt'))
+    else:
+        raise ValueError(f'Unknown tree shape: {shape}')
+    return {'files': files, 'dirs': dirs}
+
+
+def _wait(condition: Callable[[], bool], timeout: float = TIMEOUT) -> bool:
+    """Обрабатывает события Qt, пока условие не выполнится."""
+    app = QtWidgets.QApplication.instance()
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        app.processEvents(QEventLoop.AllEvents, 10)
+    return True
+
+
+def measure_search(root: str) -> Dict[str, float]:
+    """
+    Измеряет поиск FileSearchJob обходом дерева (без индекса).
+
+    Returns:
+        Время до первого результата и до завершения, число результатов
+        и пиковый объём памяти Python во время поиска
+    """
+    from explorer import FileSearchJob
+    from jobs import JobScheduler
+
+    scheduler = JobScheduler()
+    job = FileSearchJob(root, SEARCH_QUERY)
+    found: List[int] = []
+    first: List[float] = []
+    finished: List[float] = []
+    job.found_files.connect(
+        lambda paths: (first or first.append(time.perf_counter()), found.append(len(paths))))
+    job.search_finished.connect(lambda: finished.append(time.perf_counter()))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    job.start(scheduler)
+    _wait(lambda: bool(finished))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    scheduler.shutdown(timeout=TIMEOUT)
+    end = finished[0] if finished else time.perf_counter()
+    return {
+        'search_total': end - start,
+        'search_first_result': (first[0] - start) if first else end - start,
+        'search_results': sum(found),
+        'search_peak_python_mb': peak / 2 ** 20,
+    }
+
+
+def measure_fuzzy(root: str, candidates: int) -> Dict[str, float]:
+    """
+    Измеряет быстрый поиск при наборе FUZZY_QUERY по одному символу.
+
+    Каждый следующий запрос уточняет предыдущий и проверяет только
+    отобранные им пути.
+
+    Returns:
+        Наибольшее по нажатиям время до первых результатов и время
+        полного поиска по последнему запросу
+    """
+    from fuzzy import FuzzyIndex
+
+    paths = [os.path.relpath(os.path.join(d, name), root)
+             for d, _, names in os.walk(root) for name in names]
+    index = FuzzyIndex()
+    copy = 0
+    while paths and index.count < candidates:
+        index.add([f'/bench/copy_{copy}/{path}' for path in paths[:candidates - index.count]])
+        copy += 1
+
+    first_results = []
+    total = 0.0
+    for length in range(1, len(FUZZY_QUERY) + 1):
+        start = time.perf_counter()
+        first = None
+        for _ in index.search(FUZZY_QUERY[:length]):
+            if first is None:
+                first = time.perf_counter() - start
+        total = time.perf_counter() - start
+        first_results.append(total if first is None else first)
+    return {
+        'fuzzy_candidates': index.count,
+        'fuzzy_first_result': max(first_results),
+        'fuzzy_refine_total': total,
+    }
+
+
+def measure_listing(window, root: str) -> Dict[str, float]:
+    """
+    Измеряет задержку отображения каталога в file_tree.
+
+    Для QFileSystemModel — время до сигнала directoryLoaded, для ленивой
+    модели — время до появления первых строк.
+    """
+    results = {}
+    window.action_lazy_model.setChecked(False)
+    loaded: List[str] = []
+    window.fs_model.directoryLoaded.connect(loaded.append)
+    start = time.perf_counter()
+    window.change_root(root)
+    _wait(lambda: os.path.normpath(root) in map(os.path.normpath, loaded))
+    results['listing_fs_model'] = time.perf_counter() - start
+    window.fs_model.directoryLoaded.disconnect(loaded.append)
+
+    window.action_lazy_model.setChecked(True)
+    start = time.perf_counter()
+    window.change_root(root)
+    _wait(lambda: window.model.rowCount(window.ui.file_tree.rootIndex()) > 0
+          or window.lazy_model._root.complete)
+    results['listing_lazy_first_rows'] = time.perf_counter() - start
+    window.action_lazy_model.setChecked(False)
+    return results
+
+
+def measure_results_memory(root: str, count: int) -> Dict[str, float]:
+    """
+    Измеряет память модели результатов поиска с count путями.
+
+    Пути добавляются пачками, как при поиске; учитываются все данные
+    модели, включая словарь каталогов PathStore, но без самих добавляемых строк.
+
+    Returns:
+        Объём памяти Python модели в мегабайтах и байт на путь
+    """
+    from search_results import SearchResultsModel
+
+    paths = [os.path.relpath(os.path.join(d, name), root)
+             for d, _, names in os.walk(root) for name in names]
+    model = SearchResultsModel()
+    added = copy = 0
+    tracemalloc.start()
+    while paths and added < count:
+        batch = [f'/bench/copy_{copy}/{path}' for path in paths[:count - added]]
+        for start in range(0, len(batch), 500):
+            model.add_paths(batch[start:start + 500])
+        added += len(batch)
+        copy += 1
+        del batch
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'results_memory_mb': used / 2 ** 20,
+        'results_bytes_per_path': used / max(1, model.rowCount()),
+    }
+
+
+def run(shapes: List[str], scale: float, seed: int, repeat: int,
+        workdir: Optional[str] = None) -> Dict:
+    """
+    Выполняет измерения для всех форм деревьев.
+
+    Каждое измерение повторяется repeat раз, в результат попадает медиана.
+
+    Returns:
+        Словарь результатов в формате JSON-файла
+    """
+    from app_state import AppState
+    from explorer import FileExplorer
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    base = tempfile.mkdtemp(prefix='explorer_bench_', dir=workdir)
+    results: Dict[str, Dict[str, float]] = {}
+    try:
+        for shape in shapes:
+            root = os.path.join(base, shape)
+            start = time.perf_counter()
+            counts = generate_tree(root, shape, scale, seed)
+            generation_time = time.perf_counter() - start
+
+            samples: Dict[str, List[float]] = {}
+            for _ in range(repeat):
+                window = FileExplorer()
+                window.app_state = AppState(os.path.join(base, 'state.json'))
+                window.action_use_index.setChecked(False)
+                metrics = measure_search(root)
+                metrics.update(measure_listing(window, root))
+                metrics.update(measure_fuzzy(root, int(FUZZY_CANDIDATES * scale)))
+                metrics.update(measure_results_memory(root, int(FUZZY_CANDIDATES * scale)))
+                window.close()
+                window.deleteLater()
+                app.processEvents()
+                for name, value in metrics.items():
+                    samples.setdefault(name, []).append(value)
+            results[shape] = {name: statistics.median(values) for name, values in samples.items()}
+            results[shape].update(counts)
+            results[shape]['generate_seconds'] = generation_time
+            print(f'{shape}: ' + ', '.join(
+                f'{name}={value:.4f}' if isinstance(value, float) else f'{name}={value}'
+                for name, value in results[shape].items()))
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+    return {
+        'version': RESULTS_VERSION,
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'scale': scale,
+            'seed': seed,
+            'repeat': repeat,
+        },
+        # ru_maxrss в Linux — килобайты, в macOS — байты
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10),
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.2,
+            min_delta: float = MIN_DELTA) -> List[str]:
+    """
+    Сравнивает результаты с базовым прогоном.
+
+    Args:
+        current: Текущие результаты
+        baseline: Базовые результаты
+        tolerance: Допустимое относительное ухудшение (0.2 — на 20 %)
+        min_delta: Минимальная абсолютная разница, считающаяся регрессией
+
+    Returns:
+        Описания регрессий; пустой список, если их нет
+    """
+    regressions = []
+    for shape, metrics in current['results'].items():
+        base_metrics = baseline.get('results', {}).get(shape, {})
+        for name in COMPARED_METRICS:
+            old, new = base_metrics.get(name), metrics.get(name)
+            if old is None or new is None or old <= 0:
+                continue
+            if new > old * (1 + tolerance) and new - old >= min_delta:
+                regressions.append(f'{shape}.{name}: {old:.4f} -> {new:.4f} '
+                                   f'(+{(new / old - 1) * 100:.0f}%)')
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа командной строки; возвращает 1 при найденных регрессиях."""
+    parser = argparse.ArgumentParser(description='Измерения производительности Explorer QT')
+    parser.add_argument('--shapes', nargs='+', choices=sorted(SHAPES), default=list(SHAPES))
+    parser.add_argument('--scale', type=float, default=1.0, help='множитель размера деревьев')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='число повторов каждого измерения')
+    parser.add_argument('--workdir', help='каталог для временных деревьев')
+    parser.add_argument('--output', help='файл для записи результатов JSON')
+    parser.add_argument('--baseline', help='файл базовых результатов для сравнения')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = run(args.shapes, args.scale, args.seed, args.repeat, args.workdir)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        if regressions:
+            return 1
+        print('No regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
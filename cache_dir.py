@@ -0,0 +1,29 @@
+"""
+Каталог кэша приложения.
+
+Кэши, снимки и файл состояния хранятся в $XDG_CACHE_HOME/explorer_qt,
+а если переменная не задана или содержит относительный путь — в
+~/.cache/explorer_qt. Путь вычисляется при каждом обращении, а не при
+импорте, поэтому изменение окружения (например, в тестах) учитывается.
+"""
+import os
+
+# Имя каталога приложения внутри каталога кэша
+APP_DIR = 'explorer_qt'
+
+
+def cache_path(*parts: str) -> str:
+    """
+    Возвращает путь внутри каталога кэша приложения.
+
+    Args:
+        *parts: Составляющие пути относительно каталога кэша
+
+    Returns:
+        Абсолютный путь; каталоги не создаются
+    """
+    base = os.environ.get('XDG_CACHE_HOME', '')
+    if not os.path.isabs(base):
+        # Относительный путь спецификация XDG предписывает игнорировать
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, APP_DIR, *parts)
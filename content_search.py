@@ -0,0 +1,222 @@
+import logging
+import mmap
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import process_pool
+from query import Query
+from walker import DEFAULT_WORKERS, ParallelWalker
+
+logger = logging.getLogger('FileExplorer.content')
+
+# Файлы больше этого размера (в байтах) не просматриваются
+DEFAULT_MAX_FILE_SIZE = 50 * 1024 * 1024
+# Сколько байт начала файла проверяется на признаки двоичных данных
+SNIFF_SIZE = 8192
+# Количество файлов в одной задаче для процесса
+CHUNK_FILES = 64
+# Максимум совпадений, сообщаемых для одного файла
+MAX_HITS_PER_FILE = 100
+# Максимальная длина фрагмента строки в результате
+SNIPPET_LENGTH = 200
+
+Hit = Tuple[str, int, str]
+
+_compiled: Dict[Tuple[bytes, bool], 're.Pattern'] = {}
+
+
+def compile_pattern(text: str) -> Tuple[bytes, bool]:
+    """
+    Превращает текст запроса в байтовое регулярное выражение.
+
+    Текст вида /выражение/ трактуется как регулярное выражение, иначе
+    ищется подстрока. Регистр учитывается, только если в тексте есть
+    заглавные буквы. Для подстрок без учёта регистра каждая буква
+    раскрывается в альтернативу строчного и заглавного вариантов в UTF-8,
+    поэтому поиск работает и для кириллицы.
+
+    Args:
+        text: Текст запроса
+
+    Returns:
+        Кортеж (выражение в байтах, признак игнорирования регистра ASCII)
+
+    Raises:
+        re.error: Если регулярное выражение некорректно
+    """
+    ignore_case = text == text.lower()
+    if len(text) > 2 and text.startswith('/') and text.endswith('/'):
+        source = text[1:-1].encode('utf-8')
+        re.compile(source)
+        return source, ignore_case
+    parts = []
+    for char in text:
+        variants = {char.lower(), char.upper()} if ignore_case else {char}
+        if len(variants) == 1:
+            parts.append(re.escape(char.encode('utf-8')))
+        else:
+            parts.append(b'(?:' + b'|'.join(
+                re.escape(v.encode('utf-8')) for v in sorted(variants)) + b')')
+    return b''.join(parts), False
+
+
+def _regex(source: bytes, ignore_case: bool) -> 're.Pattern':
+    """Возвращает скомпилированное выражение из кэша процесса."""
+    key = (source, ignore_case)
+    if key not in _compiled:
+        _compiled[key] = re.compile(source, re.IGNORECASE if ignore_case else 0)
+    return _compiled[key]
+
+
+def grep_file(path: str, regex: 're.Pattern',
+              max_size: int = DEFAULT_MAX_FILE_SIZE) -> List[Hit]:
+    """
+    Ищет совпадения в файле, отображённом в память.
+
+    Двоичные файлы (с нулевым байтом в начале) и файлы больше max_size
+    пропускаются. Для каждой строки сообщается не более одного совпадения.
+
+    Args:
+        path: Путь к файлу
+        regex: Байтовое регулярное выражение
+        max_size: Максимальный размер файла
+
+    Returns:
+        Список кортежей (путь, номер строки, фрагмент строки)
+    """
+    hits: List[Hit] = []
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0 or size > max_size:
+                return hits
+            if b'\0' in f.read(SNIFF_SIZE):
+                return hits
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                line_no, counted_to, pos = 1, 0, 0
+                while len(hits) < MAX_HITS_PER_FILE:
+                    match = regex.search(mm, pos)
+                    if match is None:
+                        break
+                    line_start = mm.rfind(b'\n', 0, match.start()) + 1
+                    line_end = mm.find(b'\n', match.start())
+                    if line_end < 0:
+                        line_end = size
+                    line_no += mm[counted_to:line_start].count(b'\n')
+                    counted_to = line_start
+                    snippet = mm[line_start:min(line_end, line_start + SNIPPET_LENGTH)]
+                    hits.append((path, line_no, snippet.decode('utf-8', 'replace').strip()))
+                    pos = line_end + 1
+                    if pos >= size:
+                        break
+    except (OSError, ValueError) as e:
+        logger.debug(f'Content search skipped {path}: {e}')
+    return hits
+
+
+def _grep_chunk(paths: List[str], source: bytes, ignore_case: bool,
+                max_size: int) -> List[Hit]:
+    """Задача для процесса пула: поиск в пачке файлов."""
+    regex = _regex(source, ignore_case)
+    hits: List[Hit] = []
+    for path in paths:
+        hits.extend(grep_file(path, regex, max_size))
+    return hits
+
+
+class ContentSearcher:
+    """Поиск текста в файлах дерева с помощью пула процессов."""
+
+    def __init__(self, root_path: str, text: str,
+                 file_query: Optional[Query] = None,
+                 processes: Optional[int] = None,
+                 max_size: int = DEFAULT_MAX_FILE_SIZE,
+                 walk_workers: int = DEFAULT_WORKERS) -> None:
+        """
+        Инициализация поиска.
+
+        Args:
+            root_path: Корневой каталог
+            text: Искомый текст или /регулярное выражение/
+            file_query: Запрос, которому должны соответствовать имена файлов
+            processes: Количество процессов; по умолчанию по числу ядер
+            max_size: Максимальный размер просматриваемого файла
+            walk_workers: Количество потоков обхода дерева
+
+        Raises:
+            re.error: Если регулярное выражение некорректно
+        """
+        self.root_path = root_path
+        self.text = text
+        self.source, self.ignore_case = compile_pattern(text)
+        self.file_query = file_query
+        self.processes = processes or os.cpu_count() or 1
+        self.max_size = max_size
+        self.walk_workers = walk_workers
+        # Количество файлов, отправленных на проверку
+        self.files_checked = 0
+
+    def _candidates(self, should_stop: Callable[[], bool]) -> Iterator[List[str]]:
+        """Выдаёт пачки путей файлов, подходящих под фильтр."""
+        query = self.file_query
+        walker = ParallelWalker(self.root_path, self.walk_workers, should_stop,
+                                query.prune if query else None)
+        chunk: List[str] = []
+        for root, _, files in walker:
+            for name in files:
+                if query is None or query.matches(root, name):
+                    chunk.append(os.path.join(root, name))
+                    if len(chunk) >= CHUNK_FILES:
+                        yield chunk
+                        chunk = []
+        if chunk:
+            yield chunk
+
+    def search(self, should_stop: Optional[Callable[[], bool]] = None) -> Iterator[List[Hit]]:
+        """
+        Выполняет поиск, выдавая совпадения по мере готовности.
+
+        Файлы проверяются в общем пуле процессов (process_pool). Количество
+        задач в работе ограничено, поэтому память не растёт с размером
+        дерева. При остановке ожидающие задачи отменяются.
+
+        Args:
+            should_stop: Функция, возвращающая True при запросе остановки
+
+        Yields:
+            Списки совпадений (путь, номер строки, фрагмент)
+        """
+        should_stop = should_stop or (lambda: False)
+        pending: Set[Future] = set()
+        max_pending = self.processes * 4
+        try:
+            for chunk in self._candidates(should_stop):
+                self.files_checked += len(chunk)
+                pending.add(process_pool.submit(
+                    self.processes, _grep_chunk, chunk, self.source, self.ignore_case,
+                    self.max_size))
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from self._collect(done)
+                if should_stop():
+                    return
+            while pending and not should_stop():
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                yield from self._collect(done)
+        finally:
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def _collect(done: Set[Future]) -> Iterator[List[Hit]]:
+        """Выдаёт непустые результаты завершённых задач."""
+        for future in done:
+            try:
+                hits = future.result()
+            except Exception as e:
+                logger.error(f'Content search task failed: {e}')
+                continue
+            if hits:
+                yield hits
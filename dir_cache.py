@@ -0,0 +1,294 @@
+"""
+Кэш содержимого каталогов для мгновенных переходов.
+
+Содержимое хранится целиком (включая скрытые элементы), отсортированным
+так же, как в дереве по умолчанию: каталоги первыми, затем по имени.
+Запись считается действительной, пока не изменилось время изменения
+каталога; при превышении бюджета памяти вытесняются давно не
+использованные записи. Родительский каталог и вероятные подкаталоги
+текущего каталога читаются наперёд в фоновом потоке.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger('FileExplorer.dir_cache')
+
+# Бюджет памяти кэша по умолчанию (оценка по размеру объектов Python)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Сколько подкаталогов текущего каталога читать наперёд
+PREFETCH_CHILDREN = 3
+# Сколько подкаталогов рассматривается при выборе кандидатов на чтение наперёд
+PREDICT_SCAN_LIMIT = 2000
+# Каталог, изменённый менее RACY_WINDOW секунд назад, не кэшируется:
+# изменение в пределах той же единицы времени mtime осталось бы незамеченным
+RACY_WINDOW = 1.0
+# Сколько каталогов помнит счётчик посещений
+MAX_VISITS = 10000
+
+# Элемент каталога: (имя, является ли каталогом)
+Entry = Tuple[str, bool]
+
+
+def sort_entries(entries: Iterable[Entry]) -> List[Entry]:
+    """Сортирует элементы: каталоги первыми, затем по имени без учёта регистра."""
+    return sorted(entries, key=lambda entry: (not entry[1], entry[0].casefold()))
+
+
+def directory_mtime(path: str) -> Optional[int]:
+    """Возвращает время изменения каталога в наносекундах или None при ошибке."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def read_directory(path: str) -> Optional[Tuple[int, List[Entry]]]:
+    """
+    Читает каталог целиком.
+
+    Returns:
+        (время изменения каталога до чтения, отсортированные элементы)
+        или None, если каталог недоступен
+    """
+    mtime_ns = directory_mtime(path)
+    if mtime_ns is None:
+        return None
+    entries: List[Entry] = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                entries.append((entry.name, is_dir))
+    except OSError:
+        return None
+    return mtime_ns, sort_entries(entries)
+
+
+def _estimate_bytes(entries: Sequence[Entry]) -> int:
+    """Оценивает память записи: строки имён, кортежи и ссылки на них."""
+    return sum(sys.getsizeof(name) for name, _ in entries) + 64 * len(entries) + 128
+
+
+class _Listing:
+    """Запись кэша."""
+
+    __slots__ = ('mtime_ns', 'entries', 'nbytes')
+
+    def __init__(self, mtime_ns: int, entries: List[Entry]) -> None:
+        self.mtime_ns = mtime_ns
+        self.entries = entries
+        self.nbytes = _estimate_bytes(entries)
+
+
+class ListingCache:
+    """LRU-кэш содержимого каталогов с вытеснением по объёму памяти."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, executor=None) -> None:
+        """
+        Инициализация пустого кэша. Если исполнитель не передан, фоновый
+        поток чтения наперёд создаётся при первом запросе.
+
+        Args:
+            max_bytes: Бюджет памяти
+            executor: Исполнитель фоновых задач (submit/shutdown) для чтения наперёд
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[str, _Listing]' = OrderedDict()
+        self._visits: Counter = Counter()
+        self._lock = threading.Lock()
+        self._executor = executor
+        # Увеличивается при каждом запросе чтения наперёд, отменяя предыдущие
+        self._generation = 0
+        self._closed = False
+
+    def __len__(self) -> int:
+        """Количество каталогов в кэше."""
+        return len(self._entries)
+
+    def get(self, path: str) -> Optional[List[Entry]]:
+        """
+        Возвращает содержимое каталога, если оно есть в кэше и каталог
+        с тех пор не изменился.
+
+        Args:
+            path: Путь к каталогу
+
+        Returns:
+            Отсортированные элементы (не изменять) или None
+        """
+        key = os.path.normpath(path)
+        with self._lock:
+            listing = self._entries.get(key)
+        if listing is None:
+            self.misses += 1
+            return None
+        mtime_ns = directory_mtime(key)
+        with self._lock:
+            if mtime_ns != listing.mtime_ns:
+                if self._entries.get(key) is listing:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+        return listing.entries
+
+    def put(self, path: str, mtime_ns: int, entries: List[Entry]) -> None:
+        """
+        Сохраняет содержимое каталога.
+
+        Args:
+            path: Путь к каталогу
+            mtime_ns: Время изменения каталога, полученное до чтения
+            entries: Элементы, отсортированные функцией sort_entries
+        """
+        if time.time_ns() - mtime_ns < RACY_WINDOW * 1e9:
+            return
+        listing = _Listing(mtime_ns, entries)
+        if listing.nbytes > self.max_bytes:
+            return
+        key = os.path.normpath(path)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = listing
+            self.nbytes += listing.nbytes
+            while self.nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def load(self, path: str) -> Optional[List[Entry]]:
+        """
+        Возвращает содержимое каталога из кэша или читает и кэширует его.
+
+        Args:
+            path: Путь к каталогу
+
+        Returns:
+            Отсортированные элементы или None, если каталог недоступен
+        """
+        entries = self.get(path)
+        if entries is None:
+            result = read_directory(path)
+            if result is None:
+                return None
+            mtime_ns, entries = result
+            self.put(path, mtime_ns, entries)
+        return entries
+
+    def invalidate(self, paths: Iterable[str]) -> None:
+        """
+        Удаляет записи изменившихся каталогов (например, по событиям наблюдателя).
+
+        Args:
+            paths: Изменившиеся каталоги
+        """
+        with self._lock:
+            for path in paths:
+                key = os.path.normpath(path)
+                if key in self._entries:
+                    self._remove(key)
+
+    def clear(self) -> None:
+        """Удаляет все записи."""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _remove(self, key: str) -> None:
+        """Удаляет запись; вызывается под блокировкой."""
+        self.nbytes -= self._entries.pop(key).nbytes
+
+    def record_visit(self, path: str) -> None:
+        """
+        Учитывает посещение каталога при выборе кандидатов на чтение наперёд.
+
+        Args:
+            path: Посещённый каталог
+        """
+        with self._lock:
+            self._visits[os.path.normpath(path)] += 1
+            if len(self._visits) > MAX_VISITS:
+                # Забываем редко посещаемые каталоги
+                self._visits = Counter(dict(self._visits.most_common(MAX_VISITS // 2)))
+
+    def rank_children(self, path: str, children: Sequence[Tuple[str, float]],
+                      limit: int = PREFETCH_CHILDREN) -> List[str]:
+        """
+        Выбирает подкаталоги, в которые вероятнее всего перейдут.
+
+        Сначала идут чаще посещавшиеся, затем недавно изменённые.
+
+        Args:
+            path: Текущий каталог
+            children: Подкаталоги (имя, время изменения)
+            limit: Сколько подкаталогов вернуть
+
+        Returns:
+            Полные пути выбранных подкаталогов
+        """
+        path = os.path.normpath(path)
+        with self._lock:
+            visits = {name: self._visits.get(os.path.join(path, name), 0)
+                      for name, _ in children}
+        ranked = sorted(children, key=lambda child: (visits[child[0]], child[1]), reverse=True)
+        return [os.path.join(path, name) for name, _ in ranked[:limit]]
+
+    def prefetch_around(self, path: str, limit: int = PREFETCH_CHILDREN) -> None:
+        """
+        Читает в фоне каталог, его родителя и вероятные подкаталоги.
+        Незавершённое чтение для предыдущего каталога отменяется.
+
+        Args:
+            path: Текущий каталог
+            limit: Сколько подкаталогов читать наперёд
+        """
+        if self._closed:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dir-prefetch')
+        self._generation += 1
+        generation = self._generation
+        path = os.path.normpath(path)
+
+        def job():
+            if generation != self._generation:
+                return
+            entries = self.load(path)
+            parent = os.path.dirname(path)
+            if parent != path:
+                self.load(parent)
+            if not entries:
+                return
+            children = []
+            for name in [name for name, is_dir in entries if is_dir][:PREDICT_SCAN_LIMIT]:
+                mtime_ns = directory_mtime(os.path.join(path, name))
+                if mtime_ns is not None:
+                    children.append((name, mtime_ns / 1e9))
+            for child in self.rank_children(path, children, limit):
+                if generation != self._generation:
+                    return
+                self.load(child)
+
+        self._executor.submit(job)
+
+    def close(self) -> None:
+        """Отменяет чтение наперёд и останавливает фоновый поток."""
+        self._closed = True
+        self._generation += 1
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
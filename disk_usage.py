@@ -0,0 +1,233 @@
+import heapq
+import logging
+import os
+import stat
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger('FileExplorer.usage')
+
+# Сколько самых больших файлов запоминается для каждого каталога
+LARGEST_FILES = 10
+# Как часто (в секундах) сообщать о ходе анализа
+PROGRESS_INTERVAL = 0.1
+# При превышении этого числа записей из кэша удаляются не встреченные в анализе
+CACHE_LIMIT = 1_000_000
+
+DirKey = Tuple[int, int, int]
+
+
+def allocated_size(st: os.stat_result) -> int:
+    """
+    Возвращает место, занимаемое файлом на диске.
+
+    Args:
+        st: Результат os.stat
+    """
+    blocks = getattr(st, 'st_blocks', None)
+    return blocks * 512 if blocks is not None else st.st_size
+
+
+def format_size(size: int) -> str:
+    """
+    Форматирует размер в байтах для отображения.
+
+    Args:
+        size: Размер в байтах
+    """
+    value = float(size)
+    for unit in ('Б', 'КБ', 'МБ', 'ГБ', 'ТБ'):
+        if value < 1024 or unit == 'ТБ':
+            return f'{value:.0f} {unit}' if unit == 'Б' else f'{value:.1f} {unit}'
+        value /= 1024
+    return f'{size} Б'
+
+
+class DirRecord:
+    """Собственное содержимое одного каталога (без учёта подкаталогов)."""
+
+    __slots__ = ('size', 'files', 'links', 'subdirs', 'largest')
+
+    def __init__(self) -> None:
+        """Инициализация пустой записи."""
+        # Размер самого каталога и его файлов с единственной жёсткой ссылкой
+        self.size = 0
+        self.files = 0
+        # Файлы с несколькими жёсткими ссылками: ((устройство, inode), размер)
+        self.links: List[Tuple[Tuple[int, int], int]] = []
+        self.subdirs: List[str] = []
+        # Самые большие файлы каталога: (размер, имя)
+        self.largest: List[Tuple[int, str]] = []
+
+
+class DiskUsage:
+    """Результат анализа: суммарные размеры всех каталогов дерева."""
+
+    def __init__(self, root_path: str) -> None:
+        """
+        Инициализация результата.
+
+        Args:
+            root_path: Корень анализа
+        """
+        self.root_path = root_path
+        # Путь каталога -> (размер, количество файлов) с учётом поддерева
+        self.totals: Dict[str, Tuple[int, int]] = {}
+        self.records: Dict[str, DirRecord] = {}
+        # Сколько каталогов прочитано заново и сколько взято из кэша
+        self.rescanned = 0
+        self.reused = 0
+
+    def children(self, path: str) -> List[Tuple[str, bool, int, int]]:
+        """
+        Возвращает содержимое каталога для отображения.
+
+        Args:
+            path: Каталог внутри корня анализа
+
+        Returns:
+            Список (имя, является ли каталогом, размер, количество файлов):
+            все подкаталоги и самые большие файлы
+        """
+        record = self.records.get(path)
+        if record is None:
+            return []
+        rows = []
+        for name in record.subdirs:
+            size, files = self.totals.get(os.path.join(path, name), (0, 0))
+            rows.append((name, True, size, files))
+        rows.extend((name, False, size, 1) for size, name in record.largest)
+        return rows
+
+
+class DiskUsageAnalyzer:
+    """
+    Подсчёт занятого места с кэшированием по (устройство, inode, mtime).
+
+    Время изменения каталога меняется только при изменении его прямого
+    содержимого, поэтому при повторном анализе заново читаются лишь
+    изменившиеся каталоги; для остальных выполняется один stat.
+    Изменение размера файла на месте (дозапись, перезапись) не меняет
+    mtime каталога, поэтому такой анализ его не замечает; для точного
+    результата нужен режим rescan, в котором кэш не используется.
+    Файлы с несколькими жёсткими ссылками учитываются один раз.
+    """
+
+    def __init__(self, one_filesystem: bool = True) -> None:
+        """
+        Инициализация анализатора.
+
+        Args:
+            one_filesystem: Не переходить на другие файловые системы (как du -x)
+        """
+        self.one_filesystem = one_filesystem
+        self._cache: Dict[DirKey, DirRecord] = {}
+
+    def _scan(self, path: str, st: os.stat_result) -> DirRecord:
+        """Читает собственное содержимое каталога."""
+        record = DirRecord()
+        record.size = allocated_size(st)
+        largest: List[Tuple[int, str]] = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    entry_st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if stat.S_ISDIR(entry_st.st_mode):
+                    if not self.one_filesystem or entry_st.st_dev == st.st_dev:
+                        record.subdirs.append(entry.name)
+                    continue
+                size = allocated_size(entry_st)
+                record.files += 1
+                if entry_st.st_nlink > 1 and not stat.S_ISLNK(entry_st.st_mode):
+                    record.links.append(((entry_st.st_dev, entry_st.st_ino), size))
+                else:
+                    record.size += size
+                if len(largest) < LARGEST_FILES:
+                    heapq.heappush(largest, (size, entry.name))
+                elif size > largest[0][0]:
+                    heapq.heapreplace(largest, (size, entry.name))
+        record.subdirs.sort()
+        record.largest = sorted(largest, reverse=True)
+        return record
+
+    def _record(self, path: str, usage: DiskUsage, rescan: bool) -> Optional[DirRecord]:
+        """Возвращает запись каталога из кэша или читает каталог заново."""
+        try:
+            st = os.stat(path, follow_symlinks=False)
+            key = (st.st_dev, st.st_ino, st.st_mtime_ns)
+            record = None if rescan else self._cache.get(key)
+            if record is None:
+                record = self._scan(path, st)
+                self._cache[key] = record
+                usage.rescanned += 1
+            else:
+                usage.reused += 1
+            return record
+        except OSError as e:
+            logger.debug(f'Disk usage scan error: {e}')
+            return None
+
+    def analyze(self, root_path: str,
+                should_stop: Optional[Callable[[], bool]] = None,
+                progress: Optional[Callable[[int], None]] = None,
+                rescan: bool = False) -> Optional[DiskUsage]:
+        """
+        Вычисляет размеры и количество файлов для всех каталогов дерева.
+
+        Args:
+            root_path: Корневой каталог
+            should_stop: Функция, возвращающая True при запросе остановки
+            progress: Функция, получающая количество обработанных каталогов
+            rescan: Перечитать все каталоги, не доверяя кэшу (находит файлы,
+                    изменившие размер на месте); кэш обновляется
+
+        Returns:
+            Результат анализа или None при остановке
+        """
+        usage = DiskUsage(root_path)
+        seen_links: Set[Tuple[int, int]] = set()
+        pending: Dict[str, DirRecord] = {}
+        stack: List[Tuple[str, bool]] = [(root_path, False)]
+        last_progress = time.monotonic()
+        live_keys: Set[int] = set()
+
+        while stack:
+            path, expanded = stack.pop()
+            if not expanded:
+                if should_stop and should_stop():
+                    return None
+                record = self._record(path, usage, rescan)
+                if record is None:
+                    usage.totals[path] = (0, 0)
+                    continue
+                live_keys.add(id(record))
+                pending[path] = record
+                stack.append((path, True))
+                stack.extend((os.path.join(path, name), False) for name in record.subdirs)
+                if progress and time.monotonic() - last_progress >= PROGRESS_INTERVAL:
+                    progress(len(usage.totals) + len(pending))
+                    last_progress = time.monotonic()
+                continue
+
+            # Все подкаталоги уже посчитаны: суммируем снизу вверх
+            record = pending.pop(path)
+            size, files = record.size, record.files
+            for link, link_size in record.links:
+                if link not in seen_links:
+                    seen_links.add(link)
+                    size += link_size
+            for name in record.subdirs:
+                sub_size, sub_files = usage.totals.get(os.path.join(path, name), (0, 0))
+                size += sub_size
+                files += sub_files
+            usage.totals[path] = (size, files)
+            usage.records[path] = record
+
+        if len(self._cache) > CACHE_LIMIT:
+            # Записи удалённых и изменившихся каталогов больше не нужны
+            self._cache = {key: rec for key, rec in self._cache.items() if id(rec) in live_keys}
+        logger.info(f'Disk usage for {root_path}: {usage.rescanned} directories scanned, '
+                    f'{usage.reused} reused from cache')
+        return usage
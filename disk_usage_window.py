@@ -0,0 +1,116 @@
+import os
+from typing import Optional
+
+from PyQt5 import QtGui, QtWidgets
+from PyQt5.QtCore import QModelIndex, Qt, pyqtSignal
+
+from disk_usage import DiskUsage, format_size
+
+# Роли данных: числовое значение для сортировки и полный путь строки
+SORT_ROLE = Qt.UserRole
+PATH_ROLE = Qt.UserRole + 1
+
+
+class DiskUsageWindow(QtWidgets.QWidget):
+    """Окно с размерами подкаталогов и крупнейших файлов."""
+
+    directory_activated = pyqtSignal(str)
+    refresh_requested = pyqtSignal(str)
+
+    def __init__(self, parent=None) -> None:
+        """Инициализация окна анализа занятого места."""
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle('Занятое место')
+        self.resize(600, 450)
+        self.usage: Optional[DiskUsage] = None
+        self.current_path = ''
+
+        self.model = QtGui.QStandardItemModel(0, 4, self)
+        self.model.setHorizontalHeaderLabels(['Имя', 'Размер', 'Файлов', '%'])
+        self.model.setSortRole(SORT_ROLE)
+
+        self.view = QtWidgets.QTreeView(self)
+        self.view.setRootIsDecorated(False)
+        self.view.setUniformRowHeights(True)
+        self.view.setSortingEnabled(True)
+        self.view.setModel(self.model)
+        self.view.setColumnWidth(0, 300)
+        self.view.activated.connect(self._on_activated)
+
+        self.btn_up = QtWidgets.QPushButton('Вверх', self)
+        self.btn_up.clicked.connect(self.go_up)
+        self.btn_refresh = QtWidgets.QPushButton('Обновить', self)
+        self.btn_refresh.clicked.connect(
+            lambda: self.usage and self.refresh_requested.emit(self.usage.root_path))
+        self.summary = QtWidgets.QLabel(self)
+
+        buttons = QtWidgets.QHBoxLayout()
+        buttons.addWidget(self.btn_up)
+        buttons.addWidget(self.btn_refresh)
+        buttons.addStretch()
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(buttons)
+        layout.addWidget(self.view)
+        layout.addWidget(self.summary)
+
+    def set_usage(self, usage: DiskUsage) -> None:
+        """
+        Отображает результат анализа.
+
+        Args:
+            usage: Результат анализа
+        """
+        self.usage = usage
+        path = self.current_path if self.current_path in usage.totals else usage.root_path
+        self.show_directory(path)
+
+    def show_progress(self, directories: int) -> None:
+        """
+        Отображает ход анализа.
+
+        Args:
+            directories: Количество обработанных каталогов
+        """
+        self.summary.setText(f'Анализ... каталогов: {directories}')
+
+    def show_directory(self, path: str) -> None:
+        """
+        Отображает содержимое каталога, отсортированное по размеру.
+
+        Args:
+            path: Каталог внутри корня анализа
+        """
+        self.current_path = path
+        total, files = self.usage.totals.get(path, (0, 0))
+        self.model.removeRows(0, self.model.rowCount())
+        for name, is_dir, size, count in self.usage.children(path):
+            share = size * 100 / total if total else 0
+            row = [
+                QtGui.QStandardItem(name + (os.sep if is_dir else '')),
+                QtGui.QStandardItem(format_size(size)),
+                QtGui.QStandardItem(str(count)),
+                QtGui.QStandardItem(f'{share:.1f}'),
+            ]
+            for item, key in zip(row, (name.lower(), size, count, share)):
+                item.setData(key, SORT_ROLE)
+                item.setEditable(False)
+            row[0].setData(os.path.join(path, name) if is_dir else None, PATH_ROLE)
+            self.model.appendRow(row)
+        self.view.sortByColumn(1, Qt.DescendingOrder)
+        self.setWindowTitle(f'Занятое место: {path}')
+        self.summary.setText(
+            f'{format_size(total)}, файлов: {files} '
+            f'(прочитано каталогов: {self.usage.rescanned}, из кэша: {self.usage.reused})'
+        )
+
+    def go_up(self) -> None:
+        """Переход к родительскому каталогу в пределах корня анализа."""
+        if self.usage and self.current_path != self.usage.root_path:
+            self.show_directory(os.path.dirname(self.current_path))
+
+    def _on_activated(self, index: QModelIndex) -> None:
+        """Переход в подкаталог по двойному клику."""
+        path = self.model.item(index.row(), 0).data(PATH_ROLE)
+        if path:
+            self.show_directory(path)
+            self.directory_activated.emit(path)
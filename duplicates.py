@@ -0,0 +1,358 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import stat
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from contextlib import closing
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import process_pool
+from cache_dir import cache_path
+from walker import DEFAULT_WORKERS, ParallelWalker
+
+logger = logging.getLogger('FileExplorer.duplicates')
+
+# Сколько байт начала и конца файла участвует в частичном хеше
+PARTIAL_SIZE = 4096
+# Размер блока при полном хешировании
+READ_SIZE = 1024 * 1024
+# Количество файлов в одной задаче для процесса
+CHUNK_FILES = 32
+
+# (устройство, inode, размер, mtime в наносекундах)
+FileKey = Tuple[int, int, int, int]
+# Группа дубликатов: (размер файла, пути)
+Group = Tuple[int, List[str]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    partial BLOB,
+    full BLOB,
+    PRIMARY KEY (dev, ino)
+) WITHOUT ROWID;
+"""
+
+
+def _digest() -> 'hashlib._Hash':
+    """Возвращает новый объект хеша."""
+    return hashlib.blake2b(digest_size=16)
+
+
+def partial_hash(path: str, size: int) -> Optional[bytes]:
+    """
+    Хеширует первые и последние PARTIAL_SIZE байт файла.
+
+    Для файлов не больше 2 * PARTIAL_SIZE хешируется всё содержимое,
+    поэтому результат совпадает с полным хешем.
+
+    Args:
+        path: Путь к файлу
+        size: Размер файла
+
+    Returns:
+        Хеш или None при ошибке чтения
+    """
+    digest = _digest()
+    try:
+        with open(path, 'rb') as f:
+            if size <= 2 * PARTIAL_SIZE:
+                digest.update(f.read())
+            else:
+                digest.update(f.read(PARTIAL_SIZE))
+                f.seek(size - PARTIAL_SIZE)
+                digest.update(f.read(PARTIAL_SIZE))
+    except OSError as e:
+        logger.debug(f'Cannot hash {path}: {e}')
+        return None
+    return digest.digest()
+
+
+def full_hash(path: str) -> Optional[bytes]:
+    """
+    Хеширует всё содержимое файла.
+
+    Args:
+        path: Путь к файлу
+
+    Returns:
+        Хеш или None при ошибке чтения
+    """
+    digest = _digest()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(READ_SIZE), b''):
+                digest.update(block)
+    except OSError as e:
+        logger.debug(f'Cannot hash {path}: {e}')
+        return None
+    return digest.digest()
+
+
+def _hash_chunk(items: List[Tuple[str, int]], full: bool) -> List[Optional[bytes]]:
+    """Задача для процесса пула: хеши пачки файлов в том же порядке."""
+    if full:
+        return [full_hash(path) for path, _ in items]
+    return [partial_hash(path, size) for path, size in items]
+
+
+class HashCache:
+    """Постоянный кэш хешей файлов, действительный, пока не изменились размер и mtime."""
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        """
+        Инициализация кэша. База данных создаётся при первом обращении.
+
+        Args:
+            db_path: Путь к файлу базы SQLite; по умолчанию hashes.sqlite3 в каталоге кэша
+        """
+        self.db_path = db_path or cache_path('hashes.sqlite3')
+
+    def _connect(self) -> sqlite3.Connection:
+        """Открывает соединение с базой и создаёт схему при необходимости."""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def lookup(self, keys: Iterable[FileKey]) -> Dict[FileKey, Tuple[Optional[bytes], Optional[bytes]]]:
+        """
+        Возвращает известные хеши файлов.
+
+        Args:
+            keys: Ключи файлов
+
+        Returns:
+            Словарь ключ -> (частичный хеш, полный хеш) для актуальных записей
+        """
+        found = {}
+        with closing(self._connect()) as conn:
+            for key in keys:
+                row = conn.execute(
+                    'SELECT partial, full FROM hashes '
+                    'WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ?', key
+                ).fetchone()
+                if row is not None:
+                    found[key] = row
+        return found
+
+    def store(self, rows: Iterable[Tuple[FileKey, Optional[bytes], Optional[bytes]]]) -> None:
+        """
+        Сохраняет хеши файлов, заменяя устаревшие записи.
+
+        Args:
+            rows: Кортежи (ключ, частичный хеш, полный хеш)
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO hashes (dev, ino, size, mtime_ns, partial, full) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key + (partial, full) for key, partial, full in rows)
+            )
+
+
+class DuplicateFinder:
+    """
+    Поиск одинаковых файлов в дереве каталогов.
+
+    Файлы группируются по размеру, затем по хешу начала и конца файла,
+    и только оставшиеся совпадения хешируются полностью в пуле процессов.
+    Хеши кэшируются по (устройство, inode, размер, mtime), поэтому
+    повторный поиск в почти не изменившемся дереве читает лишь новые файлы.
+    Жёсткие ссылки на один inode считаются одним файлом.
+    """
+
+    def __init__(self, root_path: str,
+                 cache: Optional[HashCache] = None,
+                 processes: Optional[int] = None,
+                 min_size: int = 1,
+                 walk_workers: int = DEFAULT_WORKERS) -> None:
+        """
+        Инициализация поиска.
+
+        Args:
+            root_path: Корневой каталог
+            cache: Кэш хешей; None отключает кэширование
+            processes: Количество процессов; по умолчанию по числу ядер
+            min_size: Файлы меньше этого размера (в байтах) не рассматриваются
+            walk_workers: Количество потоков обхода дерева
+        """
+        self.root_path = root_path
+        self.cache = cache
+        self.processes = processes or os.cpu_count() or 1
+        self.min_size = max(min_size, 1)
+        self.walk_workers = walk_workers
+        # Статистика: просмотрено файлов, вычислено хешей, взято из кэша
+        self.files_scanned = 0
+        self.hashed = 0
+        self.reused = 0
+
+    def _by_size(self, should_stop: Callable[[], bool]) -> Dict[int, List[Tuple[str, FileKey]]]:
+        """Собирает обычные файлы дерева, сгруппированные по размеру."""
+        by_size: Dict[int, List[Tuple[str, FileKey]]] = defaultdict(list)
+        seen: Set[Tuple[int, int]] = set()
+        for root, _, files in ParallelWalker(self.root_path, self.walk_workers, should_stop):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.lstat(path)
+                except OSError:
+                    continue
+                if not stat.S_ISREG(st.st_mode) or st.st_size < self.min_size:
+                    continue
+                if (st.st_dev, st.st_ino) in seen:
+                    continue
+                seen.add((st.st_dev, st.st_ino))
+                self.files_scanned += 1
+                by_size[st.st_size].append(
+                    (path, (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)))
+        return by_size
+
+    def _run_tasks(self, batches: Iterable[Tuple[object, List[Tuple[str, int]]]], full: bool,
+                   should_stop: Callable[[], bool]) -> Iterator[Tuple[object, List[Optional[bytes]]]]:
+        """
+        Хеширует пачки файлов в общем пуле процессов, ограничивая число задач в работе.
+
+        Для пачки, задача которой завершилась ошибкой, выдаются пустые хеши,
+        как для нечитаемых файлов, чтобы группы с её файлами не потерялись.
+        При остановке ожидающие задачи отменяются.
+
+        Yields:
+            Пары (метка пачки, хеши) по мере готовности
+        """
+        pending: Dict[Future, Tuple[object, int]] = {}
+        max_pending = self.processes * 4
+
+        def collect(done):
+            for future in done:
+                tag, count = pending.pop(future)
+                try:
+                    digests = future.result()
+                except Exception as e:
+                    logger.error(f'Hash task failed: {e}')
+                    digests = [None] * count
+                yield tag, digests
+
+        try:
+            for tag, items in batches:
+                if should_stop():
+                    return
+                future = process_pool.submit(self.processes, _hash_chunk, items, full)
+                pending[future] = (tag, len(items))
+                if len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from collect(done)
+            while pending and not should_stop():
+                done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                yield from collect(done)
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def search(self, should_stop: Optional[Callable[[], bool]] = None) -> Iterator[Group]:
+        """
+        Выполняет поиск, выдавая группы дубликатов по мере подтверждения.
+
+        Args:
+            should_stop: Функция, возвращающая True при запросе остановки
+
+        Yields:
+            Группы (размер, пути), начиная с файлов большего размера
+        """
+        should_stop = should_stop or (lambda: False)
+        candidates = [(size, files) for size, files in self._by_size(should_stop).items()
+                      if len(files) > 1]
+        if should_stop() or not candidates:
+            return
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        files = [item for _, group in candidates for item in group]
+        known = self.cache.lookup(key for _, key in files) if self.cache else {}
+        partial: Dict[FileKey, Optional[bytes]] = {key: known[key][0] for _, key in files
+                                                   if key in known and known[key][0]}
+        full: Dict[FileKey, Optional[bytes]] = {key: known[key][1] for _, key in files
+                                                if key in known and known[key][1]}
+        computed: Set[FileKey] = set()
+
+        try:
+            # Этап 2: частичные хеши для файлов, которых нет в кэше
+            missing = [(path, key) for path, key in files if key not in partial]
+            self.reused += len(files) - len(missing)
+            batches = ((missing[i:i + CHUNK_FILES],
+                        [(path, key[2]) for path, key in missing[i:i + CHUNK_FILES]])
+                       for i in range(0, len(missing), CHUNK_FILES))
+            for batch, digests in self._run_tasks(batches, False, should_stop):
+                for (_, key), digest in zip(batch, digests):
+                    partial[key] = digest
+                    computed.add(key)
+                self.hashed += len(batch)
+            if should_stop():
+                return
+
+            # Этап 3: полные хеши только для совпавших частичных хешей
+            collisions: List[List[Tuple[str, FileKey]]] = []
+            for size, group in candidates:
+                by_partial: Dict[bytes, List[Tuple[str, FileKey]]] = defaultdict(list)
+                for path, key in group:
+                    if partial.get(key):
+                        by_partial[partial[key]].append((path, key))
+                for same in by_partial.values():
+                    if len(same) < 2:
+                        continue
+                    if size <= 2 * PARTIAL_SIZE:
+                        # Частичный хеш уже покрывает весь файл
+                        yield size, sorted(path for path, _ in same)
+                    else:
+                        collisions.append(same)
+
+            def full_batches():
+                for group in collisions:
+                    todo = [(path, key) for path, key in group if key not in full]
+                    for i in range(0, len(todo), CHUNK_FILES):
+                        batch = todo[i:i + CHUNK_FILES]
+                        yield batch, [(path, key[2]) for path, key in batch]
+
+            remaining = [sum(1 for _, key in group if key not in full) for group in collisions]
+            self.reused += sum(len(group) for group in collisions) - sum(remaining)
+            ready = [number for number, count in enumerate(remaining) if count == 0]
+            for number in ready:
+                yield from self._confirmed(collisions[number], full)
+
+            numbers = {key: number for number, group in enumerate(collisions)
+                       for _, key in group}
+            for batch, digests in self._run_tasks(full_batches(), True, should_stop):
+                for (_, key), digest in zip(batch, digests):
+                    full[key] = digest
+                    computed.add(key)
+                    number = numbers[key]
+                    remaining[number] -= 1
+                    if remaining[number] == 0:
+                        yield from self._confirmed(collisions[number], full)
+                self.hashed += len(batch)
+        finally:
+            if self.cache and computed:
+                self.cache.store((key, partial.get(key), full.get(key))
+                                 for _, key in files if key in computed)
+            logger.info(f'Duplicate search in {self.root_path}: {self.files_scanned} files, '
+                        f'{self.hashed} hashed, {self.reused} from cache')
+
+    @staticmethod
+    def _confirmed(group: List[Tuple[str, FileKey]],
+                   full: Dict[FileKey, Optional[bytes]]) -> Iterator[Group]:
+        """Делит группу с одинаковыми частичными хешами по полному хешу."""
+        by_full: Dict[bytes, List[str]] = defaultdict(list)
+        for path, key in group:
+            if full.get(key):
+                by_full[full[key]].append(path)
+        size = group[0][1][2]
+        for paths in by_full.values():
+            if len(paths) > 1:
+                yield size, sorted(paths)
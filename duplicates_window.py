@@ -0,0 +1,88 @@
+from typing import List
+
+from PyQt5 import QtGui, QtWidgets
+from PyQt5.QtCore import QModelIndex, Qt, pyqtSignal
+
+from disk_usage import format_size
+from duplicates import Group
+
+# Роль данных с полным путём файла
+PATH_ROLE = Qt.UserRole + 1
+
+
+class DuplicatesWindow(QtWidgets.QWidget):
+    """Окно с группами одинаковых файлов."""
+
+    file_activated = pyqtSignal(str)
+
+    def __init__(self, parent=None) -> None:
+        """Инициализация окна поиска дубликатов."""
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle('Дубликаты')
+        self.resize(700, 450)
+        self.groups = 0
+        self.files = 0
+        # Место, которое освободится, если оставить по одному файлу из группы
+        self.reclaimable = 0
+
+        self.model = QtGui.QStandardItemModel(0, 2, self)
+        self.model.setHorizontalHeaderLabels(['Файл', 'Размер'])
+
+        self.view = QtWidgets.QTreeView(self)
+        self.view.setUniformRowHeights(True)
+        self.view.setModel(self.model)
+        self.view.setColumnWidth(0, 520)
+        self.view.activated.connect(self._on_activated)
+
+        self.summary = QtWidgets.QLabel(self)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.view)
+        layout.addWidget(self.summary)
+
+    def start(self, root_path: str) -> None:
+        """
+        Очищает окно перед новым поиском.
+
+        Args:
+            root_path: Каталог, в котором выполняется поиск
+        """
+        self.model.removeRows(0, self.model.rowCount())
+        self.groups = self.files = self.reclaimable = 0
+        self.setWindowTitle(f'Дубликаты: {root_path}')
+        self.summary.setText('Поиск...')
+
+    def add_groups(self, groups: List[Group]) -> None:
+        """
+        Добавляет найденные группы дубликатов.
+
+        Args:
+            groups: Группы (размер, пути)
+        """
+        for size, paths in groups:
+            header = QtGui.QStandardItem(f'{len(paths)} одинаковых файла(ов)')
+            header.setEditable(False)
+            total = QtGui.QStandardItem(format_size(size * len(paths)))
+            total.setEditable(False)
+            for path in paths:
+                item = QtGui.QStandardItem(path)
+                item.setData(path, PATH_ROLE)
+                item.setEditable(False)
+                item_size = QtGui.QStandardItem(format_size(size))
+                item_size.setEditable(False)
+                header.appendRow([item, item_size])
+            self.model.appendRow([header, total])
+            self.groups += 1
+            self.files += len(paths)
+            self.reclaimable += size * (len(paths) - 1)
+        self.summary.setText(self.summary_text())
+
+    def summary_text(self) -> str:
+        """Возвращает итоговую строку по найденным группам."""
+        return (f'Групп: {self.groups}, файлов: {self.files}, '
+                f'можно освободить: {format_size(self.reclaimable)}')
+
+    def _on_activated(self, index: QModelIndex) -> None:
+        """Передаёт путь активированного файла главному окну."""
+        path = self.model.itemFromIndex(index.siblingAtColumn(0)).data(PATH_ROLE)
+        if path:
+            self.file_activated.emit(path)
@@ -1,72 +1,585 @@
-import fnmatch
+# Импортируется первым, чтобы учитывать время импорта остальных модулей
+from startup_profile import startup
+
 import logging
 import os
 import platform
+import re
 import subprocess
-from typing import Optional
+import sys
+import tempfile
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple, Union
 
 from PyQt5 import QtWidgets, QtCore, QtGui
-from PyQt5.QtCore import QDir, QThread, pyqtSignal, QModelIndex
-from PyQt5.QtWidgets import QFileSystemModel, QInputDialog
+from PyQt5.QtCore import QDir, QTimer, pyqtSignal, QModelIndex
+from PyQt5.QtWidgets import QInputDialog
 
+from app_state import AppState
+from archive_model import ArchiveModel
+from archives import ArchiveCache, ArchiveError, is_archive, split_archive_path
+from content_search import ContentSearcher
+from dir_cache import PREDICT_SCAN_LIMIT, ListingCache
+from disk_usage import DiskUsageAnalyzer
+from disk_usage_window import DiskUsageWindow
+from duplicates import DuplicateFinder, HashCache
+from duplicates_window import DuplicatesWindow
+from file_ops import (CONFLICT_POLICIES, COPY, DELETE, MOVE, OVERWRITE, RENAME, SKIP, UPDATE,
+                      FileOperation, Progress)
+from file_ops_window import FileOperationsWindow
+from fuzzy import FuzzyIndex
+from fuzzy_window import FuzzyFinderWindow
+from history import NavigationHistory
+from index_watcher import IndexWatcher
+from jobs_window import JobsWindow
+from jobs import (PRIORITY_INDEX, PRIORITY_INTERACTIVE, PRIORITY_PREFETCH, PRIORITY_SEARCH,
+                  CancelToken, Job, JobScheduler)
+from lazy_model import LazyDirectoryModel
+from log_pipeline import setup_logging
+from metadata import MetadataCache
+from metadata_model import MetadataFileSystemModel, MetadataProvider
+from perf import StallMonitor, profiler
+from perf_panel import PerfPanel
+from preview_window import PreviewWindow
+import process_pool
 from qt_design import Ui_MainWindow
+from query import Query, QueryError, compile_query
+from search_core import SearchStats, search_files
+from search_index import FileIndex
+from search_results import SearchResultsWindow
+from snapshot import (SNAPSHOT_SUFFIX, ScanStats, SnapshotInfo, default_snapshot_dir, diff_snapshots,
+                      list_snapshots, snapshot_path, take_snapshot)
+from snapshot_window import SnapshotDiffWindow
+from thumbnail_window import ThumbnailWindow
+from thumbnails import ThumbnailCache, ThumbnailProvider
+from walker import DEFAULT_WORKERS
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('explorer.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger('FileExplorer')
+startup.mark('imports')
+
+# Улучшенные стили для лучшей читаемости на macOS
+MACOS_STYLESHEET = """
+    QMainWindow {
+        background-color: rgb(0, 40, 20);
+        font-family: 'SF Pro Text', 'Helvetica Neue', sans-serif;
+    }
+    QLineEdit {
+        color: rgb(255, 255, 255);
+        font-size: 13px;
+        padding: 5px;
+        border: 1px solid rgb(100, 100, 100);
+        border-radius: 4px;
+    }
+    QPushButton {
+        color: white;
+        font-size: 12px;
+        padding: 4px;
+        border-radius: 4px;
+    }
+    QTreeView {
+        background-color: rgb(240, 240, 240);
+        alternate-background-color: rgb(230, 230, 230);
+        font-size: 12px;
+    }
+    QLabel {
+        color: rgb(0, 120, 0);
+        font-size: 11px;
+    }
+"""
+
+# Результаты поиска передаются в GUI пачками: не реже чем раз в
+# BATCH_INTERVAL секунд и не более BATCH_SIZE путей за раз
+BATCH_INTERVAL = 0.05
+BATCH_SIZE = 500
+# Список файлов для быстрого поиска перечитывается, если он старше (секунд)
+FUZZY_MAX_AGE = 300
+# Сколько секунд при закрытии ждать остановки выполняемых фоновых задач
+CLOSE_TIMEOUT = 2.0
+# Названия политик совпадения имён в меню «Правка»
+CONFLICT_POLICY_TITLES = {
+    SKIP: 'Пропускать',
+    OVERWRITE: 'Заменять',
+    RENAME: 'Сохранять под новым именем',
+    UPDATE: 'Заменять более старые',
+}
+
+
+def format_snapshot_time(created: float) -> str:
+    """Время создания снимка для отображения."""
+    return time.strftime('%d.%m.%Y %H:%M:%S', time.localtime(created))
+
+
+class BackgroundJob(QtCore.QObject):
+    """
+    Фоновая задача главного окна.
+
+    Функция run выполняется общим планировщиком задач в рабочем потоке,
+    результаты передаются сигналами Qt в поток интерфейса. Остановка
+    только отменяет токен и не ждёт завершения; получатели отбрасывают
+    сигналы устаревших задач, сравнивая отправителя с текущей задачей.
+    """
+
+    # Класс приоритета в планировщике
+    priority = PRIORITY_SEARCH
+
+    def __init__(self, title: str) -> None:
+        """
+        Инициализация задачи.
+
+        Args:
+            title: Название для журнала и окна фоновых задач
+        """
+        super().__init__()
+        self.title = title
+        self.token = CancelToken()
+        self.job: Optional[Job] = None
+
+    def start(self, scheduler: JobScheduler) -> None:
+        """
+        Передаёт задачу планировщику.
+
+        Args:
+            scheduler: Общий планировщик задач
+        """
+        self.job = scheduler.submit(lambda job: self.run(), self.title, self.priority, self.token)
+
+    def run(self) -> None:
+        """Основной метод задачи; выполняется в рабочем потоке."""
+        raise NotImplementedError
+
+    def isRunning(self) -> bool:
+        """Запущена и ещё не завершена ли задача."""
+        return self.job is not None and not self.job.done
 
+    def report(self, done: int, total: Optional[int] = None) -> None:
+        """Сообщает прогресс задачи планировщику (для окна фоновых задач)."""
+        if self.job is not None:
+            self.job.report(done, total)
+
+    def stop(self) -> None:
+        """Отмена задачи; не блокирует поток интерфейса."""
+        if not self.token.cancelled:
+            logger.info(f'Cancelling job: {self.title}')
+        self.token.cancel()
 
-class FileSearchThread(QThread):
-    """Поток для поиска файлов по заданному шаблону."""
 
-    found_file = pyqtSignal(str)
+class BatchedSearchJob(BackgroundJob):
+    """Базовая задача поиска, передающая результаты в GUI пачками."""
+
+    found_files = pyqtSignal(list)
     search_finished = pyqtSignal()
 
-    def __init__(self, root_path: str, pattern: str) -> None:
+    def __init__(self, title: str) -> None:
         """
-        Инициализация потока поиска.
+        Инициализация состояния пачки результатов.
+
+        Args:
+            title: Название задачи
+        """
+        super().__init__(title)
+        self._batch: list = []
+        self._last_flush = 0.0
+        # Статистика для профилировщика
+        self.started_at = 0.0
+        self.first_result_at: Optional[float] = None
+        self.results = 0
+
+    def _add_result(self, result) -> None:
+        """
+        Добавляет результат в текущую пачку и отправляет её при необходимости.
+
+        Args:
+            result: Путь к найденному файлу или совпадение в содержимом
+        """
+        self._batch.append(result)
+        self.results += 1
+        self.report(self.results)
+        if self.first_result_at is None:
+            self.first_result_at = time.perf_counter()
+        if (len(self._batch) >= BATCH_SIZE
+                or time.monotonic() - self._last_flush >= BATCH_INTERVAL):
+            self._flush()
+
+    def _should_stop(self) -> bool:
+        """
+        Проверка отмены для циклов обхода и ожидания в потоке задачи.
+
+        Эти циклы вызывают её постоянно, даже когда новых результатов нет,
+        поэтому здесь же отправляется пачка, ожидающая дольше BATCH_INTERVAL:
+        редкие результаты не задерживаются до следующего найденного.
+        """
+        if self._batch and time.monotonic() - self._last_flush >= BATCH_INTERVAL:
+            self._flush()
+        return self.token.cancelled
+
+    def _flush(self) -> None:
+        """Отправляет накопленную пачку результатов."""
+        if self._batch:
+            self.found_files.emit(self._batch)
+            self._batch = []
+        self._last_flush = time.monotonic()
+
+    def _record_stats(self, name: str, **fields) -> None:
+        """
+        Передаёт профилировщику длительность поиска и время до первого результата.
+
+        Args:
+            name: Имя операции
+            fields: Дополнительные показатели поиска
+        """
+        if not profiler.enabled:
+            return
+        elapsed = time.perf_counter() - self.started_at
+        if self.first_result_at is not None:
+            fields['first_hit_ms'] = (self.first_result_at - self.started_at) * 1000
+        profiler.record(name, elapsed, self.started_at, results=self.results, **fields)
+
+
+class FileSearchJob(BatchedSearchJob):
+    """Задача поиска файлов по заданному шаблону."""
+
+    def __init__(self, root_path: str, pattern: Union[str, Query],
+                 index: Optional[FileIndex] = None,
+                 workers: int = DEFAULT_WORKERS,
+                 archives: Optional[ArchiveCache] = None) -> None:
+        """
+        Инициализация задачи поиска.
 
         Args:
             root_path: Корневой путь для поиска
-            pattern: Шаблон для поиска файлов
+            pattern: Поисковый запрос или его текст (см. query.Query)
+            index: Индекс имён файлов; используется, если он актуален для корня
+            workers: Количество потоков обхода дерева
+            archives: Кэш оглавлений архивов; если передан, поиск идёт и внутри архивов
+
+        Raises:
+            QueryError: Если запрос содержит ошибку
         """
-        super().__init__()
+        query = pattern if isinstance(pattern, Query) else compile_query(pattern)
+        super().__init__(f'Поиск: {query.text}')
         self.root_path = root_path
-        self.pattern = pattern
-        self._is_running = True
+        self.query = query
+        self.pattern = query.text
+        self.index = index
+        self.workers = workers
+        self.archives = archives
 
     def run(self) -> None:
-        """Основной метод выполнения поиска."""
+        """Основной метод выполнения поиска; сам поиск выполняет search_core."""
+        self._last_flush = time.monotonic()
+        self.started_at = time.perf_counter()
+        stats = SearchStats()
         try:
             logger.info(f'Starting search for pattern: {self.pattern}')
-            for root, dirs, files in os.walk(self.root_path):
-                if not self._is_running:
+            for path in search_files(self.root_path, self.query, self.index, self.workers,
+                                     self._should_stop, stats, self.archives):
+                self._add_result(path)
+        except Exception as e:
+            logger.error(f'Search error: {e}')
+        finally:
+            self._flush()
+            elapsed = time.perf_counter() - self.started_at
+            fields = {'source': stats.source, 'dirs': stats.dirs, 'files': stats.files,
+                      'errors': stats.errors}
+            if elapsed > 0:
+                fields['files_per_sec'] = stats.files / elapsed
+                fields['dirs_per_sec'] = stats.dirs / elapsed
+            self._record_stats('search.files', **fields)
+            profiler.count('search.errors', stats.errors)
+            logger.info('Search finished')
+            self.search_finished.emit()
+
+
+class ContentSearchJob(BatchedSearchJob):
+    """Задача поиска текста в содержимом файлов."""
+
+    def __init__(self, root_path: str, text: str,
+                 file_query: Optional[Query] = None) -> None:
+        """
+        Инициализация задачи поиска по содержимому.
+
+        Args:
+            root_path: Корневой путь для поиска
+            text: Искомый текст или /регулярное выражение/
+            file_query: Запрос для отбора файлов по имени
+
+        Raises:
+            re.error: Если регулярное выражение некорректно
+        """
+        super().__init__(f'Поиск по содержимому: {text}')
+        self.searcher = ContentSearcher(root_path, text, file_query)
+
+    def run(self) -> None:
+        """Основной метод выполнения поиска; сам поиск идёт в пуле процессов."""
+        self._last_flush = time.monotonic()
+        self.started_at = time.perf_counter()
+        try:
+            logger.info(f'Starting content search for: {self.searcher.text}')
+            for hits in self.searcher.search(self._should_stop):
+                for hit in hits:
+                    self._add_result(hit)
+                if self.token.cancelled:
                     break
+            logger.info(f'Files checked: {self.searcher.files_checked}')
+        except Exception as e:
+            logger.error(f'Content search error: {e}')
+        finally:
+            self._flush()
+            self._record_stats('search.content', files=self.searcher.files_checked)
+            logger.info('Content search finished')
+            self.search_finished.emit()
+
 
-                for file in files:
-                    if not self._is_running:
-                        break
+class DuplicateSearchJob(BatchedSearchJob):
+    """Задача поиска одинаковых файлов; группы передаются в GUI пачками."""
 
-                    if fnmatch.fnmatch(file.lower(), f'*{self.pattern.lower()}*'):
-                        file_path = os.path.join(root, file)
-                        self.found_file.emit(file_path)
+    def __init__(self, root_path: str, cache: Optional[HashCache] = None) -> None:
+        """
+        Инициализация задачи поиска дубликатов.
+
+        Args:
+            root_path: Корневой путь для поиска
+            cache: Кэш хешей файлов
+        """
+        super().__init__(f'Поиск дубликатов: {root_path}')
+        self.finder = DuplicateFinder(root_path, cache)
+
+    def run(self) -> None:
+        """Основной метод поиска; хеширование идёт в пуле процессов."""
+        self._last_flush = time.monotonic()
+        self.started_at = time.perf_counter()
+        try:
+            logger.info(f'Starting duplicate search in: {self.finder.root_path}')
+            for group in self.finder.search(self._should_stop):
+                self._add_result(group)
         except Exception as e:
-            logger.error(f'Search error: {e}')
+            logger.error(f'Duplicate search error: {e}')
         finally:
-            logger.info('Search finished')
+            self._flush()
+            self._record_stats('search.duplicates', files=self.finder.files_scanned,
+                               hashed=self.finder.hashed, reused=self.finder.reused)
+            logger.info('Duplicate search finished')
             self.search_finished.emit()
 
-    def stop(self) -> None:
-        """Остановка выполнения поиска."""
-        logger.info('Stopping search thread')
-        self._is_running = False
+
+class FuzzyMatchJob(BackgroundJob):
+    """Задача нечёткого поиска по загруженному списку файлов."""
+
+    # Результаты нужны по мере ввода, как и содержимое каталогов
+    priority = PRIORITY_INTERACTIVE
+
+    results_ready = pyqtSignal(list, int, bool)
+
+    def __init__(self, index: FuzzyIndex, pattern: str) -> None:
+        """
+        Инициализация задачи нечёткого поиска.
+
+        Args:
+            index: Список файлов для поиска
+            pattern: Запрос
+        """
+        super().__init__(f'Быстрый поиск: {pattern}')
+        self.index = index
+        self.pattern = pattern
+
+    def run(self) -> None:
+        """
+        Основной метод поиска. Промежуточные лучшие результаты передаются
+        не чаще раза в BATCH_INTERVAL секунд; остановленный поиск ничего
+        не передаёт после остановки.
+        """
+        started = time.perf_counter()
+        first_result_at = None
+        last_emit = 0.0
+        paths: List[str] = []
+        matched = 0
+        try:
+            for ranked, matched in self.index.search(self.pattern,
+                                                     should_stop=self.token):
+                paths = [path for _, path in ranked]
+                if first_result_at is None and paths:
+                    first_result_at = time.perf_counter()
+                if time.monotonic() - last_emit >= BATCH_INTERVAL:
+                    self.results_ready.emit(paths, matched, False)
+                    last_emit = time.monotonic()
+        except Exception as e:
+            logger.error(f'Fuzzy search error: {e}')
+        if self.token.cancelled:
+            return
+        self.report(matched, self.index.count)
+        self.results_ready.emit(paths, matched, True)
+        if profiler.enabled:
+            fields = {'matched': matched, 'candidates': self.index.count}
+            if first_result_at is not None:
+                fields['first_hit_ms'] = (first_result_at - started) * 1000
+            profiler.record('search.fuzzy', time.perf_counter() - started, started, **fields)
+
+
+class DiskUsageJob(BackgroundJob):
+    """Задача подсчёта занятого места в дереве каталогов."""
+
+    progress = pyqtSignal(int)
+    usage_ready = pyqtSignal(object)
+
+    def __init__(self, analyzer: DiskUsageAnalyzer, root_path: str, rescan: bool = False) -> None:
+        """
+        Инициализация задачи анализа.
+
+        Args:
+            analyzer: Анализатор с кэшем результатов предыдущих запусков
+            root_path: Анализируемый каталог
+            rescan: Перечитать все каталоги, не используя кэш
+        """
+        super().__init__(f'Анализ занятого места: {root_path}')
+        self.analyzer = analyzer
+        self.root_path = root_path
+        self.rescan = rescan
+
+    def run(self) -> None:
+        """Основной метод анализа; при остановке передаётся None."""
+        usage = None
+        try:
+            usage = self.analyzer.analyze(self.root_path, self.token, self._on_progress,
+                                           self.rescan)
+        except Exception as e:
+            logger.error(f'Disk usage error: {e}')
+        finally:
+            self.usage_ready.emit(usage)
+
+    def _on_progress(self, count: int) -> None:
+        """Передаёт число обработанных каталогов окну анализа и планировщику."""
+        self.report(count)
+        self.progress.emit(count)
+
+
+class FileOperationJob(BackgroundJob):
+    """Задача выполнения одной файловой операции (копирование, перемещение, удаление)."""
+
+    progress = pyqtSignal(object)
+    operation_finished = pyqtSignal(object)
+
+    def __init__(self, operation: FileOperation) -> None:
+        """
+        Инициализация задачи файловой операции.
+
+        Args:
+            operation: Выполняемая операция
+        """
+        super().__init__(operation.describe())
+        self.operation = operation
+
+    def run(self) -> None:
+        """Основной метод операции; по завершении передаётся итоговый прогресс."""
+        started = time.perf_counter()
+        try:
+            self.operation.run(self.token, self._on_progress)
+        except Exception as e:
+            logger.error(f'File operation error: {e}')
+            self.operation.progress.error(self.operation.describe(), str(e))
+        finally:
+            progress = self.operation.progress
+            if profiler.enabled:
+                profiler.record(f'file_ops.{self.operation.kind}', time.perf_counter() - started,
+                                started, files=progress.done_files, bytes=progress.done_bytes,
+                                zero_copy_bytes=progress.zero_copy_bytes,
+                                errors=len(progress.errors))
+            self.operation_finished.emit(progress)
+
+    def _on_progress(self, progress: Progress) -> None:
+        """Передаёт прогресс операции окну операций и планировщику."""
+        self.report(progress.done_bytes, progress.total_bytes or None)
+        self.progress.emit(progress)
+
+
+class IndexBuildJob(BackgroundJob):
+    """Задача фонового построения индекса имён файлов."""
+
+    priority = PRIORITY_INDEX
+
+    index_built = pyqtSignal(bool)
+
+    def __init__(self, index: FileIndex, root_path: str) -> None:
+        """
+        Инициализация задачи построения индекса.
+
+        Args:
+            index: Индекс, который нужно построить
+            root_path: Индексируемый корневой каталог
+        """
+        super().__init__(f'Индексирование: {root_path}')
+        self.index = index
+        self.root_path = root_path
+
+    def run(self) -> None:
+        """Основной метод построения индекса."""
+        completed = False
+        try:
+            completed = self.index.build(self.root_path, self.token)
+        except Exception as e:
+            logger.error(f'Index build error: {e}')
+        finally:
+            self.index_built.emit(completed)
+
+
+class SnapshotJob(BatchedSearchJob):
+    """
+    Задача создания снимка дерева; при сравнении новый снимок пишется
+    во временный файл, изменения передаются пачками, а файл удаляется.
+    """
+
+    snapshot_finished = pyqtSignal(object)
+
+    def __init__(self, root_path: str, path: str, previous: Optional[str] = None,
+                 compare: bool = False, verify_files: bool = False) -> None:
+        """
+        Инициализация задачи снимка.
+
+        Args:
+            root_path: Корень дерева
+            path: Путь файла нового снимка
+            previous: Предыдущий снимок; неизменённые каталоги берутся из него
+            compare: Сравнить новый снимок с предыдущим и не сохранять его
+            verify_files: Проверять каждый файл неизменённых каталогов
+        """
+        super().__init__(f'{"Сравнение со снимком" if compare else "Снимок"}: {root_path}')
+        self.root_path = root_path
+        self.path = path
+        self.previous = previous
+        self.compare = compare
+        self.verify_files = verify_files
+
+    def run(self) -> None:
+        """Основной метод: обход дерева и, при сравнении, слияние снимков."""
+        self._last_flush = time.monotonic()
+        self.started_at = time.perf_counter()
+        stats = ScanStats()
+        try:
+            logger.info(f'Starting snapshot of: {self.root_path}')
+            stats = take_snapshot(self.root_path, self.path, self.previous, self.verify_files,
+                                  self.token, self._on_progress)
+            if self.compare and stats.completed:
+                for change in diff_snapshots(self.previous, self.path, self._should_stop):
+                    self._add_result(change)
+        except Exception as e:
+            logger.error(f'Snapshot error: {e}')
+            stats.completed = False
+        finally:
+            if self.compare:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+            self._flush()
+            self._record_stats('snapshot.compare' if self.compare else 'snapshot.save',
+                               dirs=stats.dirs, entries=stats.entries,
+                               reused_dirs=stats.reused_dirs, errors=stats.errors)
+            logger.info('Snapshot finished')
+            self.snapshot_finished.emit(stats)
+
+    def _on_progress(self, dirs: int, entries: int) -> None:
+        """Передаёт число обойдённых каталогов планировщику."""
+        self.report(dirs)
 
 
 class FileExplorer(QtWidgets.QMainWindow):
@@ -79,65 +592,236 @@ class FileExplorer(QtWidgets.QMainWindow):
         self.ui.setupUi(self)
         self.setFixedSize(self.size())
         logger.info('Application started')
+        startup.mark('ui setup')
 
-        # Улучшенные стили для лучшей читаемости на macOS
-        if platform.system() == 'Darwin':
-            self.setStyleSheet("""
-                QMainWindow {
-                    background-color: rgb(0, 40, 20);
-                    font-family: 'SF Pro Text', 'Helvetica Neue', sans-serif;
-                }
-                QLineEdit {
-                    color: rgb(255, 255, 255);
-                    font-size: 13px;
-                    padding: 5px;
-                    border: 1px solid rgb(100, 100, 100);
-                    border-radius: 4px;
-                }
-                QPushButton {
-                    color: white;
-                    font-size: 12px;
-                    padding: 4px;
-                    border-radius: 4px;
-                }
-                QTreeView {
-                    background-color: rgb(240, 240, 240);
-                    alternate-background-color: rgb(230, 230, 230);
-                    font-size: 12px;
-                }
-                QLabel {
-                    color: rgb(0, 120, 0);
-                    font-size: 11px;
-                }
-            """)
-
-        # Настройка модели файловой системы
-        self.model = QFileSystemModel()
-        self.model.setRootPath(os.path.expanduser('~'))
+        # Настройка модели файловой системы; ленивая модель для больших
+        # каталогов создаётся при первом включении. Корень устанавливается
+        # в finish_startup уже после показа окна: setRootPath запускает чтение
+        # каталога и наблюдение за ним, что на медленных дисках занимает секунды
+        self.fs_model = MetadataFileSystemModel()
+        self.fs_model.directoryLoaded.connect(self.on_directory_loaded)
+        # Общий планировщик фоновых задач: чтение каталогов, поиск,
+        # индексирование и чтение наперёд выполняются одним пулом потоков
+        # по приоритетам, поэтому поиск не задерживает открытие каталога
+        self.scheduler = JobScheduler()
+        self.jobs_window: Optional[JobsWindow] = None
+        # Кэш содержимого каталогов для ленивой модели: переходы в недавно
+        # открытые каталоги и каталоги, прочитанные наперёд, не читают диск
+        self.listing_cache = ListingCache(
+            executor=self.scheduler.executor(PRIORITY_PREFETCH, 'Чтение наперёд'))
+        self.lazy_model: Optional[LazyDirectoryModel] = None
+        # Архивы открываются как каталоги в отдельной модели; оглавления кэшируются
+        self.archive_cache = ArchiveCache()
+        self.archive_model: Optional[ArchiveModel] = None
+        # Столбцы свойств файлов (тип по содержимому, строки, размеры
+        # изображений); источник свойств создаётся при первом включении
+        self.metadata: Optional[MetadataProvider] = None
+        self.metadata_columns = False
+        self.model = self.fs_model
+        # Время начала загрузки каталогов для профилировщика
+        self._load_started: Dict[str, float] = {}
         self.model.setFilter(QDir.AllEntries | QDir.AllDirs | QDir.NoDotAndDotDot)
 
-        # Устанавливаем модель в QTreeView
+        # Устанавливаем модель в QTreeView; для файловых операций можно
+        # выделить несколько элементов
         self.ui.file_tree.setModel(self.model)
-        self.ui.file_tree.setRootIndex(self.model.index(os.path.expanduser('~')))
         self.ui.file_tree.setColumnWidth(0, 250)
+        self.show_metadata_columns()
+        self.ui.file_tree.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+
+        # Состояние между запусками: последний каталог и режим дерева
+        self.app_state = AppState()
+        # Каталог, загрузка которого завершает запуск
+        self._startup_root: Optional[str] = None
 
         # Переменная для отслеживания скрытых файлов
         self.show_hidden = False
 
+        # История переходов; каталог, подкаталоги которого уже читаются наперёд
+        self.history = NavigationHistory()
+        self._prefetched_root: Optional[str] = None
+        self.ui.btn_back.clicked.connect(self.go_back)
+        self.ui.btn_forward.clicked.connect(self.go_forward)
+        QtWidgets.QShortcut(QtGui.QKeySequence.Back, self, self.go_back)
+        QtWidgets.QShortcut(QtGui.QKeySequence.Forward, self, self.go_forward)
+        self.update_history_buttons()
+
         # Обработчики событий
         self.ui.file_tree.clicked.connect(self.on_tree_click)
+        self.ui.file_tree.doubleClicked.connect(self.on_tree_double_click)
         self.ui.btn_open.clicked.connect(self.open_file)
         self.ui.btn_root_reset.clicked.connect(self.change_root_reset)
         self.ui.btn_root_next.clicked.connect(self.change_root_next)
         self.ui.btn_root_up.clicked.connect(self.change_root_up)
         self.ui.btn_root_home.clicked.connect(self.change_root_home)
         self.ui.btn_toggle_hidden.clicked.connect(self.toggle_hidden_files)
-        self.ui.btn_search.clicked.connect(self.search_files)
+        self.ui.btn_search.clicked.connect(self.quick_search)
+
+        # Задача поиска файлов и число потоков обхода дерева
+        self.search_job: Optional[FileSearchJob] = None
+        self.search_workers = DEFAULT_WORKERS
+        self.results_window: Optional[SearchResultsWindow] = None
 
-        # Поток для поиска файлов
-        self.search_thread: Optional[FileSearchThread] = None
+        # Постоянный индекс имён файлов и задача его построения
+        self.file_index = FileIndex()
+        self.index_job: Optional[IndexBuildJob] = None
+        # Служба, поддерживающая индекс просмотренных корней в актуальном состоянии
+        self.index_watcher = IndexWatcher(self.file_index,
+                                          on_change=self.listing_cache.invalidate)
+        self.search_menu = self.ui.menubar.addMenu('Поиск')
+        self.action_use_index = self.search_menu.addAction('Использовать индекс')
+        self.action_use_index.setCheckable(True)
+        self.action_use_index.setChecked(True)
+        self.action_search_contents = self.search_menu.addAction('Поиск по содержимому...')
+        self.action_search_contents.triggered.connect(self.search_contents)
+        self.action_rebuild_index = self.search_menu.addAction('Обновить индекс')
+        self.action_rebuild_index.triggered.connect(self.rebuild_index)
+        self.action_search_archives = self.search_menu.addAction('Искать в архивах')
+        self.action_search_archives.setCheckable(True)
+        self.action_query_search = self.search_menu.addAction('Поиск по запросу...')
+        self.action_query_search.setShortcut('Ctrl+F')
+        self.action_query_search.triggered.connect(self.search_files)
+
+        # Быстрый поиск по мере ввода: список файлов корня загружается один
+        # раз, а каждое изменение запроса фильтрует его в памяти
+        self.fuzzy_index = FuzzyIndex()
+        self.fuzzy_root: Optional[str] = None
+        self.fuzzy_loaded_at = 0.0
+        self.fuzzy_loader: Optional[FileSearchJob] = None
+        self.fuzzy_job: Optional[FuzzyMatchJob] = None
+        self.fuzzy_window: Optional[FuzzyFinderWindow] = None
+        self.action_quick_search = self.search_menu.addAction('Быстрый поиск')
+        self.action_quick_search.setShortcut('Ctrl+P')
+        self.action_quick_search.triggered.connect(self.quick_search)
+
+        # Анализ занятого места; анализатор хранит кэш между запусками
+        self.disk_usage = DiskUsageAnalyzer()
+        self.usage_job: Optional[DiskUsageJob] = None
+        self.usage_window: Optional[DiskUsageWindow] = None
+        self.tools_menu = self.ui.menubar.addMenu('Инструменты')
+        self.action_disk_usage = self.tools_menu.addAction('Анализ занятого места')
+        self.action_disk_usage.triggered.connect(lambda: self.analyze_disk_usage())
+
+        # Поиск дубликатов; хеши файлов кэшируются между запусками
+        self.hash_cache = HashCache()
+        self.duplicates_job: Optional[DuplicateSearchJob] = None
+        self.duplicates_window: Optional[DuplicatesWindow] = None
+        self.action_duplicates = self.tools_menu.addAction('Поиск дубликатов')
+        self.action_duplicates.triggered.connect(self.find_duplicates)
+
+        # Снимки дерева: что изменилось со времени прошлого обхода
+        self.snapshot_dir = default_snapshot_dir()
+        self.snapshot_job: Optional[SnapshotJob] = None
+        self.snapshot_window: Optional[SnapshotDiffWindow] = None
+        self.snapshot_menu = self.tools_menu.addMenu('Снимок дерева')
+        self.action_save_snapshot = self.snapshot_menu.addAction('Сохранить снимок')
+        self.action_save_snapshot.triggered.connect(self.save_snapshot)
+        self.action_compare_snapshot = self.snapshot_menu.addAction('Что изменилось...')
+        self.action_compare_snapshot.triggered.connect(lambda: self.compare_snapshot())
+        self.action_verify_snapshot = self.snapshot_menu.addAction(
+            'Проверять каждый файл (медленнее)')
+        self.action_verify_snapshot.setCheckable(True)
+
+        # Статистика производительности; пока сбор выключен, затраты ничтожны
+        self.stall_monitor = StallMonitor(profiler, self)
+        self.perf_panel: Optional[PerfPanel] = None
+        self.action_perf_panel = self.tools_menu.addAction('Производительность')
+        self.action_perf_panel.triggered.connect(self.show_perf_panel)
+        self.action_jobs = self.tools_menu.addAction('Фоновые задачи')
+        self.action_jobs.triggered.connect(self.show_jobs)
+
+        # Копирование, перемещение и удаление выполняются в фоне по очереди;
+        # буфер обмена хранит вид операции и пути
+        self.file_clipboard: Optional[Tuple[str, List[str]]] = None
+        self.file_ops_queue: Deque[FileOperation] = deque()
+        self.file_ops_job: Optional[FileOperationJob] = None
+        self.file_ops_window: Optional[FileOperationsWindow] = None
+        self.conflict_policy = RENAME
+        self.edit_menu = self.ui.menubar.addMenu('Правка')
+        self.action_copy = self.edit_menu.addAction('Копировать')
+        self.action_copy.setShortcut(QtGui.QKeySequence.Copy)
+        self.action_copy.triggered.connect(lambda: self.copy_selection(COPY))
+        self.action_cut = self.edit_menu.addAction('Вырезать')
+        self.action_cut.setShortcut(QtGui.QKeySequence.Cut)
+        self.action_cut.triggered.connect(lambda: self.copy_selection(MOVE))
+        self.action_paste = self.edit_menu.addAction('Вставить')
+        self.action_paste.setShortcut(QtGui.QKeySequence.Paste)
+        self.action_paste.triggered.connect(self.paste_files)
+        self.action_delete = self.edit_menu.addAction('Удалить')
+        self.action_delete.setShortcut(QtGui.QKeySequence.Delete)
+        self.action_delete.triggered.connect(self.delete_selection)
+        self.edit_menu.addSeparator()
+        self.conflict_menu = self.edit_menu.addMenu('При совпадении имён')
+        self.conflict_actions = QtWidgets.QActionGroup(self)
+        for policy in CONFLICT_POLICIES:
+            action = self.conflict_menu.addAction(CONFLICT_POLICY_TITLES[policy])
+            action.setCheckable(True)
+            action.setData(policy)
+            action.setChecked(policy == self.conflict_policy)
+            self.conflict_actions.addAction(action)
+        self.conflict_actions.triggered.connect(
+            lambda action: self.set_conflict_policy(action.data()))
+        self.edit_menu.addSeparator()
+        self.action_file_ops = self.edit_menu.addAction('Файловые операции')
+        self.action_file_ops.triggered.connect(self.show_file_operations)
+        self.ui.file_tree.setContextMenuPolicy(QtCore.Qt.ActionsContextMenu)
+        self.ui.file_tree.addActions([self.action_copy, self.action_cut,
+                                      self.action_paste, self.action_delete])
+
+        self.view_menu = self.ui.menubar.addMenu('Вид')
+        self.action_lazy_model = self.view_menu.addAction('Режим больших каталогов')
+        self.action_lazy_model.setCheckable(True)
+        self.action_lazy_model.toggled.connect(self.set_lazy_model)
+        self.action_metadata_columns = self.view_menu.addAction(
+            'Свойства файлов (тип, строки, размеры изображений)')
+        self.action_metadata_columns.setCheckable(True)
+        self.action_metadata_columns.toggled.connect(self.set_metadata_columns)
+        # Сетка эскизов текущего каталога и панель просмотра выбранного файла;
+        # источник эскизов создаётся при первом показе сетки
+        self.thumbnails: Optional[ThumbnailProvider] = None
+        self.thumbnail_window: Optional[ThumbnailWindow] = None
+        self.preview_window: Optional[PreviewWindow] = None
+        self.view_menu.addSeparator()
+        self.action_thumbnails = self.view_menu.addAction('Эскизы')
+        self.action_thumbnails.triggered.connect(self.show_thumbnails)
+        self.action_preview = self.view_menu.addAction('Панель просмотра')
+        self.action_preview.setShortcut('F3')
+        self.action_preview.triggered.connect(self.show_preview)
 
         self.update_status('Готов')
+        startup.mark('window init')
+        QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self) -> None:
+        """
+        Завершение запуска после первого показа окна: стили и начальный каталог.
+
+        Открывается последний посещённый каталог, если он ещё существует,
+        иначе домашний.
+        """
+        startup.mark('first event loop pass')
+        if platform.system() == 'Darwin':
+            self.setStyleSheet(MACOS_STYLESHEET)
+
+        path = self.app_state.get('last_dir')
+        if not isinstance(path, str) or not os.path.isdir(path):
+            path = os.path.expanduser('~')
+        if self.app_state.get('lazy_model'):
+            self.action_lazy_model.setChecked(True)
+        if self.app_state.get('metadata_columns'):
+            self.action_metadata_columns.setChecked(True)
+        if self.app_state.get('conflict_policy') in CONFLICT_POLICIES:
+            self.set_conflict_policy(self.app_state.get('conflict_policy'))
+        self._startup_root = os.path.normpath(path)
+        self.change_root(path)
+        startup.mark('root requested')
+        logger.info(f'Initial directory: {path}')
+
+    def report_startup(self) -> None:
+        """Выводит отчёт о времени запуска, если включён флаг --profile-startup."""
+        report = startup.report()
+        if report:
+            logger.info(report)
 
     def on_tree_click(self, index: QModelIndex) -> None:
         """
@@ -150,15 +834,51 @@ class FileExplorer(QtWidgets.QMainWindow):
         self.ui.path.setText(path)
         self.update_status(f'Выбран: {path}')
         logger.info(f'Selected: {path}')
+        if self.preview_window is not None and self.preview_window.isVisible():
+            self.preview_window.show_path(path)
+
+    def on_tree_double_click(self, index: QModelIndex) -> None:
+        """
+        Обработчик двойного клика: каталоги и архивы открываются в дереве,
+        файлы — в приложении по умолчанию.
+
+        Args:
+            index: Индекс элемента
+        """
+        path = self.model.filePath(index)
+        self.ui.path.setText(path)
+        if self.model.isDir(index) or (self.model is not self.archive_model and is_archive(path)):
+            if self.change_root(path):
+                self.update_status(f'Вы перешли в: {path}')
+        else:
+            self.open_file()
 
     def open_file(self) -> None:
-        """Открытие выбранного файла или директории."""
+        """
+        Открытие выбранного файла или директории. Архив открывается в дереве
+        как каталог; файл из архива предварительно извлекается.
+        """
         path = self.ui.path.text()
         if not path:
             self.update_status('Путь не указан!')
             logger.warning('No path specified')
             return
 
+        if os.path.isfile(path) and is_archive(path):
+            if self.change_root(path):
+                self.update_status(f'Открыт архив: {path}')
+                logger.info(f'Opened archive: {path}')
+                return
+        elif not os.path.exists(path):
+            location = split_archive_path(path)
+            if location is not None and location[1]:
+                try:
+                    path = self.archive_cache.extract(*location)
+                except ArchiveError as e:
+                    self.update_status(f'Ошибка при извлечении из архива: {e}')
+                    logger.error(f'Archive extraction failed: {e}')
+                    return
+
         if os.path.exists(path):
             try:
                 if platform.system() == 'Windows':
@@ -192,15 +912,258 @@ class FileExplorer(QtWidgets.QMainWindow):
         """
         self.ui.status.setText(message)
 
-    def change_root(self, path: str) -> bool:
+    def change_root(self, path: str, remember: bool = True) -> bool:
         """
         Изменение корневой директории файловой модели.
 
         Args:
-            path: Новый корневой путь
+            path: Новый корневой путь; пустая строка означает корень файловой системы
+            remember: Добавить переход в историю (False для «Назад» и «Вперёд»)
+
+        Returns:
+            True, если корень изменён
+        """
+        in_archive = bool(path) and not os.path.isdir(path)
+        if in_archive and not self.is_browsable(path):
+            return False
+        model = self.archive_tree_model() if in_archive else self.directory_model()
+        if model is not self.model:
+            self.set_tree_model(model)
+        if profiler.enabled:
+            self._load_started[os.path.normpath(path or os.sep)] = time.perf_counter()
+        with profiler.span('navigation.change_root', path=path):
+            self.model.setRootPath(path)
+            self.ui.file_tree.setRootIndex(self.model.index(path))
+        self.sync_thumbnails()
+        target = os.path.normpath(path or os.sep)
+        if not in_archive:
+            if path:
+                self.follow_index_root(path)
+            if target != self.history.current:
+                self.listing_cache.record_visit(target)
+        if remember:
+            self.history.visit(target)
+        self.update_history_buttons()
+        if not in_archive:
+            self.prefetch_around(target)
+        return True
+
+    @staticmethod
+    def is_browsable(path: str) -> bool:
+        """Проверяет, можно ли открыть путь в дереве: каталог, архив или каталог архива."""
+        return os.path.isdir(path) or split_archive_path(path) is not None
+
+    def directory_model(self) -> QtCore.QAbstractItemModel:
+        """Модель для каталогов файловой системы с учётом режима больших каталогов."""
+        if self.lazy_model is not None and self.action_lazy_model.isChecked():
+            return self.lazy_model
+        return self.fs_model
+
+    def archive_tree_model(self) -> ArchiveModel:
+        """Модель для просмотра архивов; создаётся при первом открытии архива."""
+        if self.archive_model is None:
+            self.archive_model = ArchiveModel(
+                self.archive_cache, self,
+                self.scheduler.executor(PRIORITY_INTERACTIVE, 'Чтение архива'))
+            self.archive_model.directoryLoaded.connect(self.on_directory_loaded)
+            self.archive_model.loadFailed.connect(self.on_archive_failed)
+        return self.archive_model
+
+    def set_tree_model(self, model: QtCore.QAbstractItemModel) -> None:
+        """
+        Устанавливает модель дерева, сохраняя фильтр скрытых файлов.
+
+        Args:
+            model: QFileSystemModel, ленивая модель или модель архива
+        """
+        model.setFilter(self.model.filter())
+        self.model = model
+        self.ui.file_tree.setModel(model)
+        sortable = model is self.lazy_model
+        self.ui.file_tree.setUniformRowHeights(model is not self.fs_model)
+        if sortable:
+            self.ui.file_tree.header().setSortIndicator(0, QtCore.Qt.AscendingOrder)
+        self.ui.file_tree.setSortingEnabled(sortable)
+        self.ui.file_tree.setColumnWidth(0, 250)
+        self.show_metadata_columns()
+
+    def set_metadata_columns(self, enabled: bool) -> None:
+        """
+        Показ и скрытие столбцов свойств файлов.
+
+        Свойства вычисляются в фоне только для отображаемых строк и
+        кэшируются в metadata.sqlite3 в каталоге кэша приложения.
+
+        Args:
+            enabled: True — показывать столбцы
+        """
+        if enabled and self.metadata is None:
+            self.metadata = MetadataProvider(
+                MetadataCache(), self.scheduler.executor(PRIORITY_SEARCH, 'Свойства файлов'), self)
+            self.fs_model.set_metadata(self.metadata)
+            if self.lazy_model is not None:
+                self.lazy_model.set_metadata(self.metadata)
+        self.metadata_columns = enabled
+        self.show_metadata_columns()
+
+    def show_metadata_columns(self) -> None:
+        """Скрывает или показывает столбцы свойств файлов текущей модели дерева."""
+        first = getattr(self.model, 'metadata_column', None)
+        if first is None:
+            return
+        for column in range(first, self.model.columnCount()):
+            self.ui.file_tree.setColumnHidden(column, not self.metadata_columns)
+
+    def show_thumbnails(self) -> None:
+        """
+        Показ сетки эскизов текущего каталога.
+
+        Изображения декодируются в фоне сразу в уменьшенном размере и
+        кэшируются в памяти и в каталоге thumbnails кэша приложения.
+        """
+        if self.thumbnails is None:
+            self.thumbnails = ThumbnailProvider(
+                ThumbnailCache(), self.scheduler.executor(PRIORITY_SEARCH, 'Эскизы'), parent=self)
+        if self.thumbnail_window is None:
+            self.thumbnail_window = ThumbnailWindow(self.thumbnails, self)
+            self.thumbnail_window.view.clicked.connect(self.on_tree_click)
+            self.thumbnail_window.view.activated.connect(self.on_tree_double_click)
+        self.sync_thumbnails()
+        self.thumbnail_window.show()
+
+    def sync_thumbnails(self) -> None:
+        """Переводит сетку эскизов в текущий каталог дерева."""
+        if self.thumbnail_window is not None:
+            self.thumbnail_window.set_root(self.model, self.ui.file_tree.rootIndex())
+
+    def show_preview(self) -> None:
+        """Показ панели просмотра; она следует за выбором в дереве и сетке эскизов."""
+        if self.preview_window is None:
+            self.preview_window = PreviewWindow(
+                self.scheduler.executor(PRIORITY_INTERACTIVE, 'Просмотр'), self)
+        self.preview_window.show()
+        if self.ui.path.text():
+            self.preview_window.show_path(self.ui.path.text())
+
+    def on_archive_failed(self, path: str, message: str) -> None:
+        """
+        Обработчик ошибки чтения архива.
+
+        Args:
+            path: Открываемый путь
+            message: Описание ошибки
+        """
+        self.update_status(f'Не удалось открыть архив: {message}')
+        logger.error(f'Archive open failed: {path}: {message}')
+
+    def search_root(self) -> str:
+        """
+        Каталог для поиска и анализа: текущий каталог или, при просмотре
+        архива, каталог, в котором лежит архив.
+        """
+        if self.model is self.archive_model:
+            return os.path.dirname(self.archive_model.archive)
+        return self.model.rootPath()
+
+    def prefetch_around(self, path: str) -> None:
+        """
+        Чтение наперёд родительского каталога и вероятных подкаталогов.
+
+        Ленивая модель берёт их из кэша содержимого каталогов. QFileSystemModel
+        читает каталоги в своём фоновом потоке по fetchMore и хранит их сама;
+        подкаталоги для неё выбираются после загрузки текущего каталога.
+
+        Args:
+            path: Текущий каталог
+        """
+        if self.model is self.lazy_model:
+            self.listing_cache.prefetch_around(path)
+            return
+        self._prefetched_root = None
+        parent = os.path.dirname(path)
+        if parent != path:
+            self._fetch_directory(parent)
+
+    def _fetch_directory(self, path: str) -> None:
+        """Просит QFileSystemModel прочитать каталог в фоне."""
+        index = self.fs_model.index(path)
+        if index.isValid() and self.fs_model.canFetchMore(index):
+            self.fs_model.fetchMore(index)
+
+    def _prefetch_children(self, path: str) -> None:
+        """Читает наперёд вероятные подкаталоги загруженного каталога QFileSystemModel."""
+        self._prefetched_root = path
+        root_index = self.fs_model.index(path)
+        children = []
+        for row in range(min(self.fs_model.rowCount(root_index), PREDICT_SCAN_LIMIT)):
+            index = self.fs_model.index(row, 0, root_index)
+            if self.fs_model.isDir(index):
+                children.append((self.fs_model.fileName(index),
+                                 self.fs_model.lastModified(index).toSecsSinceEpoch()))
+        for child in self.listing_cache.rank_children(path, children):
+            self._fetch_directory(child)
+
+    def update_history_buttons(self) -> None:
+        """Включает кнопки «Назад» и «Вперёд», только если есть куда переходить."""
+        self.ui.btn_back.setEnabled(self.history.can_go_back)
+        self.ui.btn_forward.setEnabled(self.history.can_go_forward)
+
+    def go_back(self) -> None:
+        """Переход к предыдущему каталогу истории."""
+        self._go_to_history(self.history.back(self.is_browsable))
+
+    def go_forward(self) -> None:
+        """Переход к следующему каталогу истории."""
+        self._go_to_history(self.history.forward(self.is_browsable))
+
+    def _go_to_history(self, path: Optional[str]) -> None:
+        """
+        Переход в каталог из истории без её изменения.
+
+        Args:
+            path: Каталог или None, если переходить некуда
         """
-        self.model.setRootPath(path)
-        self.ui.file_tree.setRootIndex(self.model.index(path))
+        if path is None:
+            self.update_history_buttons()
+            return
+        if not self.change_root(path, remember=False):
+            return
+        self.ui.path.setText(path)
+        self.update_status(f'Вы перешли в: {path}')
+        logger.info(f'History navigation to: {path}')
+
+    def on_directory_loaded(self, path: str) -> None:
+        """
+        Обработчик окончания загрузки каталога моделью: время от перехода до загрузки.
+
+        Args:
+            path: Загруженный каталог
+        """
+        started = self._load_started.pop(os.path.normpath(path), None)
+        if started is not None:
+            profiler.record('model.directory_loaded', time.perf_counter() - started, started,
+                            model=type(self.sender()).__name__)
+        if (self.sender() is self.fs_model and self.model is self.fs_model
+                and os.path.normpath(path) == self.history.current
+                and self._prefetched_root != self.history.current):
+            self._prefetch_children(self.history.current)
+        if self._startup_root is not None and os.path.normpath(path) == self._startup_root:
+            self._startup_root = None
+            startup.mark('root loaded')
+            self.report_startup()
+
+    def follow_index_root(self, path: str) -> None:
+        """
+        Включает отслеживание изменений для проиндексированного корня, содержащего путь.
+
+        Args:
+            path: Просматриваемый или используемый для поиска каталог
+        """
+        if not self.action_use_index.isChecked():
+            return
+        root = self.file_index.covering_root(path)
+        if root is not None:
+            self.index_watcher.watch(root[0])
 
     def change_root_reset(self):
         '''Сбрасывает корневую директорию в состояние "по умолчанию".'''
@@ -242,6 +1205,34 @@ class FileExplorer(QtWidgets.QMainWindow):
         logger.info(f'Changed to directory: {path}')
 
 
+    def set_lazy_model(self, enabled: bool) -> None:
+        """
+        Переключение дерева между QFileSystemModel и ленивой моделью.
+
+        Ленивая модель читает каталог порциями и сортирует его в фоне,
+        поэтому не блокирует интерфейс на каталогах со 100 000+ элементов.
+
+        Args:
+            enabled: True — использовать ленивую модель
+        """
+        root_path = self.model.filePath(self.ui.file_tree.rootIndex()) or self.model.rootPath()
+        if enabled and self.lazy_model is None:
+            self.lazy_model = LazyDirectoryModel(
+                self, self.listing_cache,
+                self.scheduler.executor(PRIORITY_INTERACTIVE, 'Чтение каталога'))
+            self.lazy_model.directoryLoaded.connect(self.on_directory_loaded)
+            if self.metadata is not None:
+                self.lazy_model.set_metadata(self.metadata)
+        if self.model is not self.archive_model:
+            if self.directory_model() is self.model:
+                return
+            self.set_tree_model(self.directory_model())
+        # При просмотре архива режим применяется после выхода из него
+        self.change_root(root_path)
+        self.update_status('Режим больших каталогов включён' if enabled
+                           else 'Режим больших каталогов выключен')
+        logger.info(f'Lazy directory model {"enabled" if enabled else "disabled"}')
+
     def toggle_hidden_files(self) -> None:
         """Переключение отображения скрытых файлов."""
         self.show_hidden = not self.show_hidden
@@ -257,25 +1248,92 @@ class FileExplorer(QtWidgets.QMainWindow):
 
     def search_files(self) -> None:
         """Инициализация поиска файлов по шаблону."""
-        search_text, ok = QInputDialog.getText(self, 'Поиск файлов', 'Введите имя файла:')
+        search_text, ok = QInputDialog.getText(
+            self, 'Поиск файлов',
+            'Введите имя файла или запрос\n(ext:py size>1M mtime<7d type:dir -path:.git):'
+        )
         if ok and search_text:
-            # Останавливаем предыдущий поиск, если он активен
-            if self.search_thread and self.search_thread.isRunning():
-                self.search_thread.stop()
-                self.search_thread.wait()
+            try:
+                query = compile_query(search_text)
+            except QueryError as e:
+                self.update_status(f'Ошибка запроса: {e}')
+                logger.warning(f'Invalid query: {e}')
+                return
 
-            self.update_status(f'Поиск: {search_text}...')
-            logger.info(f'Starting search for: {search_text}')
+            index = self.file_index if self.action_use_index.isChecked() else None
+            root_path = self.search_root()
+            archives = self.archive_cache if self.action_search_archives.isChecked() else None
+            self.follow_index_root(root_path)
+            self.start_search(
+                FileSearchJob(root_path, query, index, self.search_workers, archives),
+                search_text, 'Результаты поиска'
+            )
 
-            # Создаем и запускаем поток поиска
-            self.search_thread = FileSearchThread(self.model.rootPath(), search_text)
-            self.search_thread.found_file.connect(self.on_file_found)
-            self.search_thread.search_finished.connect(self.on_search_finished)
-            self.search_thread.start()
+    def search_contents(self) -> None:
+        """Инициализация поиска текста в содержимом файлов."""
+        text, ok = QInputDialog.getText(
+            self, 'Поиск по содержимому', 'Введите текст или /регулярное выражение/:'
+        )
+        if not ok or not text:
+            return
+        file_filter, ok = QInputDialog.getText(
+            self, 'Поиск по содержимому',
+            'Фильтр файлов (запрос, например ext:log,conf -path:.git):', text='*'
+        )
+        if not ok:
+            return
+        try:
+            file_query = compile_query(file_filter) if file_filter.strip() else None
+            job = ContentSearchJob(self.search_root(), text, file_query)
+        except (QueryError, re.error) as e:
+            self.update_status(f'Ошибка запроса: {e}')
+            logger.warning(f'Invalid content query: {e}')
+            return
+        self.start_search(job, text, 'Поиск по содержимому')
 
-    def on_file_found(self, file_path: str) -> None:
+    def start_search(self, job: BatchedSearchJob, text: str, title: str) -> None:
         """
-        Обработчик найденного файла.
+        Запуск задачи поиска с выводом результатов в окно результатов.
+
+        Args:
+            job: Подготовленная задача поиска
+            text: Текст запроса
+            title: Заголовок окна результатов
+        """
+        # Отменяем предыдущий поиск; его оставшиеся результаты отбрасываются
+        if self.search_job:
+            self.search_job.stop()
+
+        self.update_status(f'Поиск: {text}...')
+        logger.info(f'Starting search for: {text}')
+
+        if self.results_window is None:
+            self.results_window = SearchResultsWindow(self)
+            self.results_window.result_activated.connect(self.show_search_result)
+        self.results_window.start(text, title)
+        self.results_window.show()
+
+        self.search_job = job
+        self.search_job.found_files.connect(self.on_files_found)
+        self.search_job.search_finished.connect(self.on_search_finished)
+        self.search_job.start(self.scheduler)
+
+    def on_files_found(self, file_paths: List[str]) -> None:
+        """
+        Обработчик пачки найденных файлов.
+
+        Args:
+            file_paths: Пути к найденным файлам
+        """
+        # Пачки остановленного поиска могут прийти уже после запуска нового
+        if self.sender() is not None and self.sender() is not self.search_job:
+            return
+        self.results_window.add_paths(file_paths)
+        self.update_status(f'Найдено: {self.results_window.model.rowCount()}')
+
+    def show_search_result(self, file_path: str) -> None:
+        """
+        Переход к выбранному результату поиска в дереве файлов.
 
         Args:
             file_path: Путь к найденному файлу
@@ -290,9 +1348,517 @@ class FileExplorer(QtWidgets.QMainWindow):
 
     def on_search_finished(self) -> None:
         """Обработчик завершения поиска."""
-        self.update_status('Поиск завершен')
+        if self.sender() is not None and self.sender() is not self.search_job:
+            return
+        found = self.results_window.model.rowCount()
+        self.results_window.summary.setText(f'Поиск завершен. Найдено: {found}')
+        self.update_status(f'Поиск завершен. Найдено: {found}')
         logger.info('Search completed')
 
+        # Если индекс отсутствует или устарел, перестраиваем его в фоне
+        root_path = self.search_root()
+        if (isinstance(self.search_job, FileSearchJob)
+                and self.action_use_index.isChecked()
+                and not self.file_index.is_fresh(root_path)):
+            self.start_index_build(root_path)
+
+    def quick_search(self) -> None:
+        """Открытие окна быстрого поиска по файлам текущего корня."""
+        root_path = self.search_root()
+        if self.fuzzy_window is None:
+            self.fuzzy_window = FuzzyFinderWindow(self)
+            self.fuzzy_window.query_changed.connect(self.on_fuzzy_query)
+            self.fuzzy_window.file_activated.connect(self.show_search_result)
+        loading = self.fuzzy_loader is not None and self.fuzzy_loader.isRunning()
+        if root_path != self.fuzzy_root or (
+                not loading and time.monotonic() - self.fuzzy_loaded_at > FUZZY_MAX_AGE):
+            self.load_fuzzy_candidates(root_path)
+        self.fuzzy_window.show()
+        self.fuzzy_window.raise_()
+        self.fuzzy_window.activateWindow()
+        self.fuzzy_window.edit.setFocus()
+        self.fuzzy_window.edit.selectAll()
+
+    def load_fuzzy_candidates(self, root_path: str) -> None:
+        """
+        Фоновая загрузка списка файлов для быстрого поиска.
+
+        Используется индекс имён, если он актуален, иначе дерево обходится.
+
+        Args:
+            root_path: Каталог, файлы которого загружаются
+        """
+        for job in (self.fuzzy_loader, self.fuzzy_job):
+            if job:
+                job.stop()
+        self.fuzzy_index.clear()
+        self.fuzzy_root = root_path
+        self.fuzzy_loaded_at = time.monotonic()
+        self.fuzzy_window.start(root_path)
+        logger.info(f'Loading quick search candidates: {root_path}')
+
+        index = self.file_index if self.action_use_index.isChecked() else None
+        self.fuzzy_loader = FileSearchJob(root_path, 'type:file', index, self.search_workers)
+        self.fuzzy_loader.found_files.connect(self.on_fuzzy_candidates)
+        self.fuzzy_loader.search_finished.connect(self.on_fuzzy_candidates_loaded)
+        self.fuzzy_loader.start(self.scheduler)
+        self.on_fuzzy_query(self.fuzzy_window.edit.text())
+
+    def on_fuzzy_candidates(self, paths: List[str]) -> None:
+        """
+        Обработчик пачки загруженных путей для быстрого поиска.
+
+        Args:
+            paths: Пути к файлам
+        """
+        if self.sender() is not None and self.sender() is not self.fuzzy_loader:
+            return
+        self.fuzzy_index.add(paths)
+        self.fuzzy_window.show_loading(self.fuzzy_index.count)
+
+    def on_fuzzy_candidates_loaded(self) -> None:
+        """Обработчик завершения загрузки: текущий запрос дополняется новыми путями."""
+        if self.sender() is not None and self.sender() is not self.fuzzy_loader:
+            return
+        self.fuzzy_window.show_loading(self.fuzzy_index.count, finished=True)
+        logger.info(f'Quick search candidates loaded: {self.fuzzy_index.count}')
+        self.on_fuzzy_query(self.fuzzy_window.edit.text())
+
+    def on_fuzzy_query(self, text: str) -> None:
+        """
+        Запуск нечёткого поиска при изменении запроса; устаревший поиск
+        останавливается, не дожидаясь полного завершения.
+
+        Args:
+            text: Текст запроса
+        """
+        if self.fuzzy_job:
+            self.fuzzy_job.stop()
+        if not text.strip():
+            self.fuzzy_window.model.clear()
+            self.fuzzy_window.show_loading(self.fuzzy_index.count, not self.fuzzy_window.loading)
+            return
+        self.fuzzy_job = FuzzyMatchJob(self.fuzzy_index, text)
+        self.fuzzy_job.results_ready.connect(self.on_fuzzy_results)
+        self.fuzzy_job.start(self.scheduler)
+
+    def on_fuzzy_results(self, paths: List[str], matched: int, done: bool) -> None:
+        """
+        Обработчик результатов нечёткого поиска.
+
+        Args:
+            paths: Лучшие результаты по убыванию очков
+            matched: Общее число совпадений
+            done: True, если поиск завершён
+        """
+        if self.sender() is not None and self.sender() is not self.fuzzy_job:
+            return
+        self.fuzzy_window.set_results(paths, matched, done)
+
+    def rebuild_index(self) -> None:
+        """Принудительное перестроение индекса для текущего корня."""
+        self.start_index_build(self.search_root())
+
+    def start_index_build(self, root_path: str) -> None:
+        """
+        Запуск фонового построения индекса.
+
+        Args:
+            root_path: Индексируемый корневой каталог
+        """
+        if self.index_job and self.index_job.isRunning():
+            return
+        self.index_job = IndexBuildJob(self.file_index, root_path)
+        self.index_job.index_built.connect(self.on_index_built)
+        self.index_job.start(self.scheduler)
+        logger.info(f'Index build started: {root_path}')
+
+    def on_index_built(self, completed: bool) -> None:
+        """
+        Обработчик завершения построения индекса.
+
+        Args:
+            completed: True, если индекс построен полностью
+        """
+        if completed:
+            self.update_status('Индекс обновлён')
+            logger.info('Index build completed')
+            self.index_watcher.watch(self.index_job.root_path)
+
+    def analyze_disk_usage(self, root_path: Optional[str] = None, rescan: bool = False) -> None:
+        """
+        Запуск фонового анализа занятого места для текущего корня.
+
+        Args:
+            root_path: Анализируемый каталог; по умолчанию корень дерева
+            rescan: Перечитать все каталоги, не используя кэш (кнопка «Обновить»)
+        """
+        root_path = root_path or self.search_root()
+        if self.usage_job:
+            self.usage_job.stop()
+
+        if self.usage_window is None:
+            self.usage_window = DiskUsageWindow(self)
+            self.usage_window.directory_activated.connect(self.change_root)
+            self.usage_window.refresh_requested.connect(
+                lambda path: self.analyze_disk_usage(path, rescan=True))
+        self.usage_window.show()
+        self.update_status(f'Анализ занятого места: {root_path}...')
+        logger.info(f'Starting disk usage analysis: {root_path}')
+
+        self.usage_job = DiskUsageJob(self.disk_usage, root_path, rescan)
+        self.usage_job.progress.connect(self.usage_window.show_progress)
+        self.usage_job.usage_ready.connect(self.on_disk_usage_ready)
+        self.usage_job.start(self.scheduler)
+
+    def on_disk_usage_ready(self, usage) -> None:
+        """
+        Обработчик завершения анализа занятого места.
+
+        Args:
+            usage: Результат анализа или None, если анализ остановлен
+        """
+        if usage is None or (self.sender() is not None and self.sender() is not self.usage_job):
+            return
+        self.usage_window.set_usage(usage)
+        self.update_status('Анализ занятого места завершен')
+        logger.info('Disk usage analysis completed')
+
+    def find_duplicates(self) -> None:
+        """Запуск поиска одинаковых файлов в текущем корне."""
+        root_path = self.search_root()
+        if self.duplicates_job:
+            self.duplicates_job.stop()
+
+        if self.duplicates_window is None:
+            self.duplicates_window = DuplicatesWindow(self)
+            self.duplicates_window.file_activated.connect(self.show_search_result)
+        self.duplicates_window.start(root_path)
+        self.duplicates_window.show()
+        self.update_status(f'Поиск дубликатов: {root_path}...')
+
+        self.duplicates_job = DuplicateSearchJob(root_path, self.hash_cache)
+        self.duplicates_job.found_files.connect(self.on_duplicates_found)
+        self.duplicates_job.search_finished.connect(self.on_duplicates_finished)
+        self.duplicates_job.start(self.scheduler)
+
+    def on_duplicates_found(self, groups: list) -> None:
+        """
+        Обработчик пачки найденных групп дубликатов.
+
+        Args:
+            groups: Группы (размер, пути)
+        """
+        if self.sender() is not None and self.sender() is not self.duplicates_job:
+            return
+        self.duplicates_window.add_groups(groups)
+
+    def on_duplicates_finished(self) -> None:
+        """Обработчик завершения поиска дубликатов."""
+        if self.sender() is not None and self.sender() is not self.duplicates_job:
+            return
+        summary = self.duplicates_window.summary_text()
+        self.duplicates_window.summary.setText(f'Поиск завершен. {summary}')
+        self.update_status(f'Поиск дубликатов завершен. {summary}')
+        logger.info('Duplicate search completed')
+
+    def save_snapshot(self) -> None:
+        """
+        Сохранение снимка дерева текущего корня. Каталоги, не изменившиеся
+        со времени последнего снимка, не перечитываются.
+        """
+        root_path = self.search_root()
+        snapshots = list_snapshots(root_path, self.snapshot_dir)
+        path = snapshot_path(root_path, time.time(), self.snapshot_dir)
+        self.update_status(f'Снимок дерева: {root_path}...')
+        self.start_snapshot(SnapshotJob(root_path, path,
+                                        snapshots[-1].path if snapshots else None,
+                                        verify_files=self.action_verify_snapshot.isChecked()))
+
+    def compare_snapshot(self, snapshot: Optional[SnapshotInfo] = None) -> None:
+        """
+        Сравнение текущего состояния корня с сохранённым снимком.
+
+        Args:
+            snapshot: Снимок; по умолчанию выбирается из снимков корня
+        """
+        root_path = self.search_root()
+        if snapshot is None:
+            snapshots = list_snapshots(root_path, self.snapshot_dir)[::-1]
+            if not snapshots:
+                self.update_status('Для этого каталога нет сохранённых снимков')
+                return
+            titles = [format_snapshot_time(info.created) for info in snapshots]
+            title, ok = QInputDialog.getItem(self, 'Что изменилось', 'Снимок:', titles, 0, False)
+            if not ok:
+                return
+            snapshot = snapshots[titles.index(title)]
+
+        if self.snapshot_window is None:
+            self.snapshot_window = SnapshotDiffWindow(self)
+            self.snapshot_window.path_activated.connect(self.show_search_result)
+        self.snapshot_window.start(root_path, format_snapshot_time(snapshot.created))
+        self.snapshot_window.show()
+        self.update_status(f'Сравнение со снимком: {root_path}...')
+
+        handle, path = tempfile.mkstemp(suffix=SNAPSHOT_SUFFIX)
+        os.close(handle)
+        job = SnapshotJob(root_path, path, snapshot.path, compare=True,
+                          verify_files=self.action_verify_snapshot.isChecked())
+        job.found_files.connect(self.on_snapshot_changes)
+        self.start_snapshot(job)
+
+    def start_snapshot(self, job: SnapshotJob) -> None:
+        """
+        Запуск задачи снимка вместо выполняемой.
+
+        Args:
+            job: Задача снимка или сравнения
+        """
+        if self.snapshot_job:
+            self.snapshot_job.stop()
+        self.snapshot_job = job
+        job.snapshot_finished.connect(self.on_snapshot_finished)
+        job.start(self.scheduler)
+
+    def on_snapshot_changes(self, changes: list) -> None:
+        """
+        Обработчик пачки изменений со времени снимка.
+
+        Args:
+            changes: Изменения (snapshot.Change)
+        """
+        if self.sender() is not None and self.sender() is not self.snapshot_job:
+            return
+        self.snapshot_window.add_changes(changes)
+
+    def on_snapshot_finished(self, stats: ScanStats) -> None:
+        """
+        Обработчик завершения снимка или сравнения.
+
+        Args:
+            stats: Итоги обхода дерева
+        """
+        if self.sender() is not None and self.sender() is not self.snapshot_job:
+            return
+        if not stats.completed:
+            self.update_status('Снимок дерева остановлен или не удался')
+        elif self.snapshot_job.compare:
+            summary = self.snapshot_window.summary_text()
+            self.snapshot_window.summary.setText(f'Сравнение завершено. {summary}')
+            self.update_status(f'Сравнение завершено. {summary}')
+        else:
+            self.update_status(f'Снимок сохранён: {stats.entries} элементов, '
+                               f'без перечитывания {stats.reused_dirs} из {stats.dirs} каталогов')
+
+    def selected_paths(self) -> List[str]:
+        """Возвращает пути выделенных в дереве элементов."""
+        selection = self.ui.file_tree.selectionModel()
+        rows = selection.selectedRows(0) if selection is not None else []
+        return [path for path in (self.model.filePath(index) for index in rows) if path]
+
+    def current_directory(self) -> str:
+        """Возвращает каталог, отображаемый в дереве."""
+        return self.model.filePath(self.ui.file_tree.rootIndex()) or self.model.rootPath()
+
+    def check_writable(self) -> bool:
+        """Проверяет, что файловые операции возможны: содержимое архива только просматривается."""
+        if self.model is self.archive_model:
+            self.update_status('Архив открыт только для просмотра')
+            return False
+        return True
+
+    def copy_selection(self, kind: str) -> None:
+        """
+        Помещает выделенные элементы в буфер для последующей вставки.
+
+        Args:
+            kind: COPY — копировать, MOVE — переместить (вырезать)
+        """
+        if not self.check_writable():
+            return
+        paths = self.selected_paths()
+        if not paths:
+            self.update_status('Ничего не выделено')
+            return
+        self.file_clipboard = (kind, paths)
+        verb = 'копирования' if kind == COPY else 'перемещения'
+        self.update_status(f'Для {verb} выбрано элементов: {len(paths)}')
+
+    def paste_files(self) -> None:
+        """
+        Вставляет элементы из буфера в выделенный каталог или,
+        если каталог не выделен, в текущий.
+        """
+        if not self.check_writable():
+            return
+        if self.file_clipboard is None:
+            self.update_status('Буфер пуст')
+            return
+        kind, paths = self.file_clipboard
+        selected = self.selected_paths()
+        if len(selected) == 1 and os.path.isdir(selected[0]) and selected[0] not in paths:
+            destination = selected[0]
+        else:
+            destination = self.current_directory()
+        if kind == MOVE:
+            # Перемещённые элементы нельзя вставить повторно
+            self.file_clipboard = None
+        self.enqueue_file_operation(FileOperation(kind, paths, destination, self.conflict_policy))
+
+    def delete_selection(self) -> None:
+        """Удаляет выделенные элементы после подтверждения."""
+        if not self.check_writable():
+            return
+        paths = self.selected_paths()
+        if not paths:
+            self.update_status('Ничего не выделено')
+            return
+        what = os.path.basename(paths[0]) if len(paths) == 1 else f'элементов: {len(paths)}'
+        answer = QtWidgets.QMessageBox.question(
+            self, 'Удаление', f'Удалить без возможности восстановления {what}?')
+        if answer != QtWidgets.QMessageBox.Yes:
+            return
+        self.enqueue_file_operation(FileOperation(DELETE, paths))
+
+    def set_conflict_policy(self, policy: str) -> None:
+        """
+        Выбор действия при совпадении имён в каталоге назначения.
+
+        Args:
+            policy: Одна из политик file_ops.CONFLICT_POLICIES
+        """
+        self.conflict_policy = policy
+        for action in self.conflict_actions.actions():
+            action.setChecked(action.data() == policy)
+
+    def show_file_operations(self) -> None:
+        """Показ окна файловых операций."""
+        if self.file_ops_window is None:
+            self.file_ops_window = FileOperationsWindow(self)
+            self.file_ops_window.cancel_requested.connect(self.cancel_file_operation)
+            self.file_ops_window.cancel_all_requested.connect(self.cancel_all_file_operations)
+        self.file_ops_window.show()
+
+    def enqueue_file_operation(self, operation: FileOperation) -> None:
+        """
+        Ставит операцию в очередь; операции выполняются по одной в фоне.
+
+        Args:
+            operation: Файловая операция
+        """
+        self.file_ops_queue.append(operation)
+        logger.info(f'File operation queued: {operation.describe()}')
+        self.show_file_operations()
+        # Задача сбрасывается только после обработки завершения последней операции
+        if self.file_ops_job is None:
+            self.start_next_file_operation()
+        else:
+            self.file_ops_window.set_queue([op.describe() for op in self.file_ops_queue])
+
+    def start_next_file_operation(self) -> None:
+        """Запускает следующую операцию из очереди."""
+        if not self.file_ops_queue:
+            self.file_ops_job = None
+            self.file_ops_window.set_idle()
+            return
+        operation = self.file_ops_queue.popleft()
+        self.file_ops_window.set_queue([op.describe() for op in self.file_ops_queue])
+        self.file_ops_window.start_operation(operation.describe())
+        self.update_status(f'{operation.describe()}...')
+
+        self.file_ops_job = FileOperationJob(operation)
+        self.file_ops_job.progress.connect(self.on_file_operation_progress)
+        self.file_ops_job.operation_finished.connect(self.on_file_operation_finished)
+        self.file_ops_job.start(self.scheduler)
+
+    def on_file_operation_progress(self, progress: Progress) -> None:
+        """
+        Обработчик хода файловой операции.
+
+        Args:
+            progress: Прогресс операции
+        """
+        if self.sender() is not None and self.sender() is not self.file_ops_job:
+            return
+        self.file_ops_window.show_progress(progress)
+
+    def on_file_operation_finished(self, progress: Progress) -> None:
+        """
+        Обработчик завершения файловой операции: обновляет изменившиеся
+        каталоги и запускает следующую операцию.
+
+        Args:
+            progress: Итоговый прогресс операции
+        """
+        job = self.sender() if self.sender() is not None else self.file_ops_job
+        if job is not self.file_ops_job:
+            return
+        operation = job.operation
+        directories = operation.affected_directories()
+        self.listing_cache.invalidate(directories)
+        if self.metadata is not None:
+            self.metadata.invalidate(directories)
+        if self.thumbnails is not None:
+            self.thumbnails.invalidate(directories)
+        # Ленивая модель не следит за каталогом, поэтому текущий каталог перечитывается
+        if self.model is self.lazy_model and os.path.normpath(self.model.rootPath()) in directories:
+            self.model.setRootPath(self.model.rootPath())
+
+        state = 'отменено' if progress.cancelled else 'завершено'
+        text = f'{operation.describe()}: {state}. Обработано файлов: {progress.done_files}'
+        if progress.skipped:
+            text += f', пропущено: {progress.skipped}'
+        if progress.errors:
+            path, message = progress.errors[0]
+            text += f', ошибок: {len(progress.errors)} (первая: {path}: {message})'
+        self.file_ops_window.show_result(text)
+        self.update_status(text)
+        logger.info(f'File operation {"cancelled" if progress.cancelled else "completed"}: '
+                    f'{operation.describe()}, files={progress.done_files}, '
+                    f'bytes={progress.done_bytes}, errors={len(progress.errors)}, '
+                    f'throughput={progress.average_throughput() / 1e6:.1f} MB/s')
+        self.start_next_file_operation()
+
+    def cancel_file_operation(self) -> None:
+        """Отмена выполняемой файловой операции."""
+        if self.file_ops_job and self.file_ops_job.isRunning():
+            self.file_ops_job.stop()
+
+    def cancel_all_file_operations(self) -> None:
+        """Отмена выполняемой и всех ожидающих файловых операций."""
+        self.file_ops_queue.clear()
+        self.file_ops_window.set_queue([])
+        self.cancel_file_operation()
+
+    def show_jobs(self) -> None:
+        """Показ окна фоновых задач планировщика."""
+        if self.jobs_window is None:
+            self.jobs_window = JobsWindow(self.scheduler, self)
+        self.jobs_window.show()
+
+    def show_perf_panel(self) -> None:
+        """Показ панели производительности."""
+        if self.perf_panel is None:
+            self.perf_panel = PerfPanel(profiler, self)
+            self.perf_panel.enabled_changed.connect(self.set_profiling)
+        self.perf_panel.show()
+
+    def set_profiling(self, enabled: bool) -> None:
+        """
+        Включение и выключение сбора статистики производительности.
+
+        Args:
+            enabled: True — собирать статистику
+        """
+        profiler.enable(enabled)
+        if enabled:
+            self.stall_monitor.start()
+        else:
+            self.stall_monitor.stop()
+            self._load_started.clear()
+        self.update_status('Сбор статистики включён' if enabled else 'Сбор статистики выключен')
+
     def closeEvent(self, event: QtGui.QCloseEvent) -> None:
         """
         Обработчик события закрытия приложения.
@@ -300,17 +1866,48 @@ class FileExplorer(QtWidgets.QMainWindow):
         Args:
             event: Событие закрытия
         """
-        if self.search_thread and self.search_thread.isRunning():
-            self.search_thread.stop()
-            self.search_thread.wait()
+        # Все фоновые задачи отменяются; выполняемым даётся ограниченное время
+        # на остановку, чтобы копируемый файл не остался недописанным, а индекс
+        # был сохранён. Зависшее чтение каталога закрытие не задерживает
+        self.file_ops_queue.clear()
+        self.scheduler.shutdown(CLOSE_TIMEOUT)
+        self.index_watcher.stop()
+        if self.search_root():
+            self.app_state.set('last_dir', self.search_root())
+        self.app_state.set('lazy_model', self.model is self.lazy_model)
+        self.app_state.set('metadata_columns', self.metadata_columns)
+        self.app_state.set('conflict_policy', self.conflict_policy)
+        self.app_state.save()
+        self.report_startup()
+        if self.lazy_model is not None:
+            self.lazy_model.close()
+        if self.archive_model is not None:
+            self.archive_model.close()
+        if self.metadata is not None:
+            self.metadata.close()
+        if self.thumbnails is not None:
+            self.thumbnails.close()
+        self.listing_cache.close()
         logger.info('Application closed')
         event.accept()
 
 
-if __name__ == '__main__':
-    import sys
+def main() -> int:
+    """
+    Запускает приложение.
+
+    Журналирование настраивается здесь, а не при импорте: процессы пула
+    (метод spawn) импортируют этот модуль заново и не должны открывать
+    файл журнала.
 
+    Returns:
+        Код завершения приложения
+    """
+    # Записи передаются через очередь фоновому потоку,
+    # поэтому вызовы logger не блокируют GUI и потоки поиска
+    setup_logging('explorer.log')
     app = QtWidgets.QApplication(sys.argv)
+    startup.mark('QApplication')
 
     # Устанавливаем стиль для macOS
     if platform.system() == 'Darwin':
@@ -318,4 +1915,11 @@ if __name__ == '__main__':
 
     window = FileExplorer()
     window.show()
-    sys.exit(app.exec_())
+    startup.mark('window shown')
+    code = app.exec_()
+    process_pool.shutdown()
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
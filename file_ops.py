@@ -0,0 +1,617 @@
+"""
+Копирование, перемещение и удаление файлов и каталогов.
+
+Данные копируются без участия Python там, где это возможно:
+os.copy_file_range (копирование в ядре, на CoW-файловых системах —
+reflink), затем os.sendfile, и только затем обычное чтение и запись.
+Мелкие файлы копируются параллельно в пуле потоков, крупные — по
+очереди порциями с проверкой отмены. Файл сначала записывается во
+временный файл рядом с целевым и переименовывается после успешного
+копирования, поэтому отмена не оставляет недописанных файлов.
+Перемещение в пределах одного устройства выполняется переименованием.
+"""
+import errno
+import logging
+import os
+import shutil
+import stat
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger('FileExplorer.file_ops')
+
+# Виды операций
+COPY, MOVE, DELETE = 'copy', 'move', 'delete'
+# Политики при совпадении имени в каталоге назначения: пропустить, заменить,
+# сохранить под новым именем, заменить только более старые файлы
+SKIP, OVERWRITE, RENAME, UPDATE = 'skip', 'overwrite', 'rename', 'update'
+CONFLICT_POLICIES = (SKIP, OVERWRITE, RENAME, UPDATE)
+
+# Файлы меньше этого размера копируются параллельно в пуле потоков
+SMALL_FILE = 4 * 1024 * 1024
+# Сколько байт передаётся за один системный вызов
+CHUNK_SIZE = 8 * 1024 * 1024
+# Количество потоков пула по умолчанию
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+# Обработчик прогресса вызывается не чаще раза в PROGRESS_INTERVAL секунд
+PROGRESS_INTERVAL = 0.1
+# Окно в секундах для расчёта текущей скорости
+THROUGHPUT_WINDOW = 2.0
+# Суффикс временного файла, который переименовывается в целевой после копирования
+PARTIAL_SUFFIX = '.explorer-partial'
+
+# Ошибки, при которых способ копирования не поддерживается и нужно перейти к следующему
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                errno.ENOTSUP, errno.ENOTSOCK, errno.EBADF}
+
+# Действие плана копирования: (вид, источник, назначение, размер)
+Action = Tuple[str, str, str, int]
+_MKDIR, _FILE, _LINK = 'mkdir', 'file', 'link'
+
+
+class OperationCancelled(Exception):
+    """Операция остановлена по запросу."""
+
+
+class Progress:
+    """Ход выполнения операции; счётчики обновляются из нескольких потоков."""
+
+    def __init__(self, kind: str) -> None:
+        """
+        Инициализация пустого прогресса.
+
+        Args:
+            kind: Вид операции
+        """
+        self.kind = kind
+        # 'planning' — подсчёт объёма, 'running' — выполнение, 'done' — завершено
+        self.phase = 'planning'
+        self.total_files = 0
+        self.total_bytes = 0
+        self.done_files = 0
+        self.done_bytes = 0
+        # Байты, переданные copy_file_range или sendfile
+        self.zero_copy_bytes = 0
+        self.renamed = 0
+        self.skipped = 0
+        self.errors: List[Tuple[str, str]] = []
+        self.current = ''
+        self.cancelled = False
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self._lock = threading.Lock()
+        self._samples: Deque[Tuple[float, int]] = deque()
+
+    def add_bytes(self, count: int, zero_copy: bool = False) -> None:
+        """Учитывает переданные байты."""
+        with self._lock:
+            self.done_bytes += count
+            if zero_copy:
+                self.zero_copy_bytes += count
+
+    def file_done(self, path: str) -> None:
+        """Учитывает обработанный файл."""
+        with self._lock:
+            self.done_files += 1
+            self.current = path
+
+    def error(self, path: str, message: str) -> None:
+        """Запоминает ошибку обработки пути."""
+        logger.warning(f'File operation error: {path}: {message}')
+        with self._lock:
+            self.errors.append((path, message))
+
+    def throughput(self) -> float:
+        """Текущая скорость в байтах в секунду за последние THROUGHPUT_WINDOW секунд."""
+        now = time.monotonic()
+        with self._lock:
+            self._samples.append((now, self.done_bytes))
+            while len(self._samples) > 2 and now - self._samples[0][0] > THROUGHPUT_WINDOW:
+                self._samples.popleft()
+            first_time, first_bytes = self._samples[0]
+        if now - first_time <= 0:
+            return 0.0
+        return (self.done_bytes - first_bytes) / (now - first_time)
+
+    def average_throughput(self) -> float:
+        """Средняя скорость операции в байтах в секунду."""
+        elapsed = (self.finished or time.monotonic()) - self.started
+        return self.done_bytes / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        """Оценка оставшегося времени в секундах или None, если её нет."""
+        speed = self.throughput()
+        if self.phase != 'running' or speed <= 0:
+            return None
+        return max(0, self.total_bytes - self.done_bytes) / speed
+
+
+def _check(should_stop: Callable[[], bool]) -> None:
+    """Прерывает операцию, если запрошена остановка."""
+    if should_stop():
+        raise OperationCancelled()
+
+
+def _copy_range(src_fd: int, dst_fd: int, offset: int, progress: Progress,
+                should_stop: Callable[[], bool]) -> int:
+    """Копирует данные внутри ядра через copy_file_range, начиная со смещения."""
+    while True:
+        _check(should_stop)
+        count = os.copy_file_range(src_fd, dst_fd, CHUNK_SIZE, offset, offset)
+        if count == 0:
+            return offset
+        offset += count
+        progress.add_bytes(count, zero_copy=True)
+
+
+def _sendfile(src_fd: int, dst_fd: int, offset: int, progress: Progress,
+              should_stop: Callable[[], bool]) -> int:
+    """Копирует данные через sendfile, начиная со смещения."""
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    while True:
+        _check(should_stop)
+        count = os.sendfile(dst_fd, src_fd, offset, CHUNK_SIZE)
+        if count == 0:
+            return offset
+        offset += count
+        progress.add_bytes(count, zero_copy=True)
+
+
+def _read_write(src_fd: int, dst_fd: int, offset: int, progress: Progress,
+                should_stop: Callable[[], bool]) -> int:
+    """Копирует данные обычным чтением и записью, начиная со смещения."""
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    while True:
+        _check(should_stop)
+        data = os.read(src_fd, CHUNK_SIZE)
+        if not data:
+            return offset
+        view = memoryview(data)
+        while view:
+            written = os.write(dst_fd, view)
+            view = view[written:]
+        offset += len(data)
+        progress.add_bytes(len(data))
+
+
+def _transfer(src_fd: int, dst_fd: int, progress: Progress,
+              should_stop: Callable[[], bool]) -> None:
+    """
+    Копирует содержимое файла, переходя к следующему способу, если
+    текущий не поддерживается; уже скопированная часть не повторяется.
+    """
+    methods = [_sendfile, _read_write]
+    if hasattr(os, 'copy_file_range'):
+        methods.insert(0, _copy_range)
+    offset = 0
+    for method in methods:
+        try:
+            method(src_fd, dst_fd, offset, progress, should_stop)
+            return
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED or method is _read_write:
+                raise
+            # Продолжаем с конца уже записанной части
+            offset = os.fstat(dst_fd).st_size
+            logger.debug(f'{method.__name__} unsupported ({e}), falling back at offset {offset}')
+
+
+def copy_file(src: str, dst: str, progress: Progress,
+              should_stop: Callable[[], bool] = lambda: False) -> None:
+    """
+    Копирует файл с правами доступа и временем изменения.
+
+    Данные записываются во временный файл, который после копирования
+    атомарно заменяет целевой.
+
+    Args:
+        src: Исходный файл
+        dst: Целевой путь
+        progress: Прогресс операции
+        should_stop: Функция, возвращающая True при запросе остановки
+
+    Raises:
+        OperationCancelled: Если запрошена остановка
+        OSError: При ошибке чтения или записи
+    """
+    partial = os.path.join(os.path.dirname(dst), f'.{os.path.basename(dst)}{PARTIAL_SUFFIX}')
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        dst_fd = os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            _transfer(src_fd, dst_fd, progress, should_stop)
+        finally:
+            os.close(dst_fd)
+        shutil.copystat(src, partial)
+        os.replace(partial, dst)
+    except BaseException:
+        try:
+            os.unlink(partial)
+        except OSError:
+            pass
+        raise
+    finally:
+        os.close(src_fd)
+
+
+def free_name(path: str) -> str:
+    """Возвращает свободное имя вида «имя (2).txt» рядом с path."""
+    directory, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    if name.startswith('.') and stem == name:
+        ext = ''
+    number = 2
+    while True:
+        candidate = os.path.join(directory, f'{stem} ({number}){ext}')
+        if not os.path.lexists(candidate):
+            return candidate
+        number += 1
+
+
+def _is_inside(path: str, directory: str) -> bool:
+    """Проверяет, совпадает ли path с directory или находится внутри него."""
+    path, directory = os.path.realpath(path), os.path.realpath(directory)
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+class FileOperation:
+    """Операция над набором путей: копирование, перемещение или удаление."""
+
+    def __init__(self, kind: str, sources: Sequence[str], destination: Optional[str] = None,
+                 policy: str = RENAME, workers: int = DEFAULT_WORKERS) -> None:
+        """
+        Инициализация операции.
+
+        Args:
+            kind: COPY, MOVE или DELETE
+            sources: Исходные файлы и каталоги
+            destination: Каталог назначения (для копирования и перемещения)
+            policy: Политика при совпадении имён (CONFLICT_POLICIES)
+            workers: Количество потоков для параллельного копирования мелких файлов
+
+        Raises:
+            ValueError: При неизвестном виде операции или политике
+        """
+        if kind not in (COPY, MOVE, DELETE):
+            raise ValueError(f'Unknown operation: {kind}')
+        if policy not in CONFLICT_POLICIES:
+            raise ValueError(f'Unknown conflict policy: {policy}')
+        if kind != DELETE and not destination:
+            raise ValueError('Destination is required')
+        self.kind = kind
+        self.sources = [os.path.normpath(path) for path in sources]
+        self.destination = os.path.normpath(destination) if destination else None
+        self.policy = policy
+        self.workers = max(1, workers)
+        self.progress = Progress(kind)
+
+    def describe(self) -> str:
+        """Краткое описание операции для интерфейса."""
+        what = (os.path.basename(self.sources[0]) if len(self.sources) == 1
+                else f'{len(self.sources)} элем.')
+        if self.kind == DELETE:
+            return f'Удаление: {what}'
+        verb = 'Копирование' if self.kind == COPY else 'Перемещение'
+        return f'{verb}: {what} → {self.destination}'
+
+    def affected_directories(self) -> Set[str]:
+        """Каталоги, содержимое которых меняет операция."""
+        if self.kind == COPY:
+            return {self.destination}
+        directories = {os.path.dirname(path) for path in self.sources}
+        if self.destination:
+            directories.add(self.destination)
+        return directories
+
+    def run(self, should_stop: Callable[[], bool] = lambda: False,
+            on_progress: Optional[Callable[[Progress], None]] = None) -> Progress:
+        """
+        Выполняет операцию. Ошибки отдельных путей не прерывают операцию,
+        а накапливаются в progress.errors.
+
+        Args:
+            should_stop: Функция, возвращающая True при запросе остановки
+            on_progress: Вызывается с прогрессом не чаще раза в PROGRESS_INTERVAL секунд
+
+        Returns:
+            Итоговый прогресс; progress.cancelled — True, если операция остановлена
+        """
+        self._should_stop = should_stop
+        self._on_progress = on_progress
+        self._last_report = 0.0
+        try:
+            if self.kind == DELETE:
+                self._delete(self.sources)
+            elif self.kind == COPY:
+                self._copy(self.sources)
+            else:
+                self._move()
+        except OperationCancelled:
+            self.progress.cancelled = True
+            logger.info(f'File operation cancelled: {self.describe()}')
+        finally:
+            self.progress.phase = 'done'
+            self.progress.finished = time.monotonic()
+            self._report(force=True)
+        return self.progress
+
+    def _report(self, force: bool = False) -> None:
+        """Передаёт прогресс обработчику с ограничением частоты."""
+        now = time.monotonic()
+        if self._on_progress is not None and (force or now - self._last_report >= PROGRESS_INTERVAL):
+            self._last_report = now
+            self._on_progress(self.progress)
+
+    # --- Копирование ---
+
+    def _target(self, src: str, dst: str, src_st: os.stat_result) -> Optional[str]:
+        """
+        Применяет политику совпадения имён.
+
+        Returns:
+            Путь назначения или None, если элемент пропускается
+        """
+        if os.path.normpath(src) == os.path.normpath(dst):
+            # Копия в тот же каталог возможна только под новым именем
+            return free_name(dst) if self.policy == RENAME else None
+        try:
+            dst_st = os.lstat(dst)
+        except FileNotFoundError:
+            return dst
+        if stat.S_ISDIR(src_st.st_mode) and stat.S_ISDIR(dst_st.st_mode) and self.policy != RENAME:
+            # Каталоги объединяются; политика применяется к их содержимому
+            return dst
+        if self.policy == SKIP or (self.policy == UPDATE and dst_st.st_mtime >= src_st.st_mtime):
+            return None
+        if self.policy == RENAME:
+            return free_name(dst)
+        if stat.S_ISDIR(src_st.st_mode) != stat.S_ISDIR(dst_st.st_mode):
+            raise IsADirectoryError(errno.EISDIR, 'Cannot replace a file with a directory '
+                                    'or a directory with a file', dst)
+        return dst
+
+    def _plan(self, src: str, dst: str, actions: List[Action]) -> None:
+        """Добавляет в план копирование src в dst (дерево обходится в прямом порядке)."""
+        _check(self._should_stop)
+        try:
+            st = os.lstat(src)
+            target = self._target(src, dst, st)
+        except OSError as e:
+            self.progress.error(src, e.strerror or str(e))
+            return
+        if target is None:
+            self.progress.skipped += 1
+            return
+        progress = self.progress
+        if stat.S_ISLNK(st.st_mode):
+            actions.append((_LINK, src, target, 0))
+            progress.total_files += 1
+        elif stat.S_ISDIR(st.st_mode):
+            actions.append((_MKDIR, src, target, 0))
+            try:
+                with os.scandir(src) as it:
+                    names = sorted(entry.name for entry in it)
+            except OSError as e:
+                progress.error(src, e.strerror or str(e))
+                return
+            for name in names:
+                self._plan(os.path.join(src, name), os.path.join(target, name), actions)
+        else:
+            actions.append((_FILE, src, target, st.st_size))
+            progress.total_files += 1
+            progress.total_bytes += st.st_size
+        self._report()
+
+    def _copy(self, sources: Sequence[str]) -> List[Action]:
+        """
+        Копирует источники в каталог назначения.
+
+        Returns:
+            Выполненные действия плана в порядке обхода; пропущенные
+            элементы и действия с ошибками в него не входят
+        """
+        actions: List[Action] = []
+        for src in sources:
+            if os.path.isdir(src) and not os.path.islink(src) and _is_inside(self.destination, src):
+                self.progress.error(src, 'Нельзя скопировать каталог в самого себя')
+                continue
+            self._plan(src, os.path.join(self.destination, os.path.basename(src)), actions)
+        self.progress.phase = 'running'
+        self._report(force=True)
+
+        failed: Set[str] = set()
+        directories: List[Tuple[str, str]] = []
+        # Задачи пула: будущий результат -> источник
+        pending: Dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=self.workers,
+                                thread_name_prefix='file-ops') as executor:
+            try:
+                for kind, src, dst, size in actions:
+                    _check(self._should_stop)
+                    if kind == _FILE and size < SMALL_FILE:
+                        # Ограничиваем число ожидающих задач, чтобы не держать весь план в пуле
+                        while len(pending) >= self.workers * 4:
+                            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                            self._collect(done, pending, failed)
+                        pending[executor.submit(self._copy_one, kind, src, dst)] = src
+                    else:
+                        if kind == _MKDIR:
+                            directories.append((src, dst))
+                        if not self._copy_one(kind, src, dst):
+                            failed.add(src)
+                    self._report()
+                done, _ = wait(pending)
+                self._collect(done, pending, failed)
+            except OperationCancelled:
+                for future in pending:
+                    future.cancel()
+                wait(pending)
+                raise
+        # Время изменения каталогов восстанавливается после копирования их содержимого
+        for src, dst in reversed(directories):
+            try:
+                shutil.copystat(src, dst)
+            except OSError:
+                pass
+        return [action for action in actions if action[1] not in failed]
+
+    def _collect(self, done: Set[Future], pending: Dict[Future, str], failed: Set[str]) -> None:
+        """Учитывает завершённые задачи пула; отмена передаётся дальше."""
+        for future in done:
+            src = pending.pop(future)
+            if not future.result():
+                failed.add(src)
+            self._report()
+
+    def _copy_one(self, kind: str, src: str, dst: str) -> bool:
+        """
+        Выполняет одно действие плана.
+
+        Returns:
+            True при успехе, False при ошибке (ошибка записывается в прогресс)
+        """
+        try:
+            if kind == _MKDIR:
+                os.makedirs(dst, exist_ok=True)
+                return True
+            if os.path.lexists(dst) and (kind == _LINK or os.path.islink(dst)):
+                os.unlink(dst)
+            if kind == _LINK:
+                os.symlink(os.readlink(src), dst)
+            else:
+                copy_file(src, dst, self.progress, self._should_stop)
+            self.progress.file_done(src)
+        except OSError as e:
+            self.progress.error(src, e.strerror or str(e))
+            return False
+        return True
+
+    # --- Перемещение ---
+
+    def _move(self) -> None:
+        """
+        Перемещает источники: в пределах устройства — переименованием,
+        между устройствами — копированием с последующим удалением
+        скопированных файлов и опустевших каталогов.
+        """
+        try:
+            dest_dev = os.stat(self.destination).st_dev
+        except OSError as e:
+            self.progress.error(self.destination, e.strerror or str(e))
+            return
+        copy_sources = []
+        for src in self.sources:
+            _check(self._should_stop)
+            try:
+                st = os.lstat(src)
+            except OSError as e:
+                self.progress.error(src, e.strerror or str(e))
+                continue
+            if os.path.isdir(src) and not os.path.islink(src) and _is_inside(self.destination, src):
+                self.progress.error(src, 'Нельзя переместить каталог в самого себя')
+            elif st.st_dev == dest_dev:
+                self._rename(src, os.path.join(self.destination, os.path.basename(src)), st)
+            else:
+                copy_sources.append(src)
+        if copy_sources:
+            self._remove_copied(self._copy(copy_sources))
+
+    def _remove_copied(self, done: List[Action]) -> None:
+        """
+        Удаляет источники, скопированные при перемещении между устройствами.
+
+        Удаляются только скопированные файлы и ссылки, а каталоги — только
+        если они опустели: пропущенные по политике совпадения имён и не
+        скопированные из-за ошибок элементы остаются на месте вместе с
+        содержащими их каталогами.
+        """
+        directories: List[str] = []
+        for kind, src, _, _ in done:
+            if kind == _MKDIR:
+                directories.append(src)
+                continue
+            _check(self._should_stop)
+            try:
+                os.unlink(src)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.progress.error(src, e.strerror or str(e))
+            self._report()
+        # Каталоги собраны в прямом порядке обхода: вложенные проверяются первыми
+        for path in reversed(directories):
+            try:
+                if not os.listdir(path):
+                    os.rmdir(path)
+            except OSError as e:
+                self.progress.error(path, e.strerror or str(e))
+
+    def _rename(self, src: str, dst: str, st: os.stat_result) -> None:
+        """Перемещает элемент переименованием; совпадающие каталоги объединяются."""
+        _check(self._should_stop)
+        try:
+            target = self._target(src, dst, st)
+            if target is None:
+                self.progress.skipped += 1
+                return
+            if stat.S_ISDIR(st.st_mode) and os.path.isdir(target) and not os.path.islink(target):
+                for name in sorted(os.listdir(src)):
+                    child = os.path.join(src, name)
+                    self._rename(child, os.path.join(target, name), os.lstat(child))
+                if not os.listdir(src):
+                    os.rmdir(src)
+                return
+            os.replace(src, target)
+            self.progress.renamed += 1
+            self.progress.file_done(src)
+        except OSError as e:
+            self.progress.error(src, e.strerror or str(e))
+        self._report()
+
+    # --- Удаление ---
+
+    def _delete(self, sources: Sequence[str]) -> None:
+        """Удаляет файлы и каталоги (рекурсивно, не следуя по символическим ссылкам)."""
+        files: List[str] = []
+        directories: List[str] = []
+        for src in sources:
+            self._plan_delete(src, files, directories)
+        self.progress.phase = 'running'
+        self._report(force=True)
+        for path in files:
+            _check(self._should_stop)
+            try:
+                os.unlink(path)
+                self.progress.file_done(path)
+            except FileNotFoundError:
+                self.progress.file_done(path)
+            except OSError as e:
+                self.progress.error(path, e.strerror or str(e))
+            self._report()
+        # Каталоги собраны в прямом порядке обхода: удаляем вложенные первыми
+        for path in reversed(directories):
+            try:
+                os.rmdir(path)
+            except OSError as e:
+                self.progress.error(path, e.strerror or str(e))
+
+    def _plan_delete(self, path: str, files: List[str], directories: List[str]) -> None:
+        """Собирает файлы и каталоги дерева для удаления."""
+        _check(self._should_stop)
+        if os.path.isdir(path) and not os.path.islink(path):
+            directories.append(path)
+            try:
+                with os.scandir(path) as it:
+                    children = [entry.path for entry in it]
+            except OSError as e:
+                self.progress.error(path, e.strerror or str(e))
+                return
+            for child in children:
+                self._plan_delete(child, files, directories)
+        else:
+            files.append(path)
+            self.progress.total_files += 1
@@ -0,0 +1,128 @@
+from typing import List
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import Qt, pyqtSignal
+
+from disk_usage import format_size
+from file_ops import Progress
+
+# Шкала индикатора прогресса (QProgressBar принимает только int)
+PROGRESS_SCALE = 1000
+
+
+def format_duration(seconds: float) -> str:
+    """Форматирует оставшееся время как «1:05» или «1:02:03»."""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f'{hours}:{minutes:02d}:{seconds:02d}'
+    return f'{minutes}:{seconds:02d}'
+
+
+class FileOperationsWindow(QtWidgets.QWidget):
+    """Окно с ходом текущей файловой операции и очередью ожидающих."""
+
+    cancel_requested = pyqtSignal()
+    cancel_all_requested = pyqtSignal()
+
+    def __init__(self, parent=None) -> None:
+        """Инициализация окна файловых операций."""
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle('Файловые операции')
+        self.resize(500, 300)
+
+        self.current = QtWidgets.QLabel(self)
+        self.progress_bar = QtWidgets.QProgressBar(self)
+        self.progress_bar.setRange(0, PROGRESS_SCALE)
+        self.details = QtWidgets.QLabel(self)
+        self.queue = QtWidgets.QListWidget(self)
+        self.summary = QtWidgets.QLabel(self)
+        self.summary.setWordWrap(True)
+
+        self.btn_cancel = QtWidgets.QPushButton('Отменить', self)
+        self.btn_cancel.clicked.connect(self.cancel_requested.emit)
+        self.btn_cancel_all = QtWidgets.QPushButton('Отменить все', self)
+        self.btn_cancel_all.clicked.connect(self.cancel_all_requested.emit)
+
+        buttons = QtWidgets.QHBoxLayout()
+        buttons.addStretch()
+        buttons.addWidget(self.btn_cancel)
+        buttons.addWidget(self.btn_cancel_all)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.current)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.details)
+        layout.addWidget(QtWidgets.QLabel('В очереди:', self))
+        layout.addWidget(self.queue)
+        layout.addWidget(self.summary)
+        layout.addLayout(buttons)
+        self.set_idle()
+
+    def set_queue(self, descriptions: List[str]) -> None:
+        """
+        Отображает ожидающие операции.
+
+        Args:
+            descriptions: Описания операций в порядке выполнения
+        """
+        self.queue.clear()
+        self.queue.addItems(descriptions)
+        self.btn_cancel_all.setEnabled(bool(descriptions) or self.btn_cancel.isEnabled())
+
+    def start_operation(self, description: str) -> None:
+        """
+        Подготавливает окно к новой операции.
+
+        Args:
+            description: Описание операции
+        """
+        self.current.setText(description)
+        self.progress_bar.setRange(0, 0)
+        self.details.setText('Подготовка...')
+        self.btn_cancel.setEnabled(True)
+        self.btn_cancel_all.setEnabled(True)
+
+    def show_progress(self, progress: Progress) -> None:
+        """
+        Отображает ход операции: объём, количество файлов, скорость и оставшееся время.
+
+        Args:
+            progress: Прогресс текущей операции
+        """
+        if progress.phase == 'planning':
+            self.details.setText(f'Подготовка: {progress.total_files} файлов, '
+                                 f'{format_size(progress.total_bytes)}')
+            return
+        self.progress_bar.setRange(0, PROGRESS_SCALE)
+        if progress.total_bytes:
+            fraction = progress.done_bytes / progress.total_bytes
+        else:
+            fraction = progress.done_files / max(1, progress.total_files)
+        self.progress_bar.setValue(int(min(1.0, fraction) * PROGRESS_SCALE))
+        text = f'Файлов: {progress.done_files} из {progress.total_files}'
+        if progress.total_bytes:
+            text += (f', {format_size(progress.done_bytes)} из {format_size(progress.total_bytes)}'
+                     f', {format_size(int(progress.throughput()))}/с')
+            eta = progress.eta()
+            if eta is not None:
+                text += f', осталось {format_duration(eta)}'
+        self.details.setText(text)
+
+    def show_result(self, text: str) -> None:
+        """
+        Отображает итог завершённой операции.
+
+        Args:
+            text: Описание итога
+        """
+        self.summary.setText(text)
+
+    def set_idle(self) -> None:
+        """Переводит окно в состояние без выполняемой операции."""
+        self.current.setText('Нет выполняемых операций')
+        self.progress_bar.setRange(0, PROGRESS_SCALE)
+        self.progress_bar.setValue(0)
+        self.details.clear()
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel_all.setEnabled(self.queue.count() > 0)
@@ -0,0 +1,347 @@
+"""
+Нечёткий поиск по мере ввода в стиле fzf.
+
+Кандидаты (пути) хранятся порциями — строками вида '\\nпуть\\nпуть...'.
+Отбор выполняется одним регулярным выражением на всю порцию, то есть
+в коде модуля re на C, а не циклом Python по путям. Точный подсчёт
+очков — цикл Python, поэтому в каждой порции он выполняется не более
+чем для SCORE_LIMIT путей (и для стольких, сколько нужно для заполнения
+списка лучших): если прошедших отбор больше, сначала берутся пути, в имени
+файла которых самое длинное слово запроса стоит целиком с начала слова,
+затем более короткие. Отбор запоминается и после остановленного поиска,
+и уточнение запроса (добавление символов или слов) проверяет уже
+отобранные пути, а не весь набор.
+"""
+import heapq
+import re
+import threading
+from typing import Callable, Iterator, List, Optional, Sequence, Set, Tuple
+
+# Очки за совпавший символ, штрафы за пропуски и бонусы (как в fzf)
+SCORE_MATCH = 16
+PENALTY_GAP_START = 3
+PENALTY_GAP_EXTENSION = 1
+BONUS_BOUNDARY = 8
+BONUS_PATH_SEPARATOR = 9
+BONUS_CAMEL_CASE = 7
+BONUS_CONSECUTIVE = 4
+BONUS_FIRST_CHAR_MULTIPLIER = 2
+# Бонус, если слово запроса целиком совпало с именем файла, а не с путём к нему
+BONUS_BASENAME = 16
+# Сколько лучших результатов возвращается
+DEFAULT_LIMIT = 500
+# Количество путей в одной порции: между порциями проверяется отмена запроса
+CHUNK_LINES = 5000
+# Сколько путей порции сверх нужных для заполнения списка лучших оценивается точно
+SCORE_LIMIT = 100
+
+_SEPARATORS = frozenset('/\\')
+_DELIMITERS = frozenset(' _-.,:;')
+
+# Лучшие результаты: [(очки, путь)] по убыванию очков
+Ranked = List[Tuple[int, str]]
+
+
+def _char_bonus(text: str, pos: int) -> int:
+    """Бонус за совпадение в начале слова или компонента пути."""
+    if pos == 0:
+        return BONUS_PATH_SEPARATOR
+    prev = text[pos - 1]
+    if prev in _SEPARATORS:
+        return BONUS_PATH_SEPARATOR
+    if prev in _DELIMITERS:
+        return BONUS_BOUNDARY
+    if prev.islower() and text[pos].isupper():
+        return BONUS_CAMEL_CASE
+    return 0
+
+
+def _score_window(term: str, text: str, haystack: str, begin: int) -> Optional[int]:
+    """Очки совпадения term в haystack начиная с позиции begin (алгоритм fzf v1)."""
+    pos = begin - 1
+    for ch in term:
+        pos = haystack.find(ch, pos + 1)
+        if pos < 0:
+            return None
+    # Обратный проход находит самое короткое окно, заканчивающееся там же
+    pos += 1
+    for ch in reversed(term):
+        pos = haystack.rfind(ch, begin, pos)
+
+    score = 0
+    prev = pos - 1
+    run_bonus = 0
+    for index, ch in enumerate(term):
+        pos = haystack.find(ch, prev + 1)
+        bonus = _char_bonus(text, pos)
+        if index and pos == prev + 1:
+            # Подряд идущие символы сохраняют бонус начала слова
+            run_bonus = max(run_bonus, bonus, BONUS_CONSECUTIVE)
+            bonus = run_bonus
+        else:
+            if index:
+                score -= PENALTY_GAP_START + (pos - prev - 2) * PENALTY_GAP_EXTENSION
+            run_bonus = bonus
+        if not index:
+            bonus *= BONUS_FIRST_CHAR_MULTIPLIER
+        score += SCORE_MATCH + bonus
+        prev = pos
+    return score
+
+
+def fuzzy_score(term: str, text: str, folded: Optional[str] = None) -> Optional[int]:
+    """
+    Вычисляет очки нечёткого совпадения одного слова запроса с путём.
+
+    Очки начисляются за символы в начале слов и компонентов пути и за
+    идущие подряд символы, пропуски между символами штрафуются. Если
+    слово совпадает с именем файла, оценивается совпадение в имени
+    с дополнительным бонусом.
+
+    Args:
+        term: Слово запроса (в нижнем регистре при поиске без учёта регистра)
+        text: Путь
+        folded: Путь в том же регистре, что и term (по умолчанию text)
+
+    Returns:
+        Очки или None, если символы слова не входят в путь по порядку
+    """
+    haystack = text if folded is None else folded
+    separator = max(text.rfind('/'), text.rfind('\\'))
+    if separator >= 0:
+        score = _score_window(term, text, haystack, separator + 1)
+        if score is not None:
+            return score + BONUS_BASENAME
+    return _score_window(term, text, haystack, 0)
+
+
+def split_terms(pattern: str) -> Tuple[Tuple[str, ...], bool]:
+    """
+    Разбивает запрос на слова.
+
+    Регистр учитывается, только если в запросе есть заглавные буквы;
+    иначе слова приводятся к нижнему регистру.
+
+    Returns:
+        (слова, учитывать ли регистр)
+    """
+    case_sensitive = any(ch.isupper() for ch in pattern)
+    terms = tuple(pattern.split() if case_sensitive else pattern.lower().split())
+    return terms, case_sensitive
+
+
+def _compile_filter(terms: Sequence[str], flags: int = 0) -> 're.Pattern[str]':
+    """
+    Строит выражение, выбирающее из порции пути, в которые входят
+    символы каждого слова по порядку.
+
+    Выражение начинается с '\\n', поэтому каждый путь проверяется один
+    раз, а классы вида [^\\na]*a исключают возвраты с перебором: проверка
+    линейна по длине порции.
+    """
+    lookaheads = ''.join(
+        '(?=' + ''.join(f'[^\\n{re.escape(ch)}]*{re.escape(ch)}' for ch in term) + ')'
+        for term in terms
+    )
+    return re.compile(f'\\n{lookaheads}([^\\n]*)', flags)
+
+
+def _compile_strong(term: str) -> 're.Pattern[str]':
+    """
+    Строит выражение для предварительного ранжирования: слово целиком
+    с начала слова в имени файла. Совпадение заканчивается в конце пути,
+    поэтому путь определяется по концу совпадения. Такие пути получают
+    бонусы за имя файла, начало слова и подряд идущие символы.
+    """
+    boundary = re.escape(''.join(sorted(_SEPARATORS | _DELIMITERS)))
+    separators = re.escape(''.join(sorted(_SEPARATORS)))
+    return re.compile(f'[\\n{boundary}]{re.escape(term)}[^\\n{separators}]*(?![^\\n])')
+
+
+def _prerank(spans: List[Tuple[int, int]], strong: Set[int], count: int) -> List[Tuple[int, int]]:
+    """
+    Выбирает count путей порции, которые вероятнее всего наберут больше очков.
+
+    Args:
+        spans: Границы путей в порции
+        strong: Концы путей, в которых нашлось выражение _compile_strong
+        count: Сколько путей оставить
+    """
+    first = [span for span in spans if span[1] in strong]
+    if len(first) >= count:
+        return heapq.nsmallest(count, first, key=lambda span: span[1] - span[0])
+    rest = [span for span in spans if span[1] not in strong]
+    return first + heapq.nsmallest(count - len(first), rest, key=lambda span: span[1] - span[0])
+
+
+def _is_subsequence(short: str, long: str) -> bool:
+    """Проверяет, что символы short входят в long по порядку."""
+    chars = iter(long)
+    return all(ch in chars for ch in short)
+
+
+def _refines(old_terms: Sequence[str], terms: Sequence[str]) -> bool:
+    """Проверяет, что любой путь, подходящий к terms, подходит и к old_terms."""
+    return (len(old_terms) <= len(terms)
+            and all(_is_subsequence(old, new) for old, new in zip(old_terms, terms)))
+
+
+def _pack(paths: Sequence[str]) -> str:
+    """Упаковывает пути в порцию."""
+    return '\n' + '\n'.join(paths)
+
+
+class FuzzyIndex:
+    """
+    Набор кандидатов для нечёткого поиска.
+
+    Пути можно добавлять небольшими пачками во время поиска из другого
+    потока: они накапливаются до полной порции, а поиск учитывает
+    порции и накопленные пути, добавленные до его начала.
+    """
+
+    def __init__(self) -> None:
+        """Инициализация пустого набора."""
+        self._chunks: List[str] = []
+        # Пути, ещё не собранные в порцию
+        self._pending: List[str] = []
+        self.count = 0
+        self._lock = threading.Lock()
+        # Последний отбор: (слова, учёт регистра, число порций, отобранные порции)
+        self._last: Optional[Tuple[Tuple[str, ...], bool, int, List[str]]] = None
+
+    def add(self, paths: Sequence[str]) -> None:
+        """
+        Добавляет пути.
+
+        Args:
+            paths: Пути; пути с переводом строки пропускаются
+        """
+        paths = [p for p in paths if '\n' not in p]
+        with self._lock:
+            self._pending.extend(paths)
+            self.count += len(paths)
+            while len(self._pending) >= CHUNK_LINES:
+                self._chunks.append(_pack(self._pending[:CHUNK_LINES]))
+                del self._pending[:CHUNK_LINES]
+
+    def clear(self) -> None:
+        """Удаляет всех кандидатов."""
+        with self._lock:
+            self._chunks = []
+            self._pending = []
+            self.count = 0
+            self._last = None
+
+    def _sources(self, chunks: List[str], count: int, terms: Tuple[str, ...],
+                 case_sensitive: bool) -> List[str]:
+        """
+        Возвращает порции, которые нужно проверить для запроса.
+
+        Если запрос уточняет предыдущий, проверяются только пути,
+        отобранные предыдущим запросом, и порции, добавленные после него.
+        """
+        last = self._last
+        if last is not None:
+            old_terms, old_case, covered, filtered = last
+            if old_case == case_sensitive and covered <= count and _refines(old_terms, terms):
+                return filtered + chunks[covered:count]
+        return chunks[:count]
+
+    def search(self, pattern: str, limit: int = DEFAULT_LIMIT,
+               should_stop: Optional[Callable[[], bool]] = None) -> Iterator[Tuple[Ranked, int]]:
+        """
+        Ищет пути, нечётко соответствующие запросу.
+
+        Все слова запроса, разделённые пробелами, должны входить в путь.
+        После каждой порции выдаются текущие лучшие результаты, поэтому
+        первые результаты появляются быстро и на миллионах кандидатов.
+        Отбор запоминается для последующих уточнений запроса, в том числе
+        при остановке: непроверенные порции сохраняются как есть.
+
+        Args:
+            pattern: Запрос
+            limit: Сколько лучших результатов возвращать
+            should_stop: Функция, возвращающая True при запросе остановки
+
+        Yields:
+            (лучшие результаты, число совпадений на данный момент)
+        """
+        should_stop = should_stop or (lambda: False)
+        terms, case_sensitive = split_terms(pattern)
+        if not terms:
+            return
+        with self._lock:
+            chunks = self._chunks
+            covered = len(chunks)
+            pending = _pack(self._pending) if self._pending else None
+        sources = self._sources(chunks, covered, terms, case_sensitive)
+        regex = _compile_filter(terms)
+        strong = _compile_strong(max(terms, key=len))
+        fallback = None
+
+        filtered: List[str] = []
+        # Отобранные пути собираются в полные порции: уточнение запроса
+        # проверяет меньше порций, и на каждую приходится меньше подсчётов очков
+        kept: List[str] = []
+        # Куча limit лучших: при равных очках выше более короткий путь
+        heap: List[Tuple[int, int, str]] = []
+        matched = 0
+        checked = 0
+        try:
+            # Отбор из ещё не собранных путей не запоминается: позже они
+            # попадут в новую порцию и будут проверены в ней
+            for chunk in sources + ([pending] if pending is not None else []):
+                if should_stop():
+                    return
+                folded = chunk if case_sensitive else chunk.lower()
+                same_length = len(folded) == len(chunk)
+                if same_length:
+                    spans = [m.span(1) for m in regex.finditer(folded)]
+                else:
+                    # Нижний регистр некоторых символов Unicode длиннее исходного
+                    fallback = fallback or _compile_filter(terms, re.IGNORECASE)
+                    spans = [m.span(1) for m in fallback.finditer(chunk)]
+                if chunk is not pending:
+                    checked += 1
+                    kept.extend(chunk[a:b] for a, b in spans)
+                    if len(kept) >= CHUNK_LINES:
+                        filtered.append(_pack(kept))
+                        kept = []
+                if not spans:
+                    continue
+                matched += len(spans)
+                budget = max(SCORE_LIMIT, limit - len(heap))
+                if len(spans) > budget:
+                    top = {m.end() for m in strong.finditer(folded)} if same_length else set()
+                    spans = _prerank(spans, top, budget)
+                for a, b in spans:
+                    line = chunk[a:b]
+                    folded_line = folded[a:b] if same_length else line.lower()
+                    score = 0
+                    for term in terms:
+                        term_score = fuzzy_score(term, line, folded_line)
+                        if term_score is None:
+                            break
+                        score += term_score
+                    else:
+                        key = (score, -len(line), line)
+                        if len(heap) < limit:
+                            heapq.heappush(heap, key)
+                        elif key > heap[0]:
+                            heapq.heapreplace(heap, key)
+                yield _ranked(heap), matched
+        finally:
+            # Непроверенные порции — надмножество отбора для этого запроса
+            if kept:
+                filtered.append(_pack(kept))
+            with self._lock:
+                if self._chunks is chunks:
+                    self._last = (terms, case_sensitive, covered, filtered + sources[checked:])
+        if not matched:
+            yield [], 0
+
+
+def _ranked(heap: List[Tuple[int, int, str]]) -> Ranked:
+    """Возвращает содержимое кучи по убыванию очков."""
+    return [(score, line) for score, _, line in sorted(heap, reverse=True)]
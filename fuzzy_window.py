@@ -0,0 +1,107 @@
+from typing import List
+
+from PyQt5 import QtCore, QtWidgets
+from PyQt5.QtCore import QModelIndex, Qt, pyqtSignal
+
+from search_results import SearchResultsModel
+
+# Клавиши, которые строка ввода передаёт списку результатов
+NAVIGATION_KEYS = (Qt.Key_Up, Qt.Key_Down, Qt.Key_PageUp, Qt.Key_PageDown)
+
+
+class FuzzyFinderWindow(QtWidgets.QWidget):
+    """Окно быстрого поиска: результаты обновляются по мере ввода."""
+
+    query_changed = pyqtSignal(str)
+    file_activated = pyqtSignal(str)
+
+    def __init__(self, parent=None) -> None:
+        """Инициализация окна быстрого поиска."""
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle('Быстрый поиск')
+        self.resize(600, 400)
+        self.candidates = 0
+        self.loading = False
+
+        self.edit = QtWidgets.QLineEdit(self)
+        self.edit.setPlaceholderText('Часть имени или пути, например expl py')
+        self.edit.textChanged.connect(self.query_changed.emit)
+        self.edit.returnPressed.connect(self._activate_current)
+        self.edit.installEventFilter(self)
+
+        self.model = SearchResultsModel(self)
+        self.view = QtWidgets.QListView(self)
+        self.view.setUniformItemSizes(True)
+        self.view.setModel(self.model)
+        self.view.activated.connect(self._on_activated)
+
+        self.summary = QtWidgets.QLabel(self)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.edit)
+        layout.addWidget(self.view)
+        layout.addWidget(self.summary)
+
+    def start(self, root_path: str) -> None:
+        """
+        Подготавливает окно к поиску в новом каталоге.
+
+        Args:
+            root_path: Каталог, файлы которого загружаются для поиска
+        """
+        self.setWindowTitle(f'Быстрый поиск: {root_path}')
+        self.model.clear()
+        self.candidates = 0
+        self.loading = True
+        self.summary.setText('Загрузка списка файлов...')
+
+    def show_loading(self, candidates: int, finished: bool = False) -> None:
+        """
+        Отображает ход загрузки списка файлов.
+
+        Args:
+            candidates: Количество загруженных путей
+            finished: True, если загрузка завершена
+        """
+        self.candidates = candidates
+        self.loading = not finished
+        if not self.edit.text().strip():
+            suffix = '' if finished else '...'
+            self.summary.setText(f'Файлов: {candidates}{suffix}')
+
+    def set_results(self, paths: List[str], matched: int, done: bool) -> None:
+        """
+        Заменяет список результатов, сохраняя выделение первой строки.
+
+        Args:
+            paths: Лучшие результаты по убыванию очков
+            matched: Общее число совпадений
+            done: True, если все кандидаты проверены
+        """
+        self.model.set_paths(paths)
+        if paths:
+            self.view.setCurrentIndex(self.model.index(0))
+        status = 'Найдено' if done else 'Поиск... найдено'
+        shown = f', показаны первые {len(paths)}' if matched > len(paths) else ''
+        loading = ' (список файлов ещё загружается)' if self.loading else ''
+        self.summary.setText(f'{status}: {matched} из {self.candidates}{shown}{loading}')
+
+    def eventFilter(self, obj: QtCore.QObject, event: QtCore.QEvent) -> bool:
+        """Передаёт списку клавиши навигации и закрывает окно по Escape."""
+        if obj is self.edit and event.type() == QtCore.QEvent.KeyPress:
+            if event.key() in NAVIGATION_KEYS:
+                QtWidgets.QApplication.sendEvent(self.view, event)
+                return True
+            if event.key() == Qt.Key_Escape:
+                self.close()
+                return True
+        return super().eventFilter(obj, event)
+
+    def _activate_current(self) -> None:
+        """Активирует выделенный результат по Enter в строке ввода."""
+        index = self.view.currentIndex()
+        if index.isValid():
+            self._on_activated(index)
+
+    def _on_activated(self, index: QModelIndex) -> None:
+        """Передаёт путь активированного результата главному окну."""
+        self.file_activated.emit(self.model.path(index.row()))
@@ -0,0 +1,84 @@
+import os
+from typing import Callable, List, Optional
+
+# Сколько каталогов хранится в истории переходов в каждую сторону
+HISTORY_LIMIT = 100
+
+
+class NavigationHistory:
+    """История переходов между каталогами для кнопок «Назад» и «Вперёд»."""
+
+    def __init__(self, limit: int = HISTORY_LIMIT) -> None:
+        """
+        Инициализация пустой истории.
+
+        Args:
+            limit: Наибольшее число каталогов в каждой стороне истории
+        """
+        self.limit = limit
+        self.current: Optional[str] = None
+        self._back: List[str] = []
+        self._forward: List[str] = []
+
+    @property
+    def can_go_back(self) -> bool:
+        """Есть ли каталог для перехода назад."""
+        return bool(self._back)
+
+    @property
+    def can_go_forward(self) -> bool:
+        """Есть ли каталог для перехода вперёд."""
+        return bool(self._forward)
+
+    def visit(self, path: str) -> None:
+        """
+        Запоминает переход в каталог; история «вперёд» при этом очищается.
+
+        Args:
+            path: Новый текущий каталог
+        """
+        path = os.path.normpath(path)
+        if path == self.current:
+            return
+        if self.current is not None:
+            self._back.append(self.current)
+            del self._back[:-self.limit]
+        self._forward.clear()
+        self.current = path
+
+    def back(self, valid: Callable[[str], bool] = os.path.isdir) -> Optional[str]:
+        """
+        Переходит назад, пропуская каталоги, которые больше не существуют.
+
+        Args:
+            valid: Проверка, что в каталог можно перейти
+
+        Returns:
+            Каталог для перехода или None, если переходить некуда
+        """
+        return self._step(self._back, self._forward, valid)
+
+    def forward(self, valid: Callable[[str], bool] = os.path.isdir) -> Optional[str]:
+        """
+        Переходит вперёд, пропуская каталоги, которые больше не существуют.
+
+        Args:
+            valid: Проверка, что в каталог можно перейти
+
+        Returns:
+            Каталог для перехода или None, если переходить некуда
+        """
+        return self._step(self._forward, self._back, valid)
+
+    def _step(self, source: List[str], target: List[str],
+              valid: Callable[[str], bool]) -> Optional[str]:
+        """Переносит текущий каталог в target и берёт следующий из source."""
+        while source:
+            path = source.pop()
+            if valid(path):
+                if self.current is not None:
+                    target.append(self.current)
+                    del target[:-self.limit]
+                self.current = path
+                return path
+        return None
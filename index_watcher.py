@@ -0,0 +1,416 @@
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from search_index import FileIndex
+
+logger = logging.getLogger('FileExplorer.watcher')
+
+# Флаги inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# Изменения в составе каталога; изменения содержимого файлов индексу не важны
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+_EVENT = struct.Struct('iIII')
+
+# Пауза без событий, после которой накопленные изменения применяются к индексу
+DEBOUNCE = 0.5
+# Максимальная задержка применения изменений при непрерывном потоке событий
+MAX_LATENCY = 5.0
+# Интервал пересканирования корней, для которых inotify недоступен
+POLL_INTERVAL = 60.0
+# Как часто отмечать отслеживаемые корни актуальными
+TOUCH_INTERVAL = 10 * 60.0
+# Сколько раз служба перезапускается после ошибки, прежде чем прекратить наблюдение
+MAX_RESTARTS = 3
+# Пауза перед перезапуском службы после ошибки
+RESTART_DELAY = 1.0
+
+
+class Inotify:
+    """Тонкая обёртка над inotify через ctypes (только Linux)."""
+
+    def __init__(self) -> None:
+        """
+        Создание экземпляра inotify.
+
+        Raises:
+            OSError: Если inotify недоступен
+        """
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, 'inotify is only available on Linux')
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path: str, mask: int = WATCH_MASK) -> int:
+        """
+        Добавляет наблюдение за каталогом.
+
+        Args:
+            path: Путь к каталогу
+            mask: Маска событий
+
+        Returns:
+            Дескриптор наблюдения
+
+        Raises:
+            OSError: При ошибке; errno ENOSPC означает исчерпание лимита наблюдений
+        """
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        """
+        Удаляет наблюдение.
+
+        Args:
+            wd: Дескриптор наблюдения
+        """
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self) -> List[Tuple[int, int, int, str]]:
+        """
+        Читает все доступные события без блокировки.
+
+        Returns:
+            Список кортежей (дескриптор, маска, cookie, имя)
+        """
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                events.append((wd, mask, cookie, name))
+        return events
+
+    def close(self) -> None:
+        """Закрывает дескриптор inotify."""
+        os.close(self.fd)
+
+
+class IndexWatcher:
+    """
+    Служба поддержания индекса в актуальном состоянии.
+
+    Следит за проиндексированными корнями через inotify, объединяет
+    всплески событий и применяет изменения к индексу. Если inotify
+    недоступен или исчерпан лимит наблюдений, корень периодически
+    пересканируется с пропуском каталогов, время изменения которых
+    не изменилось. После ошибки служба начинает наблюдение заново;
+    после MAX_RESTARTS ошибок она прекращает продлевать актуальность
+    корней, и поиск по ним со временем возвращается к обходу.
+    """
+
+    def __init__(self, index: FileIndex, debounce: float = DEBOUNCE,
+                 poll_interval: float = POLL_INTERVAL,
+                 on_change: Optional[Callable[[Iterable[str]], None]] = None) -> None:
+        """
+        Инициализация службы. Поток запускается при первом вызове watch().
+
+        Args:
+            index: Обновляемый индекс
+            debounce: Пауза без событий перед применением изменений
+            poll_interval: Интервал пересканирования корней без inotify
+            on_change: Вызывается из потока службы с изменившимися каталогами
+        """
+        self.index = index
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+
+        self._lock = threading.Lock()
+        self._requested: List[str] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._wake_r, self._wake_w = -1, -1
+
+        # Состояние ниже используется только потоком службы
+        self._inotify: Optional[Inotify] = None
+        self._wd_paths: Dict[int, str] = {}
+        self._path_wds: Dict[str, int] = {}
+        self._watched_roots: Set[str] = set()
+        self._polled_roots: Dict[str, float] = {}
+        self._dirty: Set[str] = set()
+        self._renames: List[Tuple[str, str]] = []
+        self._moves: Dict[int, Tuple[str, str]] = {}
+        self._first_event = 0.0
+        self._last_event = 0.0
+        self._last_touch = 0.0
+
+    @property
+    def roots(self) -> Set[str]:
+        """Корни, за которыми ведётся наблюдение (любым способом)."""
+        with self._lock:
+            return set(self._watched_roots) | set(self._polled_roots) | set(self._requested)
+
+    def watch(self, root: str) -> None:
+        """
+        Начинает отслеживать изменения в проиндексированном корне.
+
+        Args:
+            root: Корневой каталог
+        """
+        root = os.path.normpath(root)
+        with self._lock:
+            if root in self._watched_roots or root in self._polled_roots:
+                return
+            self._requested.append(root)
+        if self._thread is None or not self._thread.is_alive():
+            # Поток мог завершиться после повторяющихся ошибок
+            if self._thread is None:
+                self._wake_r, self._wake_w = os.pipe()
+            self._thread = threading.Thread(target=self._run, name='index-watcher', daemon=True)
+            self._thread.start()
+        else:
+            os.write(self._wake_w, b'\0')
+
+    def stop(self) -> None:
+        """Останавливает службу и дожидается завершения потока."""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        os.write(self._wake_w, b'\0')
+        self._thread.join()
+        self._thread = None
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+    def _run(self) -> None:
+        """Поток службы: основной цикл, перезапускаемый после ошибок."""
+        failures = 0
+        while not self._stopped.is_set():
+            try:
+                self._inotify = Inotify()
+            except OSError as e:
+                logger.info(f'inotify unavailable, falling back to polling: {e}')
+                self._inotify = None
+            try:
+                self._loop()
+                return
+            except Exception as e:
+                failures += 1
+                logger.error(f'Index watcher error: {e}')
+                if failures > MAX_RESTARTS:
+                    logger.error('Index watcher stopped after repeated errors, '
+                                 'indexed roots are no longer kept fresh')
+                    self._reset(requeue=False)
+                    return
+                self._reset(requeue=True)
+            finally:
+                if self._inotify:
+                    self._inotify.close()
+                    self._inotify = None
+            self._stopped.wait(RESTART_DELAY)
+
+    def _loop(self) -> None:
+        """Основной цикл: ожидание событий и плановых действий."""
+        while not self._stopped.is_set():
+            self._add_requested_roots()
+            fds = [self._wake_r] + ([self._inotify.fd] if self._inotify else [])
+            readable, _, _ = select.select(fds, [], [], self._timeout())
+            if self._wake_r in readable:
+                os.read(self._wake_r, 1024)
+            if self._inotify and self._inotify.fd in readable:
+                self._handle_events(self._inotify.read_events())
+            self._flush_if_quiet()
+            self._poll_roots()
+            self._touch_roots()
+
+    def _reset(self, requeue: bool) -> None:
+        """
+        Сбрасывает состояние наблюдения после ошибки.
+
+        Args:
+            requeue: Поставить корни в очередь на повторное наблюдение;
+                     иначе они забываются и больше не отмечаются актуальными
+        """
+        with self._lock:
+            roots = sorted(self._watched_roots | set(self._polled_roots))
+            self._requested = roots + self._requested if requeue else []
+            self._watched_roots.clear()
+            self._polled_roots.clear()
+        self._wd_paths.clear()
+        self._path_wds.clear()
+        self._dirty.clear()
+        self._renames.clear()
+        self._moves.clear()
+        self._first_event = 0.0
+
+    def _timeout(self) -> float:
+        """Время ожидания select до следующего запланированного действия."""
+        if self._dirty or self._renames or self._moves:
+            return self.debounce
+        return min(self.poll_interval, TOUCH_INTERVAL) if (
+            self._polled_roots or self._watched_roots) else 3600.0
+
+    def _add_requested_roots(self) -> None:
+        """Добавляет наблюдения для новых корней."""
+        with self._lock:
+            requested, self._requested = self._requested, []
+        for root in requested:
+            if self._inotify is None or not self._watch_tree(self.index.directories(root)):
+                self._drop_watches(root)
+                logger.warning(f'Watch limit reached, polling: {root}')
+                with self._lock:
+                    self._polled_roots[root] = time.monotonic()
+            else:
+                logger.info(f'Watching index root: {root}')
+                with self._lock:
+                    self._watched_roots.add(root)
+            # Изменения между построением индекса (или ошибкой службы) и началом
+            # наблюдения событий не дали: находим их по времени изменения каталогов
+            changed = self.index.refresh_changed(root, self._stopped.is_set)
+            if changed:
+                logger.info(f'Caught up {root}: {changed} directories changed')
+
+    def _watch_tree(self, directories: List[str]) -> bool:
+        """
+        Добавляет наблюдения за каталогами.
+
+        Returns:
+            False, если исчерпан лимит наблюдений
+        """
+        for path in directories:
+            if path in self._path_wds:
+                continue
+            try:
+                wd = self._inotify.add_watch(path)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    return False
+                continue
+            self._wd_paths[wd] = path
+            self._path_wds[path] = wd
+        return True
+
+    def _drop_watches(self, root: str) -> None:
+        """Снимает наблюдения со всех каталогов корня."""
+        prefix = root.rstrip(os.sep) + os.sep
+        for path in [p for p in self._path_wds if p == root or p.startswith(prefix)]:
+            wd = self._path_wds.pop(path)
+            self._wd_paths.pop(wd, None)
+            if self._inotify:
+                self._inotify.rm_watch(wd)
+
+    def _handle_events(self, events: List[Tuple[int, int, int, str]]) -> None:
+        """Превращает события inotify в набор изменившихся каталогов и переименований."""
+        now = time.monotonic()
+        if events and not self._first_event:
+            self._first_event = now
+        self._last_event = now
+        for wd, mask, cookie, name in events:
+            if mask & IN_Q_OVERFLOW:
+                # События потеряны: пересканируем изменившиеся каталоги по mtime
+                logger.warning('inotify queue overflow, rescanning watched roots')
+                for root in list(self._watched_roots):
+                    self.index.refresh_changed(root)
+                continue
+            directory = self._wd_paths.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                self._wd_paths.pop(wd, None)
+                if self._path_wds.get(directory) == wd:
+                    del self._path_wds[directory]
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                continue
+            self._dirty.add(directory)
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR and mask & IN_MOVED_FROM:
+                self._moves[cookie] = (path, directory)
+            elif mask & IN_ISDIR and mask & IN_MOVED_TO and cookie in self._moves:
+                old, _ = self._moves.pop(cookie)
+                self._renames.append((old, path))
+
+    def _flush_if_quiet(self) -> None:
+        """Применяет изменения после паузы в событиях или по истечении MAX_LATENCY."""
+        if not (self._dirty or self._renames or self._moves):
+            return
+        now = time.monotonic()
+        if now - self._last_event < self.debounce and now - self._first_event < MAX_LATENCY:
+            return
+        dirty, self._dirty = self._dirty, set()
+        renames, self._renames = self._renames, []
+        # Перемещения без пары (за пределы корня) обрабатываются как удаления
+        self._moves.clear()
+        self._first_event = 0.0
+
+        for old, new in renames:
+            self._retarget_watches(old, new)
+        added = self.index.apply_changes(dirty, renames)
+        if self.on_change is not None:
+            self.on_change(dirty | {path for rename in renames for path in rename})
+        if added and self._inotify and not self._watch_tree(added):
+            for root in [r for r in self._watched_roots
+                         if any(p == r or p.startswith(r.rstrip(os.sep) + os.sep) for p in added)]:
+                logger.warning(f'Watch limit reached, polling: {root}')
+                self._drop_watches(root)
+                with self._lock:
+                    self._watched_roots.discard(root)
+                    self._polled_roots[root] = time.monotonic()
+        logger.info(f'Index updated: {len(dirty)} directories, {len(renames)} renames')
+
+    def _retarget_watches(self, old: str, new: str) -> None:
+        """Обновляет пути наблюдений после переименования каталога."""
+        prefix = old.rstrip(os.sep) + os.sep
+        for path in [p for p in self._path_wds if p == old or p.startswith(prefix)]:
+            wd = self._path_wds.pop(path)
+            moved = new + path[len(old):]
+            self._path_wds[moved] = wd
+            self._wd_paths[wd] = moved
+
+    def _poll_roots(self) -> None:
+        """Пересканирует корни без inotify, пропуская неизменившиеся каталоги."""
+        now = time.monotonic()
+        for root, last in list(self._polled_roots.items()):
+            if now - last >= self.poll_interval:
+                changed = self.index.refresh_changed(root, self._stopped.is_set)
+                logger.info(f'Polled {root}: {changed} directories changed')
+                self._polled_roots[root] = time.monotonic()
+
+    def _touch_roots(self) -> None:
+        """Продлевает актуальность корней, изменения в которых отслеживаются inotify."""
+        now = time.monotonic()
+        if now - self._last_touch < TOUCH_INTERVAL:
+            return
+        self._last_touch = now
+        for root in self._watched_roots:
+            self.index.touch_root(root)
@@ -0,0 +1,467 @@
+"""
+Общий планировщик фоновых задач.
+
+Задачи выполняются ограниченным пулом рабочих потоков по классам
+приоритета: отображение каталогов, затем поиск и операции пользователя,
+затем построение индекса, затем чтение наперёд. Часть потоков
+зарезервирована для интерактивных задач, поэтому долгий поиск не
+задерживает открытие каталога. Отмена только отмечает токен задачи и
+никогда не ждёт её завершения: задача проверяет токен между шагами,
+а результаты отменённой задачи отбрасываются получателем. Рабочие
+потоки — демоны, поэтому зависший вызов readdir не мешает закрыть
+приложение. Задача, не остановившаяся через STUCK_TIMEOUT секунд после
+отмены, перестаёт занимать место в пуле: её поток завершится вместе с
+ней, а очередь обслуживает новый поток.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger('FileExplorer.jobs')
+
+# Классы приоритета: меньшее значение выполняется раньше
+PRIORITY_INTERACTIVE = 0
+PRIORITY_SEARCH = 1
+PRIORITY_INDEX = 2
+PRIORITY_PREFETCH = 3
+# Названия классов приоритета для интерфейса
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'интерактивная',
+    PRIORITY_SEARCH: 'поиск',
+    PRIORITY_INDEX: 'индексирование',
+    PRIORITY_PREFETCH: 'чтение наперёд',
+}
+# Количество рабочих потоков по умолчанию
+DEFAULT_WORKERS = 4
+# Сколько потоков не могут занять неинтерактивные задачи
+RESERVED_INTERACTIVE = 1
+# Через сколько секунд после отмены выполняемая задача считается зависшей
+STUCK_TIMEOUT = 2.0
+# Как часто проверяются отменённые выполняемые задачи (секунд)
+WATCH_INTERVAL = 0.5
+
+# Состояния задачи
+PENDING, RUNNING, DONE, CANCELLED, FAILED = 'pending', 'running', 'done', 'cancelled', 'failed'
+_FINISHED = (DONE, CANCELLED, FAILED)
+
+
+class JobCancelled(Exception):
+    """Задача остановлена по токену отмены."""
+
+
+class CancelToken:
+    """
+    Флаг отмены задачи.
+
+    Вызов токена возвращает True после отмены, поэтому токен передаётся
+    напрямую как параметр should_stop функций поиска и обхода.
+    """
+
+    __slots__ = ('_event', 'cancelled_at')
+
+    def __init__(self) -> None:
+        """Инициализация неотменённого токена."""
+        self._event = threading.Event()
+        # Момент отмены (time.monotonic) или None
+        self.cancelled_at: Optional[float] = None
+
+    def __call__(self) -> bool:
+        """Возвращает True, если задача отменена."""
+        return self._event.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Отменена ли задача."""
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Отменяет задачу; не ждёт её остановки."""
+        if self.cancelled_at is None:
+            self.cancelled_at = time.monotonic()
+        self._event.set()
+
+    def check(self) -> None:
+        """
+        Прерывает задачу, если она отменена.
+
+        Raises:
+            JobCancelled: Если токен отменён
+        """
+        if self._event.is_set():
+            raise JobCancelled()
+
+
+class Job:
+    """Задача планировщика: функция, приоритет, состояние и прогресс."""
+
+    def __init__(self, fn: Callable[['Job'], Any], name: str, priority: int,
+                 token: Optional[CancelToken] = None, cancellable: bool = True) -> None:
+        """
+        Инициализация задачи.
+
+        Args:
+            fn: Функция задачи; получает саму задачу (token, report)
+            name: Название для журнала и окна задач
+            priority: Класс приоритета
+            token: Токен отмены; по умолчанию создаётся новый
+            cancellable: Может ли пользователь отменить задачу в окне задач
+        """
+        self.fn = fn
+        self.name = name
+        self.priority = priority
+        self.token = token if token is not None else CancelToken()
+        self.cancellable = cancellable
+        self.state = PENDING
+        # Прогресс: (выполнено, всего или None)
+        self.progress: Tuple[int, Optional[int]] = (0, None)
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.submitted = time.monotonic()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._callbacks: List[Callable[['Job'], None]] = []
+
+    def __repr__(self) -> str:
+        return f'<Job {self.name!r} {self.state} priority={self.priority}>'
+
+    @property
+    def done(self) -> bool:
+        """Завершена ли задача (успешно, с ошибкой или отменой)."""
+        return self.state in _FINISHED
+
+    def cancelled(self) -> bool:
+        """Завершена ли задача отменой (как Future.cancelled у ThreadPoolExecutor)."""
+        return self.state == CANCELLED
+
+    def report(self, done: int, total: Optional[int] = None) -> None:
+        """
+        Сообщает прогресс задачи; вызывается из функции задачи.
+
+        Args:
+            done: Выполненный объём (файлов, байт, каталогов)
+            total: Общий объём, если известен
+        """
+        self.progress = (done, total)
+
+    def cancel(self) -> None:
+        """
+        Отменяет задачу без ожидания. Ожидающая задача сразу считается
+        отменённой; выполняемая останавливается при следующей проверке токена.
+        """
+        self.token.cancel()
+        with self._lock:
+            if self.state != PENDING:
+                return
+            self.state = CANCELLED
+        self._finish()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ждёт завершения задачи. Не вызывается из потока интерфейса, кроме
+        как с коротким таймаутом при закрытии приложения.
+
+        Returns:
+            True, если задача завершилась
+        """
+        return self._done.wait(timeout)
+
+    def add_done_callback(self, callback: Callable[['Job'], None]) -> None:
+        """
+        Добавляет обработчик завершения; вызывается в потоке, завершившем
+        задачу, или сразу, если задача уже завершена.
+        """
+        with self._lock:
+            if not self.done:
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def _run(self) -> None:
+        """Выполняет функцию задачи в рабочем потоке."""
+        with self._lock:
+            if self.state != PENDING:
+                return
+            self.state = RUNNING
+            self.started = time.monotonic()
+        state = DONE
+        try:
+            self.result = self.fn(self)
+        except JobCancelled:
+            pass
+        except Exception as e:
+            self.error = e
+            state = FAILED
+            logger.exception(f'Job failed: {self.name}')
+        if state == DONE and self.token.cancelled:
+            state = CANCELLED
+        with self._lock:
+            self.state = state
+        self._finish()
+
+    def _finish(self) -> None:
+        """Отмечает завершение и вызывает обработчики."""
+        self.finished = time.monotonic()
+        with self._lock:
+            callbacks, self._callbacks = self._callbacks, []
+        self._done.set()
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:
+                logger.exception(f'Job callback failed: {self.name}')
+
+
+class JobScheduler:
+    """Ограниченный пул рабочих потоков с очередью задач по приоритетам."""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS,
+                 reserved_interactive: int = RESERVED_INTERACTIVE) -> None:
+        """
+        Инициализация планировщика. Рабочие потоки создаются по мере надобности.
+
+        Args:
+            workers: Наибольшее число одновременно выполняемых задач
+            reserved_interactive: Сколько потоков доступно только интерактивным задачам
+        """
+        self.workers = max(1, workers)
+        self.reserved_interactive = min(max(0, reserved_interactive), self.workers - 1)
+        self._queue: List[Tuple[int, int, Job]] = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        # Рабочие потоки, занимающие место в пуле (без потоков зависших задач)
+        self._thread_count = 0
+        self._thread_names = itertools.count()
+        self._idle = 0
+        self._running: Set[Job] = set()
+        # Отменённые задачи, которые не остановились и больше не занимают место в пуле
+        self._stuck: Set[Job] = set()
+        self._background_running = 0
+        self._closed = False
+        self._watching = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def submit(self, fn: Callable[[Job], Any], name: str, priority: int = PRIORITY_SEARCH,
+               token: Optional[CancelToken] = None, cancellable: bool = True) -> Job:
+        """
+        Ставит задачу в очередь.
+
+        Args:
+            fn: Функция задачи; получает задачу (job.token — should_stop, job.report)
+            name: Название для журнала и окна задач
+            priority: Класс приоритета (PRIORITY_*)
+            token: Токен отмены; по умолчанию создаётся новый
+            cancellable: Может ли пользователь отменить задачу в окне задач
+
+        Returns:
+            Задача; после закрытия планировщика возвращается уже отменённой
+        """
+        job = Job(fn, name, priority, token, cancellable)
+        with self._cond:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                heapq.heappush(self._queue, (priority, next(self._sequence), job))
+                self._spawn_worker()
+                self._cond.notify()
+        if closed:
+            job.cancel()
+        return job
+
+    def _spawn_worker(self) -> None:
+        """Запускает рабочий поток, если свободных нет и пул не заполнен (под self._cond)."""
+        if self._idle > 0 or self._thread_count >= self.workers:
+            return
+        self._thread_count += 1
+        threading.Thread(target=self._worker, daemon=True,
+                         name=f'job-worker-{next(self._thread_names)}').start()
+        if self._watchdog is None:
+            self._watchdog = threading.Thread(target=self._watch, daemon=True,
+                                              name='job-watchdog')
+            self._watchdog.start()
+
+    def executor(self, priority: int, name: str) -> 'PriorityExecutor':
+        """
+        Возвращает адаптер с интерфейсом submit/shutdown ThreadPoolExecutor,
+        передающий задачи планировщику с заданным приоритетом.
+
+        Args:
+            priority: Класс приоритета задач адаптера
+            name: Название задач
+        """
+        return PriorityExecutor(self, priority, name)
+
+    def jobs(self) -> List[Job]:
+        """Выполняемые (в том числе зависшие после отмены) и ожидающие задачи в порядке выполнения."""
+        with self._cond:
+            running = sorted(self._running | self._stuck, key=lambda job: job.started or 0)
+            pending = [job for _, _, job in sorted(self._queue) if job.state == PENDING]
+        return running + pending
+
+    def cancel_all(self) -> None:
+        """Отменяет все выполняемые и ожидающие задачи без ожидания."""
+        for job in self.jobs():
+            job.cancel()
+
+    def shutdown(self, timeout: float = 0.0) -> bool:
+        """
+        Отменяет все задачи и останавливает рабочие потоки.
+
+        Args:
+            timeout: Сколько секунд ждать остановки выполняемых задач
+
+        Returns:
+            True, если все задачи остановились в пределах таймаута
+        """
+        with self._cond:
+            self._closed = True
+            running = list(self._running)
+            self._cond.notify_all()
+        self._watching.set()
+        self.cancel_all()
+        deadline = time.monotonic() + timeout
+        for job in running:
+            if not job.wait(max(0.0, deadline - time.monotonic())):
+                logger.warning(f'Job did not stop in time: {job.name}')
+                return False
+        return True
+
+    def _next_job(self) -> Optional[Job]:
+        """Берёт следующую задачу, учитывая резерв для интерактивных задач."""
+        with self._cond:
+            while True:
+                while self._queue and self._queue[0][2].state != PENDING:
+                    heapq.heappop(self._queue)
+                if self._closed:
+                    return None
+                if self._queue:
+                    job = self._queue[0][2]
+                    interactive = job.priority <= PRIORITY_INTERACTIVE
+                    if interactive or (self._background_running
+                                       < self.workers - self.reserved_interactive):
+                        heapq.heappop(self._queue)
+                        self._running.add(job)
+                        if not interactive:
+                            self._background_running += 1
+                        self._watching.set()
+                        return job
+                self._idle += 1
+                self._cond.wait()
+                self._idle -= 1
+
+    def _worker(self) -> None:
+        """
+        Рабочий поток: выполняет задачи, пока планировщик не закрыт. Поток
+        зависшей задачи, место которой уже занял другой поток, завершается.
+        """
+        while True:
+            job = self._next_job()
+            if job is None:
+                with self._cond:
+                    self._thread_count -= 1
+                return
+            try:
+                job._run()
+            finally:
+                with self._cond:
+                    replaced = job in self._stuck
+                    if replaced:
+                        self._stuck.discard(job)
+                    else:
+                        self._running.discard(job)
+                        if job.priority > PRIORITY_INTERACTIVE:
+                            self._background_running -= 1
+                        self._cond.notify()
+            if replaced:
+                return
+
+    def _watch(self) -> None:
+        """Поток наблюдения: освобождает места задач, не остановившихся после отмены."""
+        while True:
+            self._watching.wait()
+            time.sleep(WATCH_INTERVAL)
+            with self._cond:
+                if self._closed:
+                    return
+                self._release_stuck()
+                if not self._running:
+                    self._watching.clear()
+
+    def _release_stuck(self) -> None:
+        """
+        Убирает из пула задачи, отменённые более STUCK_TIMEOUT секунд назад,
+        и запускает вместо них новые потоки (под self._cond). Число таких
+        задач ограничено размером пула, чтобы навсегда зависшие вызовы
+        не создавали потоки без предела.
+        """
+        now = time.monotonic()
+        for job in list(self._running):
+            cancelled_at = job.token.cancelled_at
+            if (cancelled_at is None or now - cancelled_at < STUCK_TIMEOUT
+                    or len(self._stuck) >= self.workers):
+                continue
+            logger.warning(f'Job did not stop after cancellation, replacing its worker: {job.name}')
+            self._running.discard(job)
+            self._stuck.add(job)
+            if job.priority > PRIORITY_INTERACTIVE:
+                self._background_running -= 1
+            self._thread_count -= 1
+            if self._queue:
+                self._spawn_worker()
+            self._cond.notify()
+
+
+class PriorityExecutor:
+    """Адаптер планировщика с интерфейсом ThreadPoolExecutor для моделей и кэшей."""
+
+    def __init__(self, scheduler: JobScheduler, priority: int, name: str) -> None:
+        """
+        Инициализация адаптера.
+
+        Args:
+            scheduler: Планировщик
+            priority: Класс приоритета задач
+            name: Название задач
+        """
+        self._scheduler = scheduler
+        self._priority = priority
+        self._name = name
+        self._jobs: Set[Job] = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        """Ставит вызов fn(*args, **kwargs) в очередь планировщика."""
+        # Задачи адаптера не отменяются из окна задач: отмена ожидающей задачи
+        # оставила бы учёт её владельца (модели, кэша) незавершённым
+        job = self._scheduler.submit(lambda job: fn(*args, **kwargs), self._name, self._priority,
+                                     cancellable=False)
+        if self._closed:
+            job.cancel()
+            return job
+        with self._lock:
+            self._jobs.add(job)
+        job.add_done_callback(self._forget)
+        return job
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        """
+        Закрывает адаптер; с cancel_futures отменяет ожидающие задачи.
+        Ожидание (wait) не поддерживается: планировщик не блокирует вызывающего.
+        """
+        self._closed = True
+        if cancel_futures:
+            with self._lock:
+                jobs = list(self._jobs)
+            for job in jobs:
+                job.cancel()
+
+    def _forget(self, job: Job) -> None:
+        """Удаляет завершённую задачу из списка адаптера."""
+        with self._lock:
+            self._jobs.discard(job)
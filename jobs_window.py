@@ -0,0 +1,106 @@
+import time
+from typing import List
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import Qt, QTimer
+
+from jobs import PRIORITY_NAMES, RUNNING, Job, JobScheduler
+
+# Интервал обновления списка задач (мс)
+REFRESH_INTERVAL = 500
+# Столбцы списка задач
+HEADERS = ['Задача', 'Приоритет', 'Состояние', 'Прогресс', 'Время']
+
+
+def format_job_progress(job: Job) -> str:
+    """Форматирует прогресс задачи как «120 из 300» или «120»."""
+    done, total = job.progress
+    if total:
+        return f'{done} из {total}'
+    return str(done) if done else ''
+
+
+def format_job_state(job: Job) -> str:
+    """Состояние задачи для списка: ожидает, выполняется или останавливается после отмены."""
+    if job.state != RUNNING:
+        return 'ожидает'
+    return 'останавливается' if job.token.cancelled else 'выполняется'
+
+
+class JobsWindow(QtWidgets.QWidget):
+    """Окно с выполняемыми и ожидающими фоновыми задачами планировщика."""
+
+    def __init__(self, scheduler: JobScheduler, parent=None) -> None:
+        """
+        Инициализация окна фоновых задач.
+
+        Args:
+            scheduler: Общий планировщик задач
+            parent: Родительский виджет
+        """
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle('Фоновые задачи')
+        self.resize(650, 300)
+        self.scheduler = scheduler
+        self._jobs: List[Job] = []
+
+        self.table = QtWidgets.QTreeWidget(self)
+        self.table.setHeaderLabels(HEADERS)
+        self.table.setRootIsDecorated(False)
+        self.table.setColumnWidth(0, 300)
+        self.table.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+
+        self.btn_cancel = QtWidgets.QPushButton('Отменить', self)
+        self.btn_cancel.clicked.connect(self.cancel_selected)
+        buttons = QtWidgets.QHBoxLayout()
+        buttons.addStretch()
+        buttons.addWidget(self.btn_cancel)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_INTERVAL)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event) -> None:
+        """Список обновляется, только пока окно открыто."""
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event) -> None:
+        """Остановка обновления списка."""
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self) -> None:
+        """Перечитывает список задач планировщика, сохраняя выделение."""
+        selected = {self._jobs[self.table.indexOfTopLevelItem(item)]
+                    for item in self.table.selectedItems()}
+        self._jobs = self.scheduler.jobs()
+        now = time.monotonic()
+        self.table.clear()
+        for job in self._jobs:
+            started = job.started if job.state == RUNNING and job.started else job.submitted
+            item = QtWidgets.QTreeWidgetItem([
+                job.name,
+                PRIORITY_NAMES.get(job.priority, str(job.priority)),
+                format_job_state(job),
+                format_job_progress(job),
+                f'{now - started:.0f} с',
+            ])
+            if not job.cancellable:
+                # Служебные задачи моделей и кэшей отменить нельзя
+                item.setFlags(item.flags() & ~Qt.ItemIsSelectable)
+            self.table.addTopLevelItem(item)
+            item.setSelected(job in selected and job.cancellable)
+        self.btn_cancel.setEnabled(any(job.cancellable for job in self._jobs))
+
+    def cancel_selected(self) -> None:
+        """Отменяет выделенные задачи без ожидания их остановки."""
+        for item in self.table.selectedItems():
+            job = self._jobs[self.table.indexOfTopLevelItem(item)]
+            if job.cancellable:
+                job.cancel()
+        self.refresh()
@@ -0,0 +1,631 @@
+import os
+import stat
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QAbstractItemModel, QDir, QModelIndex, Qt, QTimer, pyqtSignal
+
+from dir_cache import ListingCache, directory_mtime, sort_entries
+from disk_usage import format_size
+from metadata import COLUMN_TITLES
+
+# Количество элементов в одной порции, передаваемой фоновым потоком чтения
+CHUNK_SIZE = 2000
+# Количество строк, добавляемых в модель за один вызов fetchMore
+FETCH_SIZE = 1000
+
+COLUMN_NAME, COLUMN_SIZE, COLUMN_MTIME = range(3)
+HEADERS = ('Имя', 'Размер', 'Изменён')
+
+# Состояние метаданных строки
+STAT_NONE, STAT_REQUESTED, STAT_DONE = 0, 1, 2
+
+
+class _Node:
+    """Загруженный каталог: компактные массивы с данными его элементов."""
+
+    __slots__ = ('path', 'parent', 'row', 'names', 'flags', 'sizes', 'mtimes',
+                 'stat_state', 'visible', 'children', 'listing', 'complete', 'generation')
+
+    def __init__(self, path: str, parent: Optional['_Node'], row: int) -> None:
+        """
+        Инициализация узла.
+
+        Args:
+            path: Путь к каталогу
+            parent: Родительский узел
+            row: Номер строки каталога в родительском узле
+        """
+        self.path = path
+        self.parent = parent
+        self.row = row
+        self.names: List[str] = []
+        # 1 — каталог, 0 — файл
+        self.flags = bytearray()
+        self.sizes = array('q')
+        self.mtimes = array('d')
+        self.stat_state = bytearray()
+        # Сколько первых элементов уже доступно представлению
+        self.visible = 0
+        self.children: Dict[str, '_Node'] = {}
+        self.listing = False
+        self.complete = False
+        # Увеличивается при каждой перестановке, чтобы отбрасывать устаревшие результаты
+        self.generation = 0
+
+    def append(self, entries: List[Tuple[str, bool]]) -> None:
+        """Добавляет прочитанные элементы (имя, является ли каталогом)."""
+        count = len(entries)
+        self.names.extend(name for name, _ in entries)
+        self.flags.extend(1 if is_dir else 0 for _, is_dir in entries)
+        self.sizes.extend([-1] * count)
+        self.mtimes.extend([0.0] * count)
+        self.stat_state.extend(bytes(count))
+
+
+def _list_directory(path: str, show_hidden: bool) -> Iterator[List[Tuple[str, bool]]]:
+    """Возвращает содержимое каталога порциями; последняя порция может быть пустой."""
+    chunk: List[Tuple[str, bool]] = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if not show_hidden and entry.name.startswith('.'):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                chunk.append((entry.name, is_dir))
+                if len(chunk) >= CHUNK_SIZE:
+                    yield chunk
+                    chunk = []
+    except OSError:
+        pass
+    yield chunk
+
+
+def _visible(entries: List[Tuple[str, bool]], show_hidden: bool) -> List[Tuple[str, bool]]:
+    """Отбрасывает скрытые элементы, если они не показываются."""
+    if show_hidden:
+        return entries
+    return [entry for entry in entries if not entry[0].startswith('.')]
+
+
+def _stat_entry(path: str) -> Tuple[int, float]:
+    """Возвращает (размер, время изменения) или (-2, 0) при ошибке."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return -2, 0.0
+    return (st.st_size if not stat.S_ISDIR(st.st_mode) else -2), st.st_mtime
+
+
+def _sort_order(names: List[str], flags: bytearray, column: int,
+                order: int, sizes: Optional[array], mtimes: Optional[array]) -> List[int]:
+    """Вычисляет порядок строк; каталоги всегда идут перед файлами."""
+    descending = order == Qt.DescendingOrder
+    if column == COLUMN_SIZE:
+        values = sizes
+    elif column == COLUMN_MTIME:
+        values = mtimes
+    else:
+        values = [name.casefold() for name in names]
+    rows = sorted(range(len(names)), key=values.__getitem__, reverse=descending)
+    # Устойчивая сортировка сохраняет порядок внутри групп
+    return sorted(rows, key=lambda row: not flags[row])
+
+
+class LazyDirectoryModel(QAbstractItemModel):
+    """
+    Модель файловой системы для каталогов с сотнями тысяч элементов.
+
+    Каталоги читаются в фоновом потоке порциями, а строки становятся
+    видимыми представлению через canFetchMore/fetchMore. Сортировка
+    выполняется в фоне, размеры и время изменения запрашиваются только
+    для отображаемых строк. Интерфейс повторяет используемую часть
+    QFileSystemModel: setRootPath, rootPath, filePath, index(path),
+    setFilter и filter. Если передан кэш содержимого каталогов, ранее
+    прочитанные и не изменившиеся каталоги открываются без чтения с диска.
+    За основными столбцами следуют столбцы свойств файлов (metadata.py),
+    которые заполняются, если задан источник свойств.
+    """
+
+    # Номер первого столбца свойств файлов
+    metadata_column = len(HEADERS)
+
+    # Как и в QFileSystemModel: каталог прочитан полностью
+    directoryLoaded = pyqtSignal(str)
+
+    _chunk_ready = pyqtSignal(object, int, list, bool)
+    _order_ready = pyqtSignal(object, int, object, object, object)
+    _stats_ready = pyqtSignal(object, int, object)
+    _stats_done = pyqtSignal(object, int, object)
+
+    def __init__(self, parent=None, cache: Optional[ListingCache] = None,
+                 executor=None) -> None:
+        """
+        Инициализация модели с пустым корнем.
+
+        Args:
+            parent: Родительский объект Qt
+            cache: Кэш содержимого каталогов
+            executor: Исполнитель фоновых задач (submit/shutdown), например
+                адаптер общего планировщика; по умолчанию — собственный пул
+        """
+        super().__init__(parent)
+        self._cache = cache
+        self._root = _Node('', None, 0)
+        self._filter = QDir.AllEntries | QDir.AllDirs | QDir.NoDotAndDotDot
+        self._sort_column = COLUMN_NAME
+        self._sort_order = Qt.AscendingOrder
+        self._executor = executor or ThreadPoolExecutor(max_workers=2,
+                                                        thread_name_prefix='lazy-model')
+        self._stat_requests: Dict[_Node, List[int]] = {}
+        self._metadata = None
+        self._closed = False
+
+        provider = QtWidgets.QFileIconProvider()
+        self._dir_icon = provider.icon(QtWidgets.QFileIconProvider.Folder)
+        self._file_icon = provider.icon(QtWidgets.QFileIconProvider.File)
+
+        self._chunk_ready.connect(self._on_chunk)
+        self._order_ready.connect(self._on_order)
+        self._stats_ready.connect(self._on_stats)
+        self._stats_done.connect(self._on_stats_done)
+
+    # --- Интерфейс, совместимый с QFileSystemModel ---
+
+    def setRootPath(self, path: str) -> QModelIndex:
+        """
+        Устанавливает корневой каталог и начинает его чтение.
+
+        Args:
+            path: Путь к каталогу
+        """
+        self.beginResetModel()
+        self._root.generation += 1
+        # Пустой путь, как и в QFileSystemModel, означает корень файловой системы
+        self._root = _Node(path or os.sep, None, 0)
+        self.endResetModel()
+        self._start_listing(self._root, synchronous=True)
+        return QModelIndex()
+
+    def rootPath(self) -> str:
+        """Возвращает корневой каталог."""
+        return self._root.path
+
+    def setFilter(self, filters) -> None:
+        """
+        Устанавливает фильтр; учитывается флаг QDir.Hidden.
+
+        Args:
+            filters: Флаги QDir
+        """
+        hidden_changed = bool(filters & QDir.Hidden) != bool(self._filter & QDir.Hidden)
+        self._filter = filters
+        if hidden_changed and self._root.path:
+            self.setRootPath(self._root.path)
+
+    def filter(self):
+        """Возвращает текущий фильтр."""
+        return self._filter
+
+    def filePath(self, index: QModelIndex) -> str:
+        """
+        Возвращает путь элемента.
+
+        Args:
+            index: Индекс элемента; недействительный индекс означает корень
+        """
+        if not index.isValid():
+            return self._root.path
+        node = index.internalPointer()
+        return os.path.join(node.path, node.names[index.row()])
+
+    def isDir(self, index: QModelIndex) -> bool:
+        """Проверяет, является ли элемент каталогом."""
+        if not index.isValid():
+            return True
+        return bool(index.internalPointer().flags[index.row()])
+
+    def set_metadata(self, provider) -> None:
+        """
+        Задаёт источник свойств файлов для дополнительных столбцов.
+
+        Args:
+            provider: metadata_model.MetadataProvider
+        """
+        self._metadata = provider
+        provider.metadata_ready.connect(self._on_metadata)
+
+    def close(self) -> None:
+        """Отменяет ожидающие фоновые задачи модели."""
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Реализация QAbstractItemModel ---
+
+    def index(self, row, column: int = 0, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        """
+        Возвращает индекс по строке и родителю или по пути (как QFileSystemModel).
+
+        Для пути возвращается недействительный индекс, если путь равен корню
+        или соответствующая строка ещё не загружена.
+        """
+        if isinstance(row, str):
+            return self._index_for_path(row, column)
+        node = self._container(parent)
+        if node is None or not 0 <= row < node.visible or not 0 <= column < self.columnCount():
+            return QModelIndex()
+        return self.createIndex(row, column, node)
+
+    def parent(self, index: QModelIndex = QModelIndex()) -> QModelIndex:
+        """Возвращает индекс родительского каталога."""
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalPointer()
+        if node is self._root or node.parent is None:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node.parent)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Количество видимых строк в каталоге."""
+        if parent.column() > 0:
+            return 0
+        node = self._container(parent, create=False)
+        return node.visible if node is not None else 0
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Количество столбцов вместе со столбцами свойств файлов."""
+        return len(HEADERS) + len(COLUMN_TITLES)
+
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        """Каталоги считаются раскрываемыми до их чтения."""
+        if not parent.isValid():
+            return True
+        return parent.column() == 0 and self.isDir(parent)
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        """Проверяет, есть ли ещё строки; при первом обращении начинает чтение каталога."""
+        if parent.isValid() and not self.isDir(parent):
+            return False
+        node = self._container(parent)
+        if node is None:
+            return False
+        if not node.listing and not node.complete:
+            self._start_listing(node)
+        return node.visible < len(node.names) or not node.complete
+
+    def fetchMore(self, parent: QModelIndex) -> None:
+        """Делает видимой следующую порцию уже прочитанных строк."""
+        node = self._container(parent)
+        if node is not None:
+            self._expose(node, parent, FETCH_SIZE)
+
+    def headerData(self, section: int, orientation, role: int = Qt.DisplayRole) -> Any:
+        """Заголовки столбцов."""
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return (HEADERS + COLUMN_TITLES)[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        """
+        Возвращает данные строки. Метаданные для видимых строк запрашиваются
+        в фоне; до их получения ячейки размера и даты пусты.
+        """
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        row, column = index.row(), index.column()
+        is_dir = node.flags[row]
+        if role == Qt.DecorationRole and column == COLUMN_NAME:
+            return self._dir_icon if is_dir else self._file_icon
+        if role != Qt.DisplayRole:
+            return None
+        if column == COLUMN_NAME:
+            return node.names[row]
+        if column >= self.metadata_column:
+            if is_dir or self._metadata is None:
+                return None
+            return self._metadata.value(os.path.join(node.path, node.names[row]),
+                                        column - self.metadata_column)
+        if node.stat_state[row] != STAT_DONE:
+            self._request_stat(node, row)
+            return None
+        if column == COLUMN_SIZE:
+            return '' if is_dir or node.sizes[row] < 0 else format_size(node.sizes[row])
+        return time.strftime('%d.%m.%Y %H:%M', time.localtime(node.mtimes[row]))
+
+    def sort(self, column: int, order=Qt.AscendingOrder) -> None:
+        """
+        Запускает фоновую сортировку всех прочитанных каталогов. По столбцам
+        свойств файлов сортировка идёт по имени: иначе пришлось бы читать все файлы.
+        """
+        if column >= self.metadata_column:
+            column = COLUMN_NAME
+        self._sort_column = column
+        self._sort_order = order
+        for node in self._loaded_nodes():
+            if node.complete:
+                self._start_sort(node)
+
+    # --- Внутренняя реализация ---
+
+    def _container(self, parent: QModelIndex, create: bool = True) -> Optional[_Node]:
+        """Возвращает узел каталога, на который указывает индекс."""
+        if not parent.isValid():
+            return self._root
+        node = parent.internalPointer()
+        row = parent.row()
+        if not node.flags[row]:
+            return None
+        name = node.names[row]
+        child = node.children.get(name)
+        if child is None and create:
+            child = _Node(os.path.join(node.path, name), node, row)
+            node.children[name] = child
+        return child
+
+    def _index_for_path(self, path: str, column: int) -> QModelIndex:
+        """Ищет индекс пути среди уже загруженных строк."""
+        root = self._root.path
+        path = os.path.normpath(path)
+        if not root or path == os.path.normpath(root):
+            return QModelIndex()
+        relative = os.path.relpath(path, root)
+        if relative.startswith(os.pardir):
+            return QModelIndex()
+        node, index = self._root, QModelIndex()
+        for part in relative.split(os.sep):
+            if node is None:
+                return QModelIndex()
+            try:
+                row = node.names.index(part, 0, node.visible)
+            except ValueError:
+                return QModelIndex()
+            index = self.createIndex(row, 0, node)
+            node = node.children.get(part)
+        return index.sibling(index.row(), column) if column else index
+
+    def _submit(self, job: Callable[[], None]) -> Any:
+        """
+        Передаёт задачу фоновому потоку, если модель не закрыта.
+
+        Returns:
+            Будущий результат задачи (add_done_callback) или None
+        """
+        if self._closed:
+            return None
+        return self._executor.submit(job)
+
+    def _index_of_node(self, node: _Node) -> QModelIndex:
+        """Возвращает индекс строки каталога в его родителе."""
+        if node.parent is None:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node.parent)
+
+    def _loaded_nodes(self) -> List[_Node]:
+        """Возвращает все загруженные узлы."""
+        nodes, stack = [], [self._root]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            stack.extend(node.children.values())
+        return nodes
+
+    def _expose(self, node: _Node, parent: QModelIndex, count: int) -> None:
+        """Делает видимыми до count следующих строк узла."""
+        available = min(count, len(node.names) - node.visible)
+        if available <= 0:
+            return
+        self.beginInsertRows(parent, node.visible, node.visible + available - 1)
+        node.visible += available
+        self.endInsertRows()
+
+    def _start_listing(self, node: _Node, synchronous: bool = False) -> None:
+        """
+        Запускает фоновое чтение каталога. Каталог из кэша передаётся
+        модели сразу (synchronous) или при следующей итерации цикла событий.
+        """
+        if not node.path:
+            return
+        node.listing = True
+        show_hidden = bool(self._filter & QDir.Hidden)
+        generation = node.generation
+        presort = self._sort_column == COLUMN_NAME and self._sort_order == Qt.AscendingOrder
+        cache = self._cache
+
+        cached = cache.get(node.path) if cache is not None else None
+        if cached is not None:
+            # Кэш хранит элементы в порядке по умолчанию, поэтому при
+            # сортировке по имени перестановка не понадобится
+            entries = _visible(cached, show_hidden)
+            if synchronous:
+                self._on_chunk(node, generation, entries, True)
+            else:
+                QTimer.singleShot(0, lambda: self._on_chunk(node, generation, entries, True))
+            return
+
+        def job():
+            # Для кэша читаются и скрытые элементы; модели передаются только видимые
+            mtime_ns = directory_mtime(node.path) if cache is not None else None
+            listed: List[Tuple[str, bool]] = []
+            chunks = _list_directory(node.path, show_hidden or cache is not None)
+            previous = next(chunks)
+            single = True
+            for chunk in chunks:
+                if cache is not None:
+                    listed.extend(previous)
+                self._chunk_ready.emit(node, generation, _visible(previous, show_hidden), False)
+                previous = chunk
+                single = False
+            if cache is not None:
+                listed.extend(previous)
+            previous = _visible(previous, show_hidden)
+            if single and presort:
+                # Каталог уместился в одну порцию: сортируем сразу, без перестановки
+                flags = bytearray(1 if is_dir else 0 for _, is_dir in previous)
+                rows = _sort_order([name for name, _ in previous], flags,
+                                   COLUMN_NAME, Qt.AscendingOrder, None, None)
+                previous = [previous[row] for row in rows]
+            self._chunk_ready.emit(node, generation, previous, True)
+            if mtime_ns is not None:
+                cache.put(node.path, mtime_ns, sort_entries(listed))
+
+        self._submit(job)
+
+    def _on_chunk(self, node: _Node, generation: int, entries: list, done: bool) -> None:
+        """Принимает порцию прочитанных элементов в потоке GUI."""
+        if generation != node.generation or not self._is_alive(node):
+            return
+        already_sorted = done and not node.names
+        node.append(entries)
+        if node.visible < FETCH_SIZE:
+            self._expose(node, self._index_of_node(node), FETCH_SIZE - node.visible)
+        if done:
+            node.listing = False
+            node.complete = True
+            self.directoryLoaded.emit(node.path)
+            if not (already_sorted and self._sort_column == COLUMN_NAME
+                    and self._sort_order == Qt.AscendingOrder):
+                self._start_sort(node)
+
+    def _is_alive(self, node: _Node) -> bool:
+        """Проверяет, принадлежит ли узел текущему дереву модели."""
+        while node.parent is not None:
+            if node.parent.children.get(os.path.basename(node.path)) is not node:
+                return False
+            node = node.parent
+        return node is self._root
+
+    def _start_sort(self, node: _Node) -> None:
+        """Запускает фоновую сортировку узла."""
+        names = list(node.names)
+        flags = bytearray(node.flags)
+        column, order = self._sort_column, self._sort_order
+        generation = node.generation
+
+        def job():
+            sizes = mtimes = None
+            if column != COLUMN_NAME:
+                sizes, mtimes = array('q'), array('d')
+                for name in names:
+                    size, mtime = _stat_entry(os.path.join(node.path, name))
+                    sizes.append(size)
+                    mtimes.append(mtime)
+            rows = _sort_order(names, flags, column, order, sizes, mtimes)
+            self._order_ready.emit(node, generation, rows, sizes, mtimes)
+
+        self._submit(job)
+
+    def _on_order(self, node: _Node, generation: int, rows: List[int],
+                  sizes: Optional[array], mtimes: Optional[array]) -> None:
+        """Применяет вычисленный порядок строк как изменение раскладки."""
+        if generation != node.generation or not self._is_alive(node) or len(rows) != len(node.names):
+            return
+        self.layoutAboutToBeChanged.emit()
+        new_row = [0] * len(rows)
+        for new, old in enumerate(rows):
+            new_row[old] = new
+
+        old_indexes = [index for index in self.persistentIndexList()
+                       if index.isValid() and index.internalPointer() is node]
+        new_indexes = []
+        for index in old_indexes:
+            row = new_row[index.row()]
+            new_indexes.append(self.createIndex(row, index.column(), node)
+                               if row < node.visible else QModelIndex())
+
+        node.names = [node.names[row] for row in rows]
+        node.flags = bytearray(node.flags[row] for row in rows)
+        if sizes is not None:
+            node.sizes = array('q', (sizes[row] for row in rows))
+            node.mtimes = array('d', (mtimes[row] for row in rows))
+            node.stat_state = bytearray([STAT_DONE]) * len(rows)
+        else:
+            node.sizes = array('q', (node.sizes[row] for row in rows))
+            node.mtimes = array('d', (node.mtimes[row] for row in rows))
+            # Незавершённые запросы метаданных будут повторены для новых строк
+            node.stat_state = bytearray(
+                STAT_DONE if node.stat_state[row] == STAT_DONE else STAT_NONE for row in rows)
+        for child in node.children.values():
+            child.row = new_row[child.row]
+        node.generation += 1
+
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def _request_stat(self, node: _Node, row: int) -> None:
+        """Ставит строку в очередь на получение метаданных."""
+        if node.stat_state[row] != STAT_NONE:
+            return
+        node.stat_state[row] = STAT_REQUESTED
+        if not self._stat_requests:
+            QTimer.singleShot(0, self._flush_stat_requests)
+        self._stat_requests.setdefault(node, []).append(row)
+
+    def _flush_stat_requests(self) -> None:
+        """Передаёт накопленные запросы метаданных фоновому потоку."""
+        requests, self._stat_requests = self._stat_requests, {}
+        for node, rows in requests.items():
+            items = [(row, os.path.join(node.path, node.names[row])) for row in rows]
+            generation = node.generation
+
+            def job(node=node, items=items, generation=generation):
+                results = [(row,) + _stat_entry(path) for row, path in items]
+                self._stats_ready.emit(node, generation, results)
+
+            future = self._submit(job)
+            if future is not None:
+                # Если задача отменена до выполнения, строки запрашиваются заново
+                future.add_done_callback(
+                    lambda _, node=node, rows=rows, generation=generation:
+                    self._stats_done.emit(node, generation, rows))
+
+    def _on_stats(self, node: _Node, generation: int, results: list) -> None:
+        """Сохраняет полученные метаданные и обновляет ячейки."""
+        if generation != node.generation or not self._is_alive(node):
+            return
+        for row, size, mtime in results:
+            node.sizes[row] = size
+            node.mtimes[row] = mtime
+            node.stat_state[row] = STAT_DONE
+        rows = [row for row, _, _ in results if row < node.visible]
+        if rows:
+            self.dataChanged.emit(self.createIndex(min(rows), COLUMN_SIZE, node),
+                                  self.createIndex(max(rows), COLUMN_MTIME, node))
+
+    def _on_stats_done(self, node: _Node, generation: int, rows: List[int]) -> None:
+        """Возвращает строки, оставшиеся без метаданных после задачи, в исходное состояние."""
+        if generation != node.generation or not self._is_alive(node):
+            return
+        for row in rows:
+            if node.stat_state[row] == STAT_REQUESTED:
+                node.stat_state[row] = STAT_NONE
+
+    def _node_for_path(self, path: str) -> Optional[_Node]:
+        """Возвращает загруженный узел каталога по пути."""
+        root = self._root.path
+        if path == os.path.normpath(root):
+            return self._root
+        relative = os.path.relpath(path, root)
+        if relative.startswith(os.pardir):
+            return None
+        node = self._root
+        for part in relative.split(os.sep):
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def _on_metadata(self, directories: List[str]) -> None:
+        """Обновляет столбцы свойств каталогов, свойства файлов которых получены."""
+        last = self.columnCount() - 1
+        for directory in directories:
+            node = self._node_for_path(directory)
+            if node is not None and node.visible:
+                self.dataChanged.emit(self.createIndex(0, self.metadata_column, node),
+                                      self.createIndex(node.visible - 1, last, node))
@@ -0,0 +1,187 @@
+import atexit
+import copy
+import logging
+import logging.handlers
+import queue
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Формат записей журнала
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Размер файла журнала, после которого он ротируется, и число старых файлов
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+# Максимум записей в очереди; при переполнении новые записи отбрасываются
+QUEUE_SIZE = 10000
+# Не более RATE_LIMIT записей из одного места кода за RATE_INTERVAL секунд
+RATE_LIMIT = 20
+RATE_INTERVAL = 1.0
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Ограничение частоты записей из одного места вызова.
+
+    Записи одного места кода (файл и строка) сверх RATE_LIMIT за
+    RATE_INTERVAL секунд отбрасываются; число отброшенных записей
+    сохраняется в атрибуте suppressed следующей пропущенной записи из
+    того же места (сообщение записи не изменяется: её видят и другие
+    обработчики). Ошибки не ограничиваются.
+    """
+
+    def __init__(self, limit: int = RATE_LIMIT, interval: float = RATE_INTERVAL) -> None:
+        """
+        Инициализация фильтра.
+
+        Args:
+            limit: Сколько записей из одного места пропускается за интервал
+            interval: Длина интервала в секундах
+        """
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._lock = threading.Lock()
+        # Место вызова -> [начало интервала, записей в интервале, отброшено]
+        self._sites: Dict[Tuple[str, int], List[float]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Решает, пропустить ли запись."""
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.pathname, record.lineno)
+        now = record.created
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                self._sites[key] = [now, 1, 0]
+                return True
+            if now - site[0] >= self.interval:
+                site[0], site[1] = now, 0
+            site[1] += 1
+            if site[1] > self.limit:
+                site[2] += 1
+                return False
+            suppressed, site[2] = int(site[2]), 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def pending(self) -> int:
+        """Возвращает число отброшенных записей, о которых ещё не сообщено."""
+        with self._lock:
+            return int(sum(site[2] for site in self._sites.values()))
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Обработчик, помещающий записи в очередь и никогда не ожидающий места в ней."""
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        """
+        Инициализация обработчика.
+
+        Args:
+            log_queue: Ограниченная очередь записей
+        """
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Готовит запись к передаче в другой поток.
+
+        В отличие от QueueHandler, здесь не выполняется форматирование
+        (время, уровень): оно происходит в фоновом потоке записи. К
+        сообщению копии добавляется число записей, отброшенных RateLimitFilter.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            record.msg = f'{record.msg} (+{suppressed} similar messages suppressed)'
+            del record.suppressed
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Помещает запись в очередь; при переполнении запись отбрасывается."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(path: str = 'explorer.log', level: int = logging.INFO,
+                  max_bytes: int = MAX_BYTES, backup_count: int = BACKUP_COUNT,
+                  console: bool = True) -> logging.handlers.QueueListener:
+    """
+    Настраивает асинхронное журналирование.
+
+    Корневой логгер получает единственный обработчик, который помещает
+    записи в очередь. Фоновый поток QueueListener записывает их в файл
+    с ротацией по размеру и в консоль. Повторный вызов заменяет прежнюю
+    настройку.
+
+    Args:
+        path: Путь к файлу журнала
+        level: Уровень корневого логгера
+        max_bytes: Размер файла, после которого он ротируется
+        backup_count: Количество сохраняемых старых файлов
+        console: Дублировать записи в stderr
+
+    Returns:
+        Запущенный поток записи
+    """
+    global _listener
+    stop_logging()
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers: List[logging.Handler] = [logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)]
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(QUEUE_SIZE))
+    queue_handler.addFilter(RateLimitFilter())
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers,
+                                               respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Дописывает оставшиеся записи и останавливает поток записи."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    root = logging.getLogger()
+    for handler in [h for h in root.handlers if isinstance(h, NonBlockingQueueHandler)]:
+        root.removeHandler(handler)
+        limiter = next((f for f in handler.filters if isinstance(f, RateLimitFilter)), None)
+        suppressed = limiter.pending() if limiter else 0
+        if suppressed or handler.dropped:
+            record = logging.LogRecord(
+                'FileExplorer.log', logging.WARNING, __file__, 0,
+                f'{suppressed} messages suppressed by rate limit, '
+                f'{handler.dropped} dropped on queue overflow', None, None)
+            try:
+                handler.queue.put_nowait(record)
+            except queue.Full:
+                pass
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,423 @@
+"""
+Определение типа файла по содержимому и дополнительные свойства файлов.
+
+Тип (MIME) определяется по сигнатуре в начале файла, для текстовых
+файлов считается число строк, для изображений — размеры по заголовку
+без декодирования. Результаты хранятся в постоянном кэше по
+(устройство, inode, размер, mtime), поэтому неизменённые файлы
+повторно не читаются и после перезапуска.
+"""
+import codecs
+import logging
+import os
+import sqlite3
+import stat
+import struct
+from contextlib import closing
+from typing import BinaryIO, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from cache_dir import cache_path
+
+logger = logging.getLogger('FileExplorer.metadata')
+
+# Сколько байт начала файла читается для определения типа
+HEADER_SIZE = 4096
+# Строки считаются только в текстовых файлах не больше этого размера
+LINE_COUNT_LIMIT = 64 * 1024 * 1024
+# Размер блока при подсчёте строк
+READ_SIZE = 1024 * 1024
+# Сколько байт JPEG просматривается в поисках заголовка кадра
+JPEG_SCAN_LIMIT = 1024 * 1024
+# Заголовки дополнительных столбцов дерева
+COLUMN_TITLES = ('Тип содержимого', 'Строк', 'Изображение')
+COLUMN_MIME, COLUMN_LINES, COLUMN_IMAGE = range(3)
+
+# (устройство, inode, размер, mtime в наносекундах)
+FileKey = Tuple[int, int, int, int]
+
+# Сигнатуры: (смещение, байты, тип)
+_SIGNATURES = (
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (0, b'II*\x00', 'image/tiff'),
+    (0, b'MM\x00*', 'image/tiff'),
+    (0, b'\x00\x00\x01\x00', 'image/x-icon'),
+    (0, b'%PDF-', 'application/pdf'),
+    (0, b'%!PS', 'application/postscript'),
+    (0, b'PK\x03\x04', 'application/zip'),
+    (0, b'PK\x05\x06', 'application/zip'),
+    (0, b'\x1f\x8b', 'application/gzip'),
+    (0, b'BZh', 'application/x-bzip2'),
+    (0, b'\xfd7zXZ\x00', 'application/x-xz'),
+    (0, b'(\xb5/\xfd', 'application/zstd'),
+    (0, b"7z\xbc\xaf'\x1c", 'application/x-7z-compressed'),
+    (0, b'Rar!\x1a\x07', 'application/vnd.rar'),
+    (257, b'ustar', 'application/x-tar'),
+    (0, b'\x7fELF', 'application/x-executable'),
+    (0, b'\xcf\xfa\xed\xfe', 'application/x-mach-binary'),
+    (0, b'\xfe\xed\xfa\xcf', 'application/x-mach-binary'),
+    (0, b'\xca\xfe\xba\xbe', 'application/java-vm'),
+    (0, b'MZ', 'application/x-msdownload'),
+    (0, b'\x00asm', 'application/wasm'),
+    (0, b'SQLite format 3\x00', 'application/vnd.sqlite3'),
+    (0, b'OggS', 'audio/ogg'),
+    (0, b'fLaC', 'audio/flac'),
+    (0, b'ID3', 'audio/mpeg'),
+    (0, b'\x1aE\xdf\xa3', 'video/x-matroska'),
+)
+# Подтипы контейнера RIFF по байтам 8–12
+_RIFF_TYPES = {b'WEBP': 'image/webp', b'WAVE': 'audio/wav', b'AVI ': 'video/x-msvideo'}
+# Текстовые форматы по началу содержимого (без учёта регистра)
+_TEXT_PREFIXES = (
+    (b'<?xml', 'text/xml'),
+    (b'<!doctype html', 'text/html'),
+    (b'<html', 'text/html'),
+    (b'<svg', 'image/svg+xml'),
+    (b'#!', 'text/x-script'),
+    (b'{\\rtf', 'text/rtf'),
+)
+# Маркеры начала кадра JPEG, в которых записаны размеры
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+class FileMetadata(NamedTuple):
+    """Свойства файла; None — свойство неизвестно или неприменимо."""
+
+    mime: str
+    lines: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+def file_key(st: os.stat_result) -> FileKey:
+    """Ключ кэша для результата stat."""
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _is_text(header: bytes) -> bool:
+    """Похоже ли начало файла на текст в UTF-8 (или с меткой UTF-16)."""
+    if header.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return True
+    if b'\x00' in header:
+        return False
+    try:
+        # Обрезанный на границе блока символ ошибкой не считается
+        codecs.getincrementaldecoder('utf-8')().decode(header, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def detect_mime(header: bytes) -> str:
+    """
+    Определяет тип содержимого по началу файла.
+
+    Args:
+        header: Первые байты файла (до HEADER_SIZE)
+
+    Returns:
+        Тип MIME; для нераспознанных двоичных данных — application/octet-stream
+    """
+    if not header:
+        return 'inode/x-empty'
+    for offset, signature, mime in _SIGNATURES:
+        if header.startswith(signature, offset):
+            return mime
+    if header.startswith(b'RIFF') and header[8:12] in _RIFF_TYPES:
+        return _RIFF_TYPES[header[8:12]]
+    if header[4:8] == b'ftyp':
+        brand = header[8:12]
+        if brand in (b'heic', b'heix', b'mif1'):
+            return 'image/heic'
+        if brand == b'avif':
+            return 'image/avif'
+        return 'video/quicktime' if brand == b'qt  ' else 'video/mp4'
+    if header.startswith(b'BM') and len(header) >= 26:
+        return 'image/bmp'
+    if _is_text(header):
+        start = header.lstrip(codecs.BOM_UTF8).lstrip()[:16].lower()
+        for prefix, mime in _TEXT_PREFIXES:
+            if start.startswith(prefix):
+                return mime
+        return 'text/plain'
+    return 'application/octet-stream'
+
+
+def _webp_size(header: bytes) -> Optional[Tuple[int, int]]:
+    """Размеры WebP по первому фрагменту (VP8, VP8L или VP8X)."""
+    chunk = header[12:16]
+    if chunk == b'VP8 ' and len(header) >= 30:
+        width, height = struct.unpack('<HH', header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and len(header) >= 25:
+        bits = int.from_bytes(header[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X' and len(header) >= 30:
+        return (int.from_bytes(header[24:27], 'little') + 1,
+                int.from_bytes(header[27:30], 'little') + 1)
+    return None
+
+
+def _jpeg_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    """Размеры JPEG из заголовка кадра; сегменты пропускаются без чтения."""
+    f.seek(2)
+    while f.tell() < JPEG_SCAN_LIMIT:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        # Байты заполнения 0xFF перед маркером
+        while marker[1] == 0xFF:
+            marker = marker[1:] + f.read(1)
+            if len(marker) < 2:
+                return None
+        code = marker[1]
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            continue
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        size = struct.unpack('>H', length)[0]
+        if code in _JPEG_SOF:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+        if size < 2:
+            return None
+        f.seek(size - 2, os.SEEK_CUR)
+    return None
+
+
+def image_size(mime: str, header: bytes, f: BinaryIO) -> Optional[Tuple[int, int]]:
+    """
+    Определяет размеры изображения по заголовку без декодирования.
+
+    Args:
+        mime: Тип содержимого
+        header: Первые байты файла
+        f: Открытый файл (нужен для JPEG, где заголовок кадра может быть далеко)
+
+    Returns:
+        (ширина, высота) или None, если формат не поддерживается
+    """
+    if mime == 'image/png' and len(header) >= 24 and header[12:16] == b'IHDR':
+        return struct.unpack('>II', header[16:24])
+    if mime == 'image/gif' and len(header) >= 10:
+        return struct.unpack('<HH', header[6:10])
+    if mime == 'image/bmp':
+        header_size = struct.unpack('<I', header[14:18])[0]
+        if header_size == 12:
+            return struct.unpack('<HH', header[18:22])
+        width, height = struct.unpack('<ii', header[18:26])
+        return width, abs(height)
+    if mime == 'image/webp':
+        return _webp_size(header)
+    if mime == 'image/jpeg':
+        return _jpeg_size(f)
+    return None
+
+
+def count_lines(f: BinaryIO, size: int) -> int:
+    """Считает строки; последняя строка без перевода строки тоже учитывается."""
+    f.seek(0)
+    lines = 0
+    last = b''
+    for block in iter(lambda: f.read(READ_SIZE), b''):
+        lines += block.count(b'\n')
+        last = block
+    if size and not last.endswith(b'\n'):
+        lines += 1
+    return lines
+
+
+def read_metadata(path: str, size: int) -> Optional[FileMetadata]:
+    """
+    Читает свойства файла: тип, число строк текста, размеры изображения.
+
+    Args:
+        path: Путь к обычному файлу
+        size: Размер файла
+
+    Returns:
+        Свойства или None при ошибке чтения
+    """
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+            mime = detect_mime(header)
+            lines = width = height = None
+            if mime.startswith('text/') and size <= LINE_COUNT_LIMIT:
+                lines = count_lines(f, size)
+            elif mime.startswith('image/'):
+                dimensions = image_size(mime, header, f)
+                if dimensions is not None:
+                    width, height = dimensions
+    except (OSError, struct.error) as e:
+        logger.debug(f'Cannot read metadata of {path}: {e}')
+        return None
+    return FileMetadata(mime, lines, width, height)
+
+
+def format_value(metadata: Optional[FileMetadata], column: int) -> str:
+    """
+    Текст ячейки дополнительного столбца.
+
+    Args:
+        metadata: Свойства файла; None — не удалось прочитать
+        column: Номер столбца (COLUMN_*)
+    """
+    if metadata is None:
+        return ''
+    if column == COLUMN_MIME:
+        return metadata.mime
+    if column == COLUMN_LINES:
+        return str(metadata.lines) if metadata.lines is not None else ''
+    if metadata.width is not None:
+        return f'{metadata.width}×{metadata.height}'
+    return ''
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    mime TEXT NOT NULL,
+    lines INTEGER,
+    width INTEGER,
+    height INTEGER,
+    PRIMARY KEY (dev, ino)
+) WITHOUT ROWID;
+"""
+
+
+class MetadataCache:
+    """Постоянный кэш свойств файлов, действительный, пока не изменились размер и mtime."""
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        """
+        Инициализация кэша. База данных создаётся при первом обращении.
+
+        Args:
+            db_path: Путь к файлу базы SQLite; по умолчанию metadata.sqlite3 в каталоге кэша
+        """
+        self.db_path = db_path or cache_path('metadata.sqlite3')
+
+    def _connect(self) -> sqlite3.Connection:
+        """Открывает соединение с базой и создаёт схему при необходимости."""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def lookup(self, keys: Iterable[FileKey]) -> Dict[FileKey, FileMetadata]:
+        """
+        Возвращает известные свойства файлов.
+
+        Args:
+            keys: Ключи файлов
+
+        Returns:
+            Словарь ключ -> свойства для актуальных записей
+        """
+        found = {}
+        with closing(self._connect()) as conn:
+            for key in keys:
+                row = conn.execute(
+                    'SELECT mime, lines, width, height FROM metadata '
+                    'WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ?', key
+                ).fetchone()
+                if row is not None:
+                    found[key] = FileMetadata(*row)
+        return found
+
+    def store(self, rows: Iterable[Tuple[FileKey, FileMetadata]]) -> None:
+        """
+        Сохраняет свойства файлов, заменяя устаревшие записи.
+
+        Args:
+            rows: Пары (ключ, свойства)
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO metadata '
+                '(dev, ino, size, mtime_ns, mime, lines, width, height) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key + tuple(metadata) for key, metadata in rows)
+            )
+
+
+def collect_metadata(paths: List[str], cache: Optional[MetadataCache] = None,
+                     should_stop: Optional[Callable[[], bool]] = None
+                     ) -> List[Tuple[str, Optional[FileMetadata]]]:
+    """
+    Возвращает свойства пачки файлов, читая только файлы, которых нет в кэше.
+
+    Args:
+        paths: Пути к файлам
+        cache: Постоянный кэш свойств; None отключает кэширование
+        should_stop: Функция, возвращающая True для досрочной остановки
+
+    Returns:
+        Пары (путь, свойства); для каталогов, недоступных и непрочитанных
+        файлов свойства равны None. При остановке список может быть неполным
+    """
+    return [(path, metadata) for path, _, metadata in collect_keyed_metadata(
+        paths, cache, should_stop)]
+
+
+def collect_keyed_metadata(paths: List[str], cache: Optional[MetadataCache] = None,
+                           should_stop: Optional[Callable[[], bool]] = None
+                           ) -> List[Tuple[str, Optional[FileKey], Optional[FileMetadata]]]:
+    """
+    То же, что collect_metadata, но с ключом файла, по которому получены свойства.
+
+    Ключ позволяет позже проверить, что файл не изменился. Для каталогов
+    и недоступных файлов ключ равен None.
+
+    Returns:
+        Тройки (путь, ключ, свойства)
+    """
+    keys: Dict[str, FileKey] = {}
+    results: List[Tuple[str, Optional[FileKey], Optional[FileMetadata]]] = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            results.append((path, None, None))
+            continue
+        if stat.S_ISREG(st.st_mode):
+            keys[path] = file_key(st)
+        else:
+            results.append((path, None, None))
+    known: Dict[FileKey, FileMetadata] = {}
+    if cache is not None and keys:
+        try:
+            known = cache.lookup(keys.values())
+        except sqlite3.Error as e:
+            logger.warning(f'Metadata cache unavailable: {e}')
+            cache = None
+    computed: List[Tuple[FileKey, FileMetadata]] = []
+    for path, key in keys.items():
+        metadata = known.get(key)
+        if metadata is None:
+            if should_stop is not None and should_stop():
+                break
+            metadata = read_metadata(path, key[2])
+            if metadata is not None:
+                computed.append((key, metadata))
+        results.append((path, key, metadata))
+    if cache is not None and computed:
+        try:
+            cache.store(computed)
+        except sqlite3.Error as e:
+            logger.warning(f'Cannot update metadata cache: {e}')
+    return results
@@ -0,0 +1,198 @@
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Set, Tuple
+
+from PyQt5.QtCore import QModelIndex, QObject, Qt, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QFileSystemModel
+
+from metadata import (COLUMN_TITLES, FileKey, FileMetadata, MetadataCache, collect_keyed_metadata,
+                      format_value)
+
+# Сколько файлов передаётся в одной фоновой задаче
+BATCH_FILES = 32
+# Сколько результатов хранится в памяти
+MEMORY_SIZE = 100000
+# Через сколько секунд показанные свойства перепроверяются по ключу файла
+REVALIDATE_INTERVAL = 5.0
+
+
+class MetadataProvider(QObject):
+    """
+    Свойства файлов для дополнительных столбцов дерева.
+
+    Модели запрашивают свойства только для отображаемых строк; запросы
+    накапливаются до следующей итерации цикла событий и передаются
+    фоновым задачам пачками, поэтому прокрутка не читает файлы в потоке
+    интерфейса. Результаты запоминаются в памяти и в постоянном кэше.
+
+    Запомненные свойства хранятся вместе с ключом файла (устройство, inode,
+    размер, mtime). Показанные свойства, проверенные более
+    REVALIDATE_INTERVAL секунд назад, запрашиваются в фоне снова (для
+    неизменённого файла это stat и поиск в кэше); до ответа показывается
+    прежнее значение, а модели обновляются, только если ключ изменился.
+    """
+
+    # Получены свойства файлов из этих каталогов
+    metadata_ready = pyqtSignal(list)
+
+    _batch_ready = pyqtSignal(list)
+    _batch_done = pyqtSignal(list)
+
+    def __init__(self, cache: Optional[MetadataCache] = None, executor=None,
+                 parent=None) -> None:
+        """
+        Инициализация.
+
+        Args:
+            cache: Постоянный кэш свойств; None отключает кэширование
+            executor: Исполнитель фоновых задач (submit/shutdown);
+                по умолчанию — собственный пул
+            parent: Родительский объект Qt
+        """
+        super().__init__(parent)
+        self._cache = cache
+        self._executor = executor or ThreadPoolExecutor(max_workers=2,
+                                                        thread_name_prefix='metadata')
+        # Путь -> (ключ файла, свойства, время проверки по time.monotonic)
+        self._known: 'OrderedDict[str, Tuple[Optional[FileKey], Optional[FileMetadata], float]]' = \
+            OrderedDict()
+        self._requested: Set[str] = set()
+        self._queue: List[str] = []
+        self._closed = False
+        self._batch_ready.connect(self._on_batch)
+        self._batch_done.connect(self._on_batch_done)
+
+    def value(self, path: str, column: int) -> Optional[str]:
+        """
+        Текст ячейки или None, если свойства ещё не получены (тогда они запрашиваются).
+
+        Args:
+            path: Путь к файлу
+            column: Номер дополнительного столбца (metadata.COLUMN_*)
+        """
+        known = self._known.get(path)
+        if known is not None:
+            self._known.move_to_end(path)
+            if time.monotonic() - known[2] >= REVALIDATE_INTERVAL:
+                self._request(path)
+            return format_value(known[1], column)
+        self._request(path)
+        return None
+
+    def _request(self, path: str) -> None:
+        """Ставит файл в очередь фоновых запросов, если он ещё не запрошен."""
+        if path not in self._requested and not self._closed:
+            self._requested.add(path)
+            if not self._queue:
+                QTimer.singleShot(0, self._flush)
+            self._queue.append(path)
+
+    def invalidate(self, directories: Set[str]) -> None:
+        """
+        Забывает запомненные свойства файлов в каталогах (после их изменения).
+
+        Args:
+            directories: Нормализованные пути каталогов
+        """
+        for path in [path for path in self._known if os.path.dirname(path) in directories]:
+            del self._known[path]
+
+    def close(self) -> None:
+        """Отменяет ожидающие запросы."""
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _flush(self) -> None:
+        """Передаёт накопленные запросы фоновым задачам."""
+        queue, self._queue = self._queue, []
+        if self._closed:
+            return
+        for start in range(0, len(queue), BATCH_FILES):
+            batch = queue[start:start + BATCH_FILES]
+            future = self._executor.submit(lambda batch=batch: self._batch_ready.emit(
+                collect_keyed_metadata(batch, self._cache, lambda: self._closed)))
+            future.add_done_callback(lambda _, batch=batch: self._batch_done.emit(batch))
+
+    def _on_batch(self, results: list) -> None:
+        """
+        Запоминает полученные свойства и сообщает моделям о каталогах,
+        в которых они появились или изменились.
+        """
+        directories = set()
+        now = time.monotonic()
+        for path, key, metadata in results:
+            self._requested.discard(path)
+            previous = self._known.get(path)
+            self._known[path] = (key, metadata, now)
+            self._known.move_to_end(path)
+            if previous is None or previous[0] != key or previous[1] != metadata:
+                directories.add(os.path.dirname(path))
+        while len(self._known) > MEMORY_SIZE:
+            self._known.popitem(last=False)
+        if directories:
+            self.metadata_ready.emit(sorted(directories))
+
+    def _on_batch_done(self, batch: List[str]) -> None:
+        """
+        Снимает отметку запроса с файлов пачки, свойства которых не получены
+        (задача отменена или прервана): при следующем показе они запрашиваются снова.
+        """
+        self._requested.difference_update(batch)
+
+
+class MetadataFileSystemModel(QFileSystemModel):
+    """QFileSystemModel с дополнительными столбцами свойств файлов (тип, строки, размеры)."""
+
+    # Номер первого дополнительного столбца
+    metadata_column = 4
+
+    def __init__(self, parent=None) -> None:
+        """Инициализация модели; свойства не показываются, пока не задан источник."""
+        super().__init__(parent)
+        self._metadata: Optional[MetadataProvider] = None
+
+    def set_metadata(self, provider: MetadataProvider) -> None:
+        """
+        Задаёт источник свойств файлов.
+
+        Args:
+            provider: Источник свойств
+        """
+        self._metadata = provider
+        provider.metadata_ready.connect(self._on_metadata)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Количество столбцов вместе с дополнительными."""
+        count = super().columnCount(parent)
+        return count + len(COLUMN_TITLES) if count else 0
+
+    def headerData(self, section: int, orientation, role: int = Qt.DisplayRole) -> Any:
+        """Заголовки столбцов."""
+        if section >= self.metadata_column and orientation == Qt.Horizontal:
+            return COLUMN_TITLES[section - self.metadata_column] if role == Qt.DisplayRole else None
+        return super().headerData(section, orientation, role)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        """Данные строки; свойства файлов запрашиваются в фоне при первом показе."""
+        if index.column() < self.metadata_column:
+            return super().data(index, role)
+        if role != Qt.DisplayRole or self._metadata is None or self.isDir(index):
+            return None
+        return self._metadata.value(self.filePath(index), index.column() - self.metadata_column)
+
+    def sort(self, column: int, order=Qt.AscendingOrder) -> None:
+        """Сортировка по дополнительным столбцам не поддерживается: она прочитала бы все файлы."""
+        if column < self.metadata_column:
+            super().sort(column, order)
+
+    def _on_metadata(self, directories: List[str]) -> None:
+        """Обновляет дополнительные столбцы каталогов, свойства файлов которых получены."""
+        last = self.metadata_column + len(COLUMN_TITLES) - 1
+        for directory in directories:
+            parent = self.index(directory)
+            rows = self.rowCount(parent) if parent.isValid() else 0
+            if rows:
+                self.dataChanged.emit(self.index(0, self.metadata_column, parent),
+                                      self.index(rows - 1, last, parent))
@@ -0,0 +1,263 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from PyQt5.QtCore import QObject, QTimer
+
+logger = logging.getLogger('FileExplorer.perf')
+
+# Сколько последних событий хранится для экспорта трассы
+TRACE_LIMIT = 20000
+# Интервал проверки отзывчивости цикла событий в миллисекундах
+STALL_CHECK_INTERVAL = 50
+# Задержка цикла событий (в секундах), считающаяся зависанием интерфейса
+STALL_THRESHOLD = 0.1
+
+_NULL_SPAN = nullcontext()
+
+
+class Metric:
+    """Накопленная статистика по одной измеряемой операции."""
+
+    __slots__ = ('count', 'total', 'min', 'max', 'last')
+
+    def __init__(self) -> None:
+        """Инициализация пустой статистики."""
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, duration: float) -> None:
+        """Учитывает одно измерение длительностью duration секунд."""
+        self.count += 1
+        self.total += duration
+        self.last = duration
+        if duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+
+    def as_dict(self) -> Dict[str, float]:
+        """Возвращает статистику в миллисекундах."""
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1000,
+            'avg_ms': self.total * 1000 / self.count if self.count else 0.0,
+            'min_ms': self.min * 1000 if self.count else 0.0,
+            'max_ms': self.max * 1000,
+            'last_ms': self.last * 1000,
+        }
+
+
+class Profiler:
+    """
+    Сбор времени выполнения горячих участков, счётчиков и трассы событий.
+
+    Пока сбор выключен, span() возвращает общий пустой контекст, а
+    record() и count() сразу возвращаются, поэтому инструментирование
+    практически ничего не стоит.
+    """
+
+    def __init__(self) -> None:
+        """Инициализация выключенного профилировщика."""
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self.metrics: Dict[str, Metric] = {}
+        self.counters: Dict[str, float] = {}
+        # Последние значения дополнительных полей по имени операции
+        self.details: Dict[str, Dict[str, Any]] = {}
+        self.events: Deque[tuple] = deque(maxlen=TRACE_LIMIT)
+
+    def enable(self, enabled: bool = True) -> None:
+        """
+        Включает или выключает сбор.
+
+        Args:
+            enabled: True — собирать статистику
+        """
+        self.enabled = enabled
+        logger.info(f'Profiling {"enabled" if enabled else "disabled"}')
+
+    def reset(self) -> None:
+        """Удаляет собранные данные."""
+        with self._lock:
+            self.metrics.clear()
+            self.counters.clear()
+            self.details.clear()
+            self.events.clear()
+            self._origin = time.perf_counter()
+
+    def span(self, name: str, **fields: Any):
+        """
+        Возвращает контекст, измеряющий время выполнения блока.
+
+        Args:
+            name: Имя операции, например 'navigation.change_root'
+            fields: Дополнительные поля события трассы
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, fields)
+
+    @contextmanager
+    def _span(self, name: str, fields: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Измеряет блок; поля можно дополнить внутри блока."""
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            self.record(name, time.perf_counter() - start, start, **fields)
+
+    def record(self, name: str, duration: float, start: Optional[float] = None,
+               **fields: Any) -> None:
+        """
+        Учитывает измерение, выполненное вызывающим кодом.
+
+        Args:
+            name: Имя операции
+            duration: Длительность в секундах
+            start: Момент начала по time.perf_counter(); по умолчанию сейчас минус duration
+            fields: Дополнительные поля (сохраняются как последние значения операции)
+        """
+        if not self.enabled:
+            return
+        if start is None:
+            start = time.perf_counter() - duration
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = Metric()
+            metric.add(duration)
+            if fields:
+                self.details[name] = fields
+            self.events.append((name, start, duration, threading.get_ident(), fields))
+
+    def count(self, name: str, value: float = 1) -> None:
+        """
+        Увеличивает счётчик.
+
+        Args:
+            name: Имя счётчика
+            value: Прибавляемое значение
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Возвращает собранные данные в виде словаря для отображения и экспорта."""
+        with self._lock:
+            return {
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'metrics': {name: metric.as_dict() for name, metric in sorted(self.metrics.items())},
+                'details': {name: dict(fields) for name, fields in sorted(self.details.items())},
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+    def export_json(self, path: str) -> None:
+        """
+        Записывает сводную статистику в JSON.
+
+        Args:
+            path: Путь к файлу
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False, default=str)
+
+    def export_trace(self, path: str) -> None:
+        """
+        Записывает события в формате Trace Event (chrome://tracing, Perfetto).
+
+        Args:
+            path: Путь к файлу
+        """
+        pid = os.getpid()
+        with self._lock:
+            events = [{
+                'name': name,
+                'cat': name.split('.', 1)[0],
+                'ph': 'X',
+                'ts': (start - self._origin) * 1e6,
+                'dur': duration * 1e6,
+                'pid': pid,
+                'tid': tid,
+                'args': fields,
+            } for name, start, duration, tid, fields in self.events]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f,
+                      ensure_ascii=False, default=str)
+
+
+# Общий профилировщик приложения
+profiler = Profiler()
+
+
+class StallMonitor(QObject):
+    """
+    Обнаружение зависаний цикла событий GUI.
+
+    Таймер срабатывает каждые STALL_CHECK_INTERVAL мс; если очередное
+    срабатывание опоздало больше чем на STALL_THRESHOLD, зависание
+    записывается как операция 'gui.stall'.
+    """
+
+    def __init__(self, profiler: Profiler = profiler, parent=None) -> None:
+        """
+        Инициализация монитора.
+
+        Args:
+            profiler: Профилировщик для записи зависаний
+            parent: Родительский объект Qt
+        """
+        super().__init__(parent)
+        self.profiler = profiler
+        self._timer = QTimer(self)
+        self._timer.setInterval(STALL_CHECK_INTERVAL)
+        self._timer.timeout.connect(self._check)
+        self._last = 0.0
+
+    def start(self) -> None:
+        """Запускает проверку."""
+        self._last = time.perf_counter()
+        self._timer.start()
+
+    def stop(self) -> None:
+        """Останавливает проверку."""
+        self._timer.stop()
+
+    def _check(self) -> None:
+        """Сравнивает фактический интервал срабатывания с ожидаемым."""
+        now = time.perf_counter()
+        lag = now - self._last - STALL_CHECK_INTERVAL / 1000
+        self._last = now
+        if lag > STALL_THRESHOLD:
+            self.profiler.record('gui.stall', lag, now - lag)
+            logger.debug(f'Event loop stalled for {lag * 1000:.0f} ms')
+
+
+def summary_rows(snapshot: Dict[str, Any]) -> List[tuple]:
+    """
+    Превращает снимок статистики в строки таблицы.
+
+    Args:
+        snapshot: Результат Profiler.snapshot()
+
+    Returns:
+        Кортежи (имя, вызовов, среднее мс, максимум мс, последнее мс, подробности)
+    """
+    rows = []
+    for name, metric in snapshot['metrics'].items():
+        details = ', '.join(f'{key}={value:.0f}' if isinstance(value, float) else f'{key}={value}'
+                            for key, value in snapshot['details'].get(name, {}).items())
+        rows.append((name, metric['count'], metric['avg_ms'], metric['max_ms'],
+                     metric['last_ms'], details))
+    return rows
@@ -0,0 +1,103 @@
+from PyQt5 import QtGui, QtWidgets
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+
+from perf import Profiler, summary_rows
+
+# Интервал обновления панели в миллисекундах
+REFRESH_INTERVAL = 1000
+
+
+class PerfPanel(QtWidgets.QWidget):
+    """Окно со статистикой производительности и её экспортом."""
+
+    enabled_changed = pyqtSignal(bool)
+
+    def __init__(self, profiler: Profiler, parent=None) -> None:
+        """
+        Инициализация панели.
+
+        Args:
+            profiler: Профилировщик, данные которого отображаются
+            parent: Родительский виджет
+        """
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle('Производительность')
+        self.resize(750, 400)
+        self.profiler = profiler
+
+        self.model = QtGui.QStandardItemModel(0, 6, self)
+        self.model.setHorizontalHeaderLabels(
+            ['Операция', 'Вызовов', 'Среднее, мс', 'Макс., мс', 'Последнее, мс', 'Подробности'])
+        self.view = QtWidgets.QTreeView(self)
+        self.view.setRootIsDecorated(False)
+        self.view.setUniformRowHeights(True)
+        self.view.setModel(self.model)
+        self.view.setColumnWidth(0, 200)
+
+        self.check_enabled = QtWidgets.QCheckBox('Собирать статистику', self)
+        self.check_enabled.setChecked(profiler.enabled)
+        self.check_enabled.toggled.connect(self.enabled_changed)
+        self.btn_json = QtWidgets.QPushButton('Экспорт JSON...', self)
+        self.btn_json.clicked.connect(lambda: self._export(self.profiler.export_json, 'JSON (*.json)'))
+        self.btn_trace = QtWidgets.QPushButton('Экспорт трассы...', self)
+        self.btn_trace.clicked.connect(
+            lambda: self._export(self.profiler.export_trace, 'Trace Event (*.json)'))
+        self.btn_reset = QtWidgets.QPushButton('Сбросить', self)
+        self.btn_reset.clicked.connect(self._reset)
+        self.counters = QtWidgets.QLabel(self)
+        self.counters.setWordWrap(True)
+
+        buttons = QtWidgets.QHBoxLayout()
+        buttons.addWidget(self.check_enabled)
+        buttons.addStretch()
+        buttons.addWidget(self.btn_json)
+        buttons.addWidget(self.btn_trace)
+        buttons.addWidget(self.btn_reset)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(buttons)
+        layout.addWidget(self.view)
+        layout.addWidget(self.counters)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(REFRESH_INTERVAL)
+        self._timer.timeout.connect(self.refresh)
+
+    def refresh(self) -> None:
+        """Перечитывает статистику профилировщика."""
+        snapshot = self.profiler.snapshot()
+        self.model.removeRows(0, self.model.rowCount())
+        for name, count, avg, peak, last, details in summary_rows(snapshot):
+            row = [QtGui.QStandardItem(name), QtGui.QStandardItem(str(count)),
+                   QtGui.QStandardItem(f'{avg:.2f}'), QtGui.QStandardItem(f'{peak:.2f}'),
+                   QtGui.QStandardItem(f'{last:.2f}'), QtGui.QStandardItem(details)]
+            for item in row:
+                item.setEditable(False)
+            self.model.appendRow(row)
+        self.counters.setText(', '.join(
+            f'{name}: {value:g}' for name, value in snapshot['counters'].items()))
+
+    def showEvent(self, event: QtGui.QShowEvent) -> None:
+        """Обновляет панель, пока она видима."""
+        self.refresh()
+        self._timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event: QtGui.QHideEvent) -> None:
+        """Останавливает обновление скрытой панели."""
+        self._timer.stop()
+        super().hideEvent(event)
+
+    def _reset(self) -> None:
+        """Сбрасывает собранную статистику."""
+        self.profiler.reset()
+        self.refresh()
+
+    def _export(self, export, file_filter: str) -> None:
+        """Запрашивает имя файла и выполняет экспорт."""
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, 'Экспорт', '', file_filter)
+        if not path:
+            return
+        try:
+            export(path)
+        except OSError as e:
+            QtWidgets.QMessageBox.warning(self, 'Экспорт', f'Ошибка записи: {e}')
@@ -0,0 +1,73 @@
+"""
+Чтение начала файла для панели просмотра.
+
+Файл отображается в память только на длину фрагмента (не более
+PREVIEW_BYTES), поэтому просмотр многогигабайтного журнала читает
+с диска лишь его начало. Тип определяется по сигнатуре (metadata.detect_mime);
+текст обрезается по границе строки и символа.
+"""
+import codecs
+import mmap
+import os
+from typing import NamedTuple, Optional
+
+from metadata import HEADER_SIZE, detect_mime
+
+# Сколько байт начала текстового файла показывается
+PREVIEW_BYTES = 64 * 1024
+# Сколько строк текстового файла показывается
+PREVIEW_LINES = 1000
+
+
+class Preview(NamedTuple):
+    """Начало файла для просмотра."""
+
+    mime: str
+    # Текст; None для двоичных файлов
+    text: Optional[str]
+    # Показана только часть файла
+    truncated: bool
+    size: int
+
+
+def is_text_mime(mime: str) -> bool:
+    """Можно ли показать содержимое такого типа как текст."""
+    return mime.startswith('text/') or mime in ('image/svg+xml', 'inode/x-empty')
+
+
+def read_preview(path: str, limit: int = PREVIEW_BYTES,
+                 max_lines: int = PREVIEW_LINES) -> Preview:
+    """
+    Читает начало файла через mmap.
+
+    Args:
+        path: Путь к файлу
+        limit: Наибольшее число читаемых байт
+        max_lines: Наибольшее число строк текста
+
+    Raises:
+        OSError: Если файл не удалось прочитать
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return Preview('inode/x-empty', '', False, 0)
+        length = min(size, limit)
+        with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ) as view:
+            mime = detect_mime(view[:HEADER_SIZE])
+            if not is_text_mime(mime):
+                return Preview(mime, None, False, size)
+            end = length
+            pos = -1
+            for _ in range(max_lines):
+                pos = view.find(b'\n', pos + 1)
+                if pos < 0:
+                    break
+            else:
+                end = pos + 1
+            data = view[:end]
+    truncated = end < size
+    encoding = 'utf-16' if data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)) else 'utf-8-sig'
+    # Символ, разрезанный границей фрагмента, отбрасывается
+    text = codecs.getincrementaldecoder(encoding)('replace').decode(data, final=not truncated)
+    return Preview(mime, text, truncated, size)
@@ -0,0 +1,109 @@
+import os
+from typing import Any
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QFontDatabase, QImage, QPixmap
+
+from disk_usage import format_size
+from preview import Preview, read_preview
+from thumbnails import is_image, make_thumbnail
+
+# Наибольшая сторона изображения в панели просмотра (пикселей)
+PREVIEW_SIZE = 512
+
+
+class PreviewWindow(QtWidgets.QWidget):
+    """
+    Панель просмотра выбранного файла: изображение, уменьшенное при
+    декодировании, или начало текста. Файл читается в фоновой задаче;
+    результат устаревшего выбора отбрасывается.
+    """
+
+    _loaded = pyqtSignal(int, object)
+
+    def __init__(self, executor, parent=None) -> None:
+        """
+        Инициализация панели просмотра.
+
+        Args:
+            executor: Исполнитель фоновых задач (submit)
+            parent: Родительский виджет
+        """
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle('Просмотр')
+        self.resize(560, 600)
+        self._executor = executor
+        # Номер последнего запроса: результаты прежних не показываются
+        self._generation = 0
+        self.path = ''
+
+        self.header = QtWidgets.QLabel(self)
+        self.header.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.image = QtWidgets.QLabel(self)
+        self.image.setAlignment(Qt.AlignCenter)
+        self.text = QtWidgets.QPlainTextEdit(self)
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+        self.text.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.message = QtWidgets.QLabel(self)
+        self.message.setAlignment(Qt.AlignCenter)
+        self.stack = QtWidgets.QStackedWidget(self)
+        for widget in (self.message, self.image, self.text):
+            self.stack.addWidget(widget)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.header)
+        layout.addWidget(self.stack)
+        self._loaded.connect(self._on_loaded)
+
+    def show_path(self, path: str) -> None:
+        """
+        Показывает файл; содержимое загружается в фоне.
+
+        Args:
+            path: Путь к файлу или каталогу
+        """
+        self._generation += 1
+        self.path = path
+        self.header.setText(path)
+        if os.path.isdir(path):
+            self._show_message('Каталог')
+            return
+        self._show_message('Загрузка...')
+        generation = self._generation
+        self._executor.submit(lambda: self._loaded.emit(generation, self._load(path)))
+
+    @staticmethod
+    def _load(path: str) -> Any:
+        """Читает файл для просмотра; выполняется в фоновой задаче."""
+        try:
+            if is_image(path):
+                image = make_thumbnail(path, PREVIEW_SIZE)
+                if image is not None:
+                    return image
+            return read_preview(path)
+        except (OSError, ValueError) as e:
+            return str(e)
+
+    def _on_loaded(self, generation: int, result: Any) -> None:
+        """Показывает загруженное содержимое, если выбор с тех пор не изменился."""
+        if generation != self._generation:
+            return
+        if isinstance(result, QImage):
+            self.image.setPixmap(QPixmap.fromImage(result))
+            self.stack.setCurrentWidget(self.image)
+        elif isinstance(result, Preview):
+            if result.text is None:
+                self._show_message(f'Двоичный файл: {result.mime}, {format_size(result.size)}')
+            else:
+                text = result.text + ('\n…' if result.truncated else '')
+                self.text.setPlainText(text)
+                self.stack.setCurrentWidget(self.text)
+                self.header.setText(f'{self.path} ({result.mime}, {format_size(result.size)})')
+        else:
+            self._show_message(f'Не удалось прочитать файл: {result}')
+
+    def _show_message(self, text: str) -> None:
+        """Показывает сообщение вместо содержимого."""
+        self.message.setText(text)
+        self.stack.setCurrentWidget(self.message)
@@ -0,0 +1,65 @@
+"""
+Общий пул процессов для поиска по содержимому и поиска дубликатов.
+
+Запуск процесса методом spawn заново импортирует интерпретатор и главный
+модуль, поэтому пул создаётся один раз при первой задаче и переиспользуется
+всеми последующими поисками.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict
+
+logger = logging.getLogger('FileExplorer.pool')
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def _pool(processes: int) -> ProcessPoolExecutor:
+    """Возвращает пул с заданным числом процессов, создавая его при первом вызове."""
+    with _lock:
+        pool = _pools.get(processes)
+        if pool is None:
+            # spawn безопасен при запуске из многопоточного GUI-процесса
+            context = multiprocessing.get_context('spawn')
+            pool = _pools[processes] = ProcessPoolExecutor(processes, mp_context=context)
+        return pool
+
+
+def submit(processes: int, fn: Callable, *args) -> Future:
+    """
+    Отправляет задачу в общий пул процессов.
+
+    Если процесс пула аварийно завершился, пул непригоден для новых задач:
+    он заменяется новым, и задача отправляется повторно.
+
+    Args:
+        processes: Количество процессов пула
+        fn: Функция, выполняемая в процессе
+        *args: Аргументы функции
+
+    Returns:
+        Future с результатом задачи
+    """
+    pool = _pool(processes)
+    try:
+        return pool.submit(fn, *args)
+    except BrokenProcessPool:
+        logger.warning(f'Process pool of {processes} workers is broken, replacing it')
+        with _lock:
+            if _pools.get(processes) is pool:
+                del _pools[processes]
+        pool.shutdown(wait=False)
+        return _pool(processes).submit(fn, *args)
+
+
+def shutdown() -> None:
+    """Останавливает все пулы; следующая задача создаст пул заново."""
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -92,6 +92,20 @@ class Ui_MainWindow(object):
         icon5.addPixmap(QtGui.QPixmap("static/search_24dp_E3E3E3_FILL0_wght400_GRAD0_opsz24.svg"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
         self.btn_search.setIcon(icon5)
         self.btn_search.setObjectName("btn_search")
+        self.btn_back = QtWidgets.QPushButton(self.centralwidget)
+        self.btn_back.setGeometry(QtCore.QRect(260, 80, 35, 25))
+        self.btn_back.setStyleSheet("background-color: rgb(15, 80, 24);")
+        self.btn_back.setText("")
+        icon6 = QtGui.QIcon()
+        icon6.addPixmap(QtGui.QPixmap("static/arrow_back_24dp_E3E3E3_FILL0_wght400_GRAD0_opsz24.svg"), QtGui.QIcon.Normal, QtGui.QIcon.Off)
+        self.btn_back.setIcon(icon6)
+        self.btn_back.setObjectName("btn_back")
+        self.btn_forward = QtWidgets.QPushButton(self.centralwidget)
+        self.btn_forward.setGeometry(QtCore.QRect(300, 80, 35, 25))
+        self.btn_forward.setStyleSheet("background-color: rgb(15, 80, 24);")
+        self.btn_forward.setText("")
+        self.btn_forward.setIcon(icon1)
+        self.btn_forward.setObjectName("btn_forward")
         self.wallpaper.raise_()
         self.file_tree.raise_()
         self.path.raise_()
@@ -103,6 +117,8 @@ class Ui_MainWindow(object):
         self.btn_root_home.raise_()
         self.btn_toggle_hidden.raise_()
         self.btn_search.raise_()
+        self.btn_back.raise_()
+        self.btn_forward.raise_()
         MainWindow.setCentralWidget(self.centralwidget)
         self.menubar = QtWidgets.QMenuBar(MainWindow)
         self.menubar.setGeometry(QtCore.QRect(0, 0, 600, 21))
@@ -120,6 +136,8 @@ class Ui_MainWindow(object):
         MainWindow.setWindowTitle(_translate("MainWindow", "Explorer QT"))
         self.btn_open.setText(_translate("MainWindow", "Открыть"))
         self.status.setText(_translate("MainWindow", "status"))
+        self.btn_back.setToolTip(_translate("MainWindow", "Назад"))
+        self.btn_forward.setToolTip(_translate("MainWindow", "Вперёд"))
 
 
 if __name__ == "__main__":
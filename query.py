@@ -0,0 +1,279 @@
+import fnmatch
+import os
+import re
+import time
+from datetime import datetime
+from typing import Callable, List, Optional
+
+# Единицы размера: size>10M, size<=512k
+SIZE_UNITS = {'': 1, 'b': 1, 'k': 1024, 'kb': 1024, 'm': 1024 ** 2, 'mb': 1024 ** 2,
+              'g': 1024 ** 3, 'gb': 1024 ** 3, 't': 1024 ** 4, 'tb': 1024 ** 4}
+# Единицы возраста: mtime<7d — изменён менее 7 дней назад
+AGE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+
+_TOKEN = re.compile(r'(?:[^\s"]+|"[^"]*")+')
+_FIELD = re.compile(r'^(-?)([a-z]+)(:|>=|<=|>|<|=)(.*)$', re.IGNORECASE)
+_SIZE = re.compile(r'^(\d+(?:\.\d+)?)([a-z]*)$', re.IGNORECASE)
+_AGE = re.compile(r'^(\d+(?:\.\d+)?)([smhdw])$', re.IGNORECASE)
+# Класс символов glob: [abc], [!a-z], []x] (']' сразу после '[' входит в класс)
+_CLASS = re.compile(r'\[!?\]?[^\]]*\]')
+
+_COMPARE = {
+    '>': lambda a, b: a > b,
+    '<': lambda a, b: a < b,
+    '>=': lambda a, b: a >= b,
+    '<=': lambda a, b: a <= b,
+    '=': lambda a, b: a == b,
+    ':': lambda a, b: a == b,
+}
+
+Check = Callable[[str, str, Callable[[], Optional[os.stat_result]]], bool]
+
+
+class QueryError(ValueError):
+    """Ошибка разбора поискового запроса."""
+
+
+def _glob(pattern: str) -> Callable[[str], bool]:
+    """Компилирует glob-шаблон в функцию сопоставления."""
+    return re.compile(fnmatch.translate(pattern)).match
+
+
+def _longest_literal(pattern: str) -> str:
+    """
+    Самый длинный фрагмент glob-шаблона, который обязан входить в имя.
+    Классы символов [...] целиком считаются разделителями: их содержимое
+    перечисляет варианты одного символа, а не подстроку.
+    """
+    return max(re.split(r'[*?\[\]]', _CLASS.sub('*', pattern)), key=len)
+
+
+def _parse_size(value: str) -> int:
+    """Разбирает размер вида 10M, 512k, 100."""
+    match = _SIZE.match(value)
+    if not match or match.group(2).lower() not in SIZE_UNITS:
+        raise QueryError(f'Некорректный размер: {value}')
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
+
+def _parse_date(value: str) -> float:
+    """Разбирает дату вида YYYY-MM-DD или YYYY-MM-DDTHH:MM."""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise QueryError(f'Некорректное время: {value}') from None
+
+
+class Query:
+    """
+    Скомпилированный поисковый запрос.
+
+    Поддерживаемый синтаксис (условия объединяются через И):
+        слово        — подстрока в имени (допускаются * ? [])
+        name:шаблон  — то же, что слово
+        ext:py,txt   — расширение
+        path:шаблон  — подстрока в полном пути
+        re:выражение или /выражение/ — регулярное выражение по имени
+        size>10M, size<=1k — размер файла
+        mtime<7d     — изменён менее 7 дней назад (s, m, h, d, w)
+        mtime<2024-01-01 — изменён до даты
+        type:file|dir|any — тип элемента (по умолчанию file)
+        -условие     — отрицание; -path:шаблон также исключает поддеревья
+    """
+
+    def __init__(self, text: str) -> None:
+        """
+        Разбор и компиляция запроса.
+
+        Args:
+            text: Текст запроса
+
+        Raises:
+            QueryError: Если запрос содержит ошибку
+        """
+        self.text = text
+        self.match_files = True
+        self.match_dirs = False
+        # Самый длинный литеральный фрагмент шаблонов имени для индекса
+        self.literal = ''
+        self.needs_stat = False
+        self._checks: List[Check] = []
+        self._stat_checks: List[Check] = []
+        self._prune_paths: List[Callable[[str], bool]] = []
+
+        now = time.time()
+        tokens = [token.replace('"', '') for token in _TOKEN.findall(text)]
+        if not tokens:
+            raise QueryError('Пустой запрос')
+        for token in tokens:
+            self._add_token(token, now)
+
+        # Стат-проверки выполняются последними: они требуют системного вызова
+        self._all_checks = self._checks + self._stat_checks
+        self.needs_stat = bool(self._stat_checks)
+
+    def _add_token(self, token: str, now: float) -> None:
+        """Добавляет условие для одного элемента запроса."""
+        if len(token) > 2 and token.startswith('/') and token.endswith('/'):
+            token = 're:' + token[1:-1]
+        match = _FIELD.match(token)
+        if match and match.group(2).lower() in ('name', 'ext', 'path', 're', 'size', 'mtime', 'type'):
+            negate, field, op, value = match.groups()
+            field = field.lower()
+        else:
+            negate, field, op, value = '', 'name', ':', token
+            if token.startswith('-') and len(token) > 1:
+                negate, value = '-', token[1:]
+        if not value:
+            raise QueryError(f'Пустое значение в условии: {token}')
+        if field not in ('size', 'mtime') and op != ':':
+            raise QueryError(f'Оператор {op} не поддерживается для {field}')
+
+        if field == 'type':
+            kind = value.lower()
+            if kind not in ('file', 'f', 'dir', 'd', 'any'):
+                raise QueryError(f'Неизвестный тип: {value}')
+            wants_dirs = kind in ('dir', 'd', 'any')
+            wants_files = kind in ('file', 'f', 'any')
+            if negate:
+                wants_dirs, wants_files = not wants_dirs, not wants_files
+            self.match_dirs, self.match_files = wants_dirs, wants_files
+            return
+
+        if field == 'path' and negate:
+            # Все элементы каталога, путь которого подходит под шаблон,
+            # тоже подходят, поэтому поддерево можно не обходить
+            self._prune_paths.append(_glob(f'*{value.lower()}*'))
+
+        if field == 'name' and not negate:
+            # Отрицаемый шаблон не обязан входить в имя и в индекс не передаётся
+            literal = _longest_literal(value.lower())
+            if len(literal) > len(self.literal):
+                self.literal = literal
+        check = self._compile_field(field, op, value, now)
+        if negate:
+            positive = check
+            check = lambda d, n, st: not positive(d, n, st)  # noqa: E731
+        (self._stat_checks if field in ('size', 'mtime') else self._checks).append(check)
+
+    def _compile_field(self, field: str, op: str, value: str, now: float) -> Check:
+        """Компилирует условие поля в функцию (каталог, имя, stat) -> bool."""
+        if field == 'name':
+            matcher = _glob(f'*{value.lower()}*')
+            return lambda d, n, st: matcher(n.lower()) is not None
+        if field == 'ext':
+            exts = tuple('.' + ext.lower().lstrip('.') for ext in value.split(',') if ext)
+            return lambda d, n, st: n.lower().endswith(exts)
+        if field == 'path':
+            matcher = _glob(f'*{value.lower()}*')
+            return lambda d, n, st: matcher(os.path.join(d, n).lower()) is not None
+        if field == 're':
+            try:
+                regex = re.compile(value, re.IGNORECASE)
+            except re.error as e:
+                raise QueryError(f'Некорректное регулярное выражение: {e}') from None
+            return lambda d, n, st: regex.search(n) is not None
+
+        compare = _COMPARE[op]
+        if field == 'size':
+            limit = _parse_size(value)
+
+            def check_size(d, n, st):
+                result = st()
+                return result is not None and compare(result.st_size, limit)
+            return check_size
+
+        age = _AGE.match(value)
+        if age:
+            # Относительное значение сравнивается с возрастом файла
+            limit = float(age.group(1)) * AGE_UNITS[age.group(2).lower()]
+
+            def check_age(d, n, st):
+                result = st()
+                return result is not None and compare(now - result.st_mtime, limit)
+            return check_age
+
+        moment = _parse_date(value)
+
+        def check_mtime(d, n, st):
+            result = st()
+            return result is not None and compare(result.st_mtime, moment)
+        return check_mtime
+
+    def prune(self, path: str) -> bool:
+        """
+        Проверяет, нужно ли пропустить каталог вместе со всем поддеревом.
+
+        Args:
+            path: Полный путь к каталогу
+        """
+        if not self._prune_paths:
+            return False
+        lpath = path.lower()
+        return any(matcher(lpath) for matcher in self._prune_paths)
+
+    def excluded(self, root: str, path: str) -> bool:
+        """
+        Проверяет, лежит ли путь в исключённом поддереве относительно корня.
+
+        Используется для результатов, полученных без обхода (из индекса).
+
+        Args:
+            root: Корень поиска
+            path: Полный путь к элементу
+        """
+        if not self._prune_paths:
+            return False
+        current = path
+        while len(current) > len(root):
+            if self.prune(current):
+                return True
+            current = os.path.dirname(current)
+        return False
+
+    def matches(self, dirpath: str, name: str,
+                stat: Optional[Callable[[], Optional[os.stat_result]]] = None) -> bool:
+        """
+        Проверяет элемент каталога на соответствие запросу.
+
+        Args:
+            dirpath: Каталог, содержащий элемент
+            name: Имя элемента
+            stat: Функция, возвращающая os.stat_result или None при ошибке;
+                  вызывается только если запрос проверяет размер или время,
+                  и не более одного раза для всех условий
+        """
+        if self.needs_stat:
+            fetch = stat or (lambda: _safe_stat(os.path.join(dirpath, name)))
+            cached: List[Optional[os.stat_result]] = []
+
+            def stat_once() -> Optional[os.stat_result]:
+                if not cached:
+                    cached.append(fetch())
+                return cached[0]
+            stat = stat_once
+        for check in self._all_checks:
+            if not check(dirpath, name, stat):
+                return False
+        return True
+
+
+def _safe_stat(path: str) -> Optional[os.stat_result]:
+    """Возвращает os.stat_result или None, если файл недоступен."""
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def compile_query(text: str) -> Query:
+    """
+    Компилирует текст запроса.
+
+    Args:
+        text: Текст запроса
+
+    Raises:
+        QueryError: Если запрос содержит ошибку
+    """
+    return Query(text)
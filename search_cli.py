@@ -0,0 +1,115 @@
+"""
+Поиск файлов из командной строки без графического интерфейса.
+
+Результаты выводятся построчно в формате JSON Lines по мере нахождения:
+
+    python search_cli.py ~/projects "report ext:pdf -path:.git"
+    python search_cli.py ~/projects "ext:py" --content "TODO" --limit 100
+
+Каждая строка — объект {"path": ...}; при поиске по содержимому также
+"line" и "text". Вывод всегда в UTF-8; байты имён, не являющиеся UTF-8,
+записываются экранированием \\udcXX и восстанавливаются через os.fsencode.
+Статистика выводится в stderr с флагом --stats.
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from typing import Iterator, List, Optional
+
+from archives import ArchiveCache
+from content_search import ContentSearcher
+from query import QueryError, compile_query
+from search_core import SearchStats, search_files
+from search_index import FileIndex
+from walker import DEFAULT_WORKERS
+
+
+def _records(args: argparse.Namespace, stats: SearchStats) -> Iterator[dict]:
+    """Выдаёт результаты поиска в виде словарей."""
+    if args.content is not None:
+        query = compile_query(args.query) if args.query.strip() else None
+        searcher = ContentSearcher(args.root, args.content, query, args.processes,
+                                   walk_workers=args.workers)
+        try:
+            for hits in searcher.search():
+                for path, line, text in hits:
+                    yield {'path': path, 'line': line, 'text': text}
+        finally:
+            stats.files = searcher.files_checked
+        return
+    index = FileIndex() if args.use_index else None
+    archives = ArchiveCache() if args.archives else None
+    for path in search_files(args.root, args.query, index, args.workers, stats=stats,
+                             archives=archives):
+        yield {'path': path}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Точка входа командной строки.
+
+    Returns:
+        0 при успехе, 2 при ошибке в запросе или аргументах
+    """
+    parser = argparse.ArgumentParser(description='Поиск файлов Explorer QT (JSON Lines)')
+    parser.add_argument('root', help='корневой каталог')
+    parser.add_argument('query', help='запрос (см. README); с --content — фильтр файлов')
+    parser.add_argument('--content', metavar='TEXT', help='искать текст в содержимом файлов')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help='число потоков обхода дерева')
+    parser.add_argument('--processes', type=int, help='число процессов поиска по содержимому')
+    parser.add_argument('--use-index', action='store_true',
+                        help='искать по индексу, если он актуален для корня')
+    parser.add_argument('--archives', action='store_true',
+                        help='искать и внутри архивов zip и tar')
+    parser.add_argument('--limit', type=int, help='остановиться после N результатов')
+    parser.add_argument('--stats', action='store_true', help='вывести статистику в stderr')
+    parser.add_argument('-v', '--verbose', action='store_true', help='подробный журнал в stderr')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(name)s - %(levelname)s - %(message)s')
+    if not os.path.isdir(args.root):
+        parser.error(f'not a directory: {args.root}')
+    try:
+        if args.content is None or args.query.strip():
+            compile_query(args.query)
+    except QueryError as e:
+        parser.error(f'invalid query: {e}')
+    # Завершение по обрыву канала (например, `| head`) без трассировки
+    if hasattr(signal, 'SIGPIPE'):
+        signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+    stats = SearchStats()
+    started = time.perf_counter()
+    count = 0
+    # Байтовый поток: имя файла с байтами не из UTF-8 (суррогаты после
+    # os.fsdecode) нельзя записать в текстовый stdout
+    out = sys.stdout.buffer
+    records = _records(args, stats)
+    try:
+        for record in records:
+            line = json.dumps(record, ensure_ascii=False) + '\n'
+            out.write(line.encode('utf-8', 'backslashreplace'))
+            count += 1
+            if args.limit is not None and count >= args.limit:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        records.close()
+        out.flush()
+    if args.stats:
+        print(json.dumps({'results': count, 'source': stats.source, 'dirs': stats.dirs,
+                          'files': stats.files, 'errors': stats.errors,
+                          'seconds': round(time.perf_counter() - started, 3)}),
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+Поиск файлов без зависимости от Qt.
+
+Генератор search_files и асинхронный итератор asearch_files используются
+графическим интерфейсом (FileSearchJob), командной строкой
+(search_cli.py) и измерениями производительности.
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import AsyncIterator, Callable, Iterator, Optional, Union
+
+from archives import ARCHIVE_EXTENSIONS, ArchiveCache, ArchiveError, is_archive, member_path, member_stat
+from query import Query, compile_query
+from search_index import FileIndex
+from walker import DEFAULT_WORKERS, ParallelWalker
+
+logger = logging.getLogger('FileExplorer.search')
+
+# Размер очереди между потоком поиска и асинхронным потребителем
+ASYNC_QUEUE_SIZE = 1024
+# Запрос, находящий в индексе архивы для поиска внутри них
+_ARCHIVE_QUERY = 'ext:' + ','.join(sorted({ext.rsplit('.', 1)[1] for ext in ARCHIVE_EXTENSIONS}))
+
+
+class SearchStats:
+    """Статистика одного поиска."""
+
+    __slots__ = ('source', 'dirs', 'files', 'errors')
+
+    def __init__(self) -> None:
+        """Инициализация пустой статистики."""
+        # 'index' — поиск по индексу, 'walk' — обход дерева
+        self.source = 'walk'
+        self.dirs = 0
+        self.files = 0
+        self.errors = 0
+
+
+def search_archive(archive: str, query: Query, archives: ArchiveCache,
+                   should_stop: Callable[[], bool] = lambda: False,
+                   stats: Optional[SearchStats] = None) -> Iterator[str]:
+    """
+    Ищет элементы архива, соответствующие запросу, по его оглавлению.
+
+    Args:
+        archive: Путь к архиву
+        query: Запрос
+        archives: Кэш оглавлений архивов
+        should_stop: Функция, возвращающая True при запросе остановки
+        stats: Статистика поиска; непрочитанный архив считается ошибкой
+
+    Yields:
+        Пути элементов вида /каталог/архив.zip/каталог/файл
+    """
+    try:
+        index = archives.get(archive)
+    except ArchiveError as e:
+        logger.debug(f'Archive skipped: {e}')
+        if stats is not None:
+            stats.errors += 1
+        return
+    for inner, dirs, files in index.walk():
+        if should_stop():
+            return
+        dirpath = member_path(archive, inner)
+        # Каталоги оглавления обходятся без вложенности, поэтому исключение
+        # поддерева проверяется по всем каталогам пути внутри архива
+        if inner and query.excluded(archive, dirpath):
+            continue
+        if stats is not None:
+            stats.dirs += 1
+            stats.files += len(files)
+        members = (dirs if query.match_dirs else []) + (files if query.match_files else [])
+        for member in members:
+            path = os.path.join(dirpath, member[0])
+            if (query.matches(dirpath, member[0], lambda m=member: member_stat(m))
+                    and not (member[1] and query.prune(path))):
+                yield path
+
+
+def search_files(root_path: str, query: Union[str, Query],
+                 index: Optional[FileIndex] = None,
+                 workers: int = DEFAULT_WORKERS,
+                 should_stop: Optional[Callable[[], bool]] = None,
+                 stats: Optional[SearchStats] = None,
+                 archives: Optional[ArchiveCache] = None) -> Iterator[str]:
+    """
+    Ищет файлы и каталоги, соответствующие запросу.
+
+    Если передан индекс и он актуален для корня, поиск выполняется по
+    нему (кроме запросов, которым подходят каталоги); иначе дерево
+    обходится параллельно с отсечением исключённых поддеревьев.
+    Результаты выдаются по мере нахождения, память не растёт с их числом.
+
+    Args:
+        root_path: Корневой каталог
+        query: Запрос или его текст (см. query.Query)
+        index: Индекс имён файлов
+        workers: Количество потоков обхода дерева
+        should_stop: Функция, возвращающая True при запросе остановки
+        stats: Объект, в который записывается статистика поиска
+        archives: Кэш оглавлений архивов; если передан, поиск идёт и внутри архивов
+
+    Yields:
+        Полные пути найденных элементов
+
+    Raises:
+        QueryError: Если запрос содержит ошибку
+    """
+    query = query if isinstance(query, Query) else compile_query(query)
+    should_stop = should_stop or (lambda: False)
+    stats = stats if stats is not None else SearchStats()
+
+    if index is not None and not query.match_dirs and index.is_fresh(root_path):
+        logger.info(f'Searching in index: {root_path}')
+        stats.source = 'index'
+        yield from index.search(root_path, query, should_stop)
+        if archives is not None:
+            for path in index.search(root_path, compile_query(_ARCHIVE_QUERY), should_stop):
+                if is_archive(path) and not query.excluded(root_path, path):
+                    yield from search_archive(path, query, archives, should_stop, stats)
+        return
+
+    stats.source = 'walk'
+    walker = ParallelWalker(root_path, workers, should_stop, query.prune)
+    matches = query.matches
+    try:
+        for root, dirs, files in walker:
+            if should_stop():
+                break
+            stats.files += len(files)
+            if query.match_dirs:
+                for name in dirs:
+                    if matches(root, name):
+                        yield os.path.join(root, name)
+            if query.match_files:
+                for name in files:
+                    if matches(root, name):
+                        yield os.path.join(root, name)
+            if archives is not None:
+                for name in files:
+                    if is_archive(name):
+                        yield from search_archive(os.path.join(root, name), query, archives,
+                                                  should_stop, stats)
+    finally:
+        # Каталоги и ошибки архивов уже учтены в search_archive
+        stats.dirs += walker.scanned
+        stats.errors += walker.errors
+        logger.info(f'Directories scanned: {walker.scanned}, errors: {walker.errors}')
+
+
+async def asearch_files(root_path: str, query: Union[str, Query],
+                        index: Optional[FileIndex] = None,
+                        workers: int = DEFAULT_WORKERS,
+                        stats: Optional[SearchStats] = None,
+                        queue_size: int = ASYNC_QUEUE_SIZE) -> AsyncIterator[str]:
+    """
+    Асинхронный вариант search_files.
+
+    Поиск выполняется в отдельном потоке; результаты передаются через
+    ограниченную очередь, поэтому медленный потребитель приостанавливает
+    поиск, а не накапливает результаты в памяти. При прекращении
+    итерации поиск останавливается.
+
+    Args:
+        root_path: Корневой каталог
+        query: Запрос или его текст
+        index: Индекс имён файлов
+        workers: Количество потоков обхода дерева
+        stats: Объект, в который записывается статистика поиска
+        queue_size: Размер очереди результатов
+
+    Yields:
+        Полные пути найденных элементов
+
+    Raises:
+        QueryError: Если запрос содержит ошибку
+    """
+    query = query if isinstance(query, Query) else compile_query(query)
+    loop = asyncio.get_running_loop()
+    results: asyncio.Queue = asyncio.Queue(queue_size)
+    stop = threading.Event()
+    done = object()
+
+    def produce() -> None:
+        try:
+            for path in search_files(root_path, query, index, workers, stop.is_set, stats):
+                if stop.is_set():
+                    break
+                asyncio.run_coroutine_threadsafe(results.put(path), loop).result()
+        except Exception as e:
+            logger.error(f'Search error: {e}')
+        finally:
+            if not stop.is_set():
+                asyncio.run_coroutine_threadsafe(results.put(done), loop).result()
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await results.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+        # Освобождаем место в очереди, чтобы поток поиска не ждал потребителя
+        while not results.empty():
+            results.get_nowait()
+        await producer
@@ -0,0 +1,485 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from cache_dir import cache_path
+from query import Query, compile_query
+from walker import DEFAULT_WORKERS, ParallelWalker, scan_directory
+
+logger = logging.getLogger('FileExplorer.index')
+
+# Через сколько секунд индекс корня считается устаревшим
+DEFAULT_MAX_AGE = 24 * 60 * 60
+# Количество каталогов, записываемых в одной транзакции при построении
+COMMIT_EVERY = 200
+
+# Версия схемы; индекс является кэшем, поэтому при смене версии он пересоздаётся
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    scanned_at REAL,
+    complete INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS dirs (
+    id INTEGER PRIMARY KEY,
+    root_id INTEGER NOT NULL,
+    parent_id INTEGER,
+    path TEXT NOT NULL UNIQUE,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent_id);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    dir_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    lname TEXT NOT NULL,
+    UNIQUE (dir_id, name)
+);
+CREATE TABLE IF NOT EXISTS trigrams (
+    tri TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    PRIMARY KEY (tri, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trigrams_file ON trigrams (file_id);
+"""
+
+def trigrams(text: str) -> set:
+    """
+    Возвращает множество триграмм строки.
+
+    Args:
+        text: Строка (обычно имя файла в нижнем регистре)
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _subtree_bounds(path: str) -> tuple:
+    """
+    Возвращает границы диапазона путей, лежащих внутри каталога.
+
+    Все потомки `path` лексикографически попадают в полуинтервал
+    [path + sep, path + chr(ord(sep) + 1)), что позволяет использовать индекс.
+    """
+    prefix = path.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class FileIndex:
+    """Постоянный индекс имён файлов с триграммным поиском подстрок."""
+
+    def __init__(self, db_path: Optional[str] = None,
+                 max_age: float = DEFAULT_MAX_AGE) -> None:
+        """
+        Инициализация индекса. База данных создаётся при первом обращении.
+
+        Args:
+            db_path: Путь к файлу базы SQLite; по умолчанию index.sqlite3 в каталоге кэша
+            max_age: Время в секундах, после которого индекс корня устаревает
+        """
+        self.db_path = db_path or cache_path('index.sqlite3')
+        self.max_age = max_age
+        # Соединение открывается один раз на поток: соединение SQLite
+        # нельзя использовать из другого потока
+        self._local = threading.local()
+        # Полностью проиндексированные корни (путь, время сканирования):
+        # читаются из базы один раз и сбрасываются при их изменении, поэтому
+        # проверка при каждом переходе по каталогам не обращается к базе
+        self._roots: Optional[List[Tuple[str, float]]] = None
+        self._roots_lock = threading.Lock()
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Соединение текущего потока. Незавершённая транзакция откатывается
+        при ошибке, чтобы следующее обращение начинало с чистого состояния.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def _connect(self) -> sqlite3.Connection:
+        """Открывает соединение с базой и создаёт схему при необходимости."""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            conn.executescript(
+                'DROP TABLE IF EXISTS trigrams; DROP TABLE IF EXISTS files; '
+                'DROP TABLE IF EXISTS dirs; DROP TABLE IF EXISTS roots;'
+            )
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def covering_root(self, path: str) -> Optional[tuple]:
+        """
+        Ищет полностью проиндексированный корень, содержащий путь.
+
+        Args:
+            path: Каталог, в котором выполняется поиск
+
+        Returns:
+            Кортеж (корень, время сканирования) или None, в том числе
+            если база недоступна (ошибка записывается в журнал)
+        """
+        try:
+            rows = self._complete_roots()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f'Index unavailable: {e}')
+            return None
+        path = os.path.normpath(path)
+        best = None
+        for root, scanned_at in rows:
+            inside = path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+            if inside and (best is None or len(root) > len(best[0])):
+                best = (root, scanned_at)
+        return best
+
+    def _complete_roots(self) -> List[Tuple[str, float]]:
+        """Полностью проиндексированные корни; из базы читаются только при первом обращении."""
+        with self._roots_lock:
+            if self._roots is None:
+                if not os.path.exists(self.db_path):
+                    return []
+                with self._connection() as conn:
+                    self._roots = conn.execute(
+                        'SELECT path, scanned_at FROM roots WHERE complete = 1'
+                    ).fetchall()
+            return self._roots
+
+    def _forget_roots(self) -> None:
+        """Сбрасывает список корней после его изменения в базе."""
+        with self._roots_lock:
+            self._roots = None
+
+    def last_scanned(self, path: str) -> Optional[float]:
+        """
+        Возвращает время последнего сканирования корня, содержащего путь.
+
+        Args:
+            path: Проверяемый каталог
+        """
+        root = self.covering_root(path)
+        return root[1] if root else None
+
+    def is_fresh(self, path: str) -> bool:
+        """
+        Проверяет, можно ли отвечать на запросы по пути из индекса.
+
+        Args:
+            path: Каталог, в котором выполняется поиск
+        """
+        scanned_at = self.last_scanned(path)
+        return scanned_at is not None and time.time() - scanned_at < self.max_age
+
+    def build(self, root: str,
+              should_stop: Optional[Callable[[], bool]] = None,
+              workers: int = DEFAULT_WORKERS) -> bool:
+        """
+        Полностью (пере)строит индекс для корня.
+
+        Args:
+            root: Корневой каталог
+            should_stop: Функция, возвращающая True при запросе остановки
+            workers: Количество потоков обхода
+
+        Returns:
+            True, если построение завершено, False при прерывании
+        """
+        root = os.path.normpath(root)
+        started = time.time()
+        logger.info(f'Building index for: {root}')
+        with self._connection() as conn:
+            self._forget_subtree(conn, root)
+            cur = conn.execute(
+                'INSERT INTO roots (path, scanned_at, complete) VALUES (?, NULL, 0)',
+                (root,)
+            )
+            root_id = cur.lastrowid
+            # Корень внутри уже проиндексированного дерева остаётся его частью
+            parent = conn.execute('SELECT id FROM dirs WHERE path = ?',
+                                  (os.path.dirname(root),)).fetchone()
+            conn.commit()
+            self._forget_roots()
+
+            self._index_subtree(conn, root, root_id, parent[0] if parent else None,
+                                should_stop, workers)
+
+            if should_stop and should_stop():
+                conn.commit()
+                logger.info(f'Index build interrupted: {root}')
+                return False
+            conn.execute(
+                'UPDATE roots SET scanned_at = ?, complete = 1 WHERE id = ?',
+                (started, root_id)
+            )
+            conn.commit()
+            self._forget_roots()
+        logger.info(f'Index built for {root} in {time.time() - started:.2f}s')
+        return True
+
+    @staticmethod
+    def _index_subtree(conn: sqlite3.Connection, path: str, root_id: int,
+                       parent_id: Optional[int],
+                       should_stop: Optional[Callable[[], bool]] = None,
+                       workers: int = DEFAULT_WORKERS) -> List[str]:
+        """
+        Обходит поддерево и добавляет его каталоги и файлы в индекс.
+
+        Returns:
+            Пути добавленных каталогов
+        """
+        ids = {}
+        pending = 0
+        walker = ParallelWalker(path, workers, should_stop)
+        # Обходчик выдаёт каталог раньше его подкаталогов
+        for current, _, filenames in walker:
+            try:
+                mtime = os.stat(current).st_mtime
+            except OSError:
+                mtime = None
+            ids[current] = conn.execute(
+                'INSERT INTO dirs (root_id, parent_id, path, mtime) VALUES (?, ?, ?, ?)',
+                (root_id, ids.get(os.path.dirname(current), parent_id), current, mtime)
+            ).lastrowid
+            FileIndex._insert_files(conn, ids[current], filenames)
+            pending += 1
+            if pending >= COMMIT_EVERY:
+                conn.commit()
+                pending = 0
+        return list(ids)
+
+    @staticmethod
+    def _insert_files(conn: sqlite3.Connection, dir_id: int, names: List[str]) -> None:
+        """Добавляет файлы каталога и их триграммы."""
+        for name in names:
+            lname = name.lower()
+            file_id = conn.execute(
+                'INSERT INTO files (dir_id, name, lname) VALUES (?, ?, ?)',
+                (dir_id, name, lname)
+            ).lastrowid
+            conn.executemany(
+                'INSERT OR IGNORE INTO trigrams (tri, file_id) VALUES (?, ?)',
+                ((tri, file_id) for tri in trigrams(lname))
+            )
+
+    @staticmethod
+    def _forget_subtree(conn: sqlite3.Connection, root: str,
+                        keep_roots: bool = False) -> None:
+        """Удаляет из индекса все данные о каталоге и его потомках."""
+        low, high = _subtree_bounds(root)
+        dir_filter = 'SELECT id FROM dirs WHERE path = ? OR (path >= ? AND path < ?)'
+        file_filter = f'SELECT id FROM files WHERE dir_id IN ({dir_filter})'
+        args = (root, low, high)
+        conn.execute(f'DELETE FROM trigrams WHERE file_id IN ({file_filter})', args)
+        conn.execute(f'DELETE FROM files WHERE dir_id IN ({dir_filter})', args)
+        conn.execute('DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)', args)
+        if not keep_roots:
+            conn.execute('DELETE FROM roots WHERE path = ? OR (path >= ? AND path < ?)', args)
+
+    def directories(self, root: str) -> List[str]:
+        """
+        Возвращает все проиндексированные каталоги внутри корня.
+
+        Args:
+            root: Корневой каталог
+        """
+        root = os.path.normpath(root)
+        low, high = _subtree_bounds(root)
+        with self._connection() as conn:
+            return [row[0] for row in conn.execute(
+                'SELECT path FROM dirs WHERE path = ? OR (path >= ? AND path < ?)',
+                (root, low, high)
+            )]
+
+    def touch_root(self, root: str) -> None:
+        """
+        Отмечает корень как актуальный на текущий момент.
+
+        Вызывается, когда изменения отслеживаются непрерывно и индекс
+        не нуждается в полном пересканировании.
+
+        Args:
+            root: Корневой каталог
+        """
+        with self._connection() as conn:
+            conn.execute('UPDATE roots SET scanned_at = ? WHERE path = ? AND complete = 1',
+                         (time.time(), os.path.normpath(root)))
+            conn.commit()
+            self._forget_roots()
+
+    def apply_changes(self, dirty_dirs: Iterable[str],
+                      renames: Iterable[Tuple[str, str]] = ()) -> List[str]:
+        """
+        Применяет накопленные изменения файловой системы к индексу.
+
+        Сначала переносятся переименованные каталоги (их содержимое не
+        пересканируется), затем каждый изменившийся каталог сверяется
+        с диском одним вызовом scandir.
+
+        Args:
+            dirty_dirs: Каталоги, содержимое которых изменилось
+            renames: Пары (старый путь, новый путь) переименованных каталогов
+
+        Returns:
+            Пути каталогов, впервые добавленных в индекс
+        """
+        added: List[str] = []
+        with self._connection() as conn:
+            for old, new in renames:
+                self._rename_subtree(conn, os.path.normpath(old), os.path.normpath(new))
+            for path in sorted(set(dirty_dirs)):
+                added.extend(self._sync_directory(conn, os.path.normpath(path)))
+            conn.commit()
+        return added
+
+    def refresh_changed(self, root: str,
+                        should_stop: Optional[Callable[[], bool]] = None) -> int:
+        """
+        Обновляет индекс корня без полного обхода.
+
+        Для каждого проиндексированного каталога выполняется только stat;
+        заново читаются лишь каталоги с изменившимся временем модификации.
+
+        Args:
+            root: Корневой каталог
+            should_stop: Функция, возвращающая True при запросе остановки
+
+        Returns:
+            Количество пересканированных каталогов
+        """
+        root = os.path.normpath(root)
+        low, high = _subtree_bounds(root)
+        changed = []
+        with self._connection() as conn:
+            rows = conn.execute(
+                'SELECT path, mtime FROM dirs WHERE path = ? OR (path >= ? AND path < ?)',
+                (root, low, high)
+            ).fetchall()
+            for path, mtime in rows:
+                if should_stop and should_stop():
+                    return len(changed)
+                try:
+                    current = os.stat(path).st_mtime
+                except OSError:
+                    current = None
+                if current is None or current != mtime:
+                    changed.append(path)
+            for path in changed:
+                self._sync_directory(conn, path)
+            conn.execute('UPDATE roots SET scanned_at = ? WHERE path = ? AND complete = 1',
+                         (time.time(), root))
+            conn.commit()
+            self._forget_roots()
+        return len(changed)
+
+    @staticmethod
+    def _sync_directory(conn: sqlite3.Connection, path: str) -> List[str]:
+        """
+        Сверяет один каталог индекса с диском.
+
+        Returns:
+            Пути каталогов, добавленных в индекс
+        """
+        row = conn.execute('SELECT id, root_id FROM dirs WHERE path = ?', (path,)).fetchone()
+        if row is None:
+            # Каталог не проиндексирован: его появление обработает родитель
+            return []
+        dir_id, root_id = row
+        try:
+            mtime = os.stat(path).st_mtime
+            _, filenames, subdirs = scan_directory(path)
+        except OSError:
+            FileIndex._forget_subtree(conn, path, keep_roots=True)
+            return []
+
+        known = dict(conn.execute('SELECT name, id FROM files WHERE dir_id = ?', (dir_id,)))
+        on_disk = set(filenames)
+        gone = [file_id for name, file_id in known.items() if name not in on_disk]
+        if gone:
+            conn.executemany('DELETE FROM trigrams WHERE file_id = ?', ((i,) for i in gone))
+            conn.executemany('DELETE FROM files WHERE id = ?', ((i,) for i in gone))
+        FileIndex._insert_files(conn, dir_id, [name for name in filenames if name not in known])
+
+        known_dirs = {p for (p,) in conn.execute(
+            'SELECT path FROM dirs WHERE parent_id = ?', (dir_id,))}
+        added: List[str] = []
+        for sub in set(subdirs) - known_dirs:
+            added.extend(FileIndex._index_subtree(conn, sub, root_id, dir_id, workers=1))
+        for sub in known_dirs - set(subdirs):
+            FileIndex._forget_subtree(conn, sub, keep_roots=True)
+        conn.execute('UPDATE dirs SET mtime = ? WHERE id = ?', (mtime, dir_id))
+        return added
+
+    @staticmethod
+    def _rename_subtree(conn: sqlite3.Connection, old: str, new: str) -> None:
+        """Переносит каталог и его потомков на новый путь без пересканирования."""
+        row = conn.execute('SELECT id FROM dirs WHERE path = ?', (old,)).fetchone()
+        parent = conn.execute('SELECT id FROM dirs WHERE path = ?',
+                              (os.path.dirname(new),)).fetchone()
+        if row is None or parent is None:
+            return
+        FileIndex._forget_subtree(conn, new, keep_roots=True)
+        low, high = _subtree_bounds(old)
+        conn.execute(
+            'UPDATE dirs SET path = ? || substr(path, ?) '
+            'WHERE path = ? OR (path >= ? AND path < ?)',
+            (new, len(old) + 1, old, low, high)
+        )
+        conn.execute('UPDATE dirs SET parent_id = ? WHERE id = ?', (parent[0], row[0]))
+
+    def search(self, root: str, query: Union[str, Query],
+               should_stop: Optional[Callable[[], bool]] = None) -> Iterator[str]:
+        """
+        Ищет файлы, соответствующие запросу.
+
+        Семантика совпадает с живым поиском. Самый длинный литеральный
+        фрагмент шаблонов имени используется для предварительной выборки
+        по триграммам, остальные условия проверяются для каждого кандидата.
+
+        Args:
+            root: Каталог, в котором выполняется поиск
+            query: Скомпилированный запрос или его текст
+            should_stop: Функция, возвращающая True при запросе остановки
+
+        Yields:
+            Полные пути найденных файлов
+        """
+        if isinstance(query, str):
+            query = compile_query(query)
+        root = os.path.normpath(root)
+        low, high = _subtree_bounds(root)
+
+        sql = ('SELECT d.path, f.name FROM files f '
+               'JOIN dirs d ON d.id = f.dir_id '
+               'WHERE (d.path = ? OR (d.path >= ? AND d.path < ?))')
+        args: list = [root, low, high]
+        grams = sorted(trigrams(query.literal))
+        if grams:
+            sql += ' AND f.id IN (' + ' INTERSECT '.join(
+                'SELECT file_id FROM trigrams WHERE tri = ?' for _ in grams
+            ) + ')'
+            args.extend(grams)
+
+        with self._connection() as conn:
+            for dir_path, name in conn.execute(sql, args):
+                if should_stop and should_stop():
+                    break
+                if query.matches(dir_path, name) and not query.excluded(root, dir_path):
+                    yield os.path.join(dir_path, name)
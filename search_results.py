@@ -0,0 +1,165 @@
+import os
+from array import array
+from typing import Any, List, Tuple, Union
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt, pyqtSignal
+
+from path_store import PathStore
+
+
+# Результат — путь к файлу или совпадение в содержимом (путь, номер строки, фрагмент)
+Result = Union[str, Tuple[str, int, str]]
+
+
+class SearchResultsModel(QAbstractListModel):
+    """
+    Модель списка найденных путей, рассчитанная на миллионы строк.
+
+    Пути хранятся в PathStore и собираются только для отображаемых строк;
+    для совпадений в содержимом номера строк и фрагменты хранятся
+    отдельно, в порядке строк модели.
+    """
+
+    def __init__(self, parent=None) -> None:
+        """Инициализация пустой модели результатов."""
+        super().__init__(parent)
+        self._paths = PathStore()
+        self._lines = array('q')
+        self._snippets: List[str] = []
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Количество строк; у элементов списка нет потомков."""
+        return 0 if parent.isValid() else len(self._paths)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        """
+        Возвращает данные строки. Отображается только видимая часть списка,
+        поэтому данные вычисляются по запросу.
+
+        Args:
+            index: Индекс строки
+            role: Роль данных
+        """
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            path = self._paths[row]
+            if row < len(self._snippets):
+                return f'{path}:{self._lines[row]}: {self._snippets[row]}'
+            return path
+        if role == Qt.ToolTipRole:
+            return os.path.basename(self._paths[row])
+        return None
+
+    def add_paths(self, paths: List[Result]) -> None:
+        """
+        Добавляет пачку результатов одной операцией вставки.
+
+        Args:
+            paths: Новые пути или совпадения в содержимом (в одной модели — одного вида)
+        """
+        if not paths:
+            return
+        first = len(self._paths)
+        self.beginInsertRows(QModelIndex(), first, first + len(paths) - 1)
+        self._append(paths)
+        self.endInsertRows()
+
+    def set_paths(self, paths: List[Result]) -> None:
+        """
+        Заменяет все результаты одной операцией сброса модели.
+
+        Args:
+            paths: Новый список результатов
+        """
+        self.beginResetModel()
+        self._reset()
+        self._append(paths)
+        self.endResetModel()
+
+    def clear(self) -> None:
+        """Удаляет все результаты."""
+        self.beginResetModel()
+        self._reset()
+        self.endResetModel()
+
+    def path(self, row: int) -> str:
+        """
+        Возвращает путь по номеру строки.
+
+        Args:
+            row: Номер строки
+        """
+        return self._paths[row]
+
+    def _append(self, items: List[Result]) -> None:
+        """Добавляет результаты в хранилища модели."""
+        for item in items:
+            if isinstance(item, str):
+                self._paths.append(item)
+            else:
+                path, line, snippet = item
+                self._paths.append(path)
+                self._lines.append(line)
+                self._snippets.append(snippet)
+
+    def _reset(self) -> None:
+        """Освобождает хранилища модели."""
+        self._paths.clear()
+        self._lines = array('q')
+        self._snippets = []
+
+
+class SearchResultsWindow(QtWidgets.QWidget):
+    """Окно со списком результатов поиска."""
+
+    result_activated = pyqtSignal(str)
+
+    def __init__(self, parent=None) -> None:
+        """Инициализация окна результатов."""
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle('Результаты поиска')
+        self.resize(600, 400)
+
+        self.model = SearchResultsModel(self)
+        self.view = QtWidgets.QListView(self)
+        # Одинаковая высота строк и пакетная раскладка позволяют не измерять
+        # каждую строку при добавлении больших пачек
+        self.view.setUniformItemSizes(True)
+        self.view.setLayoutMode(QtWidgets.QListView.Batched)
+        self.view.setBatchSize(1000)
+        self.view.setModel(self.model)
+        self.view.activated.connect(self._on_activated)
+
+        self.summary = QtWidgets.QLabel(self)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.view)
+        layout.addWidget(self.summary)
+
+    def start(self, pattern: str, title: str = 'Результаты поиска') -> None:
+        """
+        Очищает окно перед новым поиском.
+
+        Args:
+            pattern: Шаблон поиска
+            title: Заголовок окна
+        """
+        self.model.clear()
+        self.setWindowTitle(f'{title}: {pattern}')
+        self.summary.setText('Поиск...')
+
+    def add_paths(self, paths: List[Result]) -> None:
+        """
+        Добавляет пачку результатов.
+
+        Args:
+            paths: Найденные пути или совпадения в содержимом
+        """
+        self.model.add_paths(paths)
+        self.summary.setText(f'Найдено: {self.model.rowCount()}')
+
+    def _on_activated(self, index: QModelIndex) -> None:
+        """Передаёт путь активированного результата главному окну."""
+        self.result_activated.emit(self.model.path(index.row()))
@@ -0,0 +1,606 @@
+"""
+Снимки дерева каталогов и их сравнение.
+
+Снимок — поток записей (путь, вид, размер, mtime, inode) всех элементов
+дерева в порядке обхода в глубину с сортировкой по имени. Путь
+хранится относительно корня с разделителем b'\\0' и сжат относительно
+предыдущей записи (общий префикс + окончание), поток сжат gzip. Байтовый
+порядок таких путей совпадает с порядком обхода, поэтому два снимка
+сравниваются слиянием за один проход, не загружая их в память.
+
+Повторный снимок читает предыдущий параллельно с обходом: каталог,
+mtime и inode которого не изменились, не перечитывается, а его записи
+берутся из предыдущего снимка (как в updatedb). Подкаталоги такого
+каталога всё равно проверяются. Изменение файла на месте не меняет
+mtime каталога, поэтому для его обнаружения нужен режим verify_files,
+в котором проверяется каждый файл, но не перечитываются каталоги.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import stat
+import struct
+import time
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from cache_dir import cache_path
+from disk_usage import format_size
+
+logger = logging.getLogger('FileExplorer.snapshot')
+
+# Расширение файлов снимков
+SNAPSHOT_SUFFIX = '.snapshot'
+# Сигнатура и версия формата
+MAGIC = b'EXPLSNP1'
+# Степень сжатия gzip: быстрее записи на диск, но в разы меньше исходного потока
+COMPRESS_LEVEL = 3
+# Размер блока при чтении снимка
+READ_SIZE = 1024 * 1024
+# Как часто (в каталогах) сообщать о ходе обхода
+PROGRESS_EVERY = 100
+
+# Вид элемента
+KIND_FILE, KIND_DIR, KIND_LINK, KIND_OTHER = range(4)
+# Вид изменения
+ADDED, REMOVED, MODIFIED, MOVED = 'added', 'removed', 'modified', 'moved'
+# Названия видов изменений для интерфейса
+CHANGE_TITLES = {
+    ADDED: 'Добавлен',
+    REMOVED: 'Удалён',
+    MODIFIED: 'Изменён',
+    MOVED: 'Перемещён',
+}
+_KIND_TITLES = ('файл', 'каталог', 'ссылка', 'особый файл')
+
+# Заголовок: время создания снимка и длина пути корня
+_HEADER = struct.Struct('<dH')
+# Запись: длина общего с предыдущей записью префикса, длина окончания пути,
+# вид, размер, mtime в наносекундах, inode
+_RECORD = struct.Struct('<HHBQqQ')
+_SEP = b'\0'
+
+
+class SnapshotError(OSError):
+    """Файл снимка повреждён или имеет неизвестный формат."""
+
+
+class Entry(NamedTuple):
+    """Запись снимка; key — путь относительно корня с разделителем b'\\0'."""
+
+    key: bytes
+    kind: int
+    size: int
+    mtime_ns: int
+    ino: int
+
+
+class Change(NamedTuple):
+    """Изменение между двумя снимками."""
+
+    kind: str
+    # Путь в новом снимке (для удалённых — в старом)
+    path: str
+    old: Optional[Entry]
+    new: Optional[Entry]
+    # Прежний путь перемещённого элемента
+    moved_from: str = ''
+
+
+class SnapshotInfo(NamedTuple):
+    """Сохранённый снимок."""
+
+    path: str
+    root: str
+    created: float
+
+
+class ScanStats:
+    """Итоги создания снимка."""
+
+    def __init__(self) -> None:
+        """Инициализация нулевых счётчиков."""
+        self.dirs = 0
+        self.entries = 0
+        # Каталоги, записи которых взяты из предыдущего снимка без чтения
+        self.reused_dirs = 0
+        self.errors = 0
+        self.completed = False
+
+
+def entry_kind(st: os.stat_result) -> int:
+    """Вид элемента по результату lstat."""
+    if stat.S_ISDIR(st.st_mode):
+        return KIND_DIR
+    if stat.S_ISREG(st.st_mode):
+        return KIND_FILE
+    if stat.S_ISLNK(st.st_mode):
+        return KIND_LINK
+    return KIND_OTHER
+
+
+def key_to_path(root: str, key: bytes) -> str:
+    """Полный путь элемента по ключу записи."""
+    if not key:
+        return root
+    return os.path.join(root, *(os.fsdecode(part) for part in key.split(_SEP)))
+
+
+def default_snapshot_dir() -> str:
+    """Каталог снимков по умолчанию: snapshots в каталоге кэша."""
+    return cache_path('snapshots')
+
+
+def snapshot_path(root: str, created: float, directory: Optional[str] = None) -> str:
+    """
+    Путь нового файла снимка.
+
+    Args:
+        root: Корень снимка
+        created: Время создания (секунды с начала эпохи)
+        directory: Каталог снимков; по умолчанию default_snapshot_dir()
+    """
+    directory = directory or default_snapshot_dir()
+    digest = hashlib.sha1(os.fsencode(root)).hexdigest()[:16]
+    return os.path.join(directory, f'{digest}-{int(created * 1000)}{SNAPSHOT_SUFFIX}')
+
+
+def list_snapshots(root: str, directory: Optional[str] = None) -> List[SnapshotInfo]:
+    """
+    Сохранённые снимки корня, от старых к новым. Повреждённые файлы пропускаются.
+
+    Args:
+        root: Корень снимков
+        directory: Каталог снимков; по умолчанию default_snapshot_dir()
+    """
+    directory = directory or default_snapshot_dir()
+    root = os.path.normpath(root)
+    prefix = os.path.basename(snapshot_path(root, 0, directory)).split('-')[0] + '-'
+    try:
+        names = [name for name in os.listdir(directory)
+                 if name.startswith(prefix) and name.endswith(SNAPSHOT_SUFFIX)]
+    except OSError:
+        return []
+    snapshots = []
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            with SnapshotReader(path) as reader:
+                if reader.root == root:
+                    snapshots.append(SnapshotInfo(path, reader.root, reader.created))
+        except OSError as e:
+            logger.warning(f'Skipping snapshot {path}: {e}')
+    snapshots.sort(key=lambda info: info.created)
+    return snapshots
+
+
+class SnapshotWriter:
+    """
+    Запись снимка. Файл пишется во временный и переименовывается при
+    закрытии, поэтому прерванная запись не оставляет неполного снимка.
+    """
+
+    def __init__(self, path: str, root: str, created: Optional[float] = None) -> None:
+        """
+        Инициализация и запись заголовка.
+
+        Args:
+            path: Путь файла снимка
+            root: Корень снимка
+            created: Время создания; по умолчанию текущее
+        """
+        self.path = path
+        self.count = 0
+        self._partial = path + '.partial'
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = gzip.open(self._partial, 'wb', compresslevel=COMPRESS_LEVEL)
+        encoded = os.fsencode(root)
+        self._file.write(MAGIC + _HEADER.pack(time.time() if created is None else created,
+                                              len(encoded)) + encoded)
+        self._last = b''
+        # Записи сжимаются блоками: вызов gzip на каждую запись заметно медленнее
+        self._buffer = bytearray()
+
+    def write(self, entry: Entry) -> None:
+        """Добавляет запись; записи передаются в порядке ключей."""
+        key = entry.key
+        prefix = _common_prefix(self._last, key)
+        self._buffer += _RECORD.pack(prefix, len(key) - prefix, entry.kind, entry.size,
+                                     entry.mtime_ns, entry.ino)
+        self._buffer += key[prefix:]
+        self._last = key
+        self.count += 1
+        if len(self._buffer) >= READ_SIZE:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+
+    def close(self) -> None:
+        """Завершает запись и публикует снимок."""
+        self._file.write(self._buffer)
+        self._file.close()
+        os.replace(self._partial, self.path)
+
+    def abort(self) -> None:
+        """Прерывает запись и удаляет временный файл."""
+        self._file.close()
+        try:
+            os.remove(self._partial)
+        except OSError:
+            pass
+
+
+class SnapshotReader:
+    """Последовательное чтение снимка; используется как контекстный менеджер."""
+
+    def __init__(self, path: str) -> None:
+        """
+        Открытие снимка и чтение заголовка.
+
+        Args:
+            path: Путь файла снимка
+
+        Raises:
+            SnapshotError: Если файл не является снимком
+            OSError: Если файл не удалось прочитать
+        """
+        self.path = path
+        self._file: BinaryIO = gzip.open(path, 'rb')
+        try:
+            header = self._file.read(len(MAGIC) + _HEADER.size)
+            if len(header) != len(MAGIC) + _HEADER.size or not header.startswith(MAGIC):
+                raise SnapshotError(f'Not a snapshot: {path}')
+            self.created, length = _HEADER.unpack_from(header, len(MAGIC))
+            encoded = self._file.read(length)
+            if len(encoded) != length:
+                raise SnapshotError(f'Truncated snapshot: {path}')
+            self.root = os.fsdecode(encoded)
+        except (EOFError, OSError) as e:
+            self._file.close()
+            raise e if isinstance(e, SnapshotError) else SnapshotError(f'{path}: {e}')
+
+    def __enter__(self) -> 'SnapshotReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Закрывает файл снимка."""
+        self._file.close()
+
+    def __iter__(self) -> Iterator[Entry]:
+        """
+        Перебирает записи по порядку.
+
+        Raises:
+            SnapshotError: Если снимок обрывается или повреждён
+        """
+        buffer = b''
+        pos = 0
+        key = b''
+        size = _RECORD.size
+        while True:
+            if len(buffer) - pos >= size:
+                prefix, length, kind, entry_size, mtime_ns, ino = _RECORD.unpack_from(buffer, pos)
+                end = pos + size + length
+                if end <= len(buffer):
+                    key = key[:prefix] + buffer[pos + size:end]
+                    pos = end
+                    yield Entry(key, kind, entry_size, mtime_ns, ino)
+                    continue
+            try:
+                chunk = self._file.read(READ_SIZE)
+            except (EOFError, OSError) as e:
+                raise SnapshotError(f'{self.path}: {e}')
+            if not chunk:
+                if pos != len(buffer):
+                    raise SnapshotError(f'Truncated snapshot: {self.path}')
+                return
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+
+def _common_prefix(a: bytes, b: bytes) -> int:
+    """Длина общего префикса двух строк байт (двоичный поиск по срезам)."""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class _Cursor:
+    """Чтение записей предыдущего снимка вслед за обходом."""
+
+    def __init__(self, entries: Iterable[Entry]) -> None:
+        self._entries = iter(entries)
+        self._next = next(self._entries, None)
+
+    def peek(self) -> Optional[Entry]:
+        """Следующая запись без её извлечения."""
+        return self._next
+
+    def take(self) -> Optional[Entry]:
+        """Извлекает следующую запись."""
+        entry = self._next
+        self._next = next(self._entries, None)
+        return entry
+
+    def seek(self, key: bytes) -> Optional[Entry]:
+        """Пропускает записи до ключа; возвращает и извлекает запись с этим ключом."""
+        while self._next is not None and self._next.key < key:
+            self.take()
+        if self._next is not None and self._next.key == key:
+            return self.take()
+        return None
+
+    def skip_under(self, key: bytes) -> None:
+        """Пропускает оставшиеся записи поддерева ключа."""
+        prefix = key + _SEP if key else b''
+        while self._next is not None and self._next.key.startswith(prefix):
+            self.take()
+
+
+class _Frame:
+    """Каталог в стеке обхода."""
+
+    __slots__ = ('path', 'key', 'children', 'position')
+
+    def __init__(self, path: str, key: bytes, children: Optional[List[os.DirEntry]]) -> None:
+        self.path = path
+        self.key = key
+        # Прочитанное содержимое, отсортированное по ключу; None — записи
+        # каталога берутся из предыдущего снимка
+        self.children = children
+        self.position = 0
+
+
+def _entry(key: bytes, st: os.stat_result) -> Entry:
+    """Запись по результату lstat; размер каталогов не сохраняется."""
+    kind = entry_kind(st)
+    return Entry(key, kind, 0 if kind == KIND_DIR else st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+def take_snapshot(root: str, path: str, previous: Optional[str] = None,
+                  verify_files: bool = False,
+                  should_stop: Optional[Callable[[], bool]] = None,
+                  on_progress: Optional[Callable[[int, int], None]] = None) -> ScanStats:
+    """
+    Создаёт снимок дерева. Символические ссылки не разыменовываются.
+
+    Args:
+        root: Корень дерева
+        path: Путь файла снимка
+        previous: Предыдущий снимок того же корня: неизменённые каталоги
+            не перечитываются, а их записи копируются из него
+        verify_files: Проверять lstat каждого файла неизменённых каталогов
+        should_stop: Функция, возвращающая True при необходимости остановки
+        on_progress: Вызывается с числом каталогов и записей
+
+    Returns:
+        Итоги обхода; при остановке снимок не сохраняется (completed=False)
+
+    Raises:
+        OSError: Если корень недоступен или снимок не удалось записать
+    """
+    root = os.path.normpath(root)
+    stats = ScanStats()
+    root_stat = os.stat(root)
+    reader = None
+    old = _Cursor(())
+    if previous:
+        try:
+            reader = SnapshotReader(previous)
+            if reader.root == root:
+                old = _Cursor(reader)
+            else:
+                logger.warning(f'Snapshot {previous} has another root: {reader.root}')
+        except OSError as e:
+            logger.warning(f'Previous snapshot ignored: {e}')
+    writer = SnapshotWriter(path, root)
+    try:
+        root_entry = _entry(b'', root_stat)
+        writer.write(root_entry)
+        stack = [_open_frame(root, root_entry, old.seek(b''), stats)]
+        while stack:
+            frame = stack[-1]
+            child = _next_child(frame, old, verify_files, stats)
+            if child is None:
+                old.skip_under(frame.key)
+                stack.pop()
+                continue
+            child_path, entry, previous_entry = child
+            writer.write(entry)
+            stats.entries += 1
+            if entry.kind == KIND_DIR:
+                if should_stop and should_stop():
+                    writer.abort()
+                    return stats
+                stack.append(_open_frame(child_path, entry, previous_entry, stats))
+                if on_progress and stats.dirs % PROGRESS_EVERY == 0:
+                    on_progress(stats.dirs, stats.entries)
+            elif previous_entry is not None and previous_entry.kind == KIND_DIR:
+                # Каталог заменён файлом: прежнее поддерево больше не нужно
+                old.skip_under(entry.key)
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        if reader is not None:
+            reader.close()
+    stats.completed = True
+    if on_progress:
+        on_progress(stats.dirs, stats.entries)
+    logger.info(f'Snapshot of {root}: {stats.dirs} dirs, {stats.entries} entries, '
+                f'{stats.reused_dirs} dirs reused, {stats.errors} errors')
+    return stats
+
+
+def _open_frame(path: str, entry: Entry, previous: Optional[Entry], stats: ScanStats) -> _Frame:
+    """Каталог для обхода: содержимое читается, только если каталог изменился."""
+    stats.dirs += 1
+    if (previous is not None and previous.kind == KIND_DIR
+            and previous.mtime_ns == entry.mtime_ns and previous.ino == entry.ino):
+        stats.reused_dirs += 1
+        return _Frame(path, entry.key, None)
+    try:
+        with os.scandir(path) as it:
+            children = list(it)
+    except OSError as e:
+        logger.debug(f'Cannot read {path}: {e}')
+        stats.errors += 1
+        children = []
+    children.sort(key=lambda child: os.fsencode(child.name))
+    return _Frame(path, entry.key, children)
+
+
+def _next_child(frame: _Frame, old: _Cursor, verify_files: bool, stats: ScanStats):
+    """
+    Следующий элемент каталога: (путь, новая запись, запись предыдущего
+    снимка или None) либо None, если элементы закончились.
+    """
+    prefix = frame.key + _SEP if frame.key else b''
+    if frame.children is not None:
+        while frame.position < len(frame.children):
+            child = frame.children[frame.position]
+            frame.position += 1
+            key = prefix + os.fsencode(child.name)
+            try:
+                st = child.stat(follow_symlinks=False)
+            except OSError:
+                stats.errors += 1
+                continue
+            return child.path, _entry(key, st), old.seek(key)
+        return None
+    # Каталог не изменился: его элементы — записи предыдущего снимка
+    while True:
+        previous = old.peek()
+        if (previous is None or not previous.key.startswith(prefix)
+                or _SEP in previous.key[len(prefix):]):
+            return None
+        old.take()
+        if previous.kind != KIND_DIR and not verify_files:
+            # Путь нужен только каталогам, которые обходятся дальше
+            return '', previous, previous
+        child_path = os.path.join(frame.path, os.fsdecode(previous.key[len(prefix):]))
+        try:
+            st = os.lstat(child_path)
+        except OSError:
+            # Изменение в пределах точности mtime каталога
+            old.skip_under(previous.key)
+            continue
+        return child_path, _entry(previous.key, st), previous
+
+
+def diff_snapshots(old_path: str, new_path: str,
+                   should_stop: Optional[Callable[[], bool]] = None) -> Iterator[Change]:
+    """
+    Сравнивает два снимка одного корня слиянием за один проход.
+
+    Изменённые элементы выдаются по ходу сравнения. Добавленные и удалённые
+    накапливаются до конца, чтобы сопоставить перемещения по inode (для файлов
+    также по размеру и mtime), поэтому память пропорциональна числу
+    изменений, а не размеру дерева. Элементы перемещённого каталога отдельно
+    не перечисляются. Изменение mtime каталога изменением не считается.
+
+    Args:
+        old_path: Предыдущий снимок
+        new_path: Новый снимок
+        should_stop: Функция, возвращающая True при необходимости остановки
+
+    Raises:
+        SnapshotError: Если снимок повреждён
+    """
+    with SnapshotReader(old_path) as old_reader, SnapshotReader(new_path) as new_reader:
+        old_root, root = old_reader.root, new_reader.root
+        removed: Dict[bytes, Entry] = {}
+        added: Dict[bytes, Entry] = {}
+        old_entries, new_entries = iter(old_reader), iter(new_reader)
+        old, new = next(old_entries, None), next(new_entries, None)
+        count = 0
+        while old is not None or new is not None:
+            count += 1
+            if should_stop and count % 4096 == 0 and should_stop():
+                return
+            if new is None or (old is not None and old.key < new.key):
+                removed[old.key] = old
+                old = next(old_entries, None)
+            elif old is None or new.key < old.key:
+                added[new.key] = new
+                new = next(new_entries, None)
+            else:
+                if old.kind != new.kind or (new.kind != KIND_DIR and (
+                        old.size != new.size or old.mtime_ns != new.mtime_ns)):
+                    yield Change(MODIFIED, key_to_path(root, new.key), old, new)
+                old, new = next(old_entries, None), next(new_entries, None)
+
+    identities = {_identity(entry): key for key, entry in removed.items()}
+    # Новый ключ перемещённого каталога -> прежний
+    moved_dirs: Dict[bytes, bytes] = {}
+    for key, entry in added.items():
+        source = _moved_with_parent(key, entry, moved_dirs, removed)
+        if source is not None:
+            old_entry = removed.pop(source)
+            if entry.kind == KIND_DIR:
+                moved_dirs[key] = source
+            elif _identity(old_entry) != _identity(entry):
+                yield Change(MODIFIED, key_to_path(root, key), old_entry, entry)
+            continue
+        source = identities.get(_identity(entry))
+        if source is not None and source in removed:
+            old_entry = removed.pop(source)
+            if entry.kind == KIND_DIR:
+                moved_dirs[key] = source
+            yield Change(MOVED, key_to_path(root, key), old_entry, entry,
+                         key_to_path(old_root, source))
+        else:
+            yield Change(ADDED, key_to_path(root, key), None, entry)
+    for key, entry in removed.items():
+        yield Change(REMOVED, key_to_path(old_root, key), entry, None)
+
+
+def _identity(entry: Entry) -> tuple:
+    """Признаки, по которым перемещённый элемент узнаётся на новом месте."""
+    if entry.kind == KIND_DIR:
+        return entry.kind, entry.ino
+    return entry.kind, entry.ino, entry.size, entry.mtime_ns
+
+
+def _moved_with_parent(key: bytes, entry: Entry, moved_dirs: Dict[bytes, bytes],
+                       removed: Dict[bytes, Entry]) -> Optional[bytes]:
+    """
+    Прежний ключ элемента, перемещённого вместе с каталогом-предком, или None.
+    Элемент мог при этом измениться, поэтому сравнивается только вид.
+    """
+    parent = key
+    while _SEP in parent:
+        parent = parent.rpartition(_SEP)[0]
+        source_dir = moved_dirs.get(parent)
+        if source_dir is not None:
+            source = source_dir + key[len(parent):]
+            previous = removed.get(source)
+            if previous is not None and previous.kind == entry.kind:
+                return source
+            return None
+    return None
+
+
+def describe_change(change: Change) -> str:
+    """Подробности изменения для отображения."""
+    if change.kind == MOVED:
+        return f'из {change.moved_from}'
+    entry = change.new or change.old
+    if change.kind != MODIFIED:
+        if entry.kind == KIND_FILE:
+            return f'{_KIND_TITLES[entry.kind]}, {format_size(entry.size)}'
+        return _KIND_TITLES[entry.kind]
+    old, new = change.old, change.new
+    if old.kind != new.kind:
+        return f'{_KIND_TITLES[old.kind]} → {_KIND_TITLES[new.kind]}'
+    if old.size != new.size:
+        return f'размер {format_size(old.size)} → {format_size(new.size)}'
+    return 'изменено время'
@@ -0,0 +1,141 @@
+from typing import Any, Dict, List
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+from path_store import PathStore
+from snapshot import ADDED, CHANGE_TITLES, MODIFIED, MOVED, REMOVED, Change, describe_change
+
+# Столбцы списка изменений
+HEADERS = ['Изменение', 'Путь', 'Подробности']
+# Порядок видов изменений (номер вида хранится в модели одним байтом)
+CHANGE_KINDS = (ADDED, REMOVED, MODIFIED, MOVED)
+
+
+class ChangesModel(QAbstractTableModel):
+    """
+    Список изменений между снимками. Пути хранятся в PathStore, вид
+    изменения — одним байтом, подробности — готовой строкой.
+    """
+
+    def __init__(self, parent=None) -> None:
+        """Инициализация пустого списка."""
+        super().__init__(parent)
+        self._kinds = bytearray()
+        self._paths = PathStore()
+        self._details: List[str] = []
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Количество изменений."""
+        return 0 if parent.isValid() else len(self._kinds)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Количество столбцов."""
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section: int, orientation, role: int = Qt.DisplayRole) -> Any:
+        """Заголовки столбцов."""
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return HEADERS[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        """Данные видимой строки."""
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        row, column = index.row(), index.column()
+        if column == 0:
+            return CHANGE_TITLES[CHANGE_KINDS[self._kinds[row]]]
+        if column == 1:
+            return self._paths[row]
+        return self._details[row]
+
+    def add_changes(self, changes: List[Change]) -> None:
+        """Добавляет пачку изменений одной операцией вставки."""
+        if not changes:
+            return
+        first = len(self._kinds)
+        self.beginInsertRows(QModelIndex(), first, first + len(changes) - 1)
+        for change in changes:
+            self._kinds.append(CHANGE_KINDS.index(change.kind))
+            self._paths.append(change.path)
+            self._details.append(describe_change(change))
+        self.endInsertRows()
+
+    def clear(self) -> None:
+        """Удаляет все изменения."""
+        self.beginResetModel()
+        self._kinds = bytearray()
+        self._paths.clear()
+        self._details = []
+        self.endResetModel()
+
+    def kind(self, row: int) -> str:
+        """Вид изменения строки."""
+        return CHANGE_KINDS[self._kinds[row]]
+
+    def path(self, row: int) -> str:
+        """Путь строки."""
+        return self._paths[row]
+
+
+class SnapshotDiffWindow(QtWidgets.QWidget):
+    """Окно со списком изменений дерева со времени снимка."""
+
+    path_activated = pyqtSignal(str)
+
+    def __init__(self, parent=None) -> None:
+        """Инициализация окна сравнения снимков."""
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle('Изменения со времени снимка')
+        self.resize(800, 450)
+        self.counts: Dict[str, int] = {}
+
+        self.model = ChangesModel(self)
+        self.view = QtWidgets.QTableView(self)
+        self.view.setModel(self.model)
+        self.view.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.view.verticalHeader().hide()
+        self.view.horizontalHeader().setStretchLastSection(True)
+        self.view.setColumnWidth(1, 500)
+        self.view.activated.connect(self._on_activated)
+
+        self.summary = QtWidgets.QLabel(self)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.view)
+        layout.addWidget(self.summary)
+
+    def start(self, root_path: str, created: str) -> None:
+        """
+        Очищает окно перед новым сравнением.
+
+        Args:
+            root_path: Сравниваемый каталог
+            created: Время создания снимка для заголовка
+        """
+        self.model.clear()
+        self.counts = {kind: 0 for kind in CHANGE_KINDS}
+        self.setWindowTitle(f'Изменения с {created}: {root_path}')
+        self.summary.setText('Сравнение...')
+
+    def add_changes(self, changes: List[Change]) -> None:
+        """
+        Добавляет пачку изменений.
+
+        Args:
+            changes: Изменения
+        """
+        self.model.add_changes(changes)
+        for change in changes:
+            self.counts[change.kind] += 1
+        self.summary.setText(self.summary_text())
+
+    def summary_text(self) -> str:
+        """Итоговая строка по видам изменений."""
+        return ', '.join(f'{CHANGE_TITLES[kind].lower()}: {self.counts.get(kind, 0)}'
+                         for kind in CHANGE_KINDS)
+
+    def _on_activated(self, index: QModelIndex) -> None:
+        """Передаёт путь активированного изменения (кроме удалённых) главному окну."""
+        if self.model.kind(index.row()) != REMOVED:
+            self.path_activated.emit(self.model.path(index.row()))
@@ -0,0 +1,92 @@
+"""
+Профилирование запуска приложения (флаг --profile-startup).
+
+Модуль импортируется первым и использует только стандартную
+библиотеку, чтобы учитывать время импорта всех остальных модулей.
+"""
+import builtins
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Флаг командной строки, включающий профилирование запуска
+FLAG = '--profile-startup'
+# Сколько самых медленных импортов показывать в отчёте
+TOP_IMPORTS = 15
+
+
+class StartupProfile:
+    """Отметки этапов запуска и время импорта модулей."""
+
+    def __init__(self, enabled: bool) -> None:
+        """
+        Инициализация профиля.
+
+        Args:
+            enabled: Собирать ли отметки
+        """
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.marks: List[Tuple[str, float]] = []
+        # Модуль -> время его первого импорта (включая вложенные импорты)
+        self.imports: Dict[str, float] = {}
+        self._original_import = None
+        self._reported = False
+
+    def install_import_timer(self) -> None:
+        """Начинает замерять время первого импорта каждого модуля."""
+        if not self.enabled or self._original_import is not None:
+            return
+        original = self._original_import = builtins.__import__
+        imports = self.imports
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                imports.setdefault(name, time.perf_counter() - start)
+
+        builtins.__import__ = timed_import
+
+    def uninstall_import_timer(self) -> None:
+        """Прекращает замер импортов."""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def mark(self, name: str) -> None:
+        """
+        Отмечает окончание этапа запуска.
+
+        Args:
+            name: Название этапа
+        """
+        if self.enabled:
+            self.marks.append((name, time.perf_counter()))
+
+    def report(self) -> Optional[str]:
+        """Возвращает текстовый отчёт (один раз) или None, если профилирование выключено."""
+        if not self.enabled or self._reported:
+            return None
+        self._reported = True
+        self.uninstall_import_timer()
+        lines = ['Startup profile:']
+        previous = self.started
+        for name, moment in self.marks:
+            lines.append(f'  {name:<28} {(moment - previous) * 1000:8.1f} ms'
+                         f'  (total {(moment - self.started) * 1000:8.1f} ms)')
+            previous = moment
+        if self.imports:
+            lines.append(f'Slowest imports (top {TOP_IMPORTS}, including nested):')
+            slowest = sorted(self.imports.items(), key=lambda item: item[1], reverse=True)
+            for name, duration in slowest[:TOP_IMPORTS]:
+                lines.append(f'  {name:<28} {duration * 1000:8.1f} ms')
+        return '\n'.join(lines)
+
+
+# Профиль текущего процесса
+startup = StartupProfile(FLAG in sys.argv)
+startup.install_import_timer()
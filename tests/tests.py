@@ -1,11 +1,65 @@
+import asyncio
+import errno
+import json
+import logging
+import os
 import platform
+import re
+import subprocess
 import sys
+import tarfile
+import threading
+import time
+import tracemalloc
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
 from unittest.mock import patch
 
 import pytest
+from PyQt5.QtCore import QEvent, QModelIndex, Qt
+from PyQt5.QtGui import QColor, QImage
 from PyQt5.QtWidgets import QApplication
 
-from explorer import FileExplorer
+import benchmark
+import explorer
+from app_state import AppState
+from archives import ArchiveCache, ArchiveError, split_archive_path
+import lazy_model
+import search_cli
+from explorer import FileExplorer, FileSearchJob
+from content_search import ContentSearcher, compile_pattern, grep_file
+import dir_cache
+from dir_cache import ListingCache
+from disk_usage import DiskUsageAnalyzer
+import duplicates
+from duplicates import DuplicateFinder, HashCache
+import file_ops
+from file_ops import FileOperation
+import fuzzy
+from fuzzy import FuzzyIndex, fuzzy_score
+import index_watcher
+from index_watcher import IndexWatcher
+import jobs
+from jobs import CancelToken, JobScheduler
+from lazy_model import LazyDirectoryModel
+from log_pipeline import RateLimitFilter, setup_logging, stop_logging
+import metadata
+from metadata import FileMetadata, MetadataCache, collect_metadata
+import metadata_model
+from metadata_model import MetadataProvider
+from path_store import PathStore
+from perf import Profiler, profiler
+from preview import read_preview
+import process_pool
+from query import QueryError, compile_query
+from search_core import SearchStats, asearch_files, search_files
+from search_index import FileIndex
+from search_results import SearchResultsModel
+import thumbnails
+from thumbnails import ThumbnailCache, ThumbnailProvider, load_thumbnail
+import snapshot
+from snapshot import SnapshotError, SnapshotReader, diff_snapshots, list_snapshots, take_snapshot
+from walker import ParallelWalker
 
 
 @pytest.fixture(scope="module")
@@ -18,12 +72,21 @@ def app_qt():
 
 
 @pytest.fixture
-def file_explorer(app_qt):
+def file_explorer(app_qt, tmp_path, monkeypatch):
     """
-    Создает и возвращает экземпляр FileExplorer для каждого теста.
+    Создает экземпляр FileExplorer для каждого теста и закрывает его после
+    теста. Состояние и кэши окна хранятся во временном каталоге, а не в ~/.cache.
     """
-    explorer = FileExplorer()
-    return explorer
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    window = FileExplorer()
+    yield window
+    # Фоновые задачи останавливаются, их сигналы доставляются ещё живым
+    # объектам, и только затем окно с моделями удаляется
+    window.close()
+    window.scheduler.shutdown(explorer.CLOSE_TIMEOUT)
+    app_qt.processEvents()
+    window.deleteLater()
+    app_qt.sendPostedEvents(None, QEvent.DeferredDelete)
 
 
 def test_open_file_success_directory(file_explorer):
@@ -128,5 +191,1643 @@ def test_change_root_next(file_explorer):
         assert file_explorer.ui.status.text() == "Вы перешли в: /fake/path"
 
 
+@pytest.fixture
+def sample_tree(tmp_path):
+    """
+    Создает небольшое дерево каталогов для тестов поиска.
+    """
+    root = tmp_path / "root"
+    (root / "docs" / "old").mkdir(parents=True)
+    (root / "src").mkdir()
+    (root / "docs" / "Report.TXT").write_text("report")
+    (root / "docs" / "old" / "report_2020.txt").write_text("old")
+    (root / "src" / "main.py").write_text("print()")
+    (root / "readme.md").write_text("readme")
+    return root
+
+
+def test_file_index_search(sample_tree, tmp_path):
+    """
+    Тестирует построение индекса и поиск подстроки без учета регистра.
+    """
+    index = FileIndex(str(tmp_path / "index.db"))
+    assert not index.is_fresh(str(sample_tree))
+    assert index.build(str(sample_tree))
+    assert index.is_fresh(str(sample_tree / "docs"))
+    assert index.last_scanned(str(sample_tree)) is not None
+
+    found = sorted(index.search(str(sample_tree), "report"))
+    assert found == [
+        str(sample_tree / "docs" / "Report.TXT"),
+        str(sample_tree / "docs" / "old" / "report_2020.txt"),
+    ]
+    assert list(index.search(str(sample_tree / "src"), "*.py")) == [
+        str(sample_tree / "src" / "main.py")
+    ]
+    assert list(index.search(str(sample_tree / "src"), "report")) == []
+
+
+def test_file_index_stale(sample_tree, tmp_path):
+    """
+    Тестирует устаревание индекса и его перестроение.
+    """
+    index = FileIndex(str(tmp_path / "index.db"), max_age=0)
+    index.build(str(sample_tree))
+    assert not index.is_fresh(str(sample_tree))
+
+    (sample_tree / "new_report.log").write_text("new")
+    index.max_age = 60
+    index.build(str(sample_tree))
+    assert str(sample_tree / "new_report.log") in set(index.search(str(sample_tree), "report"))
+
+
+def test_file_index_reuses_connection(sample_tree, tmp_path):
+    """
+    Тестирует, что соединение и схема создаются один раз на поток.
+    """
+    index = FileIndex(str(tmp_path / "index.db"))
+    with patch.object(index, "_connect", wraps=index._connect) as connect:
+        index.build(str(sample_tree))
+        for _ in range(3):
+            assert index.is_fresh(str(sample_tree))
+            assert list(index.search(str(sample_tree), "main")) == [
+                str(sample_tree / "src" / "main.py")
+            ]
+        assert connect.call_count == 1
+        with ThreadPoolExecutor(1) as pool:
+            assert pool.submit(index.directories, str(sample_tree / "src")).result() == [
+                str(sample_tree / "src")
+            ]
+        assert connect.call_count == 2
+
+
+def test_file_index_roots_in_memory(sample_tree, tmp_path, caplog):
+    """
+    Тестирует, что проверка корня не читает базу повторно, а ошибка базы
+    записывается в журнал вместо исключения.
+    """
+    index = FileIndex(str(tmp_path / "index.db"))
+    assert index.covering_root(str(sample_tree)) is None
+    index.build(str(sample_tree / "docs"))
+    assert index.covering_root(str(sample_tree / "docs" / "old"))[0] == str(sample_tree / "docs")
+    with patch.object(index, "_connection", side_effect=AssertionError):
+        assert index.is_fresh(str(sample_tree / "docs"))
+        assert index.covering_root(str(sample_tree)) is None
+    index.build(str(sample_tree))
+    assert index.covering_root(str(sample_tree / "src"))[0] == str(sample_tree)
+
+    (tmp_path / "file").write_text("")
+    broken = FileIndex(str(tmp_path / "file" / "index.db"))
+    with (patch("os.path.exists", return_value=True),
+          caplog.at_level(logging.WARNING, logger="FileExplorer.index")):
+        assert broken.covering_root(str(sample_tree)) is None
+    assert "Index unavailable" in caplog.text
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_parallel_walker_matches_os_walk(sample_tree, workers):
+    """
+    Тестирует, что многопоточный обход находит то же, что os.walk.
+    """
+    expected = {
+        root: (sorted(dirs), sorted(files))
+        for root, dirs, files in os.walk(sample_tree)
+    }
+    walked = {
+        root: (dirs, files)
+        for root, dirs, files in ParallelWalker(str(sample_tree), workers)
+    }
+    assert walked == {str(root): value for root, value in expected.items()}
+
+
+def test_parallel_walker_stop(sample_tree):
+    """
+    Тестирует остановку обхода по запросу.
+    """
+    walker = ParallelWalker(str(sample_tree), 4, should_stop=lambda: True)
+    assert list(walker) == []
+
+
+def test_search_thread_batches(sample_tree):
+    """
+    Тестирует доставку результатов поиска пачками ограниченного размера.
+    """
+    batches = []
+    job = FileSearchJob(str(sample_tree), "r", workers=1)
+    job.found_files.connect(batches.append)
+    with (patch.object(explorer, "BATCH_SIZE", 2),
+          patch.object(explorer, "BATCH_INTERVAL", 60)):
+        job.run()
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert {os.path.basename(p) for batch in batches for p in batch} == {
+        "Report.TXT", "report_2020.txt", "readme.md"
+    }
+
+
+def test_search_job_flushes_during_walk(sample_tree):
+    """
+    Тестирует отправку пачки по истечении BATCH_INTERVAL, пока обход
+    продолжается без новых результатов.
+    """
+    batches = []
+    seen_during_walk = []
+
+    def slow_walk(root, query, index, workers, should_stop, stats, archives):
+        yield str(sample_tree / "readme.md")
+        deadline = time.monotonic() + 1
+        while not batches and time.monotonic() < deadline:
+            should_stop()
+            time.sleep(0.01)
+        seen_during_walk.extend(batches)
+
+    job = FileSearchJob(str(sample_tree), "readme", workers=1)
+    job.found_files.connect(batches.append)
+    with (patch.object(explorer, "BATCH_INTERVAL", 0.05),
+          patch.object(explorer, "search_files", slow_walk)):
+        job.run()
+    assert seen_during_walk == [[str(sample_tree / "readme.md")]]
+
+
+def test_search_results_navigation(file_explorer, sample_tree):
+    """
+    Тестирует накопление результатов и переход к выбранному результату.
+    """
+    file_explorer.results_window = explorer.SearchResultsWindow(file_explorer)
+    file_explorer.on_files_found([str(sample_tree / "readme.md")])
+    file_explorer.on_files_found([str(sample_tree / "src" / "main.py")])
+    assert file_explorer.results_window.model.rowCount() == 2
+    assert file_explorer.ui.status.text() == "Найдено: 2"
+
+    file_explorer.show_search_result(str(sample_tree / "src" / "main.py"))
+    assert file_explorer.model.rootPath() == str(sample_tree / "src")
+    assert file_explorer.ui.path.text() == str(sample_tree / "src" / "main.py")
+
+
+def test_query_fields(sample_tree):
+    """
+    Тестирует условия по имени, расширению, размеру, времени и типу.
+    """
+    docs = str(sample_tree / "docs")
+    assert compile_query("report").matches(docs, "Report.TXT")
+    assert compile_query("ext:txt,md").matches(docs, "Report.TXT")
+    assert not compile_query("report -ext:txt").matches(docs, "Report.TXT")
+    assert compile_query("re:^rep.*\\.txt$").matches(docs, "Report.TXT")
+    assert compile_query("/^REP/").matches(docs, "Report.TXT")
+    assert compile_query("size>=6 size<1k").matches(docs, "Report.TXT")
+    assert not compile_query("size>1M").matches(docs, "Report.TXT")
+    assert compile_query("mtime<1h").matches(docs, "Report.TXT")
+    assert not compile_query("mtime<2000-01-01").matches(docs, "Report.TXT")
+
+    query = compile_query("type:dir old")
+    assert query.match_dirs and not query.match_files
+    assert query.literal == "old"
+
+
+@pytest.mark.parametrize("text", ["", "size>lots", "mtime<yesterday", "type:socket",
+                                  "re:(", "ext>py"])
+def test_query_errors(text):
+    """
+    Тестирует сообщения об ошибках в запросе.
+    """
+    with pytest.raises(QueryError):
+        compile_query(text)
+
+
+def test_query_prunes_subtrees(sample_tree):
+    """
+    Тестирует исключение поддеревьев до спуска в них.
+    """
+    query = compile_query("report -path:old")
+    walker = ParallelWalker(str(sample_tree), 1, prune=query.prune)
+    found = [os.path.join(root, name) for root, _, files in walker
+             for name in files if query.matches(root, name)]
+    assert found == [str(sample_tree / "docs" / "Report.TXT")]
+    assert walker.scanned == 3
+    assert query.excluded(str(sample_tree), str(sample_tree / "docs" / "old"))
+    assert not query.excluded(str(sample_tree / "docs" / "old"), str(sample_tree / "docs" / "old"))
+
+
+def test_query_stats_once(sample_tree):
+    """
+    Тестирует, что несколько условий по размеру и времени вызывают stat один раз.
+    """
+    query = compile_query("size>1 size<1k mtime<7d")
+    calls = []
+    original = os.stat
+    with patch("query.os.stat", lambda path: calls.append(path) or original(path)):
+        assert query.matches(str(sample_tree / "docs"), "Report.TXT")
+    assert calls == [str(sample_tree / "docs" / "Report.TXT")]
+    result = os.stat(sample_tree / "readme.md")
+    provided = []
+    assert query.matches(str(sample_tree), "readme.md", lambda: provided.append(1) or result)
+    assert provided == [1]
+
+
+@pytest.mark.parametrize("pattern", ["old", "ol", "docs/old", "*.txt", "main"])
+def test_query_negated_path_is_complement(sample_tree, pattern):
+    """
+    Тестирует, что -path:шаблон находит в точности то, что не находит path:шаблон,
+    в том числе файлы, имя которых содержит шаблон, и каталоги с его частью в имени.
+    """
+    def walk(text):
+        query = compile_query(f"type:any {text}")
+        walker = ParallelWalker(str(sample_tree), 1, prune=query.prune)
+        return {os.path.join(root, name) for root, dirs, files in walker
+                for name in dirs + files if query.matches(root, name)}
+
+    everything = walk("*")
+    assert walk(f"-path:{pattern}") == everything - walk(f"path:{pattern}")
+
+
+def test_file_index_query(sample_tree, tmp_path):
+    """
+    Тестирует поиск по индексу со сложным запросом.
+    """
+    index = FileIndex(str(tmp_path / "index.db"))
+    index.build(str(sample_tree))
+    assert list(index.search(str(sample_tree), compile_query("report -path:old"))) == [
+        str(sample_tree / "docs" / "Report.TXT")
+    ]
+
+
+@pytest.mark.parametrize("text", ["[abcd]x", "x[!a].txt", "report[_.]", "-report",
+                                  "-name:report ext:txt", "x -readme"])
+def test_file_index_matches_walk(sample_tree, tmp_path, text):
+    """
+    Тестирует, что поиск по индексу находит то же, что обход дерева.
+    """
+    (sample_tree / "ax.txt").write_text("a")
+    (sample_tree / "src" / "dx.txt").write_text("d")
+    (sample_tree / "xb.txt").write_text("x")
+    index = FileIndex(str(tmp_path / "index.db"))
+    index.build(str(sample_tree))
+    query = compile_query(text)
+    walked = sorted(os.path.join(root, name) for root, _, files in os.walk(sample_tree)
+                    for name in files if query.matches(root, name))
+    assert walked
+    assert sorted(index.search(str(sample_tree), query)) == walked
+
+
+def test_file_index_incremental_changes(sample_tree, tmp_path):
+    """
+    Тестирует применение изменений каталога и переименования без пересканирования.
+    """
+    index = FileIndex(str(tmp_path / "index.db"))
+    index.build(str(sample_tree))
+
+    (sample_tree / "readme.md").unlink()
+    (sample_tree / "notes").mkdir()
+    (sample_tree / "notes" / "todo_report.txt").write_text("todo")
+    (sample_tree / "docs" / "old").rename(sample_tree / "docs" / "archive")
+    added = index.apply_changes(
+        [str(sample_tree), str(sample_tree / "docs")],
+        [(str(sample_tree / "docs" / "old"), str(sample_tree / "docs" / "archive"))]
+    )
+    assert added == [str(sample_tree / "notes")]
+    assert sorted(index.search(str(sample_tree), "re")) == [
+        str(sample_tree / "docs" / "Report.TXT"),
+        str(sample_tree / "docs" / "archive" / "report_2020.txt"),
+        str(sample_tree / "notes" / "todo_report.txt"),
+    ]
+
+
+def test_file_index_refresh_changed(sample_tree, tmp_path):
+    """
+    Тестирует обновление по времени изменения каталогов.
+    """
+    index = FileIndex(str(tmp_path / "index.db"))
+    index.build(str(sample_tree))
+    assert index.refresh_changed(str(sample_tree)) == 0
+
+    (sample_tree / "src" / "util.py").write_text("")
+    os.utime(sample_tree / "src", (1, 1))
+    assert index.refresh_changed(str(sample_tree)) == 1
+    assert str(sample_tree / "src" / "util.py") in set(index.search(str(sample_tree), "util"))
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify только в Linux")
+def test_index_watcher_inotify(sample_tree, tmp_path):
+    """
+    Тестирует обновление индекса по событиям inotify.
+    """
+    index = FileIndex(str(tmp_path / "index.db"))
+    index.build(str(sample_tree))
+    watcher = IndexWatcher(index, debounce=0.05)
+    watcher.watch(str(sample_tree))
+    try:
+        deadline = time.monotonic() + 5
+        while str(sample_tree) not in watcher._watched_roots and time.monotonic() < deadline:
+            time.sleep(0.01)
+        for i in range(50):
+            (sample_tree / "src" / f"burst_{i}.log").write_text("")
+        (sample_tree / "src" / "main.py").unlink()
+
+        expected = {str(sample_tree / "src" / f"burst_{i}.log") for i in range(50)}
+        found = set()
+        while found != expected and time.monotonic() < deadline:
+            time.sleep(0.05)
+            found = set(index.search(str(sample_tree / "src"), "*"))
+        assert found == expected
+    finally:
+        watcher.stop()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify только в Linux")
+def test_index_watcher_catches_up_and_restarts(app_qt, sample_tree, tmp_path, monkeypatch):
+    """
+    Тестирует догоняющее обновление изменений, сделанных до начала наблюдения,
+    и перезапуск службы после ошибки.
+    """
+    index = FileIndex(str(tmp_path / "index.db"))
+    index.build(str(sample_tree))
+    (sample_tree / "src" / "before_watch.py").write_text("")
+    monkeypatch.setattr(index_watcher, "RESTART_DELAY", 0.01)
+    watcher = IndexWatcher(index, debounce=0.05)
+    failures = []
+    original = watcher._touch_roots
+
+    def failing_touch():
+        if not failures:
+            failures.append(1)
+            raise RuntimeError("boom")
+        original()
+
+    monkeypatch.setattr(watcher, "_touch_roots", failing_touch)
+    watcher.watch(str(sample_tree))
+    try:
+        assert wait_for(app_qt, lambda: list(index.search(str(sample_tree), "before_watch")))
+        # Событие будит службу, и она падает; изменение находит перезапуск
+        (sample_tree / "src" / "during_restart.py").write_text("")
+        assert wait_for(app_qt, lambda: failures and str(sample_tree) in watcher._watched_roots)
+        assert wait_for(app_qt, lambda: list(index.search(str(sample_tree), "during_restart")))
+        (sample_tree / "src" / "after_restart.py").write_text("")
+        assert wait_for(app_qt, lambda: list(index.search(str(sample_tree), "after_restart")))
+        assert watcher._thread.is_alive()
+    finally:
+        watcher.stop()
+
+
+def test_grep_file_lines_and_binary(tmp_path):
+    """
+    Тестирует номера строк, регистр для кириллицы и пропуск двоичных файлов.
+    """
+    text_file = tmp_path / "app.conf"
+    text_file.write_text("first\nport = 80\n\nОшибка подключения\nport = 443\n", encoding="utf-8")
+    binary_file = tmp_path / "data.bin"
+    binary_file.write_bytes(b"\0\0port = 80")
+
+    source, ignore_case = compile_pattern("ошибка")
+    regex = re.compile(source, re.IGNORECASE if ignore_case else 0)
+    assert grep_file(str(text_file), regex) == [(str(text_file), 4, "Ошибка подключения")]
+
+    source, ignore_case = compile_pattern("/port = \\d+/")
+    regex = re.compile(source, re.IGNORECASE if ignore_case else 0)
+    assert [hit[1] for hit in grep_file(str(text_file), regex)] == [2, 5]
+    assert grep_file(str(binary_file), regex) == []
+    assert grep_file(str(text_file), regex, max_size=10) == []
+
+
+def test_content_searcher_process_pool(sample_tree):
+    """
+    Тестирует поиск по содержимому в пуле процессов с фильтром файлов.
+    """
+    searcher = ContentSearcher(str(sample_tree), "REPORT", compile_query("ext:txt"),
+                               processes=2)
+    hits = [hit for batch in searcher.search() for hit in batch]
+    assert hits == []
+    pool = process_pool._pools[2]
+
+    searcher = ContentSearcher(str(sample_tree), "report", compile_query("ext:txt"),
+                               processes=2)
+    hits = sorted(hit for batch in searcher.search() for hit in batch)
+    assert hits == [(str(sample_tree / "docs" / "Report.TXT"), 1, "report")]
+    assert searcher.files_checked == 2
+    # Пул процессов создаётся один раз и переиспользуется следующими поисками
+    assert process_pool._pools[2] is pool
+
+
+def test_explorer_import_has_no_side_effects(tmp_path):
+    """
+    Тестирует, что импорт explorer (его выполняют процессы пула при spawn)
+    не настраивает журналирование и не создаёт файл журнала.
+    """
+    code = "import logging, explorer; assert not logging.getLogger().handlers"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path), QT_QPA_PLATFORM="offscreen")
+    subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, check=True)
+    assert not list(tmp_path.glob("explorer.log*"))
+
+
+def test_disk_usage_totals_and_hard_links(tmp_path):
+    """
+    Тестирует суммирование по поддеревьям и однократный учет жестких ссылок.
+    """
+    root = tmp_path / "usage"
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "a" / "b" / "big.bin").write_bytes(b"x" * 100_000)
+    (root / "a" / "small.txt").write_bytes(b"x" * 10)
+    os.link(root / "a" / "b" / "big.bin", root / "big_link.bin")
+
+    usage = DiskUsageAnalyzer().analyze(str(root))
+    big = os.stat(root / "a" / "b" / "big.bin").st_blocks * 512
+    size, files = usage.totals[str(root)]
+    assert files == 3
+    assert size < 2 * big
+    assert usage.totals[str(root / "a")][1] == 2
+    names = [row[0] for row in usage.children(str(root))]
+    assert names == ["a", "big_link.bin"]
+
+
+def test_disk_usage_cache_rescans_changed_branch(tmp_path):
+    """
+    Тестирует повторный анализ с перечитыванием только изменившихся каталогов.
+    """
+    root = tmp_path / "usage"
+    for name in ("a", "b", "c"):
+        (root / name).mkdir(parents=True)
+        (root / name / "file.txt").write_text(name)
+    analyzer = DiskUsageAnalyzer()
+    assert analyzer.analyze(str(root)).rescanned == 4
+
+    (root / "b" / "new.txt").write_text("new")
+    usage = analyzer.analyze(str(root))
+    assert (usage.rescanned, usage.reused) == (1, 3)
+    assert usage.totals[str(root)][1] == 4
+    assert analyzer.analyze(str(root), should_stop=lambda: True) is None
+
+    # Дозапись в файл не меняет mtime каталога: её находит только rescan
+    mtime = os.stat(root / "c").st_mtime_ns
+    before = usage.totals[str(root / "c")][0]
+    with open(root / "c" / "file.txt", "ab") as f:
+        f.write(os.urandom(100_000))
+    os.utime(root / "c", ns=(mtime, mtime))
+    assert analyzer.analyze(str(root)).totals[str(root / "c")][0] == before
+    usage = analyzer.analyze(str(root), rescan=True)
+    assert usage.rescanned == 4
+    assert usage.totals[str(root / "c")][0] > before + 50_000
+
+
+def test_duplicate_finder_stages_and_cache(tmp_path):
+    """
+    Тестирует поиск дубликатов по частичному и полному хешу и повторный запуск из кэша.
+    """
+    root = tmp_path / "data"
+    (root / "a").mkdir(parents=True)
+    (root / "b").mkdir()
+    payload = os.urandom(50_000)
+    (root / "a" / "set.bin").write_bytes(payload)
+    (root / "b" / "set_copy.bin").write_bytes(payload)
+    # Совпадают начало и конец, различается только середина
+    (root / "b" / "set_edited.bin").write_bytes(
+        payload[:25_000] + bytes([payload[25_000] ^ 1]) + payload[25_001:])
+    (root / "a" / "note.txt").write_text("same")
+    (root / "b" / "note.txt").write_text("same")
+    (root / "b" / "other.txt").write_text("diff")
+    os.link(root / "a" / "set.bin", root / "a" / "set_link.bin")
+
+    cache = HashCache(str(tmp_path / "hashes.db"))
+    finder = DuplicateFinder(str(root), cache, processes=2)
+    groups = sorted(finder.search())
+    assert groups == [
+        (4, [str(root / "a" / "note.txt"), str(root / "b" / "note.txt")]),
+        (50_000, [str(root / "a" / "set.bin"), str(root / "b" / "set_copy.bin")]),
+    ]
+    assert finder.hashed == 9
+
+    finder = DuplicateFinder(str(root), cache, processes=2)
+    assert sorted(finder.search()) == sorted(groups)
+    assert (finder.hashed, finder.reused) == (0, 9)
+
+
+def test_duplicate_finder_survives_failed_task(tmp_path, monkeypatch):
+    """
+    Тестирует, что ошибка задачи хеширования не теряет группу:
+    остальные файлы группы по-прежнему подтверждаются.
+    """
+    payload = os.urandom(20_000)
+    for name in ("one.bin", "two.bin", "three.bin"):
+        (tmp_path / name).write_bytes(payload)
+
+    def submit(processes, fn, items, full):
+        future = Future()
+        if full and items[0][0].endswith("three.bin"):
+            future.set_exception(OSError("worker crashed"))
+        else:
+            future.set_result(fn(items, full))
+        return future
+
+    monkeypatch.setattr(duplicates, "CHUNK_FILES", 1)
+    monkeypatch.setattr(duplicates.process_pool, "submit", submit)
+    finder = DuplicateFinder(str(tmp_path), processes=1)
+    assert list(finder.search()) == [
+        (20_000, [str(tmp_path / "one.bin"), str(tmp_path / "two.bin")])]
+
+
+def test_benchmark_tree_is_reproducible(tmp_path):
+    """
+    Тестирует воспроизводимость синтетических деревьев и сравнение с базовым прогоном.
+    """
+    def listing(root):
+        return sorted((os.path.relpath(dirpath, root), sorted(files))
+                      for dirpath, _, files in os.walk(root))
+
+    counts = benchmark.generate_tree(str(tmp_path / "a"), "unicode", scale=0.1, seed=3)
+    benchmark.generate_tree(str(tmp_path / "b"), "unicode", scale=0.1, seed=3)
+    assert counts == {"files": 20, "dirs": 2}
+    assert listing(tmp_path / "a") == listing(tmp_path / "b")
+
+    baseline = {"results": {"wide": {"search_total": 1.0, "listing_fs_model": 0.001}}}
+    current = {"results": {"wide": {"search_total": 1.5, "listing_fs_model": 0.002}}}
+    assert benchmark.compare(current, baseline) == ["wide.search_total: 1.0000 -> 1.5000 (+50%)"]
+
+
+def test_profiler_records_only_when_enabled(tmp_path):
+    """
+    Тестирует сбор статистики, отсутствие записей при выключенном сборе и экспорт трассы.
+    """
+    prof = Profiler()
+    with prof.span("search.files"):
+        pass
+    prof.count("search.errors")
+    assert prof.snapshot()["metrics"] == {} and prof.snapshot()["counters"] == {}
+
+    prof.enable()
+    with prof.span("search.files", root="/") as fields:
+        fields["files"] = 10
+    prof.record("search.files", 0.5)
+    prof.count("search.errors", 2)
+    snapshot = prof.snapshot()
+    assert snapshot["metrics"]["search.files"]["count"] == 2
+    assert snapshot["metrics"]["search.files"]["max_ms"] >= 500
+    assert snapshot["counters"] == {"search.errors": 2}
+
+    prof.export_trace(str(tmp_path / "trace.json"))
+    with open(tmp_path / "trace.json", encoding="utf-8") as f:
+        events = json.load(f)["traceEvents"]
+    assert [event["ph"] for event in events] == ["X", "X"]
+    assert events[0]["args"] == {"root": "/", "files": 10}
+
+
+def test_search_thread_reports_to_profiler(file_explorer, sample_tree):
+    """
+    Тестирует запись навигации и показателей поиска в общий профилировщик.
+    """
+    file_explorer.set_profiling(True)
+    try:
+        file_explorer.change_root(str(sample_tree))
+        job = FileSearchJob(str(sample_tree), "report")
+        job.run()
+        snapshot = profiler.snapshot()
+        assert snapshot["metrics"]["navigation.change_root"]["count"] >= 1
+        details = snapshot["details"]["search.files"]
+        assert details["results"] == 2 and details["files"] == 4
+        assert details["first_hit_ms"] >= 0
+    finally:
+        file_explorer.set_profiling(False)
+        profiler.reset()
+
+
+def test_log_pipeline_rate_limit_and_rotation(tmp_path, caplog):
+    """
+    Тестирует ограничение частоты записей, ротацию и запись журнала в фоновом потоке.
+    Сообщение о пропущенных записях не попадает в записи других обработчиков.
+    """
+    log_path = tmp_path / "explorer.log"
+    setup_logging(str(log_path), max_bytes=1000, backup_count=5, console=False)
+    try:
+        log = logging.getLogger("FileExplorer.test")
+        for i in range(101):
+            if i == 100:
+                time.sleep(1.1)
+            log.info(f"Found file: {i}")
+    finally:
+        stop_logging()
+
+    text = "".join(path.read_text(encoding="utf-8") for path in sorted(tmp_path.glob("explorer.log*")))
+    assert text.count("Found file:") == 21
+    assert "(+80 similar messages suppressed)" in text
+    assert (tmp_path / "explorer.log.1").exists()
+    assert caplog.records[-1].getMessage() == "Found file: 100"
+
+    limiter = RateLimitFilter(limit=1)
+    error = logging.LogRecord("x", logging.ERROR, __file__, 1, "boom", None, None)
+    assert limiter.filter(error) and limiter.filter(error)
+
+
+def test_startup_restores_last_directory(file_explorer, tmp_path):
+    """
+    Тестирует отложенную загрузку корня и восстановление последнего каталога.
+    """
+    state = AppState(str(tmp_path / "state" / "state.json"))
+    state.set("last_dir", str(tmp_path))
+    state.save()
+
+    file_explorer.app_state = AppState(state.path)
+    assert file_explorer.model.rootPath() in ("", ".")
+    file_explorer.finish_startup()
+    assert file_explorer.model.rootPath() == str(tmp_path)
+
+    (tmp_path / "state" / "state.json").write_text("{broken")
+    file_explorer.app_state = AppState(state.path)
+    with patch("os.path.expanduser", return_value=str(tmp_path / "state")):
+        file_explorer.finish_startup()
+    assert file_explorer.model.rootPath() == str(tmp_path / "state")
+
+
+def test_cache_dir_follows_environment(file_explorer, tmp_path, monkeypatch):
+    """
+    Тестирует выбор каталога кэша по XDG_CACHE_HOME при создании кэшей, а не при импорте.
+    """
+    cache = tmp_path / "cache" / "explorer_qt"
+    assert file_explorer.app_state.path == str(cache / "state.json")
+    assert file_explorer.hash_cache.db_path == str(cache / "hashes.sqlite3")
+    assert file_explorer.snapshot_dir == str(cache / "snapshots")
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "other"))
+    assert FileIndex().db_path == str(tmp_path / "other" / "explorer_qt" / "index.sqlite3")
+    assert ThumbnailCache().directory == str(tmp_path / "other" / "explorer_qt" / "thumbnails")
+    assert ArchiveCache().extract_dir == str(tmp_path / "other" / "explorer_qt" / "archives")
+
+    # Относительный путь в XDG_CACHE_HOME игнорируется
+    monkeypatch.setenv("XDG_CACHE_HOME", "relative")
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    assert MetadataCache().db_path == str(tmp_path / "home" / ".cache" / "explorer_qt" / "metadata.sqlite3")
+
+
+def wait_for(app, condition, timeout=5):
+    """
+    Обрабатывает события Qt, пока условие не выполнится.
+    """
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    return condition()
+
+
+def test_lazy_model_fetches_and_sorts(app_qt, tmp_path, monkeypatch):
+    """
+    Тестирует порционную загрузку, фоновую сортировку и метаданные ленивой модели.
+    """
+    monkeypatch.setattr(lazy_model, "CHUNK_SIZE", 7)
+    monkeypatch.setattr(lazy_model, "FETCH_SIZE", 5)
+    for i in range(20):
+        (tmp_path / f"File{i:02d}.txt").write_bytes(b"x" * i)
+    (tmp_path / "zdir").mkdir()
+    (tmp_path / "adir").mkdir()
+    (tmp_path / ".hidden").write_text("")
+
+    model = LazyDirectoryModel()
+    root = QModelIndex()
+    model.setRootPath(str(tmp_path))
+    assert wait_for(app_qt, lambda: model._root.complete)
+    assert model.rowCount() == 5
+    while model.canFetchMore(root):
+        model.fetchMore(root)
+    assert model.rowCount() == 22
+    assert wait_for(app_qt, lambda: model._root.generation == 1)
+
+    names = [model.data(model.index(row, 0)) for row in range(model.rowCount())]
+    assert names[:2] == ["adir", "zdir"]
+    assert names[2:] == sorted(names[2:])
+    assert model.filePath(model.index(str(tmp_path / "File03.txt"))) == str(tmp_path / "File03.txt")
+    assert not model.index(str(tmp_path / ".hidden")).isValid()
+
+    size_index = model.index(3, 1)
+    assert model.data(size_index) is None
+    assert wait_for(app_qt, lambda: model.data(size_index) == "1 Б")
+
+    model.sort(1, Qt.DescendingOrder)
+    assert wait_for(app_qt, lambda: model._root.generation == 2)
+    names = [model.data(model.index(row, 0)) for row in range(model.rowCount())]
+    assert names[2:5] == ["File19.txt", "File18.txt", "File17.txt"]
+    model.close()
+
+
+def test_search_core_and_cli(sample_tree, tmp_path, capsys):
+    """
+    Тестирует поиск без Qt: генератор, асинхронный итератор и командную строку.
+    """
+    expected = {str(sample_tree / "docs" / "Report.TXT"),
+                str(sample_tree / "docs" / "old" / "report_2020.txt")}
+    stats = SearchStats()
+    assert set(search_files(str(sample_tree), "report", stats=stats)) == expected
+    assert (stats.source, stats.dirs, stats.files) == ("walk", 4, 4)
+
+    index = FileIndex(str(tmp_path / "index.db"))
+    index.build(str(sample_tree))
+    stats = SearchStats()
+    assert set(search_files(str(sample_tree), "report", index, stats=stats)) == expected
+    assert stats.source == "index"
+
+    async def collect(limit):
+        found = []
+        async for path in asearch_files(str(sample_tree), "type:file", queue_size=1):
+            found.append(path)
+            if len(found) == limit:
+                break
+        return found
+
+    assert len(asyncio.run(collect(10))) == 4
+    assert len(asyncio.run(collect(1))) == 1
+
+    assert search_cli.main([str(sample_tree), "ext:py"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line) for line in lines] == [{"path": str(sample_tree / "src" / "main.py")}]
+    assert search_cli.main([str(sample_tree), "ext:txt", "--content", "old", "--processes", "1"]) == 0
+    assert [json.loads(line) for line in capsys.readouterr().out.splitlines()] == [
+        {"path": str(sample_tree / "docs" / "old" / "report_2020.txt"), "line": 1, "text": "old"}
+    ]
+    with pytest.raises(SystemExit) as exit_info:
+        search_cli.main([str(sample_tree), "size>"])
+    assert exit_info.value.code == 2
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="имена с байтами не из UTF-8 только в Linux")
+def test_search_cli_non_utf8_names(tmp_path, capsys):
+    """
+    Тестирует вывод имени файла с байтами не из UTF-8: строка остаётся
+    корректным JSON, а исходные байты восстанавливаются через os.fsencode.
+    """
+    open(os.path.join(os.fsencode(tmp_path), b"bad\xffname.txt"), "w").close()
+    (tmp_path / "отчёт.txt").write_text("")
+    assert search_cli.main([str(tmp_path), "ext:txt"]) == 0
+    out = capsys.readouterr().out
+    assert "отчёт.txt" in out
+    names = sorted(os.fsencode(json.loads(line)["path"]) for line in out.splitlines())
+    assert names == sorted([os.path.join(os.fsencode(tmp_path), b"bad\xffname.txt"),
+                            os.fsencode(tmp_path / "отчёт.txt")])
+
+
+def test_fuzzy_index_ranks_and_refines(monkeypatch):
+    """
+    Тестирует ранжирование нечёткого поиска и уточнение запроса по прежнему отбору.
+    """
+    monkeypatch.setattr(fuzzy, "CHUNK_LINES", 3)
+    paths = [
+        "/src/explorer/main.py",
+        "/docs/explorer_guide.md",
+        "/src/extra/pool.py",
+        "/tests/tests.py",
+        "/src/Explorer.py",
+        "/build/e/x/p/l.o",
+    ]
+    index = FuzzyIndex()
+    index.add(paths[:4])
+    index.add(paths[4:])
+    assert index.count == 6
+    assert fuzzy_score("expl", "/src/Explorer.py", "/src/explorer.py") > fuzzy_score(
+        "expl", "/build/e/x/p/l.o")
+    assert fuzzy_score("xyz", "/src/explorer.py") is None
+
+    *_, (ranked, matched) = index.search("expl")
+    assert matched == 5
+    assert [path for _, path in ranked][:2] == ["/src/Explorer.py", "/docs/explorer_guide.md"]
+
+    # Уточнение проверяет только отобранные пути
+    sources = index._sources(index._chunks, len(index._chunks), ("explpy",), False)
+    assert "/tests/tests.py" not in "".join(sources)
+    *_, (ranked, matched) = index.search("expl py")
+    assert sorted(path for _, path in ranked) == [
+        "/src/Explorer.py", "/src/explorer/main.py", "/src/extra/pool.py"]
+
+    # Заглавные буквы включают учёт регистра; остановленный поиск ничего не выдаёт
+    *_, (ranked, _) = index.search("Expl")
+    assert [path for _, path in ranked] == ["/src/Explorer.py"]
+    assert list(index.search("expl", should_stop=lambda: True)) == []
+    assert list(index.search("zzz")) == [([], 0)]
+
+
+def test_fuzzy_index_caps_scoring_and_keeps_partial_filter(monkeypatch):
+    """
+    Тестирует ограничение точного подсчёта очков и сохранение отбора остановленного поиска.
+    """
+    monkeypatch.setattr(fuzzy, "CHUNK_LINES", 50)
+    monkeypatch.setattr(fuzzy, "SCORE_LIMIT", 5)
+    paths = [f"/data/r{i:03d}/m{i:03d}/other.txt" for i in range(200)]
+    paths[130] = "/data/mod/view.py"
+    index = FuzzyIndex()
+    index.add(paths)
+    scored = []
+    original = fuzzy.fuzzy_score
+    monkeypatch.setattr(fuzzy, "fuzzy_score",
+                        lambda term, *args: scored.append(term) or original(term, *args))
+
+    # В каждой порции оценивается не больше SCORE_LIMIT путей, лучший не теряется
+    *_, (ranked, matched) = index.search("view", limit=3)
+    assert matched == 1 and ranked[0][1] == "/data/mod/view.py"
+    *_, (ranked, matched) = index.search("m", limit=3)
+    assert matched == 200 and len(scored) == 1 + 4 * 5
+    assert ranked[0][1] == "/data/mod/view.py"
+
+    # Остановленный после первой порции поиск запоминает свой отбор
+    calls = []
+    stop = lambda: calls.append(1) or len(calls) > 1
+    assert len(list(index.search("m1", should_stop=stop))) == 1
+    terms, _, covered, sources = index._last
+    assert terms == ("m1",) and covered == 4
+    assert "/data/r000/" not in "".join(sources)
+    assert "/data/r199/" in "".join(sources)
+    fresh = FuzzyIndex()
+    fresh.add(paths)
+    assert list(index.search("m13"))[-1] == list(fresh.search("m13"))[-1]
+
+
+def test_quick_search_window(file_explorer, sample_tree, app_qt):
+    """
+    Тестирует загрузку списка файлов и обновление результатов по мере ввода.
+    """
+    file_explorer.action_use_index.setChecked(False)
+    file_explorer.change_root(str(sample_tree))
+    file_explorer.quick_search()
+    window = file_explorer.fuzzy_window
+    assert wait_for(app_qt, lambda: not window.loading)
+    assert file_explorer.fuzzy_index.count == 4
+
+    window.edit.setText("rep")
+    window.edit.setText("rept")
+    assert wait_for(app_qt, lambda: window.summary.text().startswith("Найдено"))
+    assert window.model.rowCount() == 2
+    assert window.model.path(0) == str(sample_tree / "docs" / "Report.TXT")
+
+    window.edit.setText("")
+    assert window.model.rowCount() == 0
+    window.edit.setText("mainpy")
+    assert wait_for(app_qt, lambda: window.model.rowCount() == 1)
+    window.edit.returnPressed.emit()
+    assert file_explorer.model.rootPath() == str(sample_tree / "src")
+    file_explorer.close()
+
+
+def test_listing_cache_validation_eviction_and_prefetch(tmp_path, app_qt, monkeypatch):
+    """
+    Тестирует кэш содержимого каталогов: проверку по mtime, вытеснение,
+    чтение наперёд и открытие каталога ленивой моделью из кэша.
+    """
+    monkeypatch.setattr(dir_cache, "RACY_WINDOW", 0)
+    for name in ("a", "b", "c"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / f"{name}.txt").write_text(name)
+    (tmp_path / "B.txt").write_text("")
+    (tmp_path / ".hidden").write_text("")
+
+    cache = ListingCache()
+    assert cache.get(str(tmp_path)) is None
+    entries = cache.load(str(tmp_path))
+    assert [name for name, _ in entries] == ["a", "b", "c", ".hidden", "B.txt"]
+    assert cache.get(str(tmp_path)) is entries
+    (tmp_path / "new.txt").write_text("")
+    os.utime(tmp_path, ns=(0, 10 ** 18))
+    assert cache.get(str(tmp_path)) is None
+    cache.load(str(tmp_path))
+    cache.invalidate([str(tmp_path)])
+    assert len(cache) == 0
+
+    # Бюджет памяти вмещает только две записи
+    small = ListingCache(max_bytes=2 * dir_cache._estimate_bytes([("a.txt", False)]) + 100)
+    for name in ("a", "b", "c"):
+        small.load(str(tmp_path / name))
+    assert len(small) == 2 and small.evictions == 1
+    assert small.get(str(tmp_path / "a")) is None
+
+    cache.record_visit(str(tmp_path / "b"))
+    assert cache.rank_children(str(tmp_path), [("a", 3.0), ("b", 1.0), ("c", 2.0)], 2) == [
+        str(tmp_path / "b"), str(tmp_path / "a")]
+    cache.prefetch_around(str(tmp_path / "b"))
+    assert wait_for(app_qt, lambda: len(cache) == 2)
+    assert cache.get(str(tmp_path)) is not None
+
+    model = LazyDirectoryModel(cache=cache)
+    model.setRootPath(str(tmp_path))
+    assert model._root.complete and model.rowCount() == 5
+    assert model.data(model.index(3, 0)) == "B.txt"
+    cache.close()
+    model.close()
+
+
+def test_navigation_history(file_explorer, sample_tree):
+    """
+    Тестирует переходы «Назад» и «Вперёд» и пропуск удалённых каталогов.
+    """
+    docs, old, src = sample_tree / "docs", sample_tree / "docs" / "old", sample_tree / "src"
+    for path in (sample_tree, docs, old):
+        file_explorer.change_root(str(path))
+    assert file_explorer.ui.btn_back.isEnabled()
+    assert not file_explorer.ui.btn_forward.isEnabled()
+
+    file_explorer.go_back()
+    assert file_explorer.model.rootPath() == str(docs)
+    file_explorer.go_back()
+    assert file_explorer.model.rootPath() == str(sample_tree)
+    assert not file_explorer.ui.btn_back.isEnabled()
+    file_explorer.go_forward()
+    assert file_explorer.model.rootPath() == str(docs)
+
+    file_explorer.change_root(str(src))
+    assert not file_explorer.ui.btn_forward.isEnabled()
+    os.remove(docs / "old" / "report_2020.txt")
+    os.rmdir(old)
+    file_explorer.go_back()
+    assert file_explorer.model.rootPath() == str(docs)
+    file_explorer.go_forward()
+    assert file_explorer.model.rootPath() == str(src)
+
+
+def test_file_operations_copy_move_delete(sample_tree, tmp_path):
+    """
+    Тестирует копирование с политиками совпадения имён, перемещение,
+    удаление, отмену и переход на обычное копирование без copy_file_range.
+    """
+    (sample_tree / "big.bin").write_bytes(os.urandom(3 * 1024 * 1024))
+    os.symlink("readme.md", sample_tree / "link")
+    dest = tmp_path / "dest"
+    dest.mkdir()
+
+    progress = FileOperation(file_ops.COPY, [str(sample_tree)], str(dest)).run()
+    copied = dest / "root"
+    assert not progress.errors and not progress.cancelled
+    assert progress.done_files == progress.total_files == 6
+    assert (copied / "big.bin").read_bytes() == (sample_tree / "big.bin").read_bytes()
+    assert os.readlink(copied / "link") == "readme.md"
+    assert (copied / "src" / "main.py").stat().st_mtime == (sample_tree / "src" / "main.py").stat().st_mtime
+
+    (sample_tree / "readme.md").write_text("changed")
+    progress = FileOperation(file_ops.COPY, [str(sample_tree / "readme.md")], str(copied),
+                             policy=file_ops.SKIP).run()
+    assert progress.skipped == 1 and (copied / "readme.md").read_text() == "readme"
+    FileOperation(file_ops.COPY, [str(sample_tree / "readme.md")], str(copied)).run()
+    assert (copied / "readme (2).md").read_text() == "changed"
+    os.utime(copied / "readme.md", (0, 0))
+    FileOperation(file_ops.COPY, [str(sample_tree / "readme.md")], str(copied),
+                  policy=file_ops.UPDATE).run()
+    assert (copied / "readme.md").read_text() == "changed"
+    progress = FileOperation(file_ops.COPY, [str(sample_tree)], str(sample_tree / "src")).run()
+    assert len(progress.errors) == 1 and not (sample_tree / "src" / "root").exists()
+
+    # Без copy_file_range и sendfile данные копируются чтением и записью
+    def unsupported(*args):
+        raise OSError(errno.EXDEV, "unsupported")
+    with patch.object(os, "copy_file_range", unsupported, create=True), \
+            patch.object(os, "sendfile", unsupported):
+        progress = FileOperation(file_ops.COPY, [str(sample_tree / "big.bin")], str(dest)).run()
+    assert progress.zero_copy_bytes == 0 and progress.done_bytes == 3 * 1024 * 1024
+    assert (dest / "big.bin").read_bytes() == (sample_tree / "big.bin").read_bytes()
+
+    progress = FileOperation(file_ops.COPY, [str(sample_tree)], str(tmp_path)).run(
+        should_stop=lambda: True)
+    assert progress.cancelled and not list(tmp_path.glob("root (2)/**/*.explorer-partial"))
+
+    progress = FileOperation(file_ops.MOVE, [str(copied / "docs")], str(dest),
+                             policy=file_ops.OVERWRITE).run()
+    assert progress.renamed == 1 and (dest / "docs" / "old" / "report_2020.txt").exists()
+    assert not (copied / "docs").exists()
+
+    progress = FileOperation(file_ops.DELETE, [str(copied)]).run()
+    assert not progress.errors and not copied.exists()
+    assert progress.done_files == progress.total_files
+
+
+def test_file_operations_move_across_devices(sample_tree, tmp_path):
+    """
+    Тестирует, что перемещение между устройствами удаляет только
+    скопированные источники: пропущенные и не скопированные остаются.
+    """
+    dest = tmp_path / "dest"
+    (dest / "docs").mkdir(parents=True)
+    (dest / "docs" / "Report.TXT").write_text("kept")
+    (dest / "readme.md").write_text("kept")
+    real_stat = os.stat
+
+    def other_device(path, *args, **kwargs):
+        st = real_stat(path, *args, **kwargs)
+        if os.fspath(path) == str(dest):
+            return os.stat_result((st.st_mode, st.st_ino, st.st_dev + 1) + tuple(st)[3:10])
+        return st
+
+    with patch("os.stat", other_device):
+        progress = FileOperation(file_ops.MOVE, [str(sample_tree / "docs"),
+                                                 str(sample_tree / "readme.md")],
+                                 str(dest), policy=file_ops.SKIP).run()
+    assert progress.renamed == 0 and progress.skipped == 2 and not progress.errors
+    assert (sample_tree / "readme.md").read_text() == "readme"
+    assert (sample_tree / "docs" / "Report.TXT").read_text() == "report"
+    assert not (sample_tree / "docs" / "old").exists()
+    assert (dest / "docs" / "old" / "report_2020.txt").read_text() == "old"
+    assert (dest / "docs" / "Report.TXT").read_text() == "kept"
+
+    (sample_tree / "src" / "util.py").write_text("util")
+    real_copy = file_ops.copy_file
+
+    def failing_copy(src, dst, *args):
+        if src.endswith("main.py"):
+            raise OSError(errno.EIO, "I/O error")
+        return real_copy(src, dst, *args)
+
+    with patch("os.stat", other_device), patch.object(file_ops, "copy_file", failing_copy):
+        progress = FileOperation(file_ops.MOVE, [str(sample_tree / "src")], str(dest)).run()
+    assert progress.errors == [(str(sample_tree / "src" / "main.py"), "I/O error")]
+    assert (sample_tree / "src" / "main.py").read_text() == "print()"
+    assert not (sample_tree / "src" / "util.py").exists()
+    assert (dest / "src" / "util.py").read_text() == "util"
+
+
+def test_file_operations_queue(file_explorer, app_qt, sample_tree, tmp_path):
+    """
+    Тестирует очередь файловых операций главного окна и вставку из буфера.
+    """
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    file_explorer.change_root(str(dest))
+    file_explorer.file_clipboard = (file_ops.COPY, [str(sample_tree / "src"), str(sample_tree / "docs")])
+    file_explorer.paste_files()
+    file_explorer.enqueue_file_operation(FileOperation(file_ops.DELETE, [str(dest / "src")]))
+    assert file_explorer.file_ops_window.queue.count() == 1
+    assert wait_for(app_qt, lambda: file_explorer.file_ops_job is None)
+    assert sorted(os.listdir(dest)) == ["docs"]
+    assert "завершено" in file_explorer.file_ops_window.summary.text()
+
+
+@pytest.fixture
+def sample_archives(sample_tree):
+    """
+    Создает в дереве для тестов zip- и tar.gz-архивы.
+    """
+    with zipfile.ZipFile(sample_tree / "bundle.zip", "w") as archive:
+        archive.writestr("docs/report_zip.txt", "zipped report")
+        archive.writestr("lib/pkg/module.py", "x = 1")
+        archive.writestr("../escape.txt", "unsafe")
+    with tarfile.open(sample_tree / "backup.tar.gz", "w:gz") as archive:
+        archive.add(sample_tree / "docs", arcname="docs")
+    return sample_tree / "bundle.zip", sample_tree / "backup.tar.gz"
+
+
+def test_archives_index_extract_and_search(sample_tree, sample_archives, tmp_path, capsys):
+    """
+    Тестирует оглавление архивов, его кэш, извлечение одного файла и поиск внутри архивов.
+    """
+    bundle, backup = sample_archives
+    cache = ArchiveCache(extract_dir=str(tmp_path / "extracted"))
+    index = cache.get(str(bundle))
+    assert [name for name, *_ in index.list("")] == ["docs", "lib"]
+    assert index.list("lib/pkg")[0][:3] == ("module.py", False, 5)
+    assert cache.get(str(bundle)) is index and len(cache) == 1
+    assert split_archive_path(str(bundle / "lib" / "pkg")) == (str(bundle), "lib/pkg")
+    assert split_archive_path(str(sample_tree / "src")) is None
+
+    extracted = cache.extract(str(backup), "docs/old/report_2020.txt")
+    assert open(extracted).read() == "old"
+    with cache.open_member(str(bundle), "docs/report_zip.txt") as member:
+        assert member.read() == b"zipped report"
+    with pytest.raises(ArchiveError):
+        cache.open_member(str(bundle), "docs/missing.txt")
+
+    (sample_tree / "broken.zip").write_bytes(b"not an archive")
+    stats = SearchStats()
+    found = set(search_files(str(sample_tree), "report", stats=stats, archives=cache))
+    assert found == {
+        str(sample_tree / "docs" / "Report.TXT"),
+        str(sample_tree / "docs" / "old" / "report_2020.txt"),
+        str(bundle / "docs" / "report_zip.txt"),
+        str(backup / "docs" / "Report.TXT"),
+        str(backup / "docs" / "old" / "report_2020.txt"),
+    }
+    assert stats.errors == 1
+    assert set(search_files(str(sample_tree), "report -path:*old*", archives=cache)) == {
+        str(sample_tree / "docs" / "Report.TXT"),
+        str(bundle / "docs" / "report_zip.txt"),
+        str(backup / "docs" / "Report.TXT"),
+    }
+
+    # Архив изменился: оглавление строится заново
+    with zipfile.ZipFile(bundle, "a") as archive:
+        archive.writestr("new.txt", "new")
+    os.utime(bundle, (time.time() + 10, time.time() + 10))
+    assert cache.get(str(bundle)).member("new.txt") is not None and len(cache) == 2
+
+    assert search_cli.main([str(sample_tree), "ext:py", "--archives"]) == 0
+    assert {json.loads(line)["path"] for line in capsys.readouterr().out.splitlines()} == {
+        str(sample_tree / "src" / "main.py"), str(bundle / "lib" / "pkg" / "module.py")}
+
+
+def test_archive_browsing(file_explorer, app_qt, sample_archives, tmp_path, monkeypatch):
+    """
+    Тестирует просмотр архива в дереве, открытие файла из архива и возврат к каталогам.
+    """
+    bundle, _ = sample_archives
+    file_explorer.archive_cache.extract_dir = str(tmp_path / "extracted")
+    file_explorer.change_root(str(bundle.parent))
+    assert file_explorer.change_root(str(bundle))
+    model = file_explorer.model
+    assert model is file_explorer.archive_model
+    assert wait_for(app_qt, lambda: model.rowCount() == 2)
+    docs = model.index(0, 0)
+    assert model.filePath(docs) == str(bundle / "docs") and model.isDir(docs)
+    assert model.data(model.index(0, 0, docs)) == "report_zip.txt"
+    file_explorer.change_root(str(bundle / "missing"))
+    assert wait_for(app_qt, lambda: "Не удалось" in file_explorer.ui.status.text())
+
+    file_explorer.change_root(str(bundle / "docs"))
+    assert wait_for(app_qt, lambda: model.rowCount() == 1)
+    opened = []
+    monkeypatch.setattr(explorer.subprocess, "call", lambda args: opened.append(args[-1]))
+    file_explorer.on_tree_double_click(model.index(0, 0))
+    assert open(opened[0]).read() == "zipped report"
+
+    file_explorer.change_root_up()
+    assert file_explorer.model.rootPath() == str(bundle)
+    file_explorer.change_root_up()
+    assert file_explorer.model is file_explorer.fs_model
+    file_explorer.go_back()
+    assert file_explorer.model is file_explorer.archive_model
+    assert file_explorer.search_root() == str(bundle.parent)
+
+
+def wait_for_cancel(job):
+    """
+    Функция задачи, выполняющейся до отмены.
+    """
+    while not job.token():
+        time.sleep(0.005)
+
+
+def test_job_scheduler_priorities_and_cancellation(app_qt):
+    """
+    Тестирует порядок задач по приоритетам, резерв потоков для интерактивных
+    задач, отмену без ожидания, ошибки задач и остановку планировщика.
+    """
+    scheduler = JobScheduler(workers=2, reserved_interactive=1)
+    order = []
+
+    # Единственный поток для неинтерактивных задач занят поиском
+    search = scheduler.submit(wait_for_cancel, "search", jobs.PRIORITY_SEARCH)
+    assert wait_for(app_qt, lambda: search.state == jobs.RUNNING)
+    index = scheduler.submit(lambda job: order.append("index"), "index", jobs.PRIORITY_INDEX)
+    prefetch = scheduler.submit(lambda job: order.append("prefetch"), "prefetch",
+                                jobs.PRIORITY_PREFETCH)
+    listing = scheduler.submit(lambda job: order.append("listing") or 42, "listing",
+                               jobs.PRIORITY_INTERACTIVE)
+    assert listing.wait(2) and listing.result == 42
+    assert index.state == jobs.PENDING and order == ["listing"]
+    assert [job.name for job in scheduler.jobs()] == ["search", "index", "prefetch"]
+
+    # Отмена ожидающей задачи завершает её сразу, выполняемой — не блокирует
+    prefetch.cancel()
+    assert prefetch.done and prefetch.state == jobs.CANCELLED
+    started = time.perf_counter()
+    search.cancel()
+    assert time.perf_counter() - started < 0.05
+    assert search.wait(2) and search.state == jobs.CANCELLED
+    assert index.wait(2) and order == ["listing", "index"]
+
+    def failing(job):
+        job.report(1, 2)
+        raise ValueError("boom")
+    failed = scheduler.submit(failing, "failing")
+    assert failed.wait(2) and failed.state == jobs.FAILED
+    assert isinstance(failed.error, ValueError) and failed.progress == (1, 2)
+
+    token = CancelToken()
+    running = scheduler.submit(wait_for_cancel, "running", jobs.PRIORITY_SEARCH, token)
+    assert wait_for(app_qt, lambda: running.state == jobs.RUNNING)
+    assert scheduler.shutdown(timeout=2) and token.cancelled
+    late = scheduler.submit(lambda job: order.append("late"), "late")
+    assert late.state == jobs.CANCELLED and "late" not in order
+
+
+def test_job_scheduler_replaces_stuck_jobs(app_qt, monkeypatch):
+    """
+    Тестирует, что задача, не остановившаяся после отмены (зависший readdir),
+    перестаёт занимать поток и не блокирует остальные фоновые задачи.
+    """
+    monkeypatch.setattr(jobs, "STUCK_TIMEOUT", 0.1)
+    monkeypatch.setattr(jobs, "WATCH_INTERVAL", 0.02)
+    scheduler = JobScheduler(workers=2, reserved_interactive=1)
+    release = threading.Event()
+    stuck = scheduler.submit(lambda job: release.wait(5), "stuck", jobs.PRIORITY_SEARCH)
+    assert wait_for(app_qt, lambda: stuck.state == jobs.RUNNING)
+    stuck.cancel()
+    index = scheduler.submit(lambda job: 42, "index", jobs.PRIORITY_INDEX)
+    assert index.wait(2) and index.result == 42
+    assert [job.name for job in scheduler.jobs()] == ["stuck"]
+
+    release.set()
+    assert stuck.wait(2) and stuck.state == jobs.CANCELLED
+    assert wait_for(app_qt, lambda: not scheduler.jobs())
+    again = scheduler.submit(lambda job: 7, "again", jobs.PRIORITY_INDEX)
+    assert again.wait(2) and again.result == 7
+    assert scheduler._thread_count <= scheduler.workers
+    scheduler.shutdown()
+
+
+class CancellingExecutor:
+    """
+    Исполнитель, отменяющий задачи до их выполнения (как при закрытии планировщика).
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.cancel()
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def test_providers_recover_from_cancelled_jobs(app_qt, tmp_path):
+    """
+    Тестирует, что отменённые до выполнения задачи не оставляют строки
+    и файлы в состоянии «запрошено»: при следующем показе они запрашиваются снова.
+    """
+    (tmp_path / "a.txt").write_text("text\n")
+    scheduler = JobScheduler(workers=2)
+    executor = scheduler.executor(jobs.PRIORITY_SEARCH, "Свойства файлов")
+    assert scheduler.submit(lambda job: None, "user").cancellable
+    assert not executor.submit(lambda: None).cancellable
+    provider = MetadataProvider(None, CancellingExecutor())
+    path = str(tmp_path / "a.txt")
+    assert provider.value(path, 0) is None
+    assert wait_for(app_qt, lambda: not provider._requested)
+    provider._executor = executor
+    assert provider.value(path, 0) is None
+    assert wait_for(app_qt, lambda: provider.value(path, 0) == "text/plain")
+
+    model = LazyDirectoryModel(executor=executor)
+    model.setRootPath(str(tmp_path))
+    assert wait_for(app_qt, lambda: model._root.complete and model.rowCount() == 1)
+    model._executor = CancellingExecutor()
+    size_index = model.index(0, 1)
+    assert model.data(size_index) is None
+    assert wait_for(app_qt, lambda: model._root.stat_state[0] == lazy_model.STAT_NONE)
+    model._executor = executor
+    assert wait_for(app_qt, lambda: model.data(size_index) == "5 Б")
+    model.close()
+    scheduler.shutdown()
+
+
+def test_metadata_provider_revalidates_changed_files(app_qt, tmp_path, monkeypatch):
+    """
+    Тестирует, что запомненные свойства перепроверяются по ключу файла:
+    изменение файла на месте обновляет ячейки, а неизменённый файл — нет.
+    """
+    path = str(tmp_path / "notes.txt")
+    with open(path, "w") as f:
+        f.write("one\n")
+    provider = MetadataProvider(None, ThreadPoolExecutor(1))
+    ready = []
+    provider.metadata_ready.connect(ready.append)
+    lines = metadata.COLUMN_LINES
+    assert provider.value(path, lines) is None
+    assert wait_for(app_qt, lambda: provider.value(path, lines) == "1")
+    assert len(ready) == 1
+
+    monkeypatch.setattr(metadata_model, "REVALIDATE_INTERVAL", 0)
+    assert provider.value(path, lines) == "1"
+    assert wait_for(app_qt, lambda: not provider._requested)
+    assert len(ready) == 1
+    with open(path, "a") as f:
+        f.write("two\nthree\n")
+    assert wait_for(app_qt, lambda: provider.value(path, lines) == "3")
+    assert ready == [[str(tmp_path)], [str(tmp_path)]]
+    provider.close()
+
+
+def test_background_jobs_window(file_explorer, app_qt, sample_tree):
+    """
+    Тестирует выполнение задачи главного окна в планировщике и окно фоновых задач.
+    """
+    blocker = file_explorer.scheduler.submit(wait_for_cancel, "blocker", jobs.PRIORITY_INDEX)
+    file_explorer.show_jobs()
+    window = file_explorer.jobs_window
+    assert wait_for(app_qt, lambda: window.table.topLevelItemCount() == 1)
+    assert window.table.topLevelItem(0).text(0) == "blocker"
+
+    job = FileSearchJob(str(sample_tree), "report")
+    found = []
+    job.found_files.connect(found.extend)
+    job.start(file_explorer.scheduler)
+    assert wait_for(app_qt, lambda: not job.isRunning() and len(found) == 2)
+    assert job.job.progress == (2, None)
+
+    window.table.topLevelItem(0).setSelected(True)
+    window.cancel_selected()
+    assert blocker.wait(2) and blocker.state == jobs.CANCELLED
+    assert wait_for(app_qt, lambda: window.table.topLevelItemCount() == 0)
+    window.close()
+
+
+def test_metadata_detection_and_cache(tmp_path, monkeypatch):
+    """
+    Тестирует определение типа по сигнатуре, подсчёт строк, размеры
+    изображений и повторное использование постоянного кэша свойств.
+    """
+    png = (b"\x89PNG\r\n\x1a\n" + (13).to_bytes(4, "big") + b"IHDR"
+           + (640).to_bytes(4, "big") + (480).to_bytes(4, "big") + b"\x08\x02\x00\x00\x00")
+    jpeg = (b"\xff\xd8\xff\xe0\x00\x10JFIF\x00" + bytes(9)
+            + b"\xff\xc0\x00\x11\x08" + (200).to_bytes(2, "big") + (300).to_bytes(2, "big")
+            + bytes(12))
+    files = {
+        "photo.dat": png,
+        "picture.jpg": jpeg,
+        "notes.txt": "один\nдва\nтри".encode(),
+        "page.html": b"<!DOCTYPE html>\n<p>\n",
+        "data.bin": b"\x00\x01\x02",
+        "archive.zip": b"PK\x03\x04" + bytes(30),
+        "empty": b"",
+    }
+    for name, content in files.items():
+        (tmp_path / name).write_bytes(content)
+    cache = MetadataCache(str(tmp_path / "metadata.sqlite3"))
+    paths = [str(tmp_path / name) for name in files] + [str(tmp_path), str(tmp_path / "missing")]
+    results = dict(collect_metadata(paths, cache))
+    assert results[str(tmp_path / "photo.dat")] == FileMetadata("image/png", None, 640, 480)
+    assert results[str(tmp_path / "picture.jpg")] == FileMetadata("image/jpeg", None, 300, 200)
+    assert results[str(tmp_path / "notes.txt")] == FileMetadata("text/plain", 3)
+    assert results[str(tmp_path / "page.html")] == FileMetadata("text/html", 2)
+    assert results[str(tmp_path / "data.bin")].mime == "application/octet-stream"
+    assert results[str(tmp_path / "archive.zip")].mime == "application/zip"
+    assert results[str(tmp_path / "empty")].mime == "inode/x-empty"
+    assert results[str(tmp_path)] is None and results[str(tmp_path / "missing")] is None
+    assert metadata.format_value(results[str(tmp_path / "photo.dat")],
+                                 metadata.COLUMN_IMAGE) == "640×480"
+
+    # Неизменённые файлы берутся из кэша, изменённый читается заново
+    monkeypatch.setattr(metadata, "read_metadata",
+                        lambda path, size: FileMetadata("text/plain", 1))
+    (tmp_path / "notes.txt").write_text("изменено")
+    results = dict(collect_metadata(paths, cache))
+    assert results[str(tmp_path / "photo.dat")].width == 640
+    assert results[str(tmp_path / "notes.txt")] == FileMetadata("text/plain", 1)
+
+
+def test_metadata_columns(file_explorer, app_qt, sample_tree, tmp_path, monkeypatch):
+    """
+    Тестирует столбцы свойств файлов в обеих моделях дерева: свойства
+    вычисляются в фоне и появляются после первого запроса ячейки.
+    """
+    monkeypatch.setattr(explorer, "MetadataCache",
+                        lambda: MetadataCache(str(tmp_path / "metadata.sqlite3")))
+    read = []
+    original = metadata.read_metadata
+    monkeypatch.setattr(metadata, "read_metadata",
+                        lambda path, size: read.append(path) or original(path, size))
+    # Отложенный запуск выполняется до перехода в тестовый каталог
+    file_explorer.app_state = AppState(str(tmp_path / "state.json"))
+    app_qt.processEvents()
+    tree = file_explorer.ui.file_tree
+    file_explorer.change_root(str(sample_tree))
+    first = file_explorer.fs_model.metadata_column
+    assert tree.isColumnHidden(first)
+    file_explorer.action_metadata_columns.setChecked(True)
+    assert not tree.isColumnHidden(first)
+
+    readme = str(sample_tree / "readme.md")
+    model = file_explorer.model
+    assert model.headerData(first, Qt.Horizontal) == "Тип содержимого"
+    assert wait_for(app_qt, lambda: model.index(readme).isValid())
+    cell = model.index(readme, first)
+    assert model.data(cell) is None and not read
+    assert wait_for(app_qt, lambda: model.data(cell) == "text/plain")
+    assert model.data(model.index(readme, first + metadata.COLUMN_LINES)) == "1"
+
+    file_explorer.action_lazy_model.setChecked(True)
+    lazy = file_explorer.model
+    assert lazy is file_explorer.lazy_model and not tree.isColumnHidden(lazy.metadata_column)
+    assert wait_for(app_qt, lambda: lazy.index(readme).isValid())
+    row = lazy.index(readme).row()
+    assert lazy.data(lazy.index(row, lazy.metadata_column)) == "text/plain"
+    assert read.count(readme) == 1
+    file_explorer.action_metadata_columns.setChecked(False)
+    assert tree.isColumnHidden(lazy.metadata_column)
+
+
+
+def test_path_store_and_results_model(app_qt):
+    """
+    Тестирует восстановление путей из компактного хранилища, его объём
+    и модель результатов поиска поверх него.
+    """
+    paths = ["/home/user/a.txt", "/home/user/docs/b.txt", "/", "relative/c.txt",
+             "/home/user/docs/", "/home/user/docs", "/tmp/\udcff.bin", "//server/share", ""]
+    store = PathStore(paths)
+    assert list(store) == paths and len(store) == len(paths)
+    assert store[1] == paths[1] and store[-1] == "" and store[2:4] == paths[2:4]
+    assert store.append("/home/user/docs/e.txt") == len(paths)
+
+    many = [f"/home/user/project/src/module_{i % 100}/file_{i}.py" for i in range(20000)]
+    store = PathStore(many)
+    assert store[12345] == many[12345]
+    assert store.nbytes < sum(sys.getsizeof(path) for path in many) / 3
+    # Оценка учитывает словарь каталогов: здесь на каталог приходится два файла
+    deep = [f"/data/level_{i % 7}/branch_{i // 2}/item_{i % 2}.dat" for i in range(20000)]
+    tracemalloc.start()
+    deep_store = PathStore(deep)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert 0.85 * used < deep_store.nbytes < 1.15 * used
+    store.clear()
+    assert len(store) == 0 and store.nbytes == 0
+
+    model = SearchResultsModel()
+    model.add_paths(many[:3])
+    assert model.rowCount() == 3 and model.path(2) == many[2]
+    assert model.data(model.index(1)) == many[1]
+    assert model.data(model.index(1), Qt.ToolTipRole) == "file_1.py"
+    model.set_paths([("/src/a.py", 7, "def main():")])
+    assert model.data(model.index(0)) == "/src/a.py:7: def main():"
+    assert model.path(0) == "/src/a.py"
+    model.clear()
+    assert model.rowCount() == 0
+
+
+def test_snapshot_rescan_and_diff(tmp_path):
+    """
+    Тестирует снимки дерева: повторный обход не перечитывает неизменённые
+    каталоги, а сравнение находит добавленные, удалённые, изменённые
+    и перемещённые элементы.
+    """
+    root = tmp_path / "root"
+    for name in ["a/b/y.txt", "a/x.txt", "a-b/z.txt", "stable/s.txt", "mv/sub/f.txt", "keep.txt"]:
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text("1")
+    first = str(tmp_path / "first.snapshot")
+    stats = take_snapshot(str(root), first)
+    assert stats.completed and stats.entries == 12 and stats.reused_dirs == 0
+    with SnapshotReader(first) as reader:
+        keys = [entry.key for entry in reader]
+    # Порядок записей — обход в глубину: элементы «a» идут раньше «a-b»
+    assert keys[:5] == [b"", b"a", b"a\0b", b"a\0b\0y.txt", b"a\0x.txt"]
+    assert keys == sorted(keys)
+
+    time.sleep(0.01)
+    (root / "a" / "x.txt").unlink()
+    (root / "a" / "new.txt").write_text("22")
+    os.rename(root / "mv", root / "a" / "b" / "moved")
+    os.rename(root / "keep.txt", root / "kept.txt")
+    (root / "stable" / "s.txt").write_text("grown")
+
+    read = []
+    original = os.scandir
+    with patch.object(snapshot.os, "scandir", lambda path: read.append(path) or original(path)):
+        quick = str(tmp_path / "quick.snapshot")
+        stats = take_snapshot(str(root), quick, previous=first)
+    assert stats.completed and stats.reused_dirs == 2
+    assert str(root / "stable") not in read and str(root / "a") in read
+    changes = {(change.kind, change.path, change.moved_from)
+               for change in diff_snapshots(first, quick)}
+    assert changes == {
+        ("removed", str(root / "a" / "x.txt"), ""),
+        ("added", str(root / "a" / "new.txt"), ""),
+        ("moved", str(root / "a" / "b" / "moved"), str(root / "mv")),
+        ("moved", str(root / "kept.txt"), str(root / "keep.txt")),
+    }
+
+    # Изменение файла на месте видно только при проверке каждого файла
+    full = str(tmp_path / "full.snapshot")
+    assert take_snapshot(str(root), full, previous=first, verify_files=True).completed
+    modified = [change for change in diff_snapshots(first, full) if change.kind == "modified"]
+    assert [change.path for change in modified] == [str(root / "stable" / "s.txt")]
+    assert snapshot.describe_change(modified[0]) == "размер 1 Б → 5 Б"
+    fresh = str(tmp_path / "fresh.snapshot")
+    take_snapshot(str(root), fresh)
+    with SnapshotReader(full) as verified, SnapshotReader(fresh) as scanned:
+        assert list(verified) == list(scanned)
+
+    assert not take_snapshot(str(root), str(tmp_path / "stopped.snapshot"),
+                             should_stop=lambda: True).completed
+    assert not os.path.exists(tmp_path / "stopped.snapshot")
+    (tmp_path / "broken.snapshot").write_bytes(b"not a snapshot")
+    with pytest.raises(SnapshotError):
+        SnapshotReader(str(tmp_path / "broken.snapshot"))
+
+
+def test_snapshot_compare_window(file_explorer, app_qt, sample_tree, tmp_path):
+    """Тестирует сохранение снимка корня и окно изменений со времени снимка."""
+    file_explorer.app_state = AppState(str(tmp_path / "state.json"))
+    app_qt.processEvents()
+    file_explorer.snapshot_dir = str(tmp_path / "snapshots")
+    file_explorer.change_root(str(sample_tree))
+    file_explorer.compare_snapshot()
+    assert file_explorer.ui.status.text() == "Для этого каталога нет сохранённых снимков"
+
+    file_explorer.save_snapshot()
+    assert wait_for(app_qt, lambda: file_explorer.ui.status.text().startswith("Снимок сохранён"))
+    snapshots = list_snapshots(str(sample_tree), file_explorer.snapshot_dir)
+    assert len(snapshots) == 1 and snapshots[0].root == str(sample_tree)
+
+    (sample_tree / "added.txt").write_text("new")
+    file_explorer.compare_snapshot(snapshots[0])
+    window = file_explorer.snapshot_window
+    assert wait_for(app_qt, lambda: window.summary.text().startswith("Сравнение завершено"))
+    assert window.model.rowCount() == 1
+    assert window.model.path(0) == str(sample_tree / "added.txt")
+    assert window.model.data(window.model.index(0, 0)) == "Добавлен"
+    assert window.counts["added"] == 1
+    # Временный снимок сравнения не сохраняется
+    assert len(list_snapshots(str(sample_tree), file_explorer.snapshot_dir)) == 1
+
+
+def write_image(path, width, height):
+    """Сохраняет одноцветное изображение для тестов эскизов."""
+    image = QImage(width, height, QImage.Format_RGB32)
+    image.fill(QColor("teal"))
+    assert image.save(str(path))
+
+
+def test_text_preview_and_thumbnail_cache(app_qt, tmp_path, monkeypatch):
+    """
+    Тестирует чтение начала файла для просмотра, эскизы в уменьшенном
+    размере и их кэш в памяти и на диске с проверкой времени изменения.
+    """
+    text = tmp_path / "log.txt"
+    text.write_text("строка\n" * 100, encoding="utf-8")
+    preview = read_preview(str(text), max_lines=3)
+    assert preview.mime == "text/plain" and preview.truncated
+    assert preview.text == "строка\n" * 3
+    # Граница фрагмента посреди символа: неполный символ отбрасывается
+    preview = read_preview(str(text), limit=5)
+    assert preview.text == "ст" and preview.truncated and preview.size == text.stat().st_size
+    binary = tmp_path / "data.bin"
+    binary.write_bytes(b"\x00\x01" * 100)
+    assert read_preview(str(binary)).text is None
+    assert read_preview(str(tmp_path / "data.bin")).mime == "application/octet-stream"
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+    assert read_preview(str(empty)).text == ""
+
+    photo = tmp_path / "photo.png"
+    write_image(photo, 1200, 600)
+    assert thumbnails.is_image(str(photo)) and not thumbnails.is_image(str(text))
+    monkeypatch.setattr(thumbnails, "CACHE_MIN_BYTES", 0)
+    decoded = []
+    original = thumbnails.make_thumbnail
+    monkeypatch.setattr(thumbnails, "make_thumbnail",
+                        lambda path, size: decoded.append(path) or original(path, size))
+    cache = ThumbnailCache(str(tmp_path / "thumbs"))
+    image = load_thumbnail(str(photo), 128, cache)
+    assert (image.width(), image.height()) == (128, 64)
+    assert load_thumbnail(str(photo), 128, cache).width() == 128 and len(decoded) == 1
+    os.utime(photo, ns=(1, 1))
+    load_thumbnail(str(photo), 128, cache)
+    assert len(decoded) == 2
+    assert len(os.listdir(tmp_path / "thumbs")) == 1
+
+    provider = ThumbnailProvider(cache)
+    ready = []
+    provider.thumbnails_ready.connect(ready.extend)
+    assert provider.thumbnail(str(photo)) is None
+    assert provider.thumbnail(str(text)) is None
+    assert wait_for(app_qt, lambda: len(ready) == 2)
+    assert provider.thumbnail(str(photo)).width() == 128
+    assert provider.thumbnail(str(text)) is None and len(decoded) == 3
+    provider.invalidate({str(tmp_path)})
+    assert provider.thumbnail(str(photo)) is None
+    provider.close()
+
+    # Задача, отменённая до выполнения, не занимает место навсегда
+    provider = ThumbnailProvider(cache, CancellingExecutor())
+    for _ in range(thumbnails.WORKERS + 1):
+        assert provider.thumbnail(str(photo)) is None
+    assert provider._active == 0
+    provider._executor = ThreadPoolExecutor(1)
+    assert wait_for(app_qt, lambda: provider.thumbnail(str(photo)) is not None)
+    provider.close()
+
+
+def test_thumbnail_grid_and_preview(file_explorer, app_qt, tmp_path, monkeypatch):
+    """Тестирует сетку эскизов текущего каталога и панель просмотра выбранного файла."""
+    monkeypatch.setattr(explorer, "ThumbnailCache",
+                        lambda: ThumbnailCache(str(tmp_path / "thumbs")))
+    folder = tmp_path / "images"
+    folder.mkdir()
+    for i in range(3):
+        write_image(folder / f"image_{i}.png", 300, 200)
+    (folder / "notes.txt").write_text("заметка\n")
+    file_explorer.app_state = AppState(str(tmp_path / "state.json"))
+    app_qt.processEvents()
+    file_explorer.change_root(str(folder))
+
+    file_explorer.show_thumbnails()
+    window = file_explorer.thumbnail_window
+    view = window.view
+    assert view.model() is file_explorer.model
+    assert view.rootIndex() == file_explorer.ui.file_tree.rootIndex()
+    assert wait_for(app_qt, lambda: file_explorer.model.rowCount(view.rootIndex()) == 4)
+    image_path = str(folder / "image_0.png")
+    assert wait_for(app_qt, lambda: file_explorer.thumbnails.thumbnail(image_path) is not None)
+    assert file_explorer.thumbnails.thumbnail(image_path).width() == 128
+
+    file_explorer.show_preview()
+    preview = file_explorer.preview_window
+    index = file_explorer.model.index(str(folder / "notes.txt"))
+    file_explorer.on_tree_click(index)
+    assert wait_for(app_qt, lambda: preview.stack.currentWidget() is preview.text)
+    assert preview.text.toPlainText() == "заметка\n"
+    file_explorer.on_tree_click(file_explorer.model.index(image_path))
+    assert wait_for(app_qt, lambda: preview.stack.currentWidget() is preview.image)
+    assert preview.image.pixmap().width() == 300
+
+    file_explorer.change_root(str(tmp_path))
+    assert view.rootIndex() == file_explorer.ui.file_tree.rootIndex()
+
+
 if __name__ == "__main__":
     pytest.main()
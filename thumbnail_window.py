@@ -0,0 +1,130 @@
+from typing import List
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QModelIndex, QRect, QSize, Qt
+from PyQt5.QtGui import QIcon, QPainter, QPalette
+
+from thumbnails import THUMBNAIL_SIZE, ThumbnailProvider, is_image
+
+# Поля вокруг эскиза и высота подписи (пикселей)
+MARGIN = 6
+LABEL_HEIGHT = 18
+# Размер значка файлов, для которых эскиза нет
+ICON_SIZE = 48
+
+
+class ThumbnailDelegate(QtWidgets.QStyledItemDelegate):
+    """
+    Отрисовка элемента сетки: эскиз изображения или значок и имя.
+    Эскизы запрашиваются только для отрисовываемых элементов.
+    """
+
+    def __init__(self, provider: ThumbnailProvider, parent=None) -> None:
+        """
+        Инициализация.
+
+        Args:
+            provider: Источник эскизов
+            parent: Родительский объект Qt
+        """
+        super().__init__(parent)
+        self.provider = provider
+        self.cell = QSize(THUMBNAIL_SIZE + 2 * MARGIN, THUMBNAIL_SIZE + 2 * MARGIN + LABEL_HEIGHT)
+
+    def sizeHint(self, option, index: QModelIndex) -> QSize:
+        """Все элементы одного размера."""
+        return self.cell
+
+    def paint(self, painter: QPainter, option, index: QModelIndex) -> None:
+        """Рисует фон выделения, эскиз или значок и имя файла."""
+        style_option = QtWidgets.QStyleOptionViewItem(option)
+        self.initStyleOption(style_option, index)
+        widget = option.widget
+        style = widget.style() if widget is not None else QtWidgets.QApplication.style()
+        style.drawPrimitive(QtWidgets.QStyle.PE_PanelItemViewItem, style_option, painter, widget)
+
+        rect = option.rect
+        image_rect = QRect(rect.x() + (rect.width() - THUMBNAIL_SIZE) // 2, rect.y() + MARGIN,
+                           THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        model = index.model()
+        path = model.filePath(index)
+        pixmap = None
+        if is_image(path) and not model.isDir(index):
+            pixmap = self.provider.thumbnail(path)
+        if pixmap is not None:
+            target = QRect(0, 0, pixmap.width(), pixmap.height())
+            target.moveCenter(image_rect.center())
+            painter.drawPixmap(target, pixmap)
+        else:
+            icon = index.data(Qt.DecorationRole)
+            if isinstance(icon, QIcon):
+                icon_rect = QRect(0, 0, ICON_SIZE, ICON_SIZE)
+                icon_rect.moveCenter(image_rect.center())
+                icon.paint(painter, icon_rect)
+
+        text_rect = QRect(rect.x() + 2, image_rect.bottom() + MARGIN, rect.width() - 4, LABEL_HEIGHT)
+        name = option.fontMetrics.elidedText(str(index.data(Qt.DisplayRole) or ''),
+                                             Qt.ElideMiddle, text_rect.width())
+        selected = bool(option.state & QtWidgets.QStyle.State_Selected)
+        painter.save()
+        painter.setPen(option.palette.color(
+            QPalette.HighlightedText if selected else QPalette.Text))
+        painter.drawText(text_rect, Qt.AlignHCenter | Qt.AlignTop, name)
+        painter.restore()
+
+
+class ThumbnailWindow(QtWidgets.QWidget):
+    """
+    Окно с содержимым текущего каталога в виде сетки эскизов.
+
+    Использует ту же модель, что и дерево, поэтому следует за переходами
+    и не читает каталог повторно. Все элементы одного размера, и
+    представление располагает их без измерения каждого.
+    """
+
+    def __init__(self, provider: ThumbnailProvider, parent=None) -> None:
+        """
+        Инициализация окна эскизов.
+
+        Args:
+            provider: Источник эскизов
+            parent: Родительский виджет
+        """
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle('Эскизы')
+        self.resize(760, 520)
+        self.provider = provider
+
+        self.delegate = ThumbnailDelegate(provider, self)
+        self.view = QtWidgets.QListView(self)
+        self.view.setViewMode(QtWidgets.QListView.IconMode)
+        self.view.setMovement(QtWidgets.QListView.Static)
+        self.view.setResizeMode(QtWidgets.QListView.Adjust)
+        self.view.setUniformItemSizes(True)
+        self.view.setGridSize(self.delegate.cell)
+        self.view.setLayoutMode(QtWidgets.QListView.Batched)
+        self.view.setBatchSize(1000)
+        self.view.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        self.view.setItemDelegate(self.delegate)
+        provider.thumbnails_ready.connect(self._on_thumbnails)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.view)
+
+    def set_root(self, model, root: QModelIndex) -> None:
+        """
+        Показывает содержимое каталога модели дерева.
+
+        Args:
+            model: Модель дерева (filePath, isDir)
+            root: Индекс каталога
+        """
+        if self.view.model() is not model:
+            self.view.setModel(model)
+        self.view.setRootIndex(root)
+        self.setWindowTitle(f'Эскизы: {model.filePath(root)}')
+
+    def _on_thumbnails(self, paths: List[str]) -> None:
+        """Перерисовывает сетку, когда готовы новые эскизы (Qt объединяет перерисовки)."""
+        if self.isVisible():
+            self.view.viewport().update()
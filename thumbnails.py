@@ -0,0 +1,314 @@
+"""
+Эскизы изображений.
+
+Изображение декодируется в фоновой задаче сразу в уменьшенном размере
+(QImageReader.setScaledSize: JPEG уменьшается уже при декодировании).
+Готовые эскизы хранятся в памяти (LRU с ограничением по объёму) и на
+диске в каталоге thumbnails кэша приложения по образцу спецификации
+freedesktop: имя файла эскиза — хеш пути, а размер и время изменения
+исходного файла записаны в текстовых полях PNG, поэтому изменённый
+файл получает новый эскиз, а устаревший перезаписывается.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import FrozenSet, List, Optional, Set
+
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader, QPixmap
+
+from cache_dir import cache_path
+
+logger = logging.getLogger('FileExplorer.thumbnails')
+
+# Наибольшая сторона эскиза (пикселей)
+THUMBNAIL_SIZE = 128
+# Файлы меньше этого размера на диске не кэшируются: их декодирование не дороже чтения эскиза
+CACHE_MIN_BYTES = 16 * 1024
+# Сколько памяти занимают эскизы в памяти (байт)
+MEMORY_BYTES = 64 * 1024 * 1024
+# Сколько фоновых задач одновременно декодируют эскизы
+WORKERS = 2
+# Сколько файлов задача декодирует до передачи результатов
+BATCH_FILES = 8
+# Сколько запросов ждут декодирования; более старые (уже прокрученные) забываются
+MAX_PENDING = 512
+
+# Текстовые поля PNG с размером и временем изменения исходного файла (без «::»
+# из спецификации freedesktop: Qt читает такие ключи только вместе с изображением)
+_SIZE_KEY = 'ThumbSize'
+_MTIME_KEY = 'ThumbMTime'
+# Оценка памяти, занимаемой записью без изображения
+_ENTRY_OVERHEAD = 200
+
+_image_suffixes: Optional[FrozenSet[str]] = None
+
+
+def is_image(path: str) -> bool:
+    """Поддерживает ли Qt формат файла (по расширению, без чтения файла)."""
+    global _image_suffixes
+    if _image_suffixes is None:
+        _image_suffixes = frozenset('.' + bytes(name).decode('ascii', 'replace').lower()
+                                    for name in QImageReader.supportedImageFormats())
+    return os.path.splitext(path)[1].lower() in _image_suffixes
+
+
+def make_thumbnail(path: str, size: int = THUMBNAIL_SIZE) -> Optional[QImage]:
+    """
+    Декодирует изображение, уменьшенное до size по большей стороне.
+
+    Args:
+        path: Путь к изображению
+        size: Наибольшая сторона (пикселей)
+
+    Returns:
+        Изображение или None, если файл не удалось декодировать
+    """
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    original = reader.size()
+    if original.isValid() and (original.width() > size or original.height() > size):
+        reader.setScaledSize(original.scaled(size, size, Qt.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        logger.debug(f'Cannot decode {path}: {reader.errorString()}')
+        return None
+    if image.width() > size or image.height() > size:
+        # Формат не сообщил размер до декодирования
+        image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image
+
+
+class ThumbnailCache:
+    """Эскизы на диске: один PNG на исходный файл, устаревшие перезаписываются."""
+
+    def __init__(self, directory: Optional[str] = None, size: int = THUMBNAIL_SIZE) -> None:
+        """
+        Инициализация кэша.
+
+        Args:
+            directory: Каталог эскизов; по умолчанию thumbnails в каталоге кэша
+            size: Наибольшая сторона эскизов
+        """
+        self.directory = directory or cache_path('thumbnails')
+        self.size = size
+
+    def file_for(self, path: str) -> str:
+        """Путь файла эскиза для исходного файла."""
+        digest = hashlib.sha1(os.fsencode(path)).hexdigest()
+        return os.path.join(self.directory, f'{digest}-{self.size}.png')
+
+    def load(self, path: str, st: os.stat_result) -> Optional[QImage]:
+        """
+        Эскиз из кэша, если исходный файл с тех пор не изменился.
+
+        Args:
+            path: Путь к исходному файлу
+            st: Результат os.stat исходного файла
+        """
+        reader = QImageReader(self.file_for(path), b'png')
+        if (not reader.canRead() or reader.text(_MTIME_KEY) != str(st.st_mtime_ns)
+                or reader.text(_SIZE_KEY) != str(st.st_size)):
+            return None
+        image = reader.read()
+        return None if image.isNull() else image
+
+    def store(self, path: str, st: os.stat_result, image: QImage) -> None:
+        """
+        Сохраняет эскиз. Файл пишется во временный и переименовывается,
+        поэтому параллельные задачи не видят недописанный эскиз.
+
+        Args:
+            path: Путь к исходному файлу
+            st: Результат os.stat исходного файла
+            image: Эскиз
+        """
+        target = self.file_for(path)
+        partial = f'{target}.{threading.get_ident()}.partial'
+        image = QImage(image)
+        image.setText(_SIZE_KEY, str(st.st_size))
+        image.setText(_MTIME_KEY, str(st.st_mtime_ns))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if image.save(partial, 'PNG'):
+                os.replace(partial, target)
+        except OSError as e:
+            logger.debug(f'Cannot store thumbnail of {path}: {e}')
+
+
+def load_thumbnail(path: str, size: int = THUMBNAIL_SIZE,
+                   cache: Optional[ThumbnailCache] = None) -> Optional[QImage]:
+    """
+    Эскиз файла из кэша или декодированием.
+
+    Args:
+        path: Путь к изображению
+        size: Наибольшая сторона эскиза
+        cache: Кэш эскизов на диске; None отключает кэширование
+
+    Returns:
+        Эскиз или None, если файл недоступен или не декодируется
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if cache is not None:
+        image = cache.load(path, st)
+        if image is not None:
+            return image
+    image = make_thumbnail(path, size)
+    if image is not None and cache is not None and st.st_size >= CACHE_MIN_BYTES:
+        cache.store(path, st, image)
+    return image
+
+
+class ThumbnailProvider(QObject):
+    """
+    Эскизы для представлений с большим числом изображений.
+
+    Представление запрашивает эскизы только отображаемых элементов при
+    отрисовке. Запросы становятся в очередь, из которой фоновые задачи
+    берут сначала самые свежие, поэтому при прокрутке декодируется то,
+    что видно сейчас, а давно прокрученные запросы вытесняются из очереди.
+    """
+
+    # Готовы эскизы этих файлов
+    thumbnails_ready = pyqtSignal(list)
+
+    _batch_ready = pyqtSignal(list)
+
+    def __init__(self, cache: Optional[ThumbnailCache] = None, executor=None,
+                 size: int = THUMBNAIL_SIZE, parent=None) -> None:
+        """
+        Инициализация.
+
+        Args:
+            cache: Кэш эскизов на диске; None отключает кэширование
+            executor: Исполнитель фоновых задач (submit/shutdown);
+                по умолчанию — собственный пул
+            size: Наибольшая сторона эскизов
+            parent: Родительский объект Qt
+        """
+        super().__init__(parent)
+        self.size = size
+        self._cache = cache
+        self._executor = executor or ThreadPoolExecutor(max_workers=WORKERS,
+                                                        thread_name_prefix='thumbnails')
+        self._known: 'OrderedDict[str, Optional[QPixmap]]' = OrderedDict()
+        self._bytes = 0
+        # Очередь запросов (последние — самые свежие) и декодируемые файлы;
+        # общие с фоновыми задачами
+        self._pending: 'OrderedDict[str, None]' = OrderedDict()
+        self._decoding: Set[str] = set()
+        self._active = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._batch_ready.connect(self._on_batch)
+
+    def thumbnail(self, path: str) -> Optional[QPixmap]:
+        """
+        Эскиз файла или None, если он ещё не готов (тогда он запрашивается)
+        или файл не декодируется.
+
+        Args:
+            path: Путь к изображению
+        """
+        if path in self._known:
+            self._known.move_to_end(path)
+            return self._known[path]
+        with self._lock:
+            if self._closed or path in self._decoding:
+                return None
+            self._pending[path] = None
+            self._pending.move_to_end(path)
+            while len(self._pending) > MAX_PENDING:
+                self._pending.popitem(last=False)
+            start = self._active < WORKERS
+            if start:
+                self._active += 1
+        if start:
+            self._start_worker()
+        return None
+
+    def invalidate(self, directories: Set[str]) -> None:
+        """
+        Забывает эскизы файлов в каталогах (после их изменения).
+
+        Args:
+            directories: Нормализованные пути каталогов
+        """
+        for path in [path for path in self._known if os.path.dirname(path) in directories]:
+            self._bytes -= _pixmap_bytes(self._known.pop(path))
+
+    def close(self) -> None:
+        """Отменяет ожидающие запросы."""
+        with self._lock:
+            self._closed = True
+            self._pending.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _start_worker(self) -> None:
+        """
+        Запускает фоновую задачу, уже учтённую в self._active. Счётчик
+        уменьшается по её завершению, в том числе если задача была отменена
+        и не выполнялась.
+        """
+        self._executor.submit(self._work).add_done_callback(self._worker_done)
+
+    def _worker_done(self, future) -> None:
+        """
+        Учитывает завершение задачи. Запросы, пришедшие после того, как
+        задача закончила очередь, передаются новой задаче; после отмены
+        (закрытие планировщика) новая задача не запускается.
+        """
+        with self._lock:
+            self._active -= 1
+            start = (not self._closed and not future.cancelled() and bool(self._pending)
+                     and self._active < WORKERS)
+            if start:
+                self._active += 1
+        if start:
+            self._start_worker()
+
+    def _work(self) -> None:
+        """Фоновая задача: декодирует запросы, начиная с самых свежих."""
+        try:
+            while True:
+                with self._lock:
+                    if self._closed or not self._pending:
+                        return
+                    batch = [self._pending.popitem()[0]
+                             for _ in range(min(BATCH_FILES, len(self._pending)))]
+                    self._decoding.update(batch)
+                self._batch_ready.emit([(path, load_thumbnail(path, self.size, self._cache))
+                                        for path in batch])
+        except Exception:
+            logger.exception('Thumbnail worker failed')
+
+    def _on_batch(self, results: list) -> None:
+        """Запоминает готовые эскизы и сообщает о них представлениям."""
+        with self._lock:
+            self._decoding.difference_update(path for path, _ in results)
+        paths: List[str] = []
+        for path, image in results:
+            pixmap = QPixmap.fromImage(image) if image is not None else None
+            if path in self._known:
+                self._bytes -= _pixmap_bytes(self._known[path])
+            self._known[path] = pixmap
+            self._bytes += _pixmap_bytes(pixmap)
+            paths.append(path)
+        while self._bytes > MEMORY_BYTES and self._known:
+            _, pixmap = self._known.popitem(last=False)
+            self._bytes -= _pixmap_bytes(pixmap)
+        self.thumbnails_ready.emit(paths)
+
+
+def _pixmap_bytes(pixmap: Optional[QPixmap]) -> int:
+    """Оценка памяти, занимаемой записью с эскизом."""
+    if pixmap is None:
+        return _ENTRY_OVERHEAD
+    return _ENTRY_OVERHEAD + pixmap.width() * pixmap.height() * pixmap.depth() // 8
@@ -0,0 +1,180 @@
+import logging
+import os
+import queue
+import threading
+from typing import Callable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger('FileExplorer.walker')
+
+# Количество потоков обхода по умолчанию
+DEFAULT_WORKERS = 4
+# Максимальное число каталогов, ожидающих обработки потребителем
+RESULT_QUEUE_SIZE = 1024
+
+WalkEntry = Tuple[str, List[str], List[str]]
+
+_DONE = object()
+
+
+def scan_directory(path: str) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Читает содержимое каталога через os.scandir.
+
+    Имена сортируются, поэтому порядок внутри каталога детерминирован.
+    Символические ссылки на каталоги попадают в список каталогов,
+    как в os.walk, но не попадают в список для спуска.
+
+    Args:
+        path: Путь к каталогу
+
+    Returns:
+        Кортеж (имена каталогов, имена файлов, пути подкаталогов для спуска)
+    """
+    dirnames, filenames, links = [], [], set()
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+                if is_dir and entry.is_symlink():
+                    links.add(entry.name)
+            except OSError:
+                is_dir = False
+            (dirnames if is_dir else filenames).append(entry.name)
+    dirnames.sort()
+    filenames.sort()
+    descend = [os.path.join(path, name) for name in dirnames if name not in links]
+    return dirnames, filenames, descend
+
+
+class ParallelWalker:
+    """Многопоточный обход дерева каталогов на основе os.scandir."""
+
+    def __init__(self, root_path: str, workers: int = DEFAULT_WORKERS,
+                 should_stop: Optional[Callable[[], bool]] = None,
+                 prune: Optional[Callable[[str], bool]] = None) -> None:
+        """
+        Инициализация обходчика.
+
+        Args:
+            root_path: Корневой каталог
+            workers: Количество потоков; при 1 обход выполняется в текущем потоке
+            should_stop: Функция, возвращающая True при запросе остановки
+            prune: Функция, получающая путь подкаталога и возвращающая True,
+                   если каталог и всё его поддерево нужно пропустить
+        """
+        self.root_path = root_path
+        self.workers = max(1, workers)
+        self.should_stop = should_stop or (lambda: False)
+        self.prune = prune
+        # Количество прочитанных каталогов и каталогов, которые не удалось прочитать
+        self.scanned = 0
+        self.errors = 0
+
+        self._cond = threading.Condition()
+        self._pending_dirs: List[str] = []
+        self._pending = 0
+        self._stopped = False
+        self._results: queue.Queue = queue.Queue(RESULT_QUEUE_SIZE)
+
+    def __iter__(self) -> Iterator[WalkEntry]:
+        """Возвращает кортежи (каталог, каталоги, файлы), как os.walk."""
+        if self.workers == 1:
+            return self._walk_serial()
+        return self._walk_parallel()
+
+    def _scan(self, path: str) -> Tuple[List[str], List[str], List[str]]:
+        """Читает каталог и отбрасывает подкаталоги, исключённые функцией prune."""
+        dirnames, filenames, subdirs = scan_directory(path)
+        if self.prune is not None and dirnames:
+            pruned = {name for name in dirnames if self.prune(os.path.join(path, name))}
+            if pruned:
+                dirnames = [name for name in dirnames if name not in pruned]
+                subdirs = [sub for sub in subdirs if os.path.basename(sub) not in pruned]
+        return dirnames, filenames, subdirs
+
+    def _walk_serial(self) -> Iterator[WalkEntry]:
+        """Однопоточный обход в глубину."""
+        stack = [self.root_path]
+        while stack and not self.should_stop():
+            path = stack.pop()
+            try:
+                dirnames, filenames, subdirs = self._scan(path)
+            except OSError as e:
+                self.errors += 1
+                logger.debug(f'Scan error: {e}')
+                continue
+            self.scanned += 1
+            yield path, dirnames, filenames
+            stack.extend(reversed(subdirs))
+
+    def _walk_parallel(self) -> Iterator[WalkEntry]:
+        """Обход пулом потоков; результаты передаются через очередь."""
+        self._pending_dirs = [self.root_path]
+        self._pending = 1
+        threads = [
+            threading.Thread(target=self._worker, name=f'walker-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        finished = 0
+        try:
+            while finished < len(threads):
+                if self.should_stop():
+                    break
+                try:
+                    item = self._results.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    finished += 1
+                    continue
+                yield item
+        finally:
+            self._stop_workers(len(threads) - finished)
+
+    def _stop_workers(self, alive: int) -> None:
+        """Останавливает потоки и вычитывает очередь, чтобы они не зависли на put."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        while alive:
+            if self._results.get() is _DONE:
+                alive -= 1
+
+    def _next_dir(self) -> Optional[str]:
+        """Берёт следующий каталог из общей очереди или None, если работа закончена."""
+        with self._cond:
+            while not self._pending_dirs and self._pending and not self._stopped:
+                self._cond.wait()
+            if self._stopped or not self._pending_dirs:
+                return None
+            return self._pending_dirs.pop()
+
+    def _worker(self) -> None:
+        """Рабочий поток: читает каталоги и добавляет подкаталоги в очередь."""
+        try:
+            while True:
+                path = self._next_dir()
+                if path is None:
+                    break
+                subdirs: List[str] = []
+                try:
+                    dirnames, filenames, subdirs = self._scan(path)
+                except OSError as e:
+                    logger.debug(f'Scan error: {e}')
+                    failed = True
+                else:
+                    self._results.put((path, dirnames, filenames))
+                    failed = False
+                with self._cond:
+                    if failed:
+                        self.errors += 1
+                    else:
+                        self.scanned += 1
+                    self._pending_dirs.extend(reversed(subdirs))
+                    self._pending += len(subdirs) - 1
+                    self._cond.notify_all()
+        finally:
+            self._results.put(_DONE)